@@ -0,0 +1,109 @@
+"""Alert coalescing, organization timezone and execution queue columns
+
+Revision ID: 002
+Revises: 001
+Create Date: 2026-10-18 00:00:00.000000
+
+Tables missing here are created complete by init_db (create_all); this
+revision only brings existing tables up to date, so each column and index
+is added only where it is absent. create_all does not add indexes to
+existing tables either, so indexes declared on the models are created here.
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '002'
+down_revision = '001'
+branch_labels = None
+depends_on = None
+
+
+NEW_COLUMNS = {
+    'mutual_support_alerts': [
+        sa.Column('coalesce_key', sa.String(length=255), nullable=True),
+        # Alerts from before the open-digest index start closed
+        sa.Column('coalesce_open', sa.Boolean(), nullable=False, server_default=sa.false()),
+        sa.Column('occurrence_count', sa.Integer(), nullable=True, server_default='1'),
+        sa.Column('last_occurrence_at', sa.DateTime(), nullable=True),
+    ],
+    'organizations': [
+        sa.Column('timezone', sa.String(length=64), nullable=True, server_default='America/Los_Angeles'),
+    ],
+    'orchestration_recommendations': [
+        sa.Column('queued_at', sa.DateTime(), nullable=True),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('completed_at', sa.DateTime(), nullable=True),
+        sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('lease_expires_at', sa.DateTime(), nullable=True),
+        sa.Column('execution_result', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+        sa.Column('last_error', sa.Text(), nullable=True),
+    ],
+}
+
+NEW_INDEXES = [
+    ('ix_mutual_support_alerts_coalesce', 'mutual_support_alerts',
+     ['organization_id', 'coalesce_key', 'status', 'created_at']),
+    ('ix_orchestration_recommendations_status_queued', 'orchestration_recommendations',
+     ['status', 'queued_at']),
+    # Heatmap / trend aggregation and pair-member lookups over intakes
+    ('ix_intakes_location_created', 'intakes', ['location_id', 'created_at']),
+    ('ix_intakes_client_id', 'intakes', ['client_id']),
+    # Org-scoped analytics windows over pairs
+    ('ix_mutual_support_pairs_org_created', 'mutual_support_pairs',
+     ['organization_id', 'created_at']),
+]
+
+# One open digest per group; coalescing upserts into it (see AlertCoalescer.open_digest)
+OPEN_DIGEST_INDEX = ('uq_mutual_support_alerts_open_digest', 'mutual_support_alerts',
+                     ['organization_id', 'coalesce_key'], "status = 'unread' AND coalesce_open")
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    tables = set(inspector.get_table_names())
+
+    for table, columns in NEW_COLUMNS.items():
+        if table not in tables:
+            continue
+        existing = {column['name'] for column in inspector.get_columns(table)}
+        for column in columns:
+            if column.name not in existing:
+                op.add_column(table, column)
+
+    # Rows from before coalescing are single occurrences
+    if 'mutual_support_alerts' in tables:
+        op.execute(
+            'UPDATE mutual_support_alerts SET last_occurrence_at = created_at '
+            'WHERE last_occurrence_at IS NULL'
+        )
+
+    for name, table, columns in NEW_INDEXES:
+        if table in tables and name not in {index['name'] for index in inspector.get_indexes(table)}:
+            op.create_index(name, table, columns)
+
+    name, table, columns, where = OPEN_DIGEST_INDEX
+    if table in tables and name not in {index['name'] for index in inspector.get_indexes(table)}:
+        op.create_index(name, table, columns, unique=True, postgresql_where=sa.text(where))
+
+
+def downgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    tables = set(inspector.get_table_names())
+
+    name, table, _, _ = OPEN_DIGEST_INDEX
+    if table in tables and name in {index['name'] for index in inspector.get_indexes(table)}:
+        op.drop_index(name, table_name=table)
+
+    for name, table, _ in reversed(NEW_INDEXES):
+        if table in tables and name in {index['name'] for index in inspector.get_indexes(table)}:
+            op.drop_index(name, table_name=table)
+
+    for table, columns in NEW_COLUMNS.items():
+        if table not in tables:
+            continue
+        existing = {column['name'] for column in inspector.get_columns(table)}
+        for column in reversed(columns):
+            if column.name in existing:
+                op.drop_column(table, column.name)
@@ -0,0 +1,112 @@
+"""Orchestration recommendations owned by an organization (UUID foreign key)
+
+Revision ID: 003
+Revises: 002
+Create Date: 2026-10-18 00:00:00.000000
+
+orchestration_recommendations.organization_id was a free-form string. It
+becomes a UUID referencing organizations.id like every other table's
+organization_id. Values that are not UUIDs of an existing organization
+cannot be delivered to anyone and are cleared; the column is made NOT NULL
+only when no such rows remain, so no recommendation is deleted here.
+
+Listings are per organization, so the keyset indexes lead with
+organization_id and replace the organization-less ones.
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '003'
+down_revision = '002'
+branch_labels = None
+depends_on = None
+
+
+TABLE = 'orchestration_recommendations'
+FOREIGN_KEY = 'orchestration_recommendations_organization_id_fkey'  # Postgres' name for create_all's key
+NEW_INDEXES = [
+    ('ix_orchestration_recommendations_org_status_created', ['organization_id', 'status', 'created_at', 'id']),
+    ('ix_orchestration_recommendations_org_created', ['organization_id', 'created_at', 'id']),
+]
+OLD_INDEXES = [
+    ('ix_orchestration_recommendations_organization_id', ['organization_id']),
+    ('ix_orchestration_recommendations_status_created', ['status', 'created_at', 'id']),
+    ('ix_orchestration_recommendations_created', ['created_at', 'id']),
+]
+UUID_PATTERN = '^[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}$'
+
+
+def _column(inspector):
+    return next(column for column in inspector.get_columns(TABLE) if column['name'] == 'organization_id')
+
+
+def _index_names(inspector):
+    return {index['name'] for index in inspector.get_indexes(TABLE)}
+
+
+def _has_foreign_key(inspector):
+    return any(
+        key['constrained_columns'] == ['organization_id'] and key['referred_table'] == 'organizations'
+        for key in inspector.get_foreign_keys(TABLE)
+    )
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if TABLE not in inspector.get_table_names():
+        return
+
+    if not isinstance(_column(inspector)['type'], sa.Uuid):
+        op.execute(sa.text(
+            f"UPDATE {TABLE} SET organization_id = NULL WHERE organization_id !~ :pattern"
+        ).bindparams(pattern=UUID_PATTERN))
+        op.alter_column(
+            TABLE, 'organization_id',
+            type_=postgresql.UUID(as_uuid=True),
+            postgresql_using='organization_id::uuid'
+        )
+    op.execute(
+        f"UPDATE {TABLE} SET organization_id = NULL WHERE organization_id IS NOT NULL "
+        f"AND NOT EXISTS (SELECT 1 FROM organizations WHERE organizations.id = {TABLE}.organization_id)"
+    )
+
+    if not _has_foreign_key(inspector):
+        op.create_foreign_key(FOREIGN_KEY, TABLE, 'organizations', ['organization_id'], ['id'])
+    existing = _index_names(inspector)
+    for name, columns in NEW_INDEXES:
+        if name not in existing:
+            op.create_index(name, TABLE, columns)
+    for name, _ in OLD_INDEXES:
+        if name in existing:
+            op.drop_index(name, table_name=TABLE)
+
+    unowned = bind.execute(sa.text(f"SELECT count(*) FROM {TABLE} WHERE organization_id IS NULL")).scalar()
+    if not unowned:
+        op.alter_column(TABLE, 'organization_id', nullable=False)
+
+
+def downgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if TABLE not in inspector.get_table_names():
+        return
+
+    existing = _index_names(inspector)
+    for name, columns in OLD_INDEXES:
+        if name not in existing:
+            op.create_index(name, TABLE, columns)
+    for name, _ in NEW_INDEXES:
+        if name in existing:
+            op.drop_index(name, table_name=TABLE)
+
+    if FOREIGN_KEY in {key['name'] for key in inspector.get_foreign_keys(TABLE)}:
+        op.drop_constraint(FOREIGN_KEY, TABLE, type_='foreignkey')
+    if isinstance(_column(inspector)['type'], sa.Uuid):
+        op.alter_column(
+            TABLE, 'organization_id',
+            type_=sa.String(length=100),
+            nullable=True,
+            postgresql_using='organization_id::text'
+        )
@@ -3,6 +3,9 @@ Database configuration and session management for First Contact EIS
 """
 
 import os
+import time
+import asyncio
+from typing import Optional
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import declarative_base
 from sqlalchemy import text
@@ -33,6 +36,117 @@ AsyncSessionLocal = async_sessionmaker(
     expire_on_commit=False
 )
 
+# Optional read replica for analytics/reporting (unset = everything on the primary)
+READ_DATABASE_URL = os.getenv("READ_DATABASE_URL")
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "30"))
+REPLICA_CHECK_INTERVAL_SECONDS = float(os.getenv("REPLICA_CHECK_INTERVAL_SECONDS", "5"))
+
+read_engine = create_async_engine(
+    READ_DATABASE_URL,
+    echo=os.getenv("DEBUG", "false").lower() == "true",
+    pool_size=20,
+    max_overflow=30,
+    pool_pre_ping=True,
+    pool_recycle=3600,
+    # Guard against accidental writes through the read path
+    connect_args={"server_settings": {"default_transaction_read_only": "on"}},
+) if READ_DATABASE_URL else None
+
+ReadSessionLocal = async_sessionmaker(
+    read_engine,
+    class_=AsyncSession,
+    expire_on_commit=False
+) if read_engine is not None else None
+
+# Seconds since the last replayed transaction, or 0 when the replica has
+# replayed everything it received (or is not in recovery at all, e.g. a
+# second standalone Postgres used as a local stand-in)
+REPLICA_LAG_QUERY = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+""")
+
+
+class ReplicaMonitor:
+    """
+    Decides whether read-only requests may use the replica
+
+    Replication lag is measured at most once per check interval; a replica
+    that is too far behind or unreachable sends reads to the primary until
+    the next check.
+    """
+
+    def __init__(
+        self,
+        session_factory,
+        max_lag_seconds: float,
+        check_interval_seconds: float,
+        check_timeout_seconds: float = 2.0
+    ):
+        self.session_factory = session_factory
+        self.max_lag_seconds = max_lag_seconds
+        self.check_interval_seconds = check_interval_seconds
+        self.check_timeout_seconds = check_timeout_seconds
+
+        self.last_lag: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.usable = False
+        self._checked_at = 0.0
+
+        # Statistics tracking
+        self.replica_sessions = 0
+        self.primary_fallbacks = 0
+
+    async def is_usable(self) -> bool:
+        """True if the replica is configured, reachable and within lag tolerance"""
+        if self.session_factory is None:
+            return False
+        if time.monotonic() - self._checked_at >= self.check_interval_seconds:
+            await self.check()
+        return self.usable
+
+    async def check(self):
+        """Measure replication lag now"""
+        self._checked_at = time.monotonic()
+        try:
+            lag = await asyncio.wait_for(self._measure_lag(), timeout=self.check_timeout_seconds)
+            self.last_lag = lag
+            self.last_error = None
+            usable = lag <= self.max_lag_seconds
+            if not usable:
+                logger.warning(f"Read replica {lag:.1f}s behind (max {self.max_lag_seconds}s); reading from primary")
+        except Exception as e:
+            self.last_error = str(e) or type(e).__name__
+            usable = False
+            logger.warning(f"Read replica unavailable; reading from primary: {self.last_error}")
+        self.usable = usable
+
+    async def _measure_lag(self) -> float:
+        async with self.session_factory() as session:
+            return float((await session.execute(REPLICA_LAG_QUERY)).scalar() or 0)
+
+    def get_statistics(self):
+        """Get replica routing statistics"""
+        return {
+            "configured": self.session_factory is not None,
+            "usable": self.usable,
+            "lag_seconds": self.last_lag,
+            "max_lag_seconds": self.max_lag_seconds,
+            "last_error": self.last_error,
+            "replica_sessions": self.replica_sessions,
+            "primary_fallbacks": self.primary_fallbacks
+        }
+
+
+replica_monitor = ReplicaMonitor(
+    ReadSessionLocal,
+    max_lag_seconds=REPLICA_MAX_LAG_SECONDS,
+    check_interval_seconds=REPLICA_CHECK_INTERVAL_SECONDS
+)
+
 # Base class for models
 Base = declarative_base()
 
@@ -60,6 +174,31 @@ async def get_db() -> AsyncSession:
         finally:
             await session.close()
 
+async def get_read_db() -> AsyncSession:
+    """
+    Dependency for read-only endpoints (analytics, listings)
+
+    Uses the read replica when it is configured and within the lag
+    tolerance, otherwise the primary.
+    """
+    if await replica_monitor.is_usable():
+        factory = ReadSessionLocal
+        replica_monitor.replica_sessions += 1
+    else:
+        factory = AsyncSessionLocal
+        if replica_monitor.session_factory is not None:
+            replica_monitor.primary_fallbacks += 1
+
+    async with factory() as session:
+        try:
+            yield session
+        except Exception as e:
+            await session.rollback()
+            logger.error(f"Database session error: {e}")
+            raise
+        finally:
+            await session.close()
+
 async def check_db_connection():
     """Check database connection"""
     try:
@@ -74,4 +213,6 @@ async def check_db_connection():
 async def close_db_connections():
     """Close all database connections"""
     await engine.dispose()
+    if read_engine is not None:
+        await read_engine.dispose()
     logger.info("Database connections closed")
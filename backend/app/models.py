@@ -5,10 +5,10 @@ Multi-tenant, geospatial, compliance-ready architecture
 
 from datetime import datetime, date
 from typing import Optional, List
-from sqlalchemy import Column, Integer, String, Text, DateTime, Date, Boolean, Float, ForeignKey, JSON, Enum
+from sqlalchemy import Column, Integer, SmallInteger, String, Text, DateTime, Date, Boolean, Float, ForeignKey, JSON, Enum, Index, LargeBinary, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.dialects.postgresql import UUID, JSONB
 import uuid
 import enum
 
@@ -90,6 +90,7 @@ class Organization(Base):
     
     # Settings
     settings = Column(JSON, default={})  # Branding, features enabled, integrations
+    timezone = Column(String(64), default="America/Los_Angeles")  # IANA name; analytics day/week boundaries
     api_key = Column(String(255), unique=True)  # For their API access
     
     # Billing
@@ -293,6 +294,13 @@ class Intake(Base):
     # Relationships
     client = relationship("Client", back_populates="intakes")
     location = relationship("Location", back_populates="intakes")
+    
+    __table_args__ = (
+        # Heatmap / trend aggregation by location over a date range
+        Index("ix_intakes_location_created", "location_id", "created_at"),
+        # Pair-member lookups (heatmap pair counts, intake status)
+        Index("ix_intakes_client_id", "client_id"),
+    )
 
 # ============================================================================
 # CASE MANAGEMENT
@@ -438,6 +446,11 @@ class MutualSupportPair(Base):
     client_b = relationship("Client", foreign_keys=[client_b_id], back_populates="mutual_support_pairs_b")
     reviewed_by = relationship("User", foreign_keys=[reviewed_by_id])
     cases = relationship("Case", back_populates="mutual_support_pair")
+    
+    __table_args__ = (
+        # Analytics windows: WHERE organization_id = ? AND created_at >= ?
+        Index("ix_mutual_support_pairs_org_created", "organization_id", "created_at"),
+    )
 
 # ============================================================================
 # CASEWORKER ALERTS
@@ -540,6 +553,15 @@ class MutualSupportAlert(Base):
     read_at = Column(DateTime)
     dismissed_at = Column(DateTime)
     
+    # Burst coalescing (repeat detections within a window fold into one digest row)
+    coalesce_key = Column(String(255))  # "pair:<a>:<b>" or "household:<hash>"
+    coalesce_open = Column(Boolean, nullable=False, default=True)  # Cleared once the window has passed
+    occurrence_count = Column(Integer, default=1)
+    last_occurrence_at = Column(DateTime, default=datetime.utcnow)
+    
+    # At most one per (organization_id, coalesce_key); see AlertCoalescer.open_digest
+    OPEN_DIGEST = "status = 'unread' AND coalesce_open"
+    
     # Additional context
     alert_metadata = Column(JSON)  # Changed from 'metadata' (reserved by SQLAlchemy)
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -548,3 +570,147 @@ class MutualSupportAlert(Base):
     # Relationships
     organization = relationship("Organization")
     mutual_support_pair = relationship("MutualSupportPair")
+    
+    __table_args__ = (
+        # Open-digest lookup during intake bursts
+        Index("ix_mutual_support_alerts_coalesce", "organization_id", "coalesce_key", "status", "created_at"),
+        # Concurrent first detections of a group upsert into one digest
+        Index(
+            "uq_mutual_support_alerts_open_digest", "organization_id", "coalesce_key", unique=True,
+            postgresql_where=text(OPEN_DIGEST), sqlite_where=text(OPEN_DIGEST)
+        ),
+    )
+
+
+# ============================================================================
+# ANALYTICS ROLLUPS (Pre-aggregated daily stats for city dashboards)
+# ============================================================================
+
+class IntakeDailyStats(Base):
+    """
+    Intakes per organization, location and UTC day
+    Maintained on write by the intake router (see app.services.rollups)
+    """
+    __tablename__ = "intake_daily_stats"
+    
+    organization_id = Column(UUID(as_uuid=True), ForeignKey("organizations.id"), primary_key=True)
+    location_id = Column(UUID(as_uuid=True), ForeignKey("locations.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    
+    intake_count = Column(Integer, nullable=False, default=0)
+    clients_sketch = Column(LargeBinary)  # HyperLogLog of client IDs (see app.services.hll)
+    
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        # Range scans per organization (trends, dashboard summary)
+        Index("ix_intake_daily_stats_org_day", "organization_id", "day"),
+    )
+
+
+class IntakeHourlyStats(Base):
+    """
+    Intakes per organization, location and UTC hour
+    Finer-grained twin of IntakeDailyStats for local-time trend buckets
+    """
+    __tablename__ = "intake_hourly_stats"
+    
+    organization_id = Column(UUID(as_uuid=True), ForeignKey("organizations.id"), primary_key=True)
+    location_id = Column(UUID(as_uuid=True), ForeignKey("locations.id"), primary_key=True)
+    hour = Column(DateTime, primary_key=True)  # UTC, truncated to the hour
+    
+    intake_count = Column(Integer, nullable=False, default=0)
+    
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        # Range scans per organization (volume trends)
+        Index("ix_intake_hourly_stats_org_hour", "organization_id", "hour"),
+    )
+
+
+class PairDailyStats(Base):
+    """
+    Mutual support pairs detected per organization and UTC day
+    """
+    __tablename__ = "pair_daily_stats"
+    
+    organization_id = Column(UUID(as_uuid=True), ForeignKey("organizations.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    
+    pair_count = Column(Integer, nullable=False, default=0)
+    ihss_eligible_count = Column(Integer, nullable=False, default=0)
+    cost_savings_total = Column(Float, nullable=False, default=0.0)
+    
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class HeatmapTile(Base):
+    """
+    Intake and pair counts per web-mercator tile (zoom 8-16) and UTC day
+    Maintained on write by the intake router (see app.services.heatmap_tiles)
+    """
+    __tablename__ = "heatmap_tiles"
+    
+    organization_id = Column(UUID(as_uuid=True), ForeignKey("organizations.id"), primary_key=True)
+    zoom = Column(SmallInteger, primary_key=True)
+    tile_x = Column(Integer, primary_key=True)
+    tile_y = Column(Integer, primary_key=True)
+    day = Column(Date, primary_key=True)
+    
+    intake_count = Column(Integer, nullable=False, default=0)
+    pair_count = Column(Integer, nullable=False, default=0)
+    
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+# ============================================================================
+# ORCHESTRATION RECOMMENDATIONS
+# ============================================================================
+
+class OrchestrationRecommendation(Base):
+    """
+    Coordination plans proposed by the orchestration engine, awaiting or
+    past caseworker approval (see app.services.recommendation_store)
+    """
+    __tablename__ = "orchestration_recommendations"
+    
+    id = Column(String(100), primary_key=True)  # Engine-generated recommendation_id
+    organization_id = Column(UUID(as_uuid=True), ForeignKey("organizations.id"), nullable=False)
+    
+    # What the caseworker sees
+    summary = Column(Text, nullable=False)
+    reasoning = Column(JSONB, default=list)
+    impact = Column(JSONB, default=dict)
+    confidence_score = Column(Float, nullable=False)
+    actions_count = Column(Integer, default=0)
+    estimated_duration_seconds = Column(Integer, default=0)
+    affected_systems = Column(JSONB, default=list)
+    
+    # What gets executed on approval
+    execution_plan = Column(JSONB, nullable=False)
+    
+    # Lifecycle: pending_approval -> queued -> executing -> completed,
+    # partial_success or failed; or pending_approval -> rejected
+    status = Column(String(50), nullable=False, default="pending_approval")
+    approved_by = Column(String(100))
+    
+    # Execution queue (see app.services.execution_queue)
+    queued_at = Column(DateTime)
+    started_at = Column(DateTime)
+    completed_at = Column(DateTime)
+    attempts = Column(Integer, nullable=False, default=0)
+    lease_expires_at = Column(DateTime)  # Executing rows past this are reclaimed
+    execution_result = Column(JSONB)
+    last_error = Column(Text)
+    
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        # Keyset listings per organization: newest first, optionally filtered by status
+        Index("ix_orchestration_recommendations_org_status_created", "organization_id", "status", "created_at", "id"),
+        Index("ix_orchestration_recommendations_org_created", "organization_id", "created_at", "id"),
+        # Queue claims: oldest queued first
+        Index("ix_orchestration_recommendations_status_queued", "status", "queued_at"),
+    )
@@ -0,0 +1,44 @@
+"""
+Redis connection management for First Contact EIS
+Shared async client for pub/sub fan-out, counters and caches
+"""
+
+import os
+import logging
+from typing import Optional
+
+import redis.asyncio as redis
+
+logger = logging.getLogger(__name__)
+
+# Redis URL from environment (same default as the Celery broker)
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379")
+
+_redis_client: Optional[redis.Redis] = None
+
+
+def get_redis() -> redis.Redis:
+    """Get the process-wide Redis client (created lazily, connects on first use)"""
+    global _redis_client
+    if _redis_client is None:
+        _redis_client = redis.from_url(REDIS_URL, decode_responses=True)
+    return _redis_client
+
+
+async def check_redis_connection() -> bool:
+    """Check Redis connection"""
+    try:
+        await get_redis().ping()
+        return True
+    except Exception as e:
+        logger.warning(f"Redis connection check failed: {e}")
+        return False
+
+
+async def close_redis_connections():
+    """Close the shared Redis client"""
+    global _redis_client
+    if _redis_client is not None:
+        await _redis_client.close()
+        _redis_client = None
+        logger.info("Redis connections closed")
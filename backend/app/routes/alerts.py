@@ -5,18 +5,33 @@ Handles caseworker alerts and notifications for mutual support pairs
 
 from typing import List, Optional
 from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, WebSocket, WebSocketDisconnect, BackgroundTasks
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
+from sqlalchemy import and_, or_, update, cast, func, bindparam, any_
+from sqlalchemy.dialects.postgresql import ARRAY, JSON, JSONB, UUID
+import json
 import logging
+import os
 
-from app.database import get_db
+from app.database import get_db, get_read_db
 from app.models import MutualSupportAlert, MutualSupportPair, Client
-from app.schemas import AlertResponse, AlertListResponse
+from app.schemas import (
+    AlertResponse,
+    AlertListResponse,
+    AlertCountsResponse,
+    BulkAlertActionRequest,
+    BulkAlertActionResponse
+)
+from app.services.alert_hub import alert_hub
+from app.services.alert_counters import alert_counters, unread_counts_query
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+# Keep-alive interval for idle real-time connections
+HEARTBEAT_INTERVAL = int(os.getenv("WS_HEARTBEAT_INTERVAL", "30"))
+
 
 @router.get("/", response_model=AlertListResponse)
 async def get_alerts(
@@ -25,7 +40,7 @@ async def get_alerts(
     severity: Optional[str] = Query(None, description="Filter by severity: high, medium, low"),
     limit: int = Query(50, le=100),
     offset: int = Query(0, ge=0),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ) -> AlertListResponse:
     """
     Get alerts for an organization's caseworkers.
@@ -75,7 +90,8 @@ async def get_alerts(
                     recommended_actions=alert.recommended_actions,
                     status=alert.status,
                     created_at=alert.created_at,
-                    read_at=alert.read_at
+                    read_at=alert.read_at,
+                    occurrence_count=alert.occurrence_count or 1
                 ))
         
         return AlertListResponse(
@@ -111,10 +127,16 @@ async def mark_alert_read(
             detail=f"Alert {alert_id} not found"
         )
     
+    previous_status = alert.status
     alert.status = "read"
     alert.read_at = datetime.utcnow()
     db.commit()
     
+    await alert_counters.record_transitions(
+        str(alert.organization_id),
+        [(alert.severity, previous_status, "read")]
+    )
+    
     logger.info(f"Alert {alert_id} marked as read")
     
     return {"status": "success", "alert_id": alert_id}
@@ -139,6 +161,7 @@ async def dismiss_alert(
             detail=f"Alert {alert_id} not found"
         )
     
+    previous_status = alert.status
     alert.status = "dismissed"
     alert.dismissed_at = datetime.utcnow()
     if reason:
@@ -147,11 +170,225 @@ async def dismiss_alert(
         alert.alert_metadata["dismissal_reason"] = reason
     db.commit()
     
+    await alert_counters.record_transitions(
+        str(alert.organization_id),
+        [(alert.severity, previous_status, "dismissed")]
+    )
+    
     logger.info(f"Alert {alert_id} dismissed: {reason}")
     
     return {"status": "success", "alert_id": alert_id}
 
 
+@router.patch("/bulk", response_model=BulkAlertActionResponse)
+async def bulk_update_alerts(
+    request: BulkAlertActionRequest,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db)
+) -> BulkAlertActionResponse:
+    """
+    Mark many alerts read or dismissed in one request.
+    
+    Runs a single set-based UPDATE ... WHERE id = ANY(:ids) RETURNING id,
+    so clearing a triage backlog is one statement instead of one
+    load/mutate/commit per alert. Alerts already in the target state (or
+    belonging to another organization) are skipped.
+    """
+    try:
+        now = datetime.utcnow()
+        alert_ids = list(dict.fromkeys(request.alert_ids))
+        ids_param = bindparam("alert_ids", value=alert_ids, type_=ARRAY(UUID(as_uuid=True)))
+        
+        # Self-join so RETURNING can report each row's pre-update status
+        previous = MutualSupportAlert.__table__.alias("previous")
+        
+        stmt = update(MutualSupportAlert).where(
+            and_(
+                MutualSupportAlert.id == previous.c.id,
+                previous.c.id == any_(ids_param),
+                previous.c.organization_id == request.organization_id
+            )
+        )
+        
+        if request.action == "read":
+            stmt = stmt.where(MutualSupportAlert.status == "unread").values(
+                status="read",
+                read_at=now,
+                updated_at=now
+            )
+        else:
+            values = {"status": "dismissed", "dismissed_at": now, "updated_at": now}
+            if request.reason:
+                # Merge the reason server-side: alert_metadata || {"dismissal_reason": ...}
+                values["alert_metadata"] = cast(
+                    func.coalesce(cast(MutualSupportAlert.alert_metadata, JSONB), cast("{}", JSONB)).op("||")(
+                        func.jsonb_build_object("dismissal_reason", request.reason)
+                    ),
+                    JSON
+                )
+            stmt = stmt.where(MutualSupportAlert.status != "dismissed").values(**values)
+        
+        stmt = stmt.returning(
+            MutualSupportAlert.id,
+            MutualSupportAlert.severity,
+            previous.c.status
+        ).execution_options(synchronize_session=False)
+        
+        rows = db.execute(stmt).all()
+        db.commit()
+        
+        updated_ids = [str(row[0]) for row in rows]
+        new_status = "read" if request.action == "read" else "dismissed"
+        await alert_counters.record_transitions(
+            str(request.organization_id),
+            [(severity, previous_status, new_status) for _, severity, previous_status in rows]
+        )
+        
+        logger.info(f"Bulk {request.action}: {len(updated_ids)}/{len(alert_ids)} alerts updated")
+        
+        if updated_ids:
+            background_tasks.add_task(
+                alert_hub.publish,
+                "alerts_updated",
+                {"action": request.action, "alert_ids": updated_ids},
+                organization_id=str(request.organization_id)
+            )
+        
+        return BulkAlertActionResponse(
+            status="success",
+            action=request.action,
+            updated=len(updated_ids),
+            skipped=len(alert_ids) - len(updated_ids),
+            updated_ids=updated_ids
+        )
+        
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error in bulk alert update: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error in bulk alert update: {str(e)}"
+        )
+
+
+@router.get("/counts", response_model=AlertCountsResponse)
+async def get_alert_counts(
+    organization_id: str,
+    db: Session = Depends(get_db)
+) -> AlertCountsResponse:
+    """
+    Unread alert counts for dashboard badges.
+    
+    Served from incrementally maintained Redis counters (one HGETALL).
+    Falls back to a grouped count query only when the organization has
+    never been counted, and seeds the counters from it.
+    """
+    try:
+        counts = await alert_counters.get_counts(organization_id)
+    except Exception as e:
+        logger.warning(f"Alert counters unavailable, counting from database: {e}")
+        counts = None
+    
+    if counts is None:
+        try:
+            rows = db.execute(unread_counts_query(organization_id)).all()
+        except Exception as e:
+            logger.error(f"Error counting alerts: {str(e)}", exc_info=True)
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Error counting alerts: {str(e)}"
+            )
+        
+        by_severity = {severity: count for _, severity, count in rows}
+        counts = {
+            "organization_id": organization_id,
+            "unread": sum(by_severity.values()),
+            "unread_by_severity": by_severity,
+            "reconciled_at": datetime.utcnow().isoformat()
+        }
+        try:
+            await alert_counters.store_counts(rows, organization_ids=[organization_id])
+        except Exception as e:
+            logger.warning(f"Could not seed alert counters for org {organization_id}: {e}")
+    
+    return AlertCountsResponse(**counts)
+
+
+@router.websocket("/ws")
+async def alerts_websocket(
+    websocket: WebSocket,
+    organization_id: str,
+    caseworker_id: Optional[str] = None
+):
+    """
+    Real-time alert feed for caseworker dashboards.
+    
+    Pushes new mutual support alerts and recommendation updates for the
+    organization as {type, data, timestamp} messages, with heartbeats
+    while idle.
+    """
+    try:
+        subscription = alert_hub.subscribe(organization_id, caseworker_id)
+    except RuntimeError as e:
+        await websocket.close(code=1013, reason=str(e))
+        return
+    
+    await websocket.accept()
+    
+    try:
+        while True:
+            message = await subscription.get(timeout=HEARTBEAT_INTERVAL)
+            if message is None:
+                if subscription.closed:
+                    # Too slow to keep up - client should reconnect and re-sync
+                    await websocket.close(code=1013, reason="Subscriber too slow")
+                    break
+                message = {"type": "heartbeat", "data": {}, "timestamp": datetime.utcnow().isoformat()}
+            await websocket.send_json(message)
+    except WebSocketDisconnect:
+        logger.debug(f"Alert subscriber {subscription.subscription_id} disconnected")
+    finally:
+        alert_hub.unsubscribe(subscription)
+
+
+@router.get("/stream")
+async def alerts_event_stream(
+    organization_id: str,
+    caseworker_id: Optional[str] = None
+):
+    """
+    Server-Sent Events alternative to the WebSocket feed.
+    
+    Same messages, for clients behind proxies that block WebSockets.
+    """
+    try:
+        subscription = alert_hub.subscribe(organization_id, caseworker_id)
+    except RuntimeError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e)
+        )
+    
+    async def event_generator():
+        try:
+            while True:
+                message = await subscription.get(timeout=HEARTBEAT_INTERVAL)
+                if message is None:
+                    if subscription.closed:
+                        break
+                    yield ": heartbeat\n\n"
+                    continue
+                yield f"event: {message['type']}\ndata: {json.dumps(message, default=str)}\n\n"
+        finally:
+            alert_hub.unsubscribe(subscription)
+    
+    return StreamingResponse(
+        event_generator(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @router.get("/{alert_id}", response_model=AlertResponse)
 async def get_alert_detail(
     alert_id: str,
@@ -188,5 +425,6 @@ async def get_alert_detail(
         recommended_actions=alert.recommended_actions,
         status=alert.status,
         created_at=alert.created_at,
-        read_at=alert.read_at
+        read_at=alert.read_at,
+        occurrence_count=alert.occurrence_count or 1
     )
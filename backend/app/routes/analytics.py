@@ -5,32 +5,184 @@ Provides data for city dashboards, heat maps, and ROI tracking
 
 from typing import List, Dict, Any, Optional
 from datetime import datetime, timedelta
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_, or_
+from sqlalchemy import func, and_, select, union_all, literal, DateTime, Interval
 import logging
 
-from app.database import get_db
+from app.database import get_read_db
+from app.services.analytics_cache import analytics_cache
+from app.services.rollups import unique_clients, unique_clients_by_location
+from app.services.exports import (
+    EXPORT_DATASETS,
+    export_query, export_filename,
+    iter_batches, iter_csv, iter_parquet, gzip_stream, parquet_available
+)
+from app.services.heatmap_tiles import (
+    MIN_ZOOM, MAX_ZOOM,
+    is_valid_tile, tile_cells_query, pack_tile
+)
 from app.models import (
     Intake, Location, MutualSupportPair,
-    Client, Organization
+    Organization,
+    IntakeDailyStats, IntakeHourlyStats, PairDailyStats
 )
 from app.schemas import (
     GeospatialAnalytics,
     LocationHeatMapData,
     CostSavingsAnalytics,
-    IntakeVolumeTrends
+    IntakeVolumeTrends,
+    HeatmapTileResponse
 )
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
 
+def build_heatmap_query(organization_id: str, cutoff_date: datetime):
+    """
+    Per-location heatmap aggregation as a single CTE statement.
+    
+    - window_stats: intakes per location in the window (distinct clients
+      come from the rollup sketches, see unique_clients_by_location)
+    - pair_members: both sides of each pair in the window via UNION ALL
+      (index-friendly, unlike an OR join on client_a_id/client_b_id)
+    - pair_stats: pairs per location, counted once per member intake at the
+      location (same counting as the previous per-location queries)
+    """
+    window_stats = select(
+        Intake.location_id,
+        func.count(Intake.id).label('intake_count')
+    ).join(
+        Location, Location.id == Intake.location_id
+    ).where(
+        and_(
+            Location.organization_id == organization_id,
+            Intake.created_at >= cutoff_date
+        )
+    ).group_by(
+        Intake.location_id
+    ).cte('window_stats')
+    
+    pair_filter = and_(
+        MutualSupportPair.organization_id == organization_id,
+        MutualSupportPair.created_at >= cutoff_date
+    )
+    pair_members = union_all(
+        select(MutualSupportPair.client_a_id.label('client_id')).where(pair_filter),
+        select(MutualSupportPair.client_b_id.label('client_id')).where(
+            and_(pair_filter, MutualSupportPair.client_b_id != MutualSupportPair.client_a_id)
+        )
+    ).cte('pair_members')
+    
+    member_pairs = select(
+        pair_members.c.client_id,
+        func.count().label('pairs')
+    ).group_by(
+        pair_members.c.client_id
+    ).cte('member_pairs')
+    
+    pair_stats = select(
+        Intake.location_id,
+        func.sum(member_pairs.c.pairs).label('pairs_detected')
+    ).join(
+        member_pairs, member_pairs.c.client_id == Intake.client_id
+    ).where(
+        Intake.location_id.in_(select(window_stats.c.location_id))
+    ).group_by(
+        Intake.location_id
+    ).cte('pair_stats')
+    
+    return select(
+        Location.id,
+        Location.display_name.label('name'),
+        Location.address,
+        Location.latitude,
+        Location.longitude,
+        Location.location_code.label('qr_code'),
+        window_stats.c.intake_count,
+        func.coalesce(pair_stats.c.pairs_detected, 0).label('pairs_detected')
+    ).join(
+        window_stats, window_stats.c.location_id == Location.id
+    ).outerjoin(
+        pair_stats, pair_stats.c.location_id == Location.id
+    )
+
+
+TREND_GRANULARITIES = {
+    "hour": timedelta(hours=1),
+    "day": timedelta(days=1),
+    "week": timedelta(weeks=1)
+}
+
+
+def build_volume_trends_query(organization_id: str, cutoff: datetime, granularity: str):
+    """
+    Gap-filled intake counts per local-time bucket as a single statement.
+    
+    Hourly rollups (UTC) are shifted into the organization's timezone and
+    truncated to hour/day/week; generate_series supplies every bucket in
+    the window so empty ones come back as 0. The window start is converted
+    back to UTC once, so the rollup is filtered with a plain range predicate
+    on its (organization_id, hour) index.
+    
+    Timezones with non-whole-hour offsets are bucketed to the UTC hour.
+    
+    The first bucket starts before `cutoff` (at the start of its hour/day/
+    week) and its counts cover the whole bucket, so each row also carries
+    that start in UTC (window_start) for per-day averages.
+    """
+    tz = func.coalesce(
+        select(Organization.timezone).where(Organization.id == organization_id).scalar_subquery(),
+        'UTC'
+    )
+    
+    def local(utc_timestamp):
+        # naive UTC -> naive local wall-clock time
+        return func.timezone(tz, func.timezone('UTC', utc_timestamp))
+    
+    first_bucket = func.date_trunc(granularity, local(literal(cutoff, DateTime)))
+    last_bucket = func.date_trunc(granularity, local(literal(datetime.utcnow(), DateTime)))
+    window_start_utc = func.timezone('UTC', func.timezone(tz, first_bucket))
+    
+    buckets = select(
+        func.generate_series(
+            first_bucket, last_bucket, literal(TREND_GRANULARITIES[granularity], Interval)
+        ).label('bucket')
+    ).subquery('buckets')
+    
+    local_bucket = func.date_trunc(granularity, local(IntakeHourlyStats.hour))
+    counts = select(
+        local_bucket.label('bucket'),
+        func.sum(IntakeHourlyStats.intake_count).label('intake_count')
+    ).where(
+        and_(
+            IntakeHourlyStats.organization_id == organization_id,
+            IntakeHourlyStats.hour >= window_start_utc
+        )
+    ).group_by(
+        local_bucket
+    ).subquery('counts')
+    
+    return select(
+        buckets.c.bucket,
+        func.coalesce(counts.c.intake_count, 0).label('intake_count'),
+        tz.label('timezone'),
+        window_start_utc.label('window_start')
+    ).select_from(
+        buckets.outerjoin(counts, counts.c.bucket == buckets.c.bucket)
+    ).order_by(
+        buckets.c.bucket
+    )
+
+
 @router.get("/heatmap", response_model=List[LocationHeatMapData])
+@analytics_cache.cached("heatmap")
 async def get_location_heatmap(
     organization_id: str,
     days: int = Query(30, ge=1, le=365),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ) -> List[LocationHeatMapData]:
     """
     Get geographic heat map data for intake locations.
@@ -41,42 +193,17 @@ async def get_location_heatmap(
     try:
         cutoff_date = datetime.utcnow() - timedelta(days=days)
         
-        # Aggregate intakes by location
-        location_stats = db.query(
-            Location.id,
-            Location.name,
-            Location.address,
-            Location.latitude,
-            Location.longitude,
-            Location.qr_code,
-            func.count(Intake.id).label('intake_count'),
-            func.count(func.distinct(Intake.client_id)).label('unique_clients')
-        ).join(
-            Intake, Intake.location_id == Location.id
-        ).filter(
-            and_(
-                Location.organization_id == organization_id,
-                Intake.created_at >= cutoff_date
-            )
-        ).group_by(
-            Location.id
+        # One statement: intake counts and pair counts per location
+        location_stats = db.execute(
+            build_heatmap_query(organization_id, cutoff_date)
         ).all()
         
-        # Calculate mutual support pairs per location
+        # Distinct clients from merged daily HyperLogLog sketches (~2% error)
+        clients_by_location = unique_clients_by_location(db, organization_id, cutoff_date.date())
+        
         heatmap_data = []
         for stat in location_stats:
-            # Count pairs detected at this location
-            pairs_count = db.query(func.count(MutualSupportPair.id)).join(
-                Intake, or_(
-                    Intake.client_id == MutualSupportPair.client_a_id,
-                    Intake.client_id == MutualSupportPair.client_b_id
-                )
-            ).filter(
-                and_(
-                    Intake.location_id == stat.id,
-                    MutualSupportPair.created_at >= cutoff_date
-                )
-            ).scalar()
+            pairs_count = int(stat.pairs_detected)
             
             # Calculate pairing rate
             pairing_rate = (pairs_count * 2 / stat.intake_count * 100) if stat.intake_count > 0 else 0
@@ -89,7 +216,7 @@ async def get_location_heatmap(
                 longitude=stat.longitude,
                 qr_code=stat.qr_code,
                 intake_count=stat.intake_count,
-                unique_clients=stat.unique_clients,
+                unique_clients=min(clients_by_location.get(stat.id, 0), stat.intake_count),
                 pairs_detected=pairs_count,
                 pairing_rate=round(pairing_rate, 1)
             ))
@@ -104,11 +231,47 @@ async def get_location_heatmap(
         )
 
 
+@router.get("/heatmap/tiles/{z}/{x}/{y}", response_model=HeatmapTileResponse)
+@analytics_cache.cached("heatmap-tiles")
+async def get_heatmap_tile(
+    z: int,
+    x: int,
+    y: int,
+    organization_id: str,
+    days: int = Query(30, ge=1, le=365),
+    db: Session = Depends(get_read_db)
+) -> HeatmapTileResponse:
+    """
+    Get heat map cells for one slippy-map tile.
+    
+    Served from the precomputed tile pyramid (zoom 8-16), so panning and
+    zooming the city map never aggregates raw intakes.
+    """
+    if not is_valid_tile(z, x, y):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Tile {z}/{x}/{y} is outside the heat map pyramid (zoom {MIN_ZOOM}-{MAX_ZOOM})"
+        )
+    
+    try:
+        cutoff_day = (datetime.utcnow() - timedelta(days=days)).date()
+        rows = db.execute(tile_cells_query(organization_id, z, x, y, cutoff_day)).all()
+        return HeatmapTileResponse(**pack_tile(z, x, y, days, rows))
+        
+    except Exception as e:
+        logger.error(f"Error generating heatmap tile: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error generating heatmap tile: {str(e)}"
+        )
+
+
 @router.get("/cost-savings", response_model=CostSavingsAnalytics)
+@analytics_cache.cached("cost-savings")
 async def get_cost_savings_analytics(
     organization_id: str,
     days: int = Query(30, ge=1, le=365),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ) -> CostSavingsAnalytics:
     """
     Calculate ROI and cost savings from mutual support pairs.
@@ -119,18 +282,23 @@ async def get_cost_savings_analytics(
     try:
         cutoff_date = datetime.utcnow() - timedelta(days=days)
         
-        # Get all pairs in period
-        pairs = db.query(MutualSupportPair).filter(
+        # Aggregate in the database - constant memory however many pairs match
+        totals = db.query(
+            func.count(MutualSupportPair.id).label('total_pairs'),
+            func.count(MutualSupportPair.id).filter(
+                MutualSupportPair.ihss_eligible.is_(True)
+            ).label('ihss_eligible_pairs'),
+            func.coalesce(func.sum(MutualSupportPair.cost_savings_estimate), 0).label('total_cost_savings')
+        ).filter(
             and_(
                 MutualSupportPair.organization_id == organization_id,
                 MutualSupportPair.created_at >= cutoff_date
             )
-        ).all()
+        ).one()
         
-        # Calculate totals
-        total_pairs = len(pairs)
-        total_cost_savings = sum(pair.cost_savings_estimate or 0 for pair in pairs)
-        ihss_eligible_pairs = sum(1 for pair in pairs if pair.ihss_eligible)
+        total_pairs = totals.total_pairs
+        total_cost_savings = totals.total_cost_savings
+        ihss_eligible_pairs = totals.ihss_eligible_pairs
         
         # Estimate annual projections
         days_elapsed = (datetime.utcnow() - cutoff_date).days
@@ -162,52 +330,52 @@ async def get_cost_savings_analytics(
 
 
 @router.get("/volume-trends", response_model=IntakeVolumeTrends)
+@analytics_cache.cached("volume-trends")
 async def get_intake_volume_trends(
     organization_id: str,
     days: int = Query(30, ge=7, le=365),
-    db: Session = Depends(get_db)
+    granularity: str = Query("day", pattern="^(hour|day|week)$"),
+    db: Session = Depends(get_read_db)
 ) -> IntakeVolumeTrends:
     """
     Get intake volume trends over time.
     
-    Shows system adoption and usage patterns.
+    Shows system adoption and usage patterns. Buckets follow the
+    organization's timezone and include empty hours/days/weeks.
     """
     try:
-        cutoff_date = datetime.utcnow() - timedelta(days=days)
+        cutoff = datetime.utcnow() - timedelta(days=days)
         
-        # Daily intake counts
-        daily_intakes = db.query(
-            func.date(Intake.created_at).label('date'),
-            func.count(Intake.id).label('count')
-        ).join(
-            Client, Client.id == Intake.client_id
-        ).filter(
-            and_(
-                Client.organization_id == organization_id,
-                Intake.created_at >= cutoff_date
-            )
-        ).group_by(
-            func.date(Intake.created_at)
-        ).order_by(
-            func.date(Intake.created_at)
+        buckets = db.execute(
+            build_volume_trends_query(organization_id, cutoff, granularity)
         ).all()
         
         # Format for charting
-        dates = [day.date.isoformat() for day in daily_intakes]
-        counts = [day.count for day in daily_intakes]
+        if granularity == "hour":
+            dates = [bucket.bucket.isoformat() for bucket in buckets]
+        else:
+            dates = [bucket.bucket.date().isoformat() for bucket in buckets]
+        counts = [int(bucket.intake_count) for bucket in buckets]
         
-        # Calculate statistics
+        # Calculate statistics (over the days the buckets actually cover:
+        # a week bucket can start up to six days before the cutoff)
         total_intakes = sum(counts)
-        avg_daily = total_intakes / len(counts) if counts else 0
-        peak_day = max(counts) if counts else 0
+        days_covered = days
+        if buckets:
+            days_covered = max((datetime.utcnow() - buckets[0].window_start).total_seconds() / 86400, 1.0)
+        avg_daily = total_intakes / days_covered
+        peak_bucket = max(counts) if counts else 0
         
         return IntakeVolumeTrends(
             dates=dates,
             intake_counts=counts,
             total_intakes=total_intakes,
             average_daily=round(avg_daily, 1),
-            peak_daily=peak_day,
-            period_days=days
+            peak_daily=peak_bucket,
+            period_days=days,
+            granularity=granularity,
+            timezone=buckets[0].timezone if buckets else "UTC",
+            unique_clients=unique_clients(db, organization_id, cutoff.date())
         )
         
     except Exception as e:
@@ -219,9 +387,10 @@ async def get_intake_volume_trends(
 
 
 @router.get("/dashboard-summary")
+@analytics_cache.cached("dashboard-summary")
 async def get_dashboard_summary(
     organization_id: str,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ) -> Dict[str, Any]:
     """
     Get high-level summary for city administrator dashboard.
@@ -229,46 +398,36 @@ async def get_dashboard_summary(
     One-stop shop for key metrics.
     """
     try:
-        # Last 30 days
-        cutoff_date = datetime.utcnow() - timedelta(days=30)
+        # Last 30 days, read from the daily rollups in one statement
+        cutoff_day = (datetime.utcnow() - timedelta(days=30)).date()
         
-        # Total intakes
-        total_intakes = db.query(func.count(Intake.id)).join(
-            Client, Client.id == Intake.client_id
-        ).filter(
-            and_(
-                Client.organization_id == organization_id,
-                Intake.created_at >= cutoff_date
-            )
-        ).scalar()
-        
-        # Total pairs
-        total_pairs = db.query(func.count(MutualSupportPair.id)).filter(
-            and_(
-                MutualSupportPair.organization_id == organization_id,
-                MutualSupportPair.created_at >= cutoff_date
-            )
-        ).scalar()
+        intake_scope = and_(
+            IntakeDailyStats.organization_id == organization_id,
+            IntakeDailyStats.day >= cutoff_day
+        )
+        pair_scope = and_(
+            PairDailyStats.organization_id == organization_id,
+            PairDailyStats.day >= cutoff_day
+        )
         
-        # Total savings
-        total_savings = db.query(
-            func.sum(MutualSupportPair.cost_savings_estimate)
-        ).filter(
-            and_(
-                MutualSupportPair.organization_id == organization_id,
-                MutualSupportPair.created_at >= cutoff_date
+        summary = db.execute(
+            select(
+                select(func.coalesce(func.sum(IntakeDailyStats.intake_count), 0))
+                    .where(intake_scope).scalar_subquery().label('total_intakes'),
+                select(func.count(func.distinct(IntakeDailyStats.location_id)))
+                    .where(intake_scope).scalar_subquery().label('active_locations'),
+                select(func.coalesce(func.sum(PairDailyStats.pair_count), 0))
+                    .where(pair_scope).scalar_subquery().label('total_pairs'),
+                select(func.coalesce(func.sum(PairDailyStats.cost_savings_total), 0))
+                    .where(pair_scope).scalar_subquery().label('total_savings')
             )
-        ).scalar() or 0
+        ).one()
         
-        # Active locations
-        active_locations = db.query(func.count(func.distinct(Intake.location_id))).join(
-            Client, Client.id == Intake.client_id
-        ).filter(
-            and_(
-                Client.organization_id == organization_id,
-                Intake.created_at >= cutoff_date
-            )
-        ).scalar()
+        total_intakes = int(summary.total_intakes)
+        total_pairs = int(summary.total_pairs)
+        total_savings = summary.total_savings
+        active_locations = summary.active_locations
+        total_clients = unique_clients(db, organization_id, cutoff_day)
         
         return {
             "period": "Last 30 days",
@@ -277,6 +436,7 @@ async def get_dashboard_summary(
             "pairing_rate": round((total_pairs * 2 / total_intakes * 100) if total_intakes > 0 else 0, 1),
             "total_cost_savings": int(total_savings),
             "active_locations": active_locations,
+            "unique_clients": total_clients,
             "avg_savings_per_pair": int(total_savings / total_pairs) if total_pairs > 0 else 0
         }
         
@@ -286,3 +446,65 @@ async def get_dashboard_summary(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error generating dashboard summary: {str(e)}"
         )
+
+
+@router.get("/export")
+async def export_analytics_data(
+    request: Request,
+    organization_id: str,
+    dataset: str = Query("intakes", description=f"One of: {', '.join(EXPORT_DATASETS)}"),
+    file_format: str = Query("csv", alias="format", pattern="^(csv|parquet)$"),
+    days: Optional[int] = Query(None, ge=1, le=3650, description="Only rows from the last N days"),
+    db: Session = Depends(get_read_db)
+) -> StreamingResponse:
+    """
+    Stream a raw extract for partner BI tools.
+    
+    Rows come from a server-side cursor and are written batch by batch
+    (CSV chunks or Parquet row groups), so memory stays flat however large
+    the extract. CSV is gzip-compressed when the client accepts it.
+    """
+    if dataset not in EXPORT_DATASETS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown dataset '{dataset}'. Expected one of: {', '.join(EXPORT_DATASETS)}"
+        )
+    
+    if file_format == "parquet" and not parquet_available():
+        # Fail before streaming: a 200 cut off mid-file looks like a download error
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail="Parquet export is not available on this server; use format=csv"
+        )
+    
+    since = datetime.utcnow() - timedelta(days=days) if days else None
+    query, columns = export_query(dataset, organization_id, since)
+    batches = iter_batches(db, query)
+    
+    headers = {
+        "Content-Disposition": f'attachment; filename="{export_filename(dataset, file_format)}"'
+    }
+    if file_format == "parquet":
+        # Parquet pages are already compressed
+        return StreamingResponse(
+            iter_parquet(batches, columns),
+            media_type="application/vnd.apache.parquet",
+            headers=headers
+        )
+    
+    body = iter_csv(batches, columns)
+    if "gzip" in request.headers.get("accept-encoding", ""):
+        body = gzip_stream(body)
+        headers["Content-Encoding"] = "gzip"
+        headers["Vary"] = "Accept-Encoding"
+    
+    logger.info(f"Exporting {dataset} ({file_format}) for organization {organization_id}")
+    return StreamingResponse(body, media_type="text/csv", headers=headers)
+
+
+@router.get("/cache/statistics")
+async def get_cache_statistics() -> Dict[str, Any]:
+    """
+    Analytics cache metrics: hit ratio, recompute counts and timings.
+    """
+    return analytics_cache.get_statistics()
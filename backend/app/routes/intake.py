@@ -16,7 +16,7 @@ import logging
 from app.database import get_db
 from app.models import (
     Client, Intake, Location, Organization,
-    MutualSupportPair, MutualSupportAlert
+    MutualSupportPair
 )
 from app.schemas import (
     IntakeSubmitRequest,
@@ -24,6 +24,12 @@ from app.schemas import (
     MutualSupportDetection
 )
 from app.agents.mutual_support_agent import MutualSupportAgent
+from app.services.alert_hub import alert_hub
+from app.services.alert_counters import alert_counters
+from app.services.alert_coalescer import alert_coalescer
+from app.services.rollups import record_intake_rollups, pair_rollup_upsert
+from app.services.heatmap_tiles import heatmap_tile_upsert
+from app.services.analytics_cache import analytics_cache
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -117,8 +123,17 @@ async def submit_intake(
         db.flush()  # Get intake.id
         logger.info(f"Created intake record: {intake.id}")
         
+        # Keep dashboard rollups current in the same transaction
+        record_intake_rollups(db, location.organization_id, location.id, client.id, intake.created_at)
+        intake_tiles = heatmap_tile_upsert(
+            location.organization_id, location.latitude, location.longitude, intake.created_at, intakes=1
+        )
+        if intake_tiles is not None:
+            db.execute(intake_tiles)
+        
         # Step 4: Run Mutual Support Agent evaluation
         mutual_support_detection = None
+        alert_created = False
         
         # Prepare intake data for agent
         intake_dict = {
@@ -193,24 +208,38 @@ async def submit_intake(
                 )
                 db.add(support_pair)
                 db.flush()
+                db.execute(pair_rollup_upsert(
+                    location.organization_id,
+                    support_pair.created_at,
+                    support_pair.ihss_eligible,
+                    support_pair.cost_savings_estimate
+                ))
+                pair_tiles = heatmap_tile_upsert(
+                    location.organization_id, location.latitude, location.longitude, support_pair.created_at, pairs=1
+                )
+                if pair_tiles is not None:
+                    db.execute(pair_tiles)
                 
-                # Create caseworker alert
-                alert = MutualSupportAlert(
+                # Create caseworker alert, or fold into an open digest for
+                # the same pair/household during a burst
+                alert_message = f"High-confidence mutual support relationship detected between {client.first_name} and {other_client.first_name}"
+                alert, alert_created = alert_coalescer.open_digest(db, alert_coalescer.create_alert(
                     organization_id=location.organization_id,
                     pair_id=support_pair.id,
-                    alert_type="mutual_support_detected",
-                    severity="high" if pair_result.confidence_score >= 0.85 else "medium",
-                    message=f"High-confidence mutual support relationship detected between {client.first_name} and {other_client.first_name}",
-                    recommended_actions=pair_result.recommended_actions,
-                    alert_metadata={
+                    pair_result=pair_result,
+                    coalesce_key=alert_coalescer.coalesce_key(client, other_client),
+                    message=alert_message,
+                    base_metadata={
                         "confidence_score": pair_result.confidence_score,
                         "ihss_eligible": pair_result.ihss_eligible,
                         "cost_savings": pair_result.consolidation_benefits,
                         "detection_time": datetime.utcnow().isoformat()
-                    },
-                    status="unread"
-                )
-                db.add(alert)
+                    }
+                ))
+                
+                if not alert_created:
+                    previous_severity = alert.severity
+                    alert_coalescer.merge(alert, support_pair.id, pair_result, alert_message)
                 
                 # Prepare response data
                 mutual_support_detection = MutualSupportDetection(
@@ -228,12 +257,35 @@ async def submit_intake(
         # Commit all changes
         db.commit()
         
+        # New intake (and maybe pair) changes every dashboard number for the org
+        await analytics_cache.invalidate(location.organization_id)
+        
+        if alert_created:
+            await alert_counters.record_created(str(location.organization_id), alert.severity)
+        elif mutual_support_detection:
+            await alert_counters.record_severity_change(
+                str(location.organization_id), previous_severity, alert.severity
+            )
+        
         # Schedule background tasks for Firestore sync and notifications
         if mutual_support_detection:
             background_tasks.add_task(
                 send_caseworker_notification,
                 alert_id=str(alert.id),
-                organization_id=str(location.organization_id)
+                organization_id=str(location.organization_id),
+                alert_data={
+                    "alert_id": str(alert.id),
+                    "pair_id": str(support_pair.id),
+                    "alert_type": alert.alert_type,
+                    "severity": alert.severity,
+                    "message": alert.message,
+                    "confidence_score": pair_result.confidence_score,
+                    "ihss_eligible": pair_result.ihss_eligible,
+                    "estimated_savings": mutual_support_detection.estimated_cost_savings,
+                    "recommended_actions": alert.recommended_actions,
+                    "occurrence_count": alert.occurrence_count,
+                    "status": alert.status
+                }
             )
         
         # Return response
@@ -265,22 +317,33 @@ async def submit_intake(
         )
 
 
-async def send_caseworker_notification(alert_id: str, organization_id: str):
+async def send_caseworker_notification(
+    alert_id: str,
+    organization_id: str,
+    alert_data: Optional[Dict[str, Any]] = None
+):
     """
     Background task to send real-time notification to caseworker dashboard.
     
-    In production, this would:
-    1. Push notification to Firestore
-    2. Trigger WebSocket update
-    3. Send SMS/email to on-call caseworker
+    Pushes the alert to every dashboard subscribed to the organization's
+    feed (WebSocket/SSE via the Alert Hub). Notifications are rate-limited
+    per caseworker; held ones collapse to the alert's latest state.
     
-    For demo, we'll just log it.
+    In production, this would also:
+    1. Push notification to Firestore
+    2. Send SMS/email to on-call caseworker
     """
     logger.info(f"📢 Sending caseworker notification for alert {alert_id}")
     logger.info(f"   Organization: {organization_id}")
     
+    await alert_hub.publish(
+        "mutual_support_alert",
+        alert_data or {"alert_id": alert_id},
+        organization_id=organization_id,
+        rate_limited=True
+    )
+    
     # TODO: Implement Firestore push notification
-    # TODO: Implement WebSocket broadcast
     # TODO: Implement SMS/email notification
     
     logger.info("✅ Notification sent")
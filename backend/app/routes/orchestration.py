@@ -6,26 +6,31 @@ Author: Claude (CTO, EINHARJER INNOVATIVE SOLUTIONS LLC)
 Date: November 7, 2025
 """
 
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 from datetime import datetime
+import json
 import logging
 import asyncio
+import time
+import uuid
 
-from ..database import get_db
+from ..database import get_db, AsyncSessionLocal
 from ..services.orchestrator import OrchestrationEngine, Event
 from ..services.executor import ExecutionService
 from ..services.event_listener import EventListenerService
+from ..services.execution_queue import ExecutionQueue
+from ..services.alert_hub import alert_hub
+from ..services.recommendation_store import recommendation_store, serialize_plan, page_etag
+from ..services.event_batches import iter_ndjson, iter_items, run_concurrently, summarize, DEFAULT_CONCURRENCY
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-# In-memory storage for demo (replace with Firestore in production)
-recommendations_store: Dict[str, Dict[str, Any]] = {}
-
-
 # ============================================================================
 # REQUEST/RESPONSE MODELS
 # ============================================================================
@@ -35,9 +40,10 @@ from pydantic import BaseModel
 class TriggerEventRequest(BaseModel):
     """Request to manually trigger an event (for testing/demo)"""
     event_type: str
+    event_id: Optional[str] = None  # Source system's ID, e.g. when replaying an export
     client_id: str = None
     provider_id: str = None
-    metadata: Dict[str, Any] = {}
+    metadata: Dict[str, Any] = {}  # Must include organization_id (owner of any recommendation)
 
 
 class RecommendationResponse(BaseModel):
@@ -59,6 +65,19 @@ class ApproveRecommendationRequest(BaseModel):
     approved_by: str  # User ID
 
 
+class ExecutionStatusResponse(BaseModel):
+    """Progress of an approved recommendation on the execution queue"""
+    recommendation_id: str
+    status: str
+    approved_by: Optional[str] = None
+    attempts: int = 0
+    queued_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
+    execution_result: Optional[Dict[str, Any]] = None
+    last_error: Optional[str] = None
+
+
 class ExecutionResultResponse(BaseModel):
     """Result of executing a plan"""
     plan_id: str
@@ -73,64 +92,171 @@ class ExecutionResultResponse(BaseModel):
 # DEPENDENCY INJECTION
 # ============================================================================
 
-def get_orchestrator(db: Session = Depends(get_db)):
-    """Get orchestrator instance"""
-    # TODO: Initialize with AI service if needed
-    return OrchestrationEngine(db_session=db, ai_service=None)
+# Services are built once per process in main.lifespan; DB sessions are
+# injected per request with get_db and passed to the call that needs them.
 
+def get_orchestrator(request: Request) -> OrchestrationEngine:
+    """Get the process-wide orchestrator"""
+    return request.app.state.orchestrator
 
-def get_executor(db: Session = Depends(get_db)):
-    """Get executor instance"""
-    # TODO: Initialize with notification service and API clients
-    return ExecutionService(
-        db_session=db,
-        notification_service=None,
-        external_api_clients={},
-        demo_mode=True  # Set to True for demo
-    )
 
+def get_executor(request: Request) -> ExecutionService:
+    """Get the process-wide executor"""
+    return request.app.state.executor
 
-def get_event_listener(
-    orchestrator = Depends(get_orchestrator)
-):
-    """Get event listener instance"""
-    return EventListenerService(
-        orchestrator=orchestrator,
-        firestore_client=None,
-        demo_mode=True  # Set to True for demo
-    )
+
+def get_event_listener(request: Request) -> EventListenerService:
+    """Get the process-wide event listener"""
+    return request.app.state.event_listener
+
+
+def get_execution_queue(request: Request) -> ExecutionQueue:
+    """Get the process-wide execution queue"""
+    return request.app.state.execution_queue
+
+
+async def publish_recommendation_update(stored_rec: Dict[str, Any]):
+    """Push a recommendation status change to subscribed caseworker dashboards"""
+    organization_id = stored_rec.get("organization_id")
+    if not organization_id:
+        # Never fall back to a broadcast: the update carries client data
+        logger.warning(
+            f"Not publishing update for recommendation {stored_rec.get('recommendation_id')}: no organization"
+        )
+        return
+    try:
+        await alert_hub.publish(
+            "recommendation_update",
+            {
+                "recommendation_id": stored_rec["recommendation_id"],
+                "summary": stored_rec["summary"],
+                "status": stored_rec["status"],
+                "confidence_score": stored_rec["confidence_score"]
+            },
+            organization_id=str(organization_id)
+        )
+    except Exception as e:
+        logger.warning(f"Failed to publish recommendation update: {e}")
 
 
 # ============================================================================
 # ROUTES
 # ============================================================================
 
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match check (weak comparison, '*' matches anything)"""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    bare = etag[2:] if etag.startswith("W/") else etag
+    return any(tag in ("*", etag, bare, f"W/{bare}") for tag in candidates)
+
+
 @router.get("/recommendations", response_model=List[RecommendationResponse])
-async def get_recommendations():
+async def get_recommendations(
+    request: Request,
+    response: Response,
+    organization_id: str = Query(..., description="Organization whose recommendations to list"),
+    status: Optional[str] = Query(None, description="Filter by status, e.g. pending_approval"),
+    since: Optional[datetime] = Query(None, description="Only recommendations created at or after this time"),
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor from the previous page")
+):
     """
-    Get all recommendations
+    Get an organization's recommendations, newest first
     
-    Returns list of pending, executing, and completed recommendations
+    Returns one page of pending, executing, and completed recommendations.
+    The cursor for the next page is in the X-Next-Cursor header (absent on
+    the last page). Polls sending If-None-Match with the previous ETag get
+    304 Not Modified while the page is unchanged; the ETag comes from a
+    count/max(updated_at) probe, so those polls never read the page itself.
     """
     try:
-        # Return recommendations from in-memory store
-        recommendations = list(recommendations_store.values())
+        try:
+            version = await recommendation_store.page_version(
+                organization_id=organization_id, status=status, since=since, limit=limit, cursor=cursor
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        etag = page_etag(version, organization_id, status, since, limit, cursor)
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        
+        if _etag_matches(request.headers.get("if-none-match"), etag):
+            # Unchanged page, so the client's X-Next-Cursor still holds
+            return Response(status_code=304, headers=headers)
         
-        # Sort by created_at (newest first)
-        recommendations.sort(key=lambda x: x['created_at'], reverse=True)
+        recommendations, next_cursor = await recommendation_store.list_page(
+            organization_id=organization_id, status=status, since=since, limit=limit, cursor=cursor
+        )
+        if next_cursor:
+            headers["X-Next-Cursor"] = next_cursor
         
+        response.headers.update(headers)
         return recommendations
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error fetching recommendations: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _build_event(request: TriggerEventRequest, default_id: Optional[str] = None) -> Event:
+    """Orchestrator event from an API trigger"""
+    return Event(
+        event_id=request.event_id or default_id or f"manual_{datetime.now().timestamp()}",
+        event_type=request.event_type,
+        timestamp=datetime.now(),
+        client_id=request.client_id,
+        provider_id=request.provider_id,
+        metadata=request.metadata
+    )
+
+
+def _require_organization(trigger: TriggerEventRequest) -> str:
+    """Organization that owns the recommendations an event produces"""
+    organization_id = trigger.metadata.get("organization_id")
+    if not organization_id:
+        raise ValueError("metadata.organization_id is required")
+    try:
+        return str(uuid.UUID(str(organization_id)))
+    except ValueError:
+        raise ValueError(f"metadata.organization_id is not a valid UUID: {organization_id!r}")
+
+
+async def _store_recommendation(recommendation, organization_id: str) -> RecommendationResponse:
+    """Persist a new recommendation for approval and announce it"""
+    response = RecommendationResponse(
+        recommendation_id=recommendation.recommendation_id,
+        summary=recommendation.summary,
+        reasoning=recommendation.reasoning,
+        impact=recommendation.impact,
+        confidence_score=recommendation.confidence_score,
+        actions_count=len(recommendation.execution_plan.actions),
+        estimated_duration_seconds=recommendation.execution_plan.estimated_duration_seconds,
+        affected_systems=recommendation.execution_plan.affected_systems,
+        status="pending_approval",
+        created_at=datetime.utcnow()  # UTC, like updated_at and queued_at
+    )
+    
+    # Store recommendation with execution plan for later approval
+    stored_rec = await recommendation_store.create({
+        **response.dict(),
+        "organization_id": organization_id,
+        "execution_plan": serialize_plan(recommendation.execution_plan)
+    })
+    
+    await publish_recommendation_update(stored_rec)
+    
+    return response
+
+
 @router.post("/trigger-event", response_model=RecommendationResponse)
 async def trigger_event(
     request: TriggerEventRequest,
-    event_listener = Depends(get_event_listener),
-    orchestrator = Depends(get_orchestrator)
+    orchestrator: OrchestrationEngine = Depends(get_orchestrator),
+    db: Session = Depends(get_db)
 ):
     """
     Manually trigger an event for testing/demo
@@ -141,18 +267,13 @@ async def trigger_event(
     - Manual coordination triggers
     """
     try:
-        # Create event
-        event = Event(
-            event_id=f"manual_{datetime.now().timestamp()}",
-            event_type=request.event_type,
-            timestamp=datetime.now(),
-            client_id=request.client_id,
-            provider_id=request.provider_id,
-            metadata=request.metadata
-        )
-        
+        organization_id = _require_organization(request)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    try:
         # Trigger orchestration
-        recommendation = await orchestrator.handle_event(event)
+        recommendation = await orchestrator.handle_event(_build_event(request), db_session=db)
         
         if not recommendation:
             raise HTTPException(
@@ -160,93 +281,108 @@ async def trigger_event(
                 detail="No recommendation generated for this event"
             )
         
-        # Create response
-        response = RecommendationResponse(
-            recommendation_id=recommendation.recommendation_id,
-            summary=recommendation.summary,
-            reasoning=recommendation.reasoning,
-            impact=recommendation.impact,
-            confidence_score=recommendation.confidence_score,
-            actions_count=len(recommendation.execution_plan.actions),
-            estimated_duration_seconds=recommendation.execution_plan.estimated_duration_seconds,
-            affected_systems=recommendation.execution_plan.affected_systems,
-            status="pending_approval",
-            created_at=datetime.now()
-        )
-        
-        # Store recommendation with execution plan for later approval
-        recommendations_store[recommendation.recommendation_id] = {
-            **response.dict(),
-            "execution_plan": recommendation.execution_plan  # Store plan for execution
-        }
-        
-        return response
+        return await _store_recommendation(recommendation, organization_id)
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error triggering event: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.post("/recommendations/{recommendation_id}/approve", response_model=ExecutionResultResponse)
+@router.post("/trigger-events")
+async def trigger_events(
+    request: Request,
+    concurrency: int = Query(DEFAULT_CONCURRENCY, ge=1, le=64, description="Events orchestrated at once"),
+    orchestrator: OrchestrationEngine = Depends(get_orchestrator)
+):
+    """
+    Trigger many events at once (e.g. replaying a provider's scheduling export)
+    
+    Body is a JSON array of trigger-event objects, or NDJSON (one object per
+    line, Content-Type: application/x-ndjson) which is read as it arrives.
+    Events are orchestrated concurrently and the response streams one NDJSON
+    line per event as soon as it finishes (so lines are not in input order;
+    use `index`), followed by a summary line with throughput.
+    """
+    content_type = request.headers.get("content-type", "")
+    if "ndjson" in content_type or "jsonl" in content_type:
+        items = iter_ndjson(request.stream())
+    else:
+        try:
+            body = await request.json()
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Body must be a JSON array or NDJSON")
+        if not isinstance(body, list):
+            raise HTTPException(status_code=400, detail="Body must be a JSON array of events")
+        items = iter_items(body)
+    
+    batch_id = f"batch_{datetime.now().timestamp()}"
+    
+    async def handle(item):
+        if not isinstance(item, dict):
+            raise ValueError("Event must be a JSON object")
+        trigger = TriggerEventRequest(**item)
+        organization_id = _require_organization(trigger)
+        event = _build_event(trigger, default_id=f"{batch_id}_{uuid.uuid4().hex[:8]}")
+        # Own session per event: concurrent handlers must not share one
+        async with AsyncSessionLocal() as session:
+            recommendation = await orchestrator.handle_event(event, db_session=session)
+        if recommendation is None:
+            return None
+        return await _store_recommendation(recommendation, organization_id)
+    
+    async def stream():
+        counts = {"recommended": 0, "no_action": 0, "failed": 0}
+        started = time.perf_counter()
+        async for outcome in run_concurrently(items, handle, concurrency=concurrency):
+            line: Dict[str, Any] = {"index": outcome.index}
+            if outcome.error is not None:
+                line.update(status="failed", error=outcome.error)
+                counts["failed"] += 1
+            elif outcome.result is None:
+                line["status"] = "no_action"
+                counts["no_action"] += 1
+            else:
+                line.update(status="recommended", recommendation=jsonable_encoder(outcome.result))
+                counts["recommended"] += 1
+            yield (json.dumps(line) + "\n").encode()
+        yield (json.dumps(summarize(counts, time.perf_counter() - started)) + "\n").encode()
+    
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
+@router.post("/recommendations/{recommendation_id}/approve", response_model=ExecutionResultResponse, status_code=202)
 async def approve_recommendation(
     recommendation_id: str,
     request: ApproveRecommendationRequest,
-    background_tasks: BackgroundTasks,
-    executor = Depends(get_executor)
+    execution_queue: ExecutionQueue = Depends(get_execution_queue)
 ):
     """
-    Approve a recommendation and execute the plan
+    Approve a recommendation and queue its plan for execution
     
-    This is the caseworker's one-click approval
+    This is the caseworker's one-click approval. The plan runs on the
+    execution queue; poll /recommendations/{id}/execution for progress.
     """
     try:
-        # Get recommendation from store
-        if recommendation_id not in recommendations_store:
-            raise HTTPException(
-                status_code=404,
-                detail=f"Recommendation {recommendation_id} not found"
-            )
-        
-        stored_rec = recommendations_store[recommendation_id]
-        
-        # Update status to executing
-        stored_rec['status'] = 'executing'
-        
-        # Get execution plan
-        execution_plan = stored_rec.get('execution_plan')
-        if not execution_plan:
+        # Only one approval (on any worker) moves it out of pending_approval
+        stored_rec = await execution_queue.enqueue(recommendation_id, request.approved_by)
+        if stored_rec is None:
+            existing = await recommendation_store.get(recommendation_id)
+            if existing is None:
+                raise HTTPException(
+                    status_code=404,
+                    detail=f"Recommendation {recommendation_id} not found"
+                )
             raise HTTPException(
-                status_code=400,
-                detail="No execution plan found for this recommendation"
+                status_code=409,
+                detail=f"Recommendation {recommendation_id} is already {existing['status']}"
             )
         
-        # Execute in background
-        async def execute_and_update():
-            try:
-                # Execute the plan
-                result = await executor.execute_plan(execution_plan, request.approved_by)
-                
-                # Update status based on result
-                if result.status == "success":
-                    stored_rec['status'] = 'completed'
-                elif result.status == "failed":
-                    stored_rec['status'] = 'failed'
-                else:
-                    stored_rec['status'] = 'partial_success'
-                    
-                logger.info(f"Recommendation {recommendation_id} execution completed: {result.status}")
-                
-            except Exception as e:
-                logger.error(f"Error executing recommendation: {e}", exc_info=True)
-                stored_rec['status'] = 'failed'
-        
-        # Start execution in background
-        background_tasks.add_task(execute_and_update)
-        
         # Return immediate response
         return ExecutionResultResponse(
-            plan_id=execution_plan.plan_id,
-            status="executing",
+            plan_id=stored_rec['execution_plan']['plan_id'],
+            status="queued",
             actions_completed=0,
             actions_failed=0,
             total_duration_seconds=0,
@@ -260,22 +396,51 @@ async def approve_recommendation(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/recommendations/{recommendation_id}/execution", response_model=ExecutionStatusResponse)
+async def get_execution_status(recommendation_id: str):
+    """
+    Poll the execution of an approved recommendation
+    
+    Status moves queued -> executing -> completed / partial_success / failed;
+    attempts > 1 means the plan was re-run after a worker was lost.
+    """
+    stored_rec = await recommendation_store.get(recommendation_id)
+    if stored_rec is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Recommendation {recommendation_id} not found"
+        )
+    return ExecutionStatusResponse(**stored_rec)
+
+
 @router.post("/recommendations/{recommendation_id}/reject")
 async def reject_recommendation(
-    recommendation_id: str
+    recommendation_id: str,
+    orchestrator: OrchestrationEngine = Depends(get_orchestrator)
 ):
     """
     Reject a recommendation
+    
+    A rejected housing offer puts its client back on the waitlist.
     """
     try:
-        if recommendation_id not in recommendations_store:
+        stored_rec = await recommendation_store.transition(
+            recommendation_id, "rejected", from_statuses=("pending_approval",)
+        )
+        if stored_rec is None:
+            existing = await recommendation_store.get(recommendation_id)
+            if existing is None:
+                raise HTTPException(
+                    status_code=404,
+                    detail=f"Recommendation {recommendation_id} not found"
+                )
             raise HTTPException(
-                status_code=404,
-                detail=f"Recommendation {recommendation_id} not found"
+                status_code=409,
+                detail=f"Recommendation {recommendation_id} is already {existing['status']}"
             )
         
-        # Update status
-        recommendations_store[recommendation_id]['status'] = 'rejected'
+        await orchestrator.release_housing_hold(stored_rec.get("execution_plan") or {})
+        await publish_recommendation_update(stored_rec)
         
         return {"status": "rejected", "recommendation_id": recommendation_id}
         
@@ -288,22 +453,30 @@ async def reject_recommendation(
 
 @router.get("/statistics")
 async def get_statistics(
-    orchestrator = Depends(get_orchestrator),
-    executor = Depends(get_executor),
-    event_listener = Depends(get_event_listener)
+    orchestrator: OrchestrationEngine = Depends(get_orchestrator),
+    executor: ExecutionService = Depends(get_executor),
+    event_listener: EventListenerService = Depends(get_event_listener),
+    execution_queue: ExecutionQueue = Depends(get_execution_queue)
 ):
     """
     Get orchestration system statistics
     
-    Returns metrics about:
+    Returns metrics about (summed over all workers):
     - Events detected and processed
     - Decisions made (rules vs AI)
     - Executions completed
     """
+    orchestrator_totals, executor_totals, listener_totals = await asyncio.gather(
+        orchestrator.stats.totals(),
+        executor.stats.totals(),
+        event_listener.stats.totals()
+    )
     return {
-        "orchestrator": orchestrator.get_statistics(),
-        "executor": executor.get_statistics(),
-        "event_listener": event_listener.get_statistics(),
+        "orchestrator": orchestrator.get_statistics(orchestrator_totals),
+        "executor": executor.get_statistics(executor_totals),
+        "event_listener": event_listener.get_statistics(listener_totals),
+        "execution_queue": execution_queue.get_statistics(),
+        "recommendation_store": recommendation_store.get_statistics(),
         "timestamp": datetime.now()
     }
 
@@ -312,7 +485,7 @@ async def get_statistics(
 async def handle_webhook(
     path: str,
     payload: Dict[str, Any],
-    event_listener = Depends(get_event_listener)
+    event_listener: EventListenerService = Depends(get_event_listener)
 ):
     """
     Handle incoming webhooks from external systems
@@ -463,6 +463,7 @@ class AlertResponse(BaseModel):
     status: str
     created_at: datetime
     read_at: Optional[datetime] = None
+    occurrence_count: int = Field(1, description="Detections folded into this alert (burst digests)")
 
 
 class AlertListResponse(BaseModel):
@@ -473,6 +474,31 @@ class AlertListResponse(BaseModel):
     offset: int
 
 
+class AlertCountsResponse(BaseModel):
+    """Unread alert counts for dashboard badges"""
+    organization_id: str
+    unread: int
+    unread_by_severity: Dict[str, int] = Field(default_factory=dict)
+    reconciled_at: Optional[str] = None
+
+
+class BulkAlertActionRequest(BaseModel):
+    """Apply one state transition to many alerts at once"""
+    organization_id: UUID
+    alert_ids: List[UUID] = Field(..., min_length=1, max_length=5000)
+    action: str = Field(..., pattern="^(read|dismiss)$")
+    reason: Optional[str] = Field(None, max_length=2000, description="Dismissal reason (dismiss only)")
+
+
+class BulkAlertActionResponse(BaseModel):
+    """Result of a bulk alert transition"""
+    status: str
+    action: str
+    updated: int
+    skipped: int = Field(..., description="Requested alerts not found or already in the target state")
+    updated_ids: List[str]
+
+
 # ============================================================================
 # ANALYTICS SCHEMAS (City dashboard)
 # ============================================================================
@@ -486,7 +512,7 @@ class LocationHeatMapData(BaseModel):
     longitude: float
     qr_code: str
     intake_count: int
-    unique_clients: int
+    unique_clients: int = Field(..., description="Approximate distinct clients (HyperLogLog, ~2% error)")
     pairs_detected: int
     pairing_rate: float = Field(..., description="Percentage of intakes that resulted in pairs")
 
@@ -505,12 +531,28 @@ class CostSavingsAnalytics(BaseModel):
 
 class IntakeVolumeTrends(BaseModel):
     """Time-series data for intake volume"""
-    dates: List[str] = Field(..., description="ISO date strings")
-    intake_counts: List[int] = Field(..., description="Daily intake counts")
+    dates: List[str] = Field(..., description="ISO bucket starts in the organization's timezone")
+    intake_counts: List[int] = Field(..., description="Intake count per bucket (0 for empty buckets)")
     total_intakes: int
     average_daily: float
-    peak_daily: int
+    peak_daily: int = Field(..., description="Largest single-bucket count")
+    period_days: int
+    granularity: str = Field("day", description="hour, day or week")
+    timezone: str = Field("UTC", description="IANA timezone the buckets follow")
+    unique_clients: int = Field(0, description="Approximate distinct clients in the period (HyperLogLog, ~2% error)")
+
+
+class HeatmapTileResponse(BaseModel):
+    """Columnar heat map cells inside one map tile"""
+    z: int
+    x: int
+    y: int
+    cell_zoom: int = Field(..., description="Zoom level of the returned cells")
     period_days: int
+    cell_x: List[int] = Field(..., description="Cell column offsets inside the tile")
+    cell_y: List[int] = Field(..., description="Cell row offsets inside the tile")
+    intake_counts: List[int]
+    pair_counts: List[int]
 
 
 class GeospatialAnalytics(BaseModel):
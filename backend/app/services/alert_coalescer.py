@@ -0,0 +1,214 @@
+"""
+First Contact E.I.S. - Alert Coalescer
+Folds bursts of mutual support detections into digest alerts
+
+When a popular location produces a wave of intakes, the same pair (or
+members of the same household) can be re-detected many times in minutes.
+Instead of one alert row per detection, detections that share an
+organization and a coalesce key within the window update a single unread
+digest row: occurrence count, every pair ID, and the top evidence by
+confidence. Nothing is lost - each detection still has its own
+MutualSupportPair row - but caseworkers triage one alert per group.
+
+A partial unique index allows one open digest per group, and detections
+write through INSERT ... ON CONFLICT DO UPDATE, so concurrent first
+detections of a group end up in the same row instead of two digests.
+"""
+
+from typing import Dict, Optional, Any, Tuple
+from datetime import datetime, timedelta
+import hashlib
+import logging
+import os
+import uuid
+
+from sqlalchemy import and_, text, update
+from sqlalchemy.dialects.postgresql import insert
+
+from app.models import MutualSupportAlert
+
+logger = logging.getLogger(__name__)
+
+
+class AlertCoalescer:
+    """
+    Groups mutual support alerts per organization and pair/household
+    """
+
+    def __init__(self, window_minutes: int = 15, max_evidence: int = 5):
+        """
+        Initialize the coalescer
+
+        Args:
+            window_minutes: How long a digest stays open for new detections
+            max_evidence: Number of highest-confidence detections kept on the digest
+        """
+        self.window = timedelta(minutes=window_minutes)
+        self.max_evidence = max_evidence
+
+        # Statistics tracking
+        self.alerts_created = 0
+        self.detections_coalesced = 0
+
+    # ------------------------------------------------------------------------
+    # GROUPING
+    # ------------------------------------------------------------------------
+
+    def coalesce_key(self, client_a, client_b) -> str:
+        """
+        Group key for a detected pair
+
+        Clients with the same address on file are one household, so every
+        pairing involving that household shares a digest. Otherwise the
+        (unordered) pair is the group.
+        """
+        address_a = self._normalize_address(getattr(client_a, "address", None))
+        address_b = self._normalize_address(getattr(client_b, "address", None))
+        if address_a and address_a == address_b:
+            digest = hashlib.sha256(address_a.encode()).hexdigest()[:16]
+            return f"household:{digest}"
+
+        first, second = sorted([str(client_a.id), str(client_b.id)])
+        return f"pair:{first}:{second}"
+
+    def _normalize_address(self, address: Optional[str]) -> Optional[str]:
+        if not address:
+            return None
+        return " ".join(address.lower().replace(",", " ").replace(".", " ").split())
+
+    def close_expired(self, db, organization_id, coalesce_key: str):
+        """Close the group's open digest if its window has passed (a new one opens next)"""
+        db.execute(
+            update(MutualSupportAlert).where(
+                and_(
+                    MutualSupportAlert.organization_id == organization_id,
+                    MutualSupportAlert.coalesce_key == coalesce_key,
+                    MutualSupportAlert.status == "unread",
+                    MutualSupportAlert.coalesce_open.is_(True),
+                    MutualSupportAlert.created_at < datetime.utcnow() - self.window
+                )
+            ).values(coalesce_open=False)
+        )
+
+    def open_digest_upsert(self, alert: MutualSupportAlert):
+        """
+        INSERT `alert`, or touch the group's open digest if there is one
+
+        RETURNING gives the id of the row written; it is `alert.id` only if
+        the alert was inserted. Either way the row stays locked until commit.
+        """
+        now = datetime.utcnow()
+        values = {
+            column.key: getattr(alert, column.key)
+            for column in MutualSupportAlert.__table__.columns
+            if getattr(alert, column.key) is not None
+        }
+        values.update(coalesce_open=True, created_at=now, last_occurrence_at=now, updated_at=now)
+        stmt = insert(MutualSupportAlert).values(**values)
+        return stmt.on_conflict_do_update(
+            index_elements=[MutualSupportAlert.organization_id, MutualSupportAlert.coalesce_key],
+            index_where=text(MutualSupportAlert.OPEN_DIGEST),
+            set_={"last_occurrence_at": stmt.excluded.last_occurrence_at}
+        ).returning(MutualSupportAlert.id)
+
+    def open_digest(self, db, alert: MutualSupportAlert) -> Tuple[MutualSupportAlert, bool]:
+        """
+        Open `alert` (from create_alert) as its group's digest, or find the open one
+
+        Returns:
+            (row, created); when created is False the caller merges the
+            detection into the returned digest, which is row-locked
+        """
+        if alert.id is None:
+            alert.id = uuid.uuid4()
+        self.close_expired(db, alert.organization_id, alert.coalesce_key)
+        digest_id = db.execute(self.open_digest_upsert(alert)).scalar_one()
+        created = digest_id == alert.id
+        if created:
+            self.alerts_created += 1
+        return db.get(MutualSupportAlert, digest_id, populate_existing=True), created
+
+    # ------------------------------------------------------------------------
+    # DIGEST CONTENT
+    # ------------------------------------------------------------------------
+
+    def evidence_entry(self, pair_id, pair_result) -> Dict[str, Any]:
+        """Compact evidence record for one detection"""
+        return {
+            "pair_id": str(pair_id),
+            "confidence_score": pair_result.confidence_score,
+            "ihss_eligible": pair_result.ihss_eligible,
+            "indicators": [indicator.indicator_type for indicator in pair_result.support_indicators],
+            "detected_at": datetime.utcnow().isoformat()
+        }
+
+    def create_alert(
+        self,
+        organization_id,
+        pair_id,
+        pair_result,
+        coalesce_key: str,
+        message: str,
+        base_metadata: Dict[str, Any]
+    ) -> MutualSupportAlert:
+        """New alert opening a group (later detections merge into it, see open_digest)"""
+        return MutualSupportAlert(
+            organization_id=organization_id,
+            pair_id=pair_id,
+            alert_type="mutual_support_detected",
+            severity="high" if pair_result.confidence_score >= 0.85 else "medium",
+            message=message,
+            recommended_actions=pair_result.recommended_actions,
+            coalesce_key=coalesce_key,
+            occurrence_count=1,
+            alert_metadata={
+                **base_metadata,
+                "pair_ids": [str(pair_id)],
+                "top_evidence": [self.evidence_entry(pair_id, pair_result)]
+            },
+            status="unread"
+        )
+
+    def merge(self, digest: MutualSupportAlert, pair_id, pair_result, message: str):
+        """Fold a new detection into an open digest"""
+        now = datetime.utcnow()
+        metadata = dict(digest.alert_metadata or {})
+
+        evidence = list(metadata.get("top_evidence", []))
+        evidence.append(self.evidence_entry(pair_id, pair_result))
+        evidence.sort(key=lambda entry: entry["confidence_score"], reverse=True)
+
+        count = (digest.occurrence_count or 1) + 1
+        metadata["pair_ids"] = list(metadata.get("pair_ids", [])) + [str(pair_id)]
+        metadata["top_evidence"] = evidence[:self.max_evidence]
+        metadata["confidence_score"] = max(metadata.get("confidence_score", 0), pair_result.confidence_score)
+        metadata["ihss_eligible"] = metadata.get("ihss_eligible", False) or pair_result.ihss_eligible
+        metadata["last_detection_time"] = now.isoformat()
+
+        # JSON columns are not mutation-tracked, so assign a fresh dict
+        digest.alert_metadata = metadata
+        digest.occurrence_count = count
+        digest.last_occurrence_at = now
+        digest.alert_type = "mutual_support_digest"
+        if pair_result.confidence_score >= 0.85:
+            digest.severity = "high"
+        digest.message = f"{count} mutual support detections in this group (latest: {message})"
+
+        self.detections_coalesced += 1
+        logger.info(f"Coalesced detection into digest {digest.id} ({count} occurrences)")
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Get coalescer statistics"""
+        total = self.alerts_created + self.detections_coalesced
+        return {
+            "alerts_created": self.alerts_created,
+            "detections_coalesced": self.detections_coalesced,
+            "coalescing_rate": (self.detections_coalesced / max(total, 1)) * 100
+        }
+
+
+# Process-wide coalescer used by the intake router
+alert_coalescer = AlertCoalescer(
+    window_minutes=int(os.getenv("ALERT_COALESCE_WINDOW_MINUTES", "15")),
+    max_evidence=int(os.getenv("ALERT_COALESCE_MAX_EVIDENCE", "5"))
+)
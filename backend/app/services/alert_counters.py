@@ -0,0 +1,285 @@
+"""
+First Contact E.I.S. - Alert Counters
+Incrementally maintained unread-alert counts for dashboard badges
+
+Counts live in one Redis hash per organization:
+    alert_counts:{organization_id} -> {unread, unread:high, unread:medium, ...}
+
+Every alert write (create, read, dismiss) adjusts the hash atomically with
+HINCRBY in a MULTI/EXEC pipeline, so a badge refresh is a single HGETALL.
+A periodic reconciler recomputes the hashes from the database to repair any
+drift (missed updates while Redis was down, writes from other tools). One
+worker per interval runs it, under a Redis lock, and the overwrite is
+discarded if any counter moved while the database was being read (WATCH),
+so concurrent HINCRBYs are never lost.
+
+Deltas are applied after the database commit, outside its transaction, so
+a delta can also land after a reconcile whose query already saw the write
+(committed before the query, HINCRBY after EXEC). That change is then
+counted twice until the next reconcile overwrites it: the drift is bounded
+to one reconcile interval, and a decrement counted twice reads as zero
+rather than negative.
+"""
+
+from typing import Dict, List, Optional, Any, Iterable, Tuple
+from datetime import datetime
+import asyncio
+import logging
+
+from redis.exceptions import WatchError
+from sqlalchemy import select, func
+
+from app.models import MutualSupportAlert
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "alert_counts:"
+RECONCILED_FIELD = "reconciled_at"
+RECONCILE_LOCK_KEY = "alert_counts_lock:reconcile"  # Outside KEY_PREFIX, so never scanned as counters
+RECONCILE_ATTEMPTS = 3
+
+
+def counts_key(organization_id: str) -> str:
+    """Redis key holding an organization's alert counters"""
+    return f"{KEY_PREFIX}{organization_id}"
+
+
+def unread_counts_query(organization_id: Optional[str] = None):
+    """
+    Source-of-truth query: unread alerts grouped by organization and severity
+
+    Shared by the reconciler (async session) and the cold-start fallback in
+    the alerts router.
+    """
+    query = select(
+        MutualSupportAlert.organization_id,
+        MutualSupportAlert.severity,
+        func.count(MutualSupportAlert.id)
+    ).where(
+        MutualSupportAlert.status == "unread"
+    ).group_by(
+        MutualSupportAlert.organization_id,
+        MutualSupportAlert.severity
+    )
+    if organization_id is not None:
+        query = query.where(MutualSupportAlert.organization_id == organization_id)
+    return query
+
+
+class AlertCounters:
+    """
+    Redis-backed unread alert counters per organization
+    """
+
+    def __init__(self, redis_client=None):
+        self.redis = redis_client
+        self._reconciler_task: Optional[asyncio.Task] = None
+
+        # Statistics tracking
+        self.updates_applied = 0
+        self.updates_failed = 0
+        self.reconciliations = 0
+
+    def _client(self):
+        if self.redis is None:
+            from app.redis_client import get_redis
+            self.redis = get_redis()
+        return self.redis
+
+    # ------------------------------------------------------------------------
+    # INCREMENTAL UPDATES
+    # ------------------------------------------------------------------------
+
+    async def record_created(self, organization_id: str, severity: str, count: int = 1):
+        """A new unread alert was written"""
+        await self._apply(organization_id, {"unread": count, f"unread:{severity}": count})
+
+    async def record_transitions(
+        self,
+        organization_id: str,
+        transitions: Iterable[Tuple[str, str, str]]
+    ):
+        """
+        Alerts changed status
+
+        Args:
+            organization_id: Organization owning the alerts
+            transitions: (severity, previous_status, new_status) per alert
+        """
+        deltas: Dict[str, int] = {}
+        for severity, previous_status, new_status in transitions:
+            if previous_status == new_status:
+                continue
+            if previous_status == "unread":
+                deltas["unread"] = deltas.get("unread", 0) - 1
+                deltas[f"unread:{severity}"] = deltas.get(f"unread:{severity}", 0) - 1
+            elif new_status == "unread":
+                deltas["unread"] = deltas.get("unread", 0) + 1
+                deltas[f"unread:{severity}"] = deltas.get(f"unread:{severity}", 0) + 1
+        if deltas:
+            await self._apply(organization_id, deltas)
+
+    async def record_severity_change(self, organization_id: str, previous_severity: str, new_severity: str):
+        """An unread alert (e.g. a burst digest) was escalated"""
+        if previous_severity != new_severity:
+            await self._apply(organization_id, {f"unread:{previous_severity}": -1, f"unread:{new_severity}": 1})
+
+    async def _apply(self, organization_id: str, deltas: Dict[str, int]):
+        """Apply counter deltas atomically; failures are repaired by the reconciler"""
+        try:
+            key = counts_key(organization_id)
+            async with self._client().pipeline(transaction=True) as pipe:
+                for field, delta in deltas.items():
+                    pipe.hincrby(key, field, delta)
+                await pipe.execute()
+            self.updates_applied += 1
+        except Exception as e:
+            self.updates_failed += 1
+            logger.warning(f"Alert counter update failed for org {organization_id}: {e}")
+
+    # ------------------------------------------------------------------------
+    # READS
+    # ------------------------------------------------------------------------
+
+    async def get_counts(self, organization_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Current counts for an organization (single HGETALL)
+
+        Returns None if the organization has never been counted or reconciled,
+        so the caller can fall back to the database.
+        """
+        raw = await self._client().hgetall(counts_key(organization_id))
+        if not raw:
+            return None
+
+        by_severity = {
+            field.split(":", 1)[1]: max(int(value), 0)
+            for field, value in raw.items()
+            if field.startswith("unread:")
+        }
+        return {
+            "organization_id": organization_id,
+            "unread": max(int(raw.get("unread", 0)), 0),
+            "unread_by_severity": by_severity,
+            "reconciled_at": raw.get(RECONCILED_FIELD)
+        }
+
+    # ------------------------------------------------------------------------
+    # RECONCILIATION
+    # ------------------------------------------------------------------------
+
+    async def store_counts(
+        self,
+        rows: List[Tuple[Any, str, int]],
+        organization_ids: Optional[Iterable[str]] = None
+    ):
+        """
+        Overwrite counters from source-of-truth rows
+
+        Args:
+            rows: (organization_id, severity, unread_count) from unread_counts_query()
+            organization_ids: Organizations covered by the query; ones with no
+                rows are reset to zero
+        """
+        async with self._client().pipeline(transaction=True) as pipe:
+            self._queue_counts(pipe, rows, organization_ids)
+            await pipe.execute()
+
+    def _queue_counts(self, pipe, rows: List[Tuple[Any, str, int]], organization_ids: Optional[Iterable[str]]):
+        counts: Dict[str, Dict[str, int]] = {str(org): {} for org in organization_ids or ()}
+        for organization_id, severity, count in rows:
+            fields = counts.setdefault(str(organization_id), {})
+            fields[f"unread:{severity}"] = count
+            fields["unread"] = fields.get("unread", 0) + count
+
+        reconciled_at = datetime.utcnow().isoformat()
+        for organization_id, fields in counts.items():
+            key = counts_key(organization_id)
+            pipe.delete(key)
+            pipe.hset(key, mapping={"unread": 0, **fields, RECONCILED_FIELD: reconciled_at})
+
+    async def reconcile(self, session) -> int:
+        """
+        Recompute every organization's counters from the database
+
+        Existing counters are WATCHed from before the query until the
+        overwrite; if an alert write moves one in between, the overwrite is
+        dropped and retried rather than erasing that increment. A delta
+        arriving after EXEC for a write the query already saw is applied
+        on top and repaired by the next reconcile (see module docstring).
+
+        Returns:
+            Rows written, or -1 if counters kept moving and nothing was written
+        """
+        client = self._client()
+        for _ in range(RECONCILE_ATTEMPTS):
+            # Organizations that previously had counters but may have no unread alerts now
+            keys = [key async for key in client.scan_iter(match=f"{KEY_PREFIX}*")]
+            async with client.pipeline(transaction=True) as pipe:
+                try:
+                    if keys:
+                        await pipe.watch(*keys)
+                    result = await session.execute(unread_counts_query())
+                    rows = result.all()
+                    pipe.multi()
+                    self._queue_counts(pipe, rows, [key[len(KEY_PREFIX):] for key in keys])
+                    await pipe.execute()
+                except WatchError:
+                    continue
+            self.reconciliations += 1
+            return len(rows)
+
+        logger.info("Alert counters changed during every reconciliation attempt; retrying next interval")
+        return -1
+
+    async def _acquire_reconcile_lock(self, interval_seconds: int) -> bool:
+        """
+        True if this worker reconciles this interval
+
+        The lock is left to expire rather than released, so the deployment
+        reconciles once per interval; if its holder dies, another worker
+        takes over at the next one.
+        """
+        acquired = await self._client().set(
+            RECONCILE_LOCK_KEY, "1", nx=True, px=max(int(interval_seconds * 1000), 1)
+        )
+        return bool(acquired)
+
+    def start_reconciler(self, session_factory, interval_seconds: int = 300):
+        """Start periodic reconciliation against the database (one worker per interval)"""
+        async def reconcile_loop():
+            while True:
+                try:
+                    if await self._acquire_reconcile_lock(interval_seconds):
+                        async with session_factory() as session:
+                            await self.reconcile(session)
+                        logger.debug("Alert counters reconciled")
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.warning(f"Alert counter reconciliation failed: {e}")
+                await asyncio.sleep(interval_seconds)
+
+        self._reconciler_task = asyncio.create_task(reconcile_loop())
+
+    async def stop(self):
+        """Stop the reconciler"""
+        if self._reconciler_task:
+            self._reconciler_task.cancel()
+            try:
+                await self._reconciler_task
+            except asyncio.CancelledError:
+                pass
+            self._reconciler_task = None
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Get counter statistics"""
+        return {
+            "updates_applied": self.updates_applied,
+            "updates_failed": self.updates_failed,
+            "reconciliations": self.reconciliations
+        }
+
+
+# Process-wide counters shared by routes and the reconciler
+alert_counters = AlertCounters()
@@ -0,0 +1,439 @@
+"""
+First Contact E.I.S. - Alert Hub
+Real-time push of caseworker alerts and recommendation updates
+
+Caseworker dashboards subscribe (WebSocket or SSE) to their organization's
+feed. Messages are published once and fanned out:
+- In-process: every local subscriber gets a bounded queue
+- Across workers: published to Redis pub/sub, and every worker's listener
+  delivers to its own local subscribers
+
+Slow clients never block publishers. When a subscriber's queue is full the
+oldest message is dropped; a subscriber that keeps overflowing is closed so
+the dashboard reconnects and re-syncs from the REST endpoints.
+
+Alert notifications are rate-limited per caseworker: one token bucket per
+(organization, caseworker) on this worker, shared by all of their
+connections and kept across reconnects. Excess notifications are collapsed
+to the latest one per alert (coalesce key; digest updates carry cumulative
+counts), held updates are released as tokens refill, and when too many are
+held the oldest is dropped.
+"""
+
+from typing import Dict, List, Optional, Any, Set
+from datetime import datetime
+from dataclasses import dataclass, field
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+# Redis channel prefix - one channel per organization, plus a broadcast channel
+CHANNEL_PREFIX = "alerts:"
+BROADCAST_CHANNEL = f"{CHANNEL_PREFIX}*all*"
+
+
+def suppression_key(message: Dict[str, Any]) -> str:
+    """What a rate-limited message supersedes: earlier updates of the same alert"""
+    data = message.get("data") or {}
+    return str(data.get("coalesce_key") or data.get("alert_id") or message.get("type"))
+
+
+class NotificationThrottle:
+    """
+    Token bucket shared by one caseworker's connections
+
+    Each rate-limited message costs one token per caseworker, however many
+    tabs they have open, and the bucket outlives a reconnect. Messages over
+    the limit are held (latest per alert) and released to every connection
+    as tokens refill; beyond `max_held` the oldest held message is dropped.
+    """
+
+    def __init__(self, rate_per_minute: float, max_held: int):
+        self.rate_per_minute = rate_per_minute
+        self.max_held = max_held
+        self.subscriptions: Set["Subscription"] = set()
+        self.held: Dict[str, Dict[str, Any]] = {}  # suppression key -> latest
+        self.dropped = 0
+        # Burst allowance = one minute
+        self._tokens = rate_per_minute
+        self._refilled_at = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(
+            self.rate_per_minute,
+            self._tokens + (now - self._refilled_at) * self.rate_per_minute / 60
+        )
+        self._refilled_at = now
+
+    def _take_token(self) -> bool:
+        self._refill()
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return True
+        return False
+
+    def seconds_until_token(self) -> float:
+        return max(1 - self._tokens, 0.0) * 60 / self.rate_per_minute
+
+    def is_idle(self) -> bool:
+        """No connections, nothing held and a full bucket (safe to forget)"""
+        self._refill()
+        return not self.subscriptions and not self.held and self._tokens >= self.rate_per_minute
+
+    def release(self):
+        """Deliver held messages (oldest first) while tokens are available"""
+        while self.held and self.subscriptions and self._take_token():
+            message = self.held.pop(next(iter(self.held)))
+            for subscription in list(self.subscriptions):
+                subscription.offer(message)
+
+    def admit(self, message: Dict[str, Any]) -> bool:
+        """Take a token for `message`, or hold it and return False"""
+        self.release()
+        key = suppression_key(message)
+        if self.held or not self._take_token():
+            # Keep only the latest per alert; held messages go first once
+            # tokens refill
+            self.held[key] = message
+            if len(self.held) > self.max_held:
+                self.held.pop(next(iter(self.held)))
+                self.dropped += 1
+            return False
+        self.held.pop(key, None)
+        return True
+
+
+@dataclass(eq=False)
+class Subscription:
+    """A single connected caseworker dashboard (hashed by identity)"""
+    organization_id: str
+    caseworker_id: Optional[str]
+    queue: asyncio.Queue
+    max_consecutive_drops: int
+    throttle: Optional[NotificationThrottle] = None  # Shared with the caseworker's other connections
+    subscription_id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    dropped: int = 0
+    consecutive_drops: int = 0
+    closed: bool = False
+
+    def offer(self, message: Dict[str, Any]) -> bool:
+        """
+        Enqueue a message without blocking the publisher
+
+        Returns False if the message could not be delivered because the
+        subscription is closed.
+        """
+        if self.closed:
+            return False
+        self._enqueue(message)
+        return True
+
+    def _enqueue(self, message: Dict[str, Any]):
+        try:
+            self.queue.put_nowait(message)
+            self.consecutive_drops = 0
+            return
+        except asyncio.QueueFull:
+            pass
+
+        # Backpressure: drop the oldest message to make room for the newest
+        try:
+            self.queue.get_nowait()
+        except asyncio.QueueEmpty:
+            pass
+        self.queue.put_nowait(message)
+        self.dropped += 1
+        self.consecutive_drops += 1
+
+        if self.consecutive_drops >= self.max_consecutive_drops:
+            logger.warning(
+                f"Closing slow alert subscriber {self.subscription_id} "
+                f"(org {self.organization_id}, {self.dropped} messages dropped)"
+            )
+            self.closed = True
+
+    def _release_held(self):
+        if self.throttle is not None:
+            self.throttle.release()
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        Wait for the next message
+
+        Returns None on timeout or when closed and drained. Held
+        rate-limited messages are delivered as soon as tokens refill.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            self._release_held()
+            if self.closed and self.queue.empty():
+                return None
+            wait = None if deadline is None else max(deadline - time.monotonic(), 0.0)
+            if self.throttle is not None and self.throttle.held and not self.closed:
+                refill = self.throttle.seconds_until_token()
+                wait = refill if wait is None else min(wait, refill)
+            try:
+                return await asyncio.wait_for(self.queue.get(), timeout=wait)
+            except asyncio.TimeoutError:
+                self._release_held()
+                if not self.queue.empty():
+                    return self.queue.get_nowait()
+                if deadline is not None and time.monotonic() >= deadline:
+                    return None
+
+
+class AlertHub:
+    """
+    Organization-scoped pub/sub hub for caseworker dashboards
+    """
+
+    def __init__(
+        self,
+        max_queue_size: int = 100,
+        max_consecutive_drops: int = 50,
+        max_subscribers: int = 1000,
+        notify_rate_per_minute: float = 6.0,
+        redis_client=None
+    ):
+        self.max_queue_size = max_queue_size
+        self.max_consecutive_drops = max_consecutive_drops
+        self.max_subscribers = max_subscribers
+        self.notify_rate_per_minute = notify_rate_per_minute
+        self.redis = redis_client
+
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+        self._throttles: Dict[tuple, NotificationThrottle] = {}  # (org, caseworker or connection) -> bucket
+        self._listener_task: Optional[asyncio.Task] = None
+        self._pubsub = None
+
+        # Statistics tracking
+        self.messages_published = 0
+        self.messages_delivered = 0
+        self.messages_dropped = 0
+        self.messages_throttled = 0
+
+        logger.info("Alert Hub initialized")
+
+    # ------------------------------------------------------------------------
+    # LIFECYCLE
+    # ------------------------------------------------------------------------
+
+    async def start(self):
+        """Start the cross-worker Redis listener (falls back to in-process only)"""
+        if self.redis is None:
+            try:
+                from app.redis_client import get_redis
+                self.redis = get_redis()
+                await self.redis.ping()
+            except Exception as e:
+                logger.warning(f"Alert Hub running in single-worker mode (Redis unavailable): {e}")
+                self.redis = None
+                return
+
+        self._pubsub = self.redis.pubsub()
+        await self._pubsub.psubscribe(f"{CHANNEL_PREFIX}*")
+        self._listener_task = asyncio.create_task(self._listen())
+        logger.info("Alert Hub listening for cross-worker messages")
+
+    async def stop(self):
+        """Stop the listener and close every subscription"""
+        if self._listener_task:
+            self._listener_task.cancel()
+            try:
+                await self._listener_task
+            except asyncio.CancelledError:
+                pass
+            self._listener_task = None
+
+        if self._pubsub is not None:
+            await self._pubsub.close()
+            self._pubsub = None
+
+        for subscriptions in self._subscribers.values():
+            for subscription in subscriptions:
+                subscription.closed = True
+        self._subscribers.clear()
+
+    async def _listen(self):
+        """Deliver messages published by any worker to local subscribers"""
+        while True:
+            try:
+                async for raw in self._pubsub.listen():
+                    if raw.get("type") != "pmessage":
+                        continue
+                    channel = raw["channel"]
+                    organization_id = None if channel == BROADCAST_CHANNEL else channel[len(CHANNEL_PREFIX):]
+                    envelope = json.loads(raw["data"])
+                    self._deliver_local(
+                        organization_id,
+                        envelope["message"],
+                        rate_limited=envelope.get("rate_limited", False)
+                    )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Alert Hub listener error: {e}", exc_info=True)
+                await asyncio.sleep(1)
+
+    # ------------------------------------------------------------------------
+    # SUBSCRIBE / PUBLISH
+    # ------------------------------------------------------------------------
+
+    def subscribe(self, organization_id: str, caseworker_id: Optional[str] = None) -> Subscription:
+        """Register a dashboard connection for an organization's feed"""
+        if self.subscriber_count() >= self.max_subscribers:
+            raise RuntimeError("Alert Hub subscriber limit reached")
+
+        subscription = Subscription(
+            organization_id=organization_id,
+            caseworker_id=caseworker_id,
+            queue=asyncio.Queue(maxsize=self.max_queue_size),
+            max_consecutive_drops=self.max_consecutive_drops
+        )
+        # Anonymous connections get a bucket of their own
+        key = (organization_id, caseworker_id or subscription.subscription_id)
+        throttle = self._throttles.get(key)
+        if throttle is None:
+            if len(self._throttles) >= self.max_subscribers:
+                self._forget_idle_throttles()
+            throttle = self._throttles[key] = NotificationThrottle(self.notify_rate_per_minute, self.max_queue_size)
+        throttle.subscriptions.add(subscription)
+        subscription.throttle = throttle
+        self._subscribers.setdefault(organization_id, set()).add(subscription)
+        logger.debug(f"Alert subscriber {subscription.subscription_id} joined org {organization_id}")
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        """Remove a dashboard connection"""
+        subscription.closed = True
+        if subscription.throttle is not None:
+            subscription.throttle.subscriptions.discard(subscription)
+            if not subscription.throttle.subscriptions:
+                # Nobody to deliver to; a reconnect re-syncs over REST
+                subscription.throttle.held.clear()
+                if subscription.caseworker_id is None:
+                    # Nobody can reconnect to an anonymous connection's bucket
+                    self._throttles.pop((subscription.organization_id, subscription.subscription_id), None)
+        subscriptions = self._subscribers.get(subscription.organization_id)
+        if subscriptions:
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self._subscribers[subscription.organization_id]
+
+    def _forget_idle_throttles(self):
+        for key in [key for key, throttle in self._throttles.items() if throttle.is_idle()]:
+            del self._throttles[key]
+
+    async def publish(
+        self,
+        message_type: str,
+        data: Dict[str, Any],
+        organization_id: Optional[str] = None,
+        rate_limited: bool = False
+    ):
+        """
+        Publish a message to an organization's subscribers
+
+        Args:
+            message_type: e.g. "mutual_support_alert", "recommendation_update"
+            data: JSON-serializable payload
+            organization_id: Target organization, or None to reach every subscriber
+                (system-wide notices only; never for tenant data)
+            rate_limited: Subject to each caseworker's notification rate limit
+                (only for messages where the latest supersedes earlier ones)
+        """
+        message = {
+            "type": message_type,
+            "data": data,
+            "timestamp": datetime.utcnow().isoformat()
+        }
+        self.messages_published += 1
+
+        if self.redis is not None:
+            channel = f"{CHANNEL_PREFIX}{organization_id}" if organization_id else BROADCAST_CHANNEL
+            try:
+                # Every worker (including this one) delivers via its listener
+                envelope = {"message": message, "rate_limited": rate_limited}
+                await self.redis.publish(channel, json.dumps(envelope, default=str))
+                return
+            except Exception as e:
+                logger.warning(f"Alert Hub Redis publish failed, delivering locally: {e}")
+
+        self._deliver_local(organization_id, message, rate_limited=rate_limited)
+
+    def _deliver_local(
+        self,
+        organization_id: Optional[str],
+        message: Dict[str, Any],
+        rate_limited: bool = False
+    ):
+        """Fan a message out to this worker's subscribers"""
+        if organization_id is None:
+            targets: List[Subscription] = [
+                subscription
+                for subscriptions in self._subscribers.values()
+                for subscription in subscriptions
+            ]
+        else:
+            targets = list(self._subscribers.get(organization_id, ()))
+
+        if rate_limited:
+            # One token per caseworker, not per connection
+            admitted = {}
+            for subscription in targets:
+                throttle = subscription.throttle
+                if throttle is not None and throttle not in admitted:
+                    dropped_before = throttle.dropped
+                    admitted[throttle] = throttle.admit(message)
+                    if not admitted[throttle]:
+                        self.messages_throttled += 1
+                    self.messages_dropped += throttle.dropped - dropped_before
+            targets = [
+                subscription for subscription in targets
+                if subscription.throttle is None or admitted[subscription.throttle]
+            ]
+
+        for subscription in targets:
+            dropped_before = subscription.dropped
+            if subscription.offer(message):
+                self.messages_delivered += 1
+                self.messages_dropped += subscription.dropped - dropped_before
+            if subscription.closed:
+                self.unsubscribe(subscription)
+
+    # ------------------------------------------------------------------------
+    # STATISTICS
+    # ------------------------------------------------------------------------
+
+    def subscriber_count(self, organization_id: Optional[str] = None) -> int:
+        """Number of local subscribers (optionally for one organization)"""
+        if organization_id is not None:
+            return len(self._subscribers.get(organization_id, ()))
+        return sum(len(subscriptions) for subscriptions in self._subscribers.values())
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Get hub statistics"""
+        return {
+            "subscribers": self.subscriber_count(),
+            "organizations": len(self._subscribers),
+            "messages_published": self.messages_published,
+            "messages_delivered": self.messages_delivered,
+            "messages_dropped": self.messages_dropped,
+            "messages_throttled": self.messages_throttled,
+            "cross_worker": self.redis is not None
+        }
+
+
+# Process-wide hub shared by routes and background tasks
+alert_hub = AlertHub(
+    max_queue_size=int(os.getenv("ALERT_HUB_QUEUE_SIZE", "100")),
+    max_consecutive_drops=int(os.getenv("ALERT_HUB_MAX_DROPS", "50")),
+    max_subscribers=int(os.getenv("WS_MAX_CONNECTIONS", "1000")),
+    notify_rate_per_minute=float(os.getenv("ALERT_NOTIFY_RATE_PER_MINUTE", "6"))
+)
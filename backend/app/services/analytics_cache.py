@@ -0,0 +1,418 @@
+"""
+First Contact E.I.S. - Analytics Cache
+Organization-scoped response cache for the city dashboard endpoints
+
+Dashboards load heatmap, cost savings, volume trends and the summary together,
+and every administrator of an organization asks for the same numbers. Responses
+are cached in two layers:
+
+    local LRU (per worker)  ->  Redis (shared)  ->  database
+
+Keys are (endpoint, organization, params, generation). Intake and pair writes
+bump the organization's generation counter in Redis, which makes every cached
+response for that organization unreachable at once - no key scanning. Entries
+also carry a TTL so a worker that cannot reach Redis still converges.
+
+Each worker remembers an organization's generation for a second or so
+(ANALYTICS_CACHE_GENERATION_SECONDS), so local hits cost no Redis round
+trip; another worker's write shows up within that time, this worker's own
+writes immediately.
+
+With a read replica, a fill right after a write could read a replica that
+has not replayed it yet and cache the old numbers under the new generation.
+So for as long as the replica may lag (REPLICA_MAX_LAG_SECONDS plus one
+check interval) after an invalidation, fills read the primary instead.
+
+A miss is recomputed once: concurrent requests for the same key in a worker
+await the same future, and workers coordinate through a short Redis lock
+(SET NX) while the winner fills the shared cache.
+"""
+
+from typing import Dict, Optional, Any, Callable, Awaitable, Tuple
+from collections import OrderedDict
+import asyncio
+import functools
+import hashlib
+import inspect
+import json
+import logging
+import os
+import time
+
+from fastapi.encoders import jsonable_encoder
+
+from app.database import AsyncSessionLocal, READ_DATABASE_URL, REPLICA_CHECK_INTERVAL_SECONDS, REPLICA_MAX_LAG_SECONDS
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "analytics:"
+GENERATION_PREFIX = "analytics_gen:"
+LOCK_PREFIX = "analytics_lock:"
+PRIMARY_READ_PREFIX = "analytics_primary:"  # Set (with a TTL) while fills must read the primary
+
+
+class AnalyticsCache:
+    """
+    Two-layer (local LRU + Redis) cache with per-organization invalidation
+    """
+
+    def __init__(
+        self,
+        max_local_entries: int = 1000,
+        ttl_seconds: int = 300,
+        lock_timeout_seconds: float = 30.0,
+        redis_client=None,
+        generation_cache_seconds: float = 1.0,
+        primary_session_factory=None,
+        primary_read_seconds: float = 0.0
+    ):
+        """
+        Initialize the cache
+
+        Args:
+            max_local_entries: LRU capacity per worker
+            ttl_seconds: Upper bound on how long a response is served
+            lock_timeout_seconds: How long other workers wait on a recompute
+            redis_client: Optional client (defaults to the shared app client)
+            generation_cache_seconds: How long a worker reuses an organization's
+                generation before asking Redis again (0 = every lookup)
+            primary_session_factory: Opens a primary session for fills that must
+                see the latest writes (None = endpoints' sessions are always used)
+            primary_read_seconds: How long after an invalidation fills read the
+                primary
+        """
+        self.max_local_entries = max_local_entries
+        self.ttl_seconds = ttl_seconds
+        self.lock_timeout_seconds = lock_timeout_seconds
+        self.redis = redis_client
+        self.generation_cache_seconds = generation_cache_seconds
+        self.primary_session_factory = primary_session_factory
+        self.primary_read_seconds = primary_read_seconds
+
+        self._local: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (expires_at, value)
+        self._local_generations: Dict[str, int] = {}  # used while Redis is unavailable
+        self._local_primary_until: Dict[str, float] = {}  # used while Redis is unavailable
+        self._generation_cache: Dict[str, tuple] = {}  # org -> (expires_at, generation, read_primary)
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+        # Statistics tracking
+        self.lookups = 0
+        self.local_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+        self.coalesced_waits = 0
+        self.recomputes = 0
+        self.recompute_seconds_total = 0.0
+        self.recompute_seconds_max = 0.0
+        self.invalidations = 0
+        self.primary_fills = 0
+        self.redis_errors = 0
+
+    def _client(self):
+        if self.redis is None:
+            from app.redis_client import get_redis
+            self.redis = get_redis()
+        return self.redis
+
+    # ------------------------------------------------------------------------
+    # GENERATIONS
+    # ------------------------------------------------------------------------
+
+    async def _generation(self, organization_id: str) -> Tuple[int, bool]:
+        """
+        Current cache generation for an organization, and whether fills
+        must read the primary (the organization was written to recently)
+        """
+        now = time.monotonic()
+        cached = self._generation_cache.get(organization_id)
+        if cached is not None and cached[0] > now:
+            return cached[1], cached[2]
+
+        try:
+            generation, read_primary = await self._client().mget(
+                f"{GENERATION_PREFIX}{organization_id}", f"{PRIMARY_READ_PREFIX}{organization_id}"
+            )
+            state = (int(generation or 0), read_primary is not None)
+        except Exception as e:
+            self.redis_errors += 1
+            logger.debug(f"Analytics cache generation lookup failed: {e}")
+            state = (
+                self._local_generations.get(organization_id, 0),
+                self._local_primary_until.get(organization_id, 0.0) > now
+            )
+        if self.generation_cache_seconds > 0:
+            self._generation_cache[organization_id] = (now + self.generation_cache_seconds, *state)
+        return state
+
+    async def invalidate(self, organization_id) -> None:
+        """
+        Drop every cached response for an organization
+
+        Called after intake and pair writes commit.
+        """
+        organization_id = str(organization_id)
+        self.invalidations += 1
+        self._local_generations[organization_id] = self._local_generations.get(organization_id, 0) + 1
+        # This worker sees its own write at once
+        self._generation_cache.pop(organization_id, None)
+        if self.primary_read_seconds > 0:
+            self._local_primary_until[organization_id] = time.monotonic() + self.primary_read_seconds
+        try:
+            async with self._client().pipeline(transaction=True) as pipe:
+                pipe.incr(f"{GENERATION_PREFIX}{organization_id}")
+                if self.primary_read_seconds > 0:
+                    pipe.set(
+                        f"{PRIMARY_READ_PREFIX}{organization_id}", "1", px=int(self.primary_read_seconds * 1000)
+                    )
+                await pipe.execute()
+        except Exception as e:
+            self.redis_errors += 1
+            logger.warning(f"Analytics cache invalidation for org {organization_id} not shared: {e}")
+
+    # ------------------------------------------------------------------------
+    # LOCAL LRU
+    # ------------------------------------------------------------------------
+
+    def _local_get(self, key: str):
+        entry = self._local.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._local[key]
+            return None
+        self._local.move_to_end(key)
+        return value
+
+    def _local_set(self, key: str, value: Any):
+        self._local[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._local.move_to_end(key)
+        while len(self._local) > self.max_local_entries:
+            self._local.popitem(last=False)
+
+    # ------------------------------------------------------------------------
+    # LOOKUP
+    # ------------------------------------------------------------------------
+
+    def make_key(self, endpoint: str, organization_id: str, params: Dict[str, Any], generation: int) -> str:
+        """Cache key for one endpoint response"""
+        encoded = json.dumps(jsonable_encoder(params), sort_keys=True)
+        digest = hashlib.sha256(encoded.encode()).hexdigest()[:16]
+        return f"{KEY_PREFIX}{endpoint}:{organization_id}:{generation}:{digest}"
+
+    async def get_or_compute(
+        self,
+        endpoint: str,
+        organization_id: str,
+        params: Dict[str, Any],
+        compute: Callable[[], Any],
+        compute_on_primary: Optional[Callable[[], Any]] = None
+    ) -> Any:
+        """
+        Cached response, computing it at most once on a miss
+
+        Args:
+            endpoint: Endpoint name (part of the key)
+            organization_id: Organization the response belongs to
+            params: Query parameters that change the response
+            compute: Sync or async callable producing the response
+            compute_on_primary: Used instead of `compute` while the
+                organization's recent writes may not be on the replica yet
+        """
+        organization_id = str(organization_id)
+        self.lookups += 1
+        generation, read_primary = await self._generation(organization_id)
+        key = self.make_key(endpoint, organization_id, params, generation)
+        if read_primary and compute_on_primary is not None:
+            compute = compute_on_primary
+
+        value = self._local_get(key)
+        if value is not None:
+            self.local_hits += 1
+            return value
+
+        # Another request in this worker is already computing it
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.coalesced_waits += 1
+            return await asyncio.shield(inflight)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await self._fill(key, compute)
+            future.set_result(value)
+            return value
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Waiters re-raise it; mark retrieved so an unwaited future doesn't log
+            future.exception()
+            raise
+        finally:
+            del self._inflight[key]
+
+    async def _fill(self, key: str, compute: Callable[[], Any]) -> Any:
+        """Read through Redis, recomputing under a cross-worker lock on a miss"""
+        value = await self._redis_get(key)
+        if value is not None:
+            self.redis_hits += 1
+            self._local_set(key, value)
+            return value
+
+        have_lock = await self._acquire_lock(key)
+        if not have_lock:
+            # Another worker is recomputing - wait for it to publish the result
+            value = await self._wait_for_redis(key)
+            if value is not None:
+                self.redis_hits += 1
+                self.coalesced_waits += 1
+                self._local_set(key, value)
+                return value
+
+        self.misses += 1
+        try:
+            value = await self._recompute(compute)
+            self._local_set(key, value)
+            await self._redis_set(key, value)
+            return value
+        finally:
+            if have_lock:
+                await self._release_lock(key)
+
+    async def _recompute(self, compute: Callable[[], Any]) -> Any:
+        started = time.perf_counter()
+        result = compute()
+        if inspect.isawaitable(result):
+            result = await result
+        elapsed = time.perf_counter() - started
+
+        self.recomputes += 1
+        self.recompute_seconds_total += elapsed
+        self.recompute_seconds_max = max(self.recompute_seconds_max, elapsed)
+        return jsonable_encoder(result)
+
+    # ------------------------------------------------------------------------
+    # REDIS LAYER
+    # ------------------------------------------------------------------------
+
+    async def _redis_get(self, key: str) -> Optional[Any]:
+        try:
+            raw = await self._client().get(key)
+            return json.loads(raw) if raw is not None else None
+        except Exception as e:
+            self.redis_errors += 1
+            logger.debug(f"Analytics cache read failed: {e}")
+            return None
+
+    async def _redis_set(self, key: str, value: Any):
+        try:
+            await self._client().set(key, json.dumps(value), ex=self.ttl_seconds)
+        except Exception as e:
+            self.redis_errors += 1
+            logger.debug(f"Analytics cache write failed: {e}")
+
+    async def _acquire_lock(self, key: str) -> bool:
+        """True if this worker should recompute (also when Redis is unavailable)"""
+        try:
+            acquired = await self._client().set(
+                f"{LOCK_PREFIX}{key}", "1", nx=True, px=int(self.lock_timeout_seconds * 1000)
+            )
+            return bool(acquired)
+        except Exception as e:
+            self.redis_errors += 1
+            logger.debug(f"Analytics cache lock failed: {e}")
+            return True
+
+    async def _release_lock(self, key: str):
+        try:
+            await self._client().delete(f"{LOCK_PREFIX}{key}")
+        except Exception as e:
+            self.redis_errors += 1
+            logger.debug(f"Analytics cache unlock failed: {e}")
+
+    async def _wait_for_redis(self, key: str, poll_seconds: float = 0.05) -> Optional[Any]:
+        """Poll for another worker's result until its lock expires"""
+        deadline = time.monotonic() + self.lock_timeout_seconds
+        while time.monotonic() < deadline:
+            await asyncio.sleep(poll_seconds)
+            value = await self._redis_get(key)
+            if value is not None:
+                return value
+            try:
+                if not await self._client().exists(f"{LOCK_PREFIX}{key}"):
+                    # Lock released without a result (recompute failed)
+                    return await self._redis_get(key)
+            except Exception:
+                return None
+            poll_seconds = min(poll_seconds * 2, 0.5)
+        return None
+
+    # ------------------------------------------------------------------------
+    # ENDPOINT DECORATOR
+    # ------------------------------------------------------------------------
+
+    def cached(self, endpoint: str, exclude: tuple = ("db",), session_arg: str = "db"):
+        """
+        Cache an analytics endpoint's response
+
+        The endpoint must take `organization_id`; every other argument except
+        the ones in `exclude` becomes part of the key. Fills that must read
+        the primary pass a primary session as `session_arg`.
+        """
+        def decorator(func: Callable[..., Awaitable[Any]]):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                params = {
+                    name: value for name, value in kwargs.items()
+                    if name not in exclude and name != "organization_id"
+                }
+
+                compute_on_primary = None
+                if self.primary_session_factory is not None and session_arg in kwargs:
+                    async def compute_on_primary():
+                        self.primary_fills += 1
+                        async with self.primary_session_factory() as session:
+                            return await func(*args, **{**kwargs, session_arg: session})
+
+                return await self.get_or_compute(
+                    endpoint,
+                    kwargs["organization_id"],
+                    params,
+                    lambda: func(*args, **kwargs),
+                    compute_on_primary
+                )
+            return wrapper
+        return decorator
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Get cache statistics"""
+        return {
+            "lookups": self.lookups,
+            "local_hits": self.local_hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+            "hit_ratio": (1 - self.misses / self.lookups) if self.lookups else 0.0,
+            "coalesced_waits": self.coalesced_waits,
+            "recomputes": self.recomputes,
+            "avg_recompute_ms": (self.recompute_seconds_total / self.recomputes * 1000) if self.recomputes else 0.0,
+            "max_recompute_ms": self.recompute_seconds_max * 1000,
+            "invalidations": self.invalidations,
+            "primary_fills": self.primary_fills,
+            "redis_errors": self.redis_errors,
+            "local_entries": len(self._local)
+        }
+
+
+# Process-wide cache used by the analytics router
+analytics_cache = AnalyticsCache(
+    max_local_entries=int(os.getenv("ANALYTICS_CACHE_MAX_ENTRIES", "1000")),
+    ttl_seconds=int(os.getenv("ANALYTICS_CACHE_TTL_SECONDS", "300")),
+    generation_cache_seconds=float(os.getenv("ANALYTICS_CACHE_GENERATION_SECONDS", "1")),
+    # Endpoints read the replica when one is configured; it may lag by up to
+    # the tolerance, plus one check interval before that is noticed
+    primary_session_factory=AsyncSessionLocal if READ_DATABASE_URL else None,
+    primary_read_seconds=REPLICA_MAX_LAG_SECONDS + REPLICA_CHECK_INTERVAL_SECONDS
+)
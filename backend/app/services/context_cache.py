@@ -0,0 +1,112 @@
+"""
+First Contact E.I.S. - Context Cache
+Short-lived, per-worker snapshots of slowly changing orchestration context
+
+Provider capacity and overall system state change on the order of minutes,
+but every event used to query them again. Entries live for a few seconds;
+concurrent misses for the same key share one load (single flight), and
+events that change the underlying data (provider_capacity_change) invalidate
+entries explicitly - on every worker, via the orchestrator's WorkerSync.
+Without Redis, other workers see a change once their entry expires (at most
+the key's TTL).
+
+Cached values are shared between events: treat them as read-only. A load
+outlives the caller that started it, so loaders must acquire their own
+resources (e.g. open their own DB session) rather than borrow the caller's.
+"""
+
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+from collections import OrderedDict
+import asyncio
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+PROVIDER_CAPACITY_TTL_SECONDS = float(os.getenv("PROVIDER_CAPACITY_TTL_SECONDS", "30"))
+SYSTEM_STATE_TTL_SECONDS = float(os.getenv("SYSTEM_STATE_TTL_SECONDS", "10"))
+
+SYSTEM_STATE_KEY = ("system_state",)
+
+
+def provider_capacity_key(provider_id: Optional[str]) -> tuple:
+    return ("provider_capacity", provider_id)
+
+
+class ContextCache:
+    """
+    Async TTL cache with single-flight loads and explicit invalidation
+    """
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()  # key -> (expires_at, value)
+        self._loads: Dict[Hashable, asyncio.Future] = {}
+        self._generations: Dict[Hashable, int] = {}
+
+        # Statistics tracking
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.invalidations = 0
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]], ttl_seconds: float) -> Any:
+        """
+        Cached value for `key`, loading it with `loader` if absent or expired
+
+        Callers arriving while a load is in flight wait for it instead of
+        starting another. A caller giving up (e.g. its own timeout) does not
+        cancel the load for the others. Failed loads are not cached.
+        """
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+        pending = self._loads.get(key)
+        if pending is not None:
+            self.coalesced += 1
+            return await asyncio.shield(pending)
+
+        self.misses += 1
+        generation = self._generations.get(key, 0)
+        task = asyncio.ensure_future(self._load(key, loader, ttl_seconds, generation))
+        self._loads[key] = task
+        return await asyncio.shield(task)
+
+    async def _load(self, key: Hashable, loader, ttl_seconds: float, generation: int):
+        try:
+            value = await loader()
+            # Skip storing if the key was invalidated while we were loading
+            if self._generations.get(key, 0) == generation:
+                self._entries[key] = (time.monotonic() + ttl_seconds, value)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+            return value
+        finally:
+            self._loads.pop(key, None)
+
+    def invalidate(self, key: Hashable):
+        """Drop a key; loads already in flight will not repopulate it"""
+        self._entries.pop(key, None)
+        self._generations[key] = self._generations.get(key, 0) + 1
+        self.invalidations += 1
+
+    def clear(self):
+        for key in list(self._entries):
+            self.invalidate(key)
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Get cache statistics"""
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "invalidations": self.invalidations,
+            "hit_rate": ((self.hits + self.coalesced) / lookups * 100) if lookups else 0.0
+        }
@@ -0,0 +1,143 @@
+"""
+First Contact E.I.S. - Event Batches
+Concurrent orchestration of many events (provider export replays, backfills)
+
+Events are read incrementally (a JSON array or an NDJSON stream), handed to
+the orchestrator with at most `concurrency` in flight, and results are
+yielded in completion order so the caller can stream them back while the
+rest of the batch is still running. Reading stops while every slot is busy,
+so memory is bounded by `concurrency` whatever the batch size.
+"""
+
+from typing import Any, AsyncIterable, AsyncIterator, Awaitable, Callable, Dict, Optional, Tuple
+from dataclasses import dataclass
+import asyncio
+import json
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONCURRENCY = int(os.getenv("TRIGGER_BATCH_CONCURRENCY", "16"))
+MAX_BATCH_EVENTS = int(os.getenv("TRIGGER_BATCH_MAX_EVENTS", "100000"))
+
+_DONE = object()
+
+
+@dataclass
+class BatchItemResult:
+    """Outcome of one event in a batch"""
+    index: int
+    item: Any
+    result: Any = None
+    error: Optional[str] = None
+
+
+async def iter_ndjson(chunks: AsyncIterable[bytes]) -> AsyncIterator[Tuple[int, Any]]:
+    """
+    (line number, parsed object) from an NDJSON byte stream
+
+    Blank lines are skipped; a malformed line yields a ValueError in place of
+    the object so one bad row does not abort the batch.
+    """
+    buffer = b""
+    line_number = 0
+
+    def parse(line: bytes):
+        try:
+            return json.loads(line)
+        except ValueError as e:
+            return ValueError(f"Invalid JSON on line {line_number}: {e}")
+
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            line_number += 1
+            if line.strip():
+                yield line_number, parse(line)
+    if buffer.strip():
+        line_number += 1
+        yield line_number, parse(buffer)
+
+
+async def iter_items(items) -> AsyncIterator[Tuple[int, Any]]:
+    """(index, item) from an in-memory list"""
+    for index, item in enumerate(items):
+        yield index, item
+
+
+async def run_concurrently(
+    items: AsyncIterable[Tuple[int, Any]],
+    handler: Callable[[Any], Awaitable[Any]],
+    concurrency: int = DEFAULT_CONCURRENCY,
+    max_items: int = MAX_BATCH_EVENTS
+) -> AsyncIterator[BatchItemResult]:
+    """
+    Apply `handler` to every item with bounded concurrency
+
+    Items that are exceptions (e.g. unparseable lines) and handler failures
+    become results with `error` set. Results are yielded as they complete.
+    Items beyond `max_items` are reported as errors and not processed.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    # Bounded too, so a slow reader of the results pauses the whole pipeline
+    results: asyncio.Queue = asyncio.Queue(maxsize=concurrency)
+    tasks = set()
+
+    async def run(index: int, item: Any):
+        try:
+            try:
+                outcome = BatchItemResult(index, item, result=await handler(item))
+            except Exception as e:
+                logger.warning(f"Batch item {index} failed: {e}")
+                outcome = BatchItemResult(index, item, error=str(e) or type(e).__name__)
+            await results.put(outcome)
+        finally:
+            semaphore.release()
+
+    async def produce():
+        count = 0
+        try:
+            async for index, item in items:
+                count += 1
+                if isinstance(item, Exception):
+                    await results.put(BatchItemResult(index, None, error=str(item)))
+                    continue
+                if count > max_items:
+                    await results.put(BatchItemResult(index, item, error=f"Batch limit of {max_items} events exceeded"))
+                    break
+                await semaphore.acquire()
+                task = asyncio.create_task(run(index, item))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.wait(set(tasks))
+            await results.put(_DONE)
+        except Exception as e:
+            # Reading the input failed (e.g. client disconnect); end the batch
+            await results.put(e)
+
+    producer = asyncio.create_task(produce())
+    try:
+        while (result := await results.get()) is not _DONE:
+            if isinstance(result, Exception):
+                raise result
+            yield result
+    finally:
+        producer.cancel()
+        for task in list(tasks):
+            task.cancel()
+        await asyncio.gather(producer, *tasks, return_exceptions=True)
+
+
+def summarize(counts: Dict[str, int], elapsed_seconds: float) -> Dict[str, Any]:
+    """Trailer line for a streamed batch"""
+    total = sum(counts.values())
+    return {
+        "summary": True,
+        "events": total,
+        **counts,
+        "elapsed_seconds": round(elapsed_seconds, 3),
+        "events_per_second": round(total / elapsed_seconds, 1) if elapsed_seconds > 0 else None
+    }
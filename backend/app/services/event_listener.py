@@ -43,11 +43,15 @@ class EventListenerService:
         self,
         orchestrator,
         firestore_client=None,
-        demo_mode: bool = True
+        demo_mode: bool = True,
+        stats=None,
+        session_factory=None
     ):
         self.orchestrator = orchestrator
         self.firestore = firestore_client
         self.demo_mode = demo_mode
+        self.stats = stats  # Optional SharedCounters (cross-worker totals)
+        self.session_factory = session_factory  # Defaults to AsyncSessionLocal
         
         self.events_detected = 0
         self.events_processed = 0
@@ -166,12 +170,12 @@ class EventListenerService:
     
     async def handle_webhook(self, webhook_path: str, payload: Dict[str, Any]):
         """Handle incoming webhook from external system"""
-        self.events_detected += 1
+        self._count("events_detected")
         
         event_type = self.webhook_handlers.get(webhook_path)
         if not event_type:
             logger.warning(f"Unknown webhook path: {webhook_path}")
-            self.events_ignored += 1
+            self._count("events_ignored")
             return
         
         try:
@@ -196,17 +200,25 @@ class EventListenerService:
         try:
             logger.info(f"Triggering orchestration: {event.event_type}")
             
-            recommendation = await self.orchestrator.handle_event(event)
+            # Own session per event: concurrent webhooks must not share one
+            async with self._sessions() as session:
+                recommendation = await self.orchestrator.handle_event(event, db_session=session)
             
             if recommendation:
                 await self._store_recommendation(recommendation)
-                self.events_processed += 1
+                self._count("events_processed")
             else:
-                self.events_ignored += 1
+                self._count("events_ignored")
             
         except Exception as e:
             logger.error(f"Error triggering orchestration: {e}", exc_info=True)
     
+    def _sessions(self):
+        if self.session_factory is None:
+            from app.database import AsyncSessionLocal
+            self.session_factory = AsyncSessionLocal
+        return self.session_factory()
+    
     async def _store_recommendation(self, recommendation):
         """Store recommendation in Firestore"""
         if not self.firestore or self.demo_mode:
@@ -236,15 +248,25 @@ class EventListenerService:
         
         await self._trigger_orchestration(event)
     
-    def get_statistics(self) -> Dict[str, Any]:
-        """Get event listener statistics"""
-        return {
+    def _count(self, field: str):
+        setattr(self, field, getattr(self, field) + 1)
+        if self.stats is not None:
+            self.stats.incr(field)
+    
+    def get_statistics(self, totals: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
+        """Get event listener statistics (cluster-wide if totals are given)"""
+        counts = totals if totals is not None else {
             "events_detected": self.events_detected,
             "events_processed": self.events_processed,
-            "events_ignored": self.events_ignored,
+            "events_ignored": self.events_ignored
+        }
+        detected = counts.get("events_detected", 0)
+        processed = counts.get("events_processed", 0)
+        return {
+            "events_detected": detected,
+            "events_processed": processed,
+            "events_ignored": counts.get("events_ignored", 0),
             "active_listeners": len(self.listeners),
             "webhook_handlers": len(self.webhook_handlers),
-            "processing_rate": (
-                self.events_processed / max(self.events_detected, 1)
-            ) * 100 if self.events_detected > 0 else 0
+            "processing_rate": (processed / max(detected, 1)) * 100 if detected > 0 else 0
         }
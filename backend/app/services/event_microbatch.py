@@ -0,0 +1,201 @@
+"""
+First Contact E.I.S. - Event Micro-batching
+Coalesce bursts of related events so they are decided together
+
+When a clinic closes for the day, dozens of appointment_cancelled events for
+one provider arrive within seconds. Handled one by one, each re-queries the
+same context and may offer its slot to the client another event already
+picked. The batcher holds events with the same key for a short window (or
+until max_events arrive) and hands them to one batch handler; every caller
+still gets its own result.
+
+max_weight_assignment solves the joint decision: which freed slot goes to
+which candidate so the total score is highest, with nobody booked twice.
+"""
+
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Sequence
+import asyncio
+import logging
+import os
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# 0 = off; a burst is only batched once a window (e.g. 0.2) is configured
+CANCELLATION_BATCH_WINDOW_SECONDS = float(os.getenv("CANCELLATION_BATCH_WINDOW_SECONDS", "0"))
+CANCELLATION_BATCH_MAX_EVENTS = int(os.getenv("CANCELLATION_BATCH_MAX_EVENTS", "50"))
+
+
+def max_weight_assignment(weights: Sequence[Sequence[float]]) -> List[Optional[int]]:
+    """
+    Column assigned to each row, maximizing the total weight
+
+    Hungarian algorithm (O(rows^2 x columns), vectorized over columns).
+    Weights <= 0 mean "not allowed"; a row whose best option is not allowed
+    is left unassigned (None). Among equal totals, lower column indexes win.
+    """
+    rows = len(weights)
+    if rows == 0:
+        return []
+    matrix = np.asarray(weights, dtype=np.float64).reshape(rows, -1)
+    columns = matrix.shape[1]
+
+    # Minimize cost; one zero-cost "unassigned" column per row keeps every
+    # row assignable however few real columns there are
+    size = columns + rows
+    cost = np.zeros((rows + 1, size + 1))
+    cost[1:, 1:columns + 1] = -np.maximum(matrix, 0.0)
+
+    u = np.zeros(rows + 1)
+    v = np.zeros(size + 1)
+    owner = np.zeros(size + 1, dtype=np.int64)  # Row holding each column (0 = none)
+    way = np.zeros(size + 1, dtype=np.int64)
+
+    for row in range(1, rows + 1):
+        owner[0] = row
+        column = 0
+        min_reduced = np.full(size + 1, np.inf)
+        used = np.zeros(size + 1, dtype=bool)
+        while True:
+            used[column] = True
+            current_row = owner[column]
+            reduced = cost[current_row] - u[current_row] - v
+            free = ~used
+            better = free & (reduced < min_reduced)
+            min_reduced[better] = reduced[better]
+            way[better] = column
+            candidates = np.where(free, min_reduced, np.inf)
+            next_column = int(np.argmin(candidates))
+            delta = candidates[next_column]
+            u[owner[used]] += delta
+            v[used] -= delta
+            min_reduced[free] -= delta
+            column = next_column
+            if owner[column] == 0:
+                break
+        # Flip the augmenting path
+        while column:
+            previous = way[column]
+            owner[column] = owner[previous]
+            column = previous
+
+    assignment: List[Optional[int]] = [None] * rows
+    for column in range(1, columns + 1):
+        row = owner[column]
+        if row and matrix[row - 1, column - 1] > 0:
+            assignment[row - 1] = column - 1
+    return assignment
+
+
+class _PendingBatch:
+    def __init__(self, context: Any):
+        self.context = context
+        self.items: List[tuple] = []  # (event, future)
+        self.timer: Optional[asyncio.TimerHandle] = None
+        self.done = asyncio.Event()
+
+
+class MicroBatcher:
+    """
+    Per-key batching window in front of a batch handler
+    """
+
+    def __init__(
+        self,
+        handle_batch: Callable[[List[Any], Any], Awaitable[List[Any]]],
+        window_seconds: float = CANCELLATION_BATCH_WINDOW_SECONDS,
+        max_events: int = CANCELLATION_BATCH_MAX_EVENTS
+    ):
+        """
+        Initialize the batcher
+
+        Args:
+            handle_batch: Awaited with (events, context of the first event);
+                returns one result per event, in order
+            window_seconds: How long the first event of a batch waits for company
+            max_events: Batch size that triggers handling without waiting
+        """
+        self.handle_batch = handle_batch
+        self.window_seconds = window_seconds
+        self.max_events = max_events
+        self._pending: Dict[Hashable, _PendingBatch] = {}
+        self._running = set()
+
+        # Statistics tracking
+        self.batches = 0
+        self.batched_events = 0
+        self.largest_batch = 0
+
+    async def submit(self, key: Hashable, event: Any, context: Any = None) -> Any:
+        """
+        Add an event to its key's batch and wait for its result
+
+        `context` (e.g. a DB session) of the batch's first event is used for
+        the whole batch; that caller is kept waiting until the batch is done
+        even if cancelled, so whatever it lent stays usable.
+        """
+        loop = asyncio.get_running_loop()
+        batch = self._pending.get(key)
+        owner = batch is None
+        if owner:
+            batch = _PendingBatch(context)
+            self._pending[key] = batch
+            batch.timer = loop.call_later(self.window_seconds, self._flush, key)
+
+        future = loop.create_future()
+        batch.items.append((event, future))
+        if len(batch.items) >= self.max_events:
+            self._flush(key)
+
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            if owner:
+                await batch.done.wait()
+            raise
+
+    def _flush(self, key: Hashable):
+        batch = self._pending.pop(key, None)
+        if batch is None:
+            return
+        batch.timer.cancel()
+        task = asyncio.create_task(self._run(batch))
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+
+    async def _run(self, batch: _PendingBatch):
+        events = [event for event, _ in batch.items]
+        self.batches += 1
+        self.batched_events += len(events)
+        self.largest_batch = max(self.largest_batch, len(events))
+        try:
+            results = await self.handle_batch(events, batch.context)
+        except Exception as e:
+            logger.error(f"Batch of {len(events)} events failed: {e}", exc_info=True)
+            for _, future in batch.items:
+                if not future.done():
+                    future.set_exception(e)
+        else:
+            for (_, future), result in zip(batch.items, results):
+                if not future.done():
+                    future.set_result(result)
+        finally:
+            batch.done.set()
+
+    async def drain(self):
+        """Handle pending batches now and wait for all running ones"""
+        for key in list(self._pending):
+            self._flush(key)
+        if self._running:
+            await asyncio.gather(*self._running, return_exceptions=True)
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Get batching statistics"""
+        return {
+            "window_seconds": self.window_seconds,
+            "batches": self.batches,
+            "batched_events": self.batched_events,
+            "avg_batch_size": (self.batched_events / self.batches) if self.batches else 0.0,
+            "largest_batch": self.largest_batch
+        }
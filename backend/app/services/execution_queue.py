@@ -0,0 +1,267 @@
+"""
+First Contact E.I.S. - Execution Queue
+Durable, concurrency-limited execution of approved recommendations
+
+Approval only marks a recommendation `queued` (the orchestration_recommendations
+table is the outbox), so the web request returns immediately whatever the
+plan's duration. Workers - an asyncio pool inside each API process and/or
+dedicated processes (scripts/run_execution_worker.py) - claim queued plans
+with SELECT ... FOR UPDATE SKIP LOCKED and run up to `concurrency` at once:
+
+    queued -> executing -> completed | partial_success | failed
+
+A claim holds a lease that is renewed while the plan runs. If the process
+dies (redeploy, OOM) the lease lapses and another worker re-runs the plan,
+up to max_attempts; plans are executed at least once, so a reclaimed plan
+may repeat actions that completed before the crash.
+"""
+
+from typing import Dict, Optional, Any, Callable, Awaitable, Set
+from dataclasses import asdict
+from datetime import datetime
+import asyncio
+import logging
+import os
+import time
+
+from fastapi.encoders import jsonable_encoder
+
+from app.services.recommendation_store import recommendation_store, deserialize_plan
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONCURRENCY = int(os.getenv("EXECUTION_WORKER_CONCURRENCY", "4"))
+DEFAULT_POLL_INTERVAL = float(os.getenv("EXECUTION_POLL_INTERVAL_SECONDS", "1.0"))
+DEFAULT_LEASE_SECONDS = float(os.getenv("EXECUTION_LEASE_SECONDS", "300"))
+DEFAULT_MAX_ATTEMPTS = int(os.getenv("EXECUTION_MAX_ATTEMPTS", "3"))
+
+FINAL_STATUSES = {"success": "completed", "failed": "failed"}
+
+
+class ExecutionQueue:
+    """
+    Worker pool draining queued recommendations through the executor
+    """
+
+    def __init__(
+        self,
+        executor,
+        store=None,
+        session_factory=None,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        poll_interval_seconds: float = DEFAULT_POLL_INTERVAL,
+        lease_seconds: float = DEFAULT_LEASE_SECONDS,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+        on_status_change: Optional[Callable[[Dict[str, Any]], Awaitable[None]]] = None
+    ):
+        """
+        Initialize the queue
+
+        Args:
+            executor: ExecutionService running the plans
+            store: RecommendationStore (defaults to the process-wide store)
+            session_factory: Async session factory for per-plan DB sessions
+            concurrency: Plans run at once by this process (0 = enqueue only)
+            poll_interval_seconds: Idle wait between claim attempts
+            lease_seconds: How long a claim survives without renewal
+            max_attempts: Executions before a repeatedly reclaimed plan fails
+            on_status_change: Awaited with the record after each transition
+        """
+        self.executor = executor
+        self.store = store or recommendation_store
+        self.session_factory = session_factory
+        self.concurrency = concurrency
+        self.poll_interval_seconds = poll_interval_seconds
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.on_status_change = on_status_change
+
+        self._wakeup = asyncio.Event()
+        self._workers: Set[asyncio.Task] = set()
+        self._stopping = False
+        self.in_flight = 0
+
+        # Statistics tracking
+        self.enqueued = 0
+        self.claimed = 0
+        self.reclaimed = 0
+        self.completed = 0
+        self.failed = 0
+        self.total_execution_seconds = 0.0
+
+    def _sessions(self):
+        if self.session_factory is None:
+            from app.database import AsyncSessionLocal
+            self.session_factory = AsyncSessionLocal
+        return self.session_factory()
+
+    async def _notify(self, record: Dict[str, Any]):
+        if self.on_status_change is not None:
+            try:
+                await self.on_status_change(record)
+            except Exception as e:
+                logger.warning(f"Status change callback failed: {e}")
+
+    # ------------------------------------------------------------------------
+    # PRODUCER
+    # ------------------------------------------------------------------------
+
+    async def enqueue(self, recommendation_id: str, approved_by: str) -> Optional[Dict[str, Any]]:
+        """
+        Approve and queue a pending recommendation
+
+        Returns the queued record, or None if it was not pending approval.
+        """
+        record = await self.store.transition(
+            recommendation_id,
+            "queued",
+            from_statuses=("pending_approval",),
+            approved_by=approved_by,
+            queued_at=datetime.utcnow()
+        )
+        if record is not None:
+            self.enqueued += 1
+            self._wakeup.set()  # Local workers pick it up without waiting a poll
+            await self._notify(record)
+        return record
+
+    # ------------------------------------------------------------------------
+    # WORKERS
+    # ------------------------------------------------------------------------
+
+    def start(self):
+        """Start `concurrency` worker tasks"""
+        self._stopping = False
+        for index in range(self.concurrency - len(self._workers)):
+            task = asyncio.create_task(self._worker_loop(), name=f"execution-worker-{index}")
+            self._workers.add(task)
+            task.add_done_callback(self._workers.discard)
+        if self.concurrency:
+            logger.info(f"Execution queue started ({self.concurrency} workers)")
+
+    async def stop(self, timeout_seconds: float = 30.0):
+        """
+        Stop claiming and give running plans time to finish
+
+        Plans still running after the timeout are cancelled; their leases lapse
+        and another worker re-runs them.
+        """
+        self._stopping = True
+        self._wakeup.set()
+        if not self._workers:
+            return
+        _, pending = await asyncio.wait(set(self._workers), timeout=timeout_seconds)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+    async def _worker_loop(self):
+        while not self._stopping:
+            try:
+                record = await self.store.claim_next(self.lease_seconds)
+            except Exception as e:
+                logger.warning(f"Execution queue claim failed: {e}")
+                record = None
+
+            if record is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval_seconds)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            await self.run_claimed(record)
+
+    async def run_once(self) -> bool:
+        """Claim and run a single plan (for scripts and tests); False if idle"""
+        record = await self.store.claim_next(self.lease_seconds)
+        if record is None:
+            return False
+        await self.run_claimed(record)
+        return True
+
+    async def run_claimed(self, record: Dict[str, Any]):
+        """Execute a claimed plan and record its outcome"""
+        recommendation_id = record["recommendation_id"]
+        attempt = record["attempts"]
+        self.claimed += 1
+        if attempt > 1:
+            self.reclaimed += 1
+            logger.warning(f"Re-running recommendation {recommendation_id} (attempt {attempt})")
+
+        if attempt > self.max_attempts:
+            await self._finish(
+                recommendation_id, attempt, "failed",
+                last_error=f"Gave up after {self.max_attempts} attempts"
+            )
+            return
+
+        await self._notify(record)
+        self.in_flight += 1
+        heartbeat = asyncio.create_task(self._keep_lease(recommendation_id, attempt))
+        started = time.perf_counter()
+        try:
+            plan = deserialize_plan(record["execution_plan"])
+            async with self._sessions() as session:
+                result = await self.executor.execute_plan(plan, record["approved_by"], db_session=session)
+            await self._finish(
+                recommendation_id, attempt,
+                FINAL_STATUSES.get(result.status, "partial_success"),
+                execution_result=jsonable_encoder(asdict(result))
+            )
+        except asyncio.CancelledError:
+            # Shutdown: leave the row executing; the lease lapses and it is reclaimed
+            raise
+        except Exception as e:
+            logger.error(f"Error executing recommendation {recommendation_id}: {e}", exc_info=True)
+            await self._finish(recommendation_id, attempt, "failed", last_error=str(e) or type(e).__name__)
+        finally:
+            heartbeat.cancel()
+            self.in_flight -= 1
+            self.total_execution_seconds += time.perf_counter() - started
+
+    async def _keep_lease(self, recommendation_id: str, attempt: int):
+        """Renew the claim every third of a lease while the plan runs"""
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                if not await self.store.extend_lease(recommendation_id, attempt, self.lease_seconds):
+                    logger.warning(f"Lost lease on recommendation {recommendation_id}")
+                    return
+            except Exception as e:
+                logger.warning(f"Lease renewal failed for {recommendation_id}: {e}")
+
+    async def _finish(self, recommendation_id: str, attempt: int, status: str, **fields):
+        record = await self.store.transition(
+            recommendation_id,
+            status,
+            from_statuses=("executing",),
+            attempt=attempt,
+            completed_at=datetime.utcnow(),
+            lease_expires_at=None,
+            **fields
+        )
+        if record is None:
+            logger.warning(f"Recommendation {recommendation_id} attempt {attempt} was superseded")
+            return
+        if status == "failed":
+            self.failed += 1
+        else:
+            self.completed += 1
+        logger.info(f"Recommendation {recommendation_id} execution finished: {status}")
+        await self._notify(record)
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Get queue statistics for this process"""
+        finished = self.completed + self.failed
+        return {
+            "concurrency": self.concurrency,
+            "in_flight": self.in_flight,
+            "enqueued": self.enqueued,
+            "claimed": self.claimed,
+            "reclaimed": self.reclaimed,
+            "completed": self.completed,
+            "failed": self.failed,
+            "avg_execution_seconds": (self.total_execution_seconds / finished) if finished else 0.0
+        }
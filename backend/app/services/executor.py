@@ -57,12 +57,14 @@ class ExecutionService:
         db_session,
         notification_service,
         external_api_clients: Dict[str, Any],
-        demo_mode: bool = True
+        demo_mode: bool = True,
+        stats=None
     ):
         self.db = db_session
         self.notifications = notification_service
         self.api_clients = external_api_clients
         self.demo_mode = demo_mode
+        self.stats = stats  # Optional SharedCounters (cross-worker totals)
         
         self.executions_count = 0
         self.successful_executions = 0
@@ -72,8 +74,8 @@ class ExecutionService:
         
         logger.info(f"Execution Service initialized (demo_mode={demo_mode})")
     
-    async def execute_plan(self, execution_plan, approved_by: str) -> ExecutionResult:
-        """Execute an approved coordination plan"""
+    async def execute_plan(self, execution_plan, approved_by: str, db_session=None) -> ExecutionResult:
+        """Execute an approved coordination plan (db_session defaults to self.db)"""
         logger.info(f"Executing plan: {execution_plan.plan_id}")
         start_time = datetime.now()
         
@@ -100,17 +102,19 @@ class ExecutionService:
             
             if failed == 0:
                 status = "success"
-                self.successful_executions += 1
+                self._count("successful_executions")
             elif completed > 0:
                 status = "partial_success"
             else:
                 status = "failed"
-                self.failed_executions += 1
+                self._count("failed_executions")
             
-            self.executions_count += 1
+            self._count("executions_count")
             duration = (datetime.now() - start_time).total_seconds()
             
-            await self._log_execution(execution_plan.plan_id, approved_by, status, action_results)
+            await self._log_execution(
+                execution_plan.plan_id, approved_by, status, action_results, db_session or self.db
+            )
             
             return ExecutionResult(
                 plan_id=execution_plan.plan_id,
@@ -248,14 +252,33 @@ class ExecutionService:
         # TODO: Implement rollback logic
         return True
     
-    async def _log_execution(self, plan_id: str, approved_by: str, status: str, action_results: List[ActionResult]):
+    async def _log_execution(
+        self,
+        plan_id: str,
+        approved_by: str,
+        status: str,
+        action_results: List[ActionResult],
+        db=None
+    ):
         # TODO: Log to database for audit trail
         pass
     
-    def get_statistics(self) -> Dict[str, Any]:
+    def _count(self, field: str):
+        setattr(self, field, getattr(self, field) + 1)
+        if self.stats is not None:
+            self.stats.incr(field)
+    
+    def get_statistics(self, totals: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
+        counts = totals if totals is not None else {
+            "executions_count": self.executions_count,
+            "successful_executions": self.successful_executions,
+            "failed_executions": self.failed_executions
+        }
+        executions = counts.get("executions_count", 0)
+        successful = counts.get("successful_executions", 0)
         return {
-            "total_executions": self.executions_count,
-            "successful": self.successful_executions,
-            "failed": self.failed_executions,
-            "success_rate": (self.successful_executions / max(self.executions_count, 1)) * 100
+            "total_executions": executions,
+            "successful": successful,
+            "failed": counts.get("failed_executions", 0),
+            "success_rate": (successful / max(executions, 1)) * 100
         }
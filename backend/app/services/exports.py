@@ -0,0 +1,263 @@
+"""
+First Contact E.I.S. - Data Exports
+Streaming CSV/Parquet extracts of intakes, pairs and rollups for city BI tools
+
+Rows are read through a server-side cursor (yield_per) and written out one
+batch at a time, so memory is bounded by the batch size whatever the row
+count:
+
+    CSV      - one text chunk per batch, optionally gzip-compressed on the fly
+    Parquet  - one Arrow record batch (row group) per batch, flushed as written
+"""
+
+from typing import Dict, List, Tuple, Iterator, Iterable, Optional, Any
+from datetime import datetime, date
+import csv
+import enum
+import io
+import logging
+import uuid
+import zlib
+
+from sqlalchemy import select
+
+from app.models import (
+    Intake, Client, MutualSupportPair,
+    IntakeDailyStats, PairDailyStats
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 10000
+
+# Column name -> Arrow type name (see _arrow_type)
+Columns = List[Tuple[str, str]]
+
+
+# ============================================================================
+# DATASETS
+# ============================================================================
+
+def _intakes(organization_id: str, since: Optional[datetime]):
+    query = select(
+        Intake.id,
+        Intake.client_id,
+        Intake.location_id,
+        Intake.crisis_level,
+        Intake.mutual_support_score,
+        Intake.mutual_support_detected,
+        Intake.created_at
+    ).join(
+        Client, Client.id == Intake.client_id
+    ).where(
+        Client.organization_id == organization_id
+    ).order_by(Intake.created_at)
+    if since is not None:
+        query = query.where(Intake.created_at >= since)
+    return query
+
+
+def _pairs(organization_id: str, since: Optional[datetime]):
+    query = select(
+        MutualSupportPair.id,
+        MutualSupportPair.client_a_id,
+        MutualSupportPair.client_b_id,
+        MutualSupportPair.confidence_score,
+        MutualSupportPair.ihss_eligible,
+        MutualSupportPair.cost_savings_estimate,
+        MutualSupportPair.status,
+        MutualSupportPair.created_at
+    ).where(
+        MutualSupportPair.organization_id == organization_id
+    ).order_by(MutualSupportPair.created_at)
+    if since is not None:
+        query = query.where(MutualSupportPair.created_at >= since)
+    return query
+
+
+def _intake_rollups(organization_id: str, since: Optional[datetime]):
+    query = select(
+        IntakeDailyStats.day,
+        IntakeDailyStats.location_id,
+        IntakeDailyStats.intake_count
+    ).where(
+        IntakeDailyStats.organization_id == organization_id
+    ).order_by(IntakeDailyStats.day, IntakeDailyStats.location_id)
+    if since is not None:
+        query = query.where(IntakeDailyStats.day >= since.date())
+    return query
+
+
+def _pair_rollups(organization_id: str, since: Optional[datetime]):
+    query = select(
+        PairDailyStats.day,
+        PairDailyStats.pair_count,
+        PairDailyStats.ihss_eligible_count,
+        PairDailyStats.cost_savings_total
+    ).where(
+        PairDailyStats.organization_id == organization_id
+    ).order_by(PairDailyStats.day)
+    if since is not None:
+        query = query.where(PairDailyStats.day >= since.date())
+    return query
+
+
+EXPORT_DATASETS: Dict[str, Tuple[Any, Columns]] = {
+    "intakes": (_intakes, [
+        ("id", "string"),
+        ("client_id", "string"),
+        ("location_id", "string"),
+        ("crisis_level", "string"),
+        ("mutual_support_score", "float64"),
+        ("mutual_support_detected", "bool"),
+        ("created_at", "timestamp")
+    ]),
+    "pairs": (_pairs, [
+        ("id", "string"),
+        ("client_a_id", "string"),
+        ("client_b_id", "string"),
+        ("confidence_score", "float64"),
+        ("ihss_eligible", "bool"),
+        ("cost_savings_estimate", "float64"),
+        ("status", "string"),
+        ("created_at", "timestamp")
+    ]),
+    "intake_rollups": (_intake_rollups, [
+        ("day", "date"),
+        ("location_id", "string"),
+        ("intake_count", "int64")
+    ]),
+    "pair_rollups": (_pair_rollups, [
+        ("day", "date"),
+        ("pair_count", "int64"),
+        ("ihss_eligible_count", "int64"),
+        ("cost_savings_total", "float64")
+    ]),
+}
+
+
+def export_query(dataset: str, organization_id: str, since: Optional[datetime] = None):
+    """Select statement and column spec for a dataset"""
+    build, columns = EXPORT_DATASETS[dataset]
+    return build(organization_id, since), columns
+
+
+def iter_batches(db, query, batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[list]:
+    """Rows in batches from a server-side cursor"""
+    result = db.execute(query.execution_options(yield_per=batch_size))
+    try:
+        for partition in result.partitions():
+            yield partition
+    finally:
+        result.close()
+
+
+# ============================================================================
+# WRITERS
+# ============================================================================
+
+def _plain(value):
+    """DB value -> value both writers understand"""
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if isinstance(value, enum.Enum):
+        return value.value
+    return value
+
+
+def iter_csv(batches: Iterable[list], columns: Columns) -> Iterator[bytes]:
+    """CSV with a header row, one chunk per batch"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([name for name, _ in columns])
+    for batch in batches:
+        writer.writerows([_plain(value) for value in row] for row in batch)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands written bytes back to the generator"""
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+        self.position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        chunk = bytes(data)
+        self.chunks.append(chunk)
+        self.position += len(chunk)
+        return len(chunk)
+
+    def tell(self) -> int:
+        return self.position
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def parquet_available() -> bool:
+    """True if the Parquet writer (pyarrow) can be loaded"""
+    try:
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _arrow_type(name: str):
+    import pyarrow as pa
+    return {
+        "string": pa.string(),
+        "float64": pa.float64(),
+        "int64": pa.int64(),
+        "bool": pa.bool_(),
+        "timestamp": pa.timestamp("us"),
+        "date": pa.date32()
+    }[name]
+
+
+def iter_parquet(batches: Iterable[list], columns: Columns) -> Iterator[bytes]:
+    """Parquet file written one Arrow record batch (row group) at a time"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([(name, _arrow_type(type_name)) for name, type_name in columns])
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression="snappy")
+    try:
+        for batch in batches:
+            arrays = [
+                pa.array([_plain(row[index]) for row in batch], type=field.type)
+                for index, field in enumerate(schema)
+            ]
+            writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=schema))
+            data = sink.drain()
+            if data:
+                yield data
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def gzip_stream(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    """Gzip-compress a byte stream incrementally"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def export_filename(dataset: str, file_format: str) -> str:
+    """Download name, e.g. intakes-20250101.csv"""
+    return f"{dataset}-{date.today():%Y%m%d}.{file_format}"
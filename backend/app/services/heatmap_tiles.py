@@ -0,0 +1,267 @@
+"""
+First Contact E.I.S. - Heatmap Tile Pyramid
+Pre-aggregated intake/pair counts per web-mercator tile for the city map
+
+Every location is projected to slippy-map tile coordinates (the same z/x/y
+scheme as the basemap) at zooms 8-16. Each intake or detected pair upserts
+one row per zoom for its (organization, tile, day), so a map tile request is
+a primary-key range scan over a handful of pre-summed cells instead of an
+aggregate over raw intakes.
+
+A tile request at zoom z returns the counts of its sub-cells at zoom
+z + DETAIL_LEVELS (capped at MAX_ZOOM), i.e. up to an 8x8 grid per tile.
+"""
+
+from typing import Optional, Tuple, Dict, Any
+from datetime import datetime, date, timedelta
+import logging
+import math
+
+from sqlalchemy import func, select, delete, and_, cast, Date
+from sqlalchemy.dialects.postgresql import insert
+
+from app.models import Intake, Location, MutualSupportPair, HeatmapTile
+
+logger = logging.getLogger(__name__)
+
+MIN_ZOOM = 8
+MAX_ZOOM = 16
+DETAIL_LEVELS = 3
+
+# Web mercator is undefined at the poles
+MAX_LATITUDE = 85.05112878
+
+
+# ============================================================================
+# TILE MATH
+# ============================================================================
+
+def tile_for(latitude: float, longitude: float, zoom: int = MAX_ZOOM) -> Tuple[int, int]:
+    """Slippy-map (x, y) of the tile containing a point"""
+    latitude = max(min(latitude, MAX_LATITUDE), -MAX_LATITUDE)
+    n = 1 << zoom
+    lat_rad = math.radians(latitude)
+    x = int((longitude + 180.0) / 360.0 * n)
+    y = int((1.0 - math.asinh(math.tan(lat_rad)) / math.pi) / 2.0 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def tile_pyramid(latitude: float, longitude: float) -> Dict[int, Tuple[int, int]]:
+    """Tile of a point at every stored zoom (parents derived by bit shifts)"""
+    x, y = tile_for(latitude, longitude, MAX_ZOOM)
+    return {zoom: (x >> (MAX_ZOOM - zoom), y >> (MAX_ZOOM - zoom)) for zoom in range(MIN_ZOOM, MAX_ZOOM + 1)}
+
+
+def is_valid_tile(z: int, x: int, y: int) -> bool:
+    """Tile exists and is inside the stored pyramid"""
+    return MIN_ZOOM <= z <= MAX_ZOOM and 0 <= x < (1 << z) and 0 <= y < (1 << z)
+
+
+# ============================================================================
+# WRITE PATH (called inside the intake transaction)
+# ============================================================================
+
+def heatmap_tile_upsert(
+    organization_id,
+    latitude: Optional[float],
+    longitude: Optional[float],
+    created_at: datetime,
+    intakes: int = 0,
+    pairs: int = 0
+):
+    """
+    Statement adding counts to a point's tiles at every zoom
+
+    Returns None for locations without coordinates.
+    """
+    if latitude is None or longitude is None:
+        return None
+
+    now = datetime.utcnow()
+    day = created_at.date()
+    rows = [
+        {
+            "organization_id": organization_id,
+            "zoom": zoom,
+            "tile_x": x,
+            "tile_y": y,
+            "day": day,
+            "intake_count": intakes,
+            "pair_count": pairs,
+            "updated_at": now
+        }
+        for zoom, (x, y) in tile_pyramid(latitude, longitude).items()
+    ]
+    stmt = insert(HeatmapTile).values(rows)
+    return stmt.on_conflict_do_update(
+        index_elements=[
+            HeatmapTile.organization_id,
+            HeatmapTile.zoom,
+            HeatmapTile.tile_x,
+            HeatmapTile.tile_y,
+            HeatmapTile.day
+        ],
+        set_={
+            "intake_count": HeatmapTile.intake_count + stmt.excluded.intake_count,
+            "pair_count": HeatmapTile.pair_count + stmt.excluded.pair_count,
+            "updated_at": stmt.excluded.updated_at
+        }
+    )
+
+
+# ============================================================================
+# READ PATH
+# ============================================================================
+
+def tile_cells_query(organization_id: str, z: int, x: int, y: int, cutoff_day: date):
+    """Sub-cell counts for one tile, summed over days >= cutoff_day"""
+    cell_zoom = min(z + DETAIL_LEVELS, MAX_ZOOM)
+    shift = cell_zoom - z
+    min_x, min_y = x << shift, y << shift
+    max_x, max_y = min_x + (1 << shift) - 1, min_y + (1 << shift) - 1
+
+    return select(
+        HeatmapTile.tile_x,
+        HeatmapTile.tile_y,
+        func.sum(HeatmapTile.intake_count).label('intake_count'),
+        func.sum(HeatmapTile.pair_count).label('pair_count')
+    ).where(
+        and_(
+            HeatmapTile.organization_id == organization_id,
+            HeatmapTile.zoom == cell_zoom,
+            HeatmapTile.tile_x.between(min_x, max_x),
+            HeatmapTile.tile_y.between(min_y, max_y),
+            HeatmapTile.day >= cutoff_day
+        )
+    ).group_by(
+        HeatmapTile.tile_x,
+        HeatmapTile.tile_y
+    ).order_by(
+        HeatmapTile.tile_y,
+        HeatmapTile.tile_x
+    )
+
+
+def pack_tile(z: int, x: int, y: int, days: int, rows) -> Dict[str, Any]:
+    """
+    Compact columnar tile payload
+
+    Cell coordinates are offsets inside the requested tile at `cell_zoom`.
+    """
+    cell_zoom = min(z + DETAIL_LEVELS, MAX_ZOOM)
+    shift = cell_zoom - z
+    cells_x, cells_y, intakes, pairs = [], [], [], []
+    for row in rows:
+        cells_x.append(row.tile_x - (x << shift))
+        cells_y.append(row.tile_y - (y << shift))
+        intakes.append(int(row.intake_count))
+        pairs.append(int(row.pair_count))
+
+    return {
+        "z": z,
+        "x": x,
+        "y": y,
+        "cell_zoom": cell_zoom,
+        "period_days": days,
+        "cell_x": cells_x,
+        "cell_y": cells_y,
+        "intake_counts": intakes,
+        "pair_counts": pairs
+    }
+
+
+# ============================================================================
+# BACKFILL / REPAIR
+# ============================================================================
+
+def rebuild_heatmap_tiles(
+    db,
+    start_day: date,
+    end_day: date,
+    organization_id: Optional[str] = None
+):
+    """
+    Recompute tiles for [start_day, end_day] from raw intakes and pairs
+
+    Counts are aggregated per (location, day) in SQL and fanned out to the
+    pyramid here; pairs are placed at the location of the intake that
+    detected them (client A's latest intake at detection time).
+    """
+    range_start = datetime.combine(start_day, datetime.min.time())
+    range_end = datetime.combine(end_day + timedelta(days=1), datetime.min.time())
+
+    scope = and_(HeatmapTile.day >= start_day, HeatmapTile.day <= end_day)
+    if organization_id is not None:
+        scope = and_(scope, HeatmapTile.organization_id == organization_id)
+    db.execute(delete(HeatmapTile).where(scope))
+
+    coordinates = {
+        row.id: (row.organization_id, row.latitude, row.longitude)
+        for row in db.execute(
+            select(Location.id, Location.organization_id, Location.latitude, Location.longitude).where(
+                and_(Location.latitude.isnot(None), Location.longitude.isnot(None))
+            )
+        )
+    }
+
+    intake_day = cast(Intake.created_at, Date)
+    intake_rows = select(
+        Intake.location_id,
+        intake_day.label('day'),
+        func.count(Intake.id).label('count')
+    ).where(
+        and_(Intake.created_at >= range_start, Intake.created_at < range_end)
+    ).group_by(Intake.location_id, intake_day)
+
+    detecting_location = select(Intake.location_id).where(
+        and_(
+            Intake.client_id == MutualSupportPair.client_a_id,
+            Intake.created_at <= MutualSupportPair.created_at
+        )
+    ).order_by(Intake.created_at.desc()).limit(1).scalar_subquery()
+    pair_day = cast(MutualSupportPair.created_at, Date)
+    pair_rows = select(
+        detecting_location.label('location_id'),
+        pair_day.label('day'),
+        func.count(MutualSupportPair.id).label('count')
+    ).where(
+        and_(MutualSupportPair.created_at >= range_start, MutualSupportPair.created_at < range_end)
+    ).group_by(detecting_location, pair_day)
+
+    if organization_id is not None:
+        intake_rows = intake_rows.join(Location, Location.id == Intake.location_id).where(
+            Location.organization_id == organization_id
+        )
+        pair_rows = pair_rows.where(MutualSupportPair.organization_id == organization_id)
+
+    tiles: Dict[tuple, list] = {}
+    for column, rows in ((0, db.execute(intake_rows)), (1, db.execute(pair_rows))):
+        for row in rows:
+            location = coordinates.get(row.location_id)
+            if location is None:
+                continue
+            org, latitude, longitude = location
+            for zoom, (x, y) in tile_pyramid(latitude, longitude).items():
+                counts = tiles.setdefault((org, zoom, x, y, row.day), [0, 0])
+                counts[column] += row.count
+
+    now = datetime.utcnow()
+    rows = [
+        {
+            "organization_id": org,
+            "zoom": zoom,
+            "tile_x": x,
+            "tile_y": y,
+            "day": day,
+            "intake_count": intake_count,
+            "pair_count": pair_count,
+            "updated_at": now
+        }
+        for (org, zoom, x, y, day), (intake_count, pair_count) in tiles.items()
+    ]
+    batch_size = 5000
+    for start in range(0, len(rows), batch_size):
+        db.execute(insert(HeatmapTile).values(rows[start:start + batch_size]))
+    db.commit()
+
+    logger.info(f"Rebuilt {len(rows)} heatmap tiles for {start_day} - {end_day}")
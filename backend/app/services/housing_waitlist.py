@@ -0,0 +1,396 @@
+"""
+First Contact E.I.S. - Housing Waitlist Index
+Best eligible waitlisted client for an opening unit without scanning the list
+
+Clients are bucketed by bedrooms needed and by their set of accessibility
+requirements; a unit is open to the buckets with its bedroom count whose
+requirements it meets. Inside a bucket, clients with a location preference
+are registered in every grid cell their preferred area overlaps (clients
+happy to live anywhere share one cell), so a unit only looks at its own cell.
+
+The index is per worker. The waitlist itself lives in a Redis hash
+(WaitlistStore) that every worker loads at startup; changes are written
+there and broadcast to the other workers (see app.services.worker_sync).
+
+Priority is days on waitlist x urgency. Between two clients with the same
+urgency the earlier joiner always ranks higher, so each (bucket, cell,
+urgency) keeps a heap ordered by join time and a match compares the heap
+tops - one per urgency level (urgency is kept to one decimal). Joining and
+leaving are O(log n); leaving is lazy, stale heap entries are dropped when
+they surface and the heaps are rebuilt if they pile up.
+"""
+
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Tuple
+from dataclasses import dataclass, field
+from datetime import datetime
+import heapq
+import json
+import logging
+import math
+
+logger = logging.getLogger(__name__)
+
+# ~5.5 km north-south; small enough that most units share a cell with few
+# out-of-area clients
+GRID_CELL_DEGREES = 0.05
+KM_PER_DEGREE = 111.32
+
+# Preferred areas spanning more cells than this are treated as "anywhere"
+# and distance-checked at match time
+MAX_CELLS_PER_CLIENT = 400
+
+ANYWHERE = None
+SECONDS_PER_DAY = 86400.0
+
+WAITLIST_KEY = "housing_waitlist:entries"  # Redis hash: client_id -> entry JSON
+
+
+@dataclass
+class WaitlistEntry:
+    """A client waiting for housing and what they need"""
+    client_id: str
+    bedrooms: int
+    urgency: float  # 0-10, like appointment urgency_score
+    joined_at: datetime
+    accessibility: FrozenSet[str] = frozenset()  # e.g. {"wheelchair", "ground_floor"}
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+    radius_km: Optional[float] = None  # None = anywhere
+
+    def has_location_preference(self) -> bool:
+        return self.latitude is not None and self.longitude is not None and self.radius_km is not None
+
+
+@dataclass
+class HousingUnit:
+    """A unit that just became available"""
+    unit_id: str
+    bedrooms: int
+    accessibility: FrozenSet[str] = frozenset()
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+
+
+@dataclass
+class WaitlistMatch:
+    """Best eligible client for a unit"""
+    entry: WaitlistEntry
+    priority: float
+    days_waiting: float
+    distance_km: Optional[float] = None
+
+
+@dataclass
+class _Registration:
+    entry: WaitlistEntry
+    seq: int
+    heaps: List[list] = field(default_factory=list)
+
+
+def distance_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance"""
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * 6371.0 * math.asin(min(1.0, math.sqrt(a)))
+
+
+def grid_cell(latitude: float, longitude: float) -> Tuple[int, int]:
+    return math.floor(latitude / GRID_CELL_DEGREES), math.floor(longitude / GRID_CELL_DEGREES)
+
+
+def preference_cells(entry: WaitlistEntry) -> List[Optional[Tuple[int, int]]]:
+    """Grid cells overlapping a client's preferred area ([ANYWHERE] if none)"""
+    if not entry.has_location_preference():
+        return [ANYWHERE]
+    lat_span = entry.radius_km / KM_PER_DEGREE
+    lon_span = entry.radius_km / (KM_PER_DEGREE * max(math.cos(math.radians(entry.latitude)), 0.01))
+    low = grid_cell(entry.latitude - lat_span, entry.longitude - lon_span)
+    high = grid_cell(entry.latitude + lat_span, entry.longitude + lon_span)
+    if (high[0] - low[0] + 1) * (high[1] - low[1] + 1) > MAX_CELLS_PER_CLIENT:
+        return [ANYWHERE]
+    return [(row, col) for row in range(low[0], high[0] + 1) for col in range(low[1], high[1] + 1)]
+
+
+def entry_from_metadata(client_id: str, data: Dict[str, Any]) -> WaitlistEntry:
+    """
+    Waitlist entry from event metadata
+
+    Raises:
+        ValueError: bedrooms or urgency missing or not numeric
+    """
+    joined_at = data.get("joined_at") or datetime.now()
+    if isinstance(joined_at, str):
+        joined_at = datetime.fromisoformat(joined_at)
+    try:
+        return WaitlistEntry(
+            client_id=client_id,
+            bedrooms=int(data["bedrooms"]),
+            urgency=float(data.get("urgency_score", 0)),
+            joined_at=joined_at,
+            accessibility=frozenset(data.get("accessibility_requirements") or ()),
+            latitude=data.get("latitude"),
+            longitude=data.get("longitude"),
+            radius_km=data.get("radius_km")
+        )
+    except (KeyError, TypeError, ValueError) as e:
+        raise ValueError(f"Invalid waitlist entry for {client_id}: {e}")
+
+
+def entry_to_metadata(entry: WaitlistEntry) -> Dict[str, Any]:
+    """JSON-compatible form of an entry (inverse of entry_from_metadata)"""
+    return {
+        "bedrooms": entry.bedrooms,
+        "urgency_score": entry.urgency,
+        "joined_at": entry.joined_at.isoformat(),
+        "accessibility_requirements": sorted(entry.accessibility),
+        "latitude": entry.latitude,
+        "longitude": entry.longitude,
+        "radius_km": entry.radius_km
+    }
+
+
+def unit_from_metadata(data: Dict[str, Any]) -> HousingUnit:
+    """
+    Housing unit from a housing_available event
+
+    Raises:
+        ValueError: unit_id or bedrooms missing or not numeric
+    """
+    try:
+        return HousingUnit(
+            unit_id=str(data["unit_id"]),
+            bedrooms=int(data["bedrooms"]),
+            accessibility=frozenset(data.get("accessibility_features") or ()),
+            latitude=data.get("latitude"),
+            longitude=data.get("longitude")
+        )
+    except (KeyError, TypeError, ValueError) as e:
+        raise ValueError(f"Invalid housing unit: {e}")
+
+
+class HousingWaitlist:
+    """
+    In-memory waitlist index (one per worker, fed by waitlist events)
+    """
+
+    def __init__(self):
+        # bedrooms -> accessibility requirements -> cell -> urgency -> heap of (joined_at, seq, client_id)
+        self._buckets: Dict[int, Dict[FrozenSet[str], Dict[Any, Dict[float, list]]]] = {}
+        self._clients: Dict[str, _Registration] = {}
+        self._seq = 0
+        self._live_heap_entries = 0
+        self._heap_entries = 0
+
+        # Statistics tracking
+        self.matches = 0
+        self.misses = 0
+        self.rebuilds = 0
+
+    def __len__(self) -> int:
+        return len(self._clients)
+
+    def __contains__(self, client_id: str) -> bool:
+        return client_id in self._clients
+
+    # ------------------------------------------------------------------------
+    # UPDATES
+    # ------------------------------------------------------------------------
+
+    def add(self, entry: WaitlistEntry):
+        """Add a client, replacing their previous entry if any"""
+        self.remove(entry.client_id)
+        self._seq += 1
+        registration = _Registration(entry, self._seq)
+        self._register(registration)
+        self._clients[entry.client_id] = registration
+
+    def load(self, entries: Iterable[WaitlistEntry]):
+        """Add many clients at once (e.g. at startup)"""
+        for entry in entries:
+            self.add(entry)
+
+    def remove(self, client_id: str) -> bool:
+        """Take a client off the waitlist; False if they were not on it"""
+        registration = self._clients.pop(client_id, None)
+        if registration is None:
+            return False
+        self._live_heap_entries -= len(registration.heaps)
+        if self._heap_entries > 2 * self._live_heap_entries + 1024:
+            self._rebuild()
+        return True
+
+    def _register(self, registration: _Registration):
+        entry = registration.entry
+        cells = self._buckets.setdefault(entry.bedrooms, {}).setdefault(entry.accessibility, {})
+        item = (entry.joined_at, registration.seq, entry.client_id)
+        for cell in preference_cells(entry):
+            heap = cells.setdefault(cell, {}).setdefault(round(entry.urgency, 1), [])
+            heapq.heappush(heap, item)
+            registration.heaps.append(heap)
+        self._live_heap_entries += len(registration.heaps)
+        self._heap_entries += len(registration.heaps)
+
+    def _rebuild(self):
+        """Drop stale heap entries left behind by removals"""
+        self._buckets = {}
+        self._live_heap_entries = self._heap_entries = 0
+        for registration in self._clients.values():
+            registration.heaps = []
+            self._register(registration)
+        self.rebuilds += 1
+
+    def _is_current(self, item) -> bool:
+        registration = self._clients.get(item[2])
+        return registration is not None and registration.seq == item[1]
+
+    # ------------------------------------------------------------------------
+    # MATCHING
+    # ------------------------------------------------------------------------
+
+    def best_match(
+        self,
+        unit: HousingUnit,
+        now: Optional[datetime] = None,
+        exclude: Iterable[str] = ()
+    ) -> Optional[WaitlistMatch]:
+        """
+        Highest-priority client the unit suits, or None
+
+        Eligible: needs exactly the unit's bedrooms, every accessibility
+        requirement is met, and the unit is inside their preferred area.
+        Ties go to the earlier joiner. The client stays on the waitlist.
+        """
+        now = now or datetime.now()
+        exclude = set(exclude)
+        unit_cell = grid_cell(unit.latitude, unit.longitude) if self._has_location(unit) else ANYWHERE
+        cells_to_search = [ANYWHERE] if unit_cell is ANYWHERE else [ANYWHERE, unit_cell]
+
+        best = None
+        best_key = None
+        for requirements, cells in self._buckets.get(unit.bedrooms, {}).items():
+            if not requirements <= unit.accessibility:
+                continue
+            for cell in cells_to_search:
+                for heap in cells.get(cell, {}).values():
+                    found = self._first_eligible(heap, unit, exclude)
+                    if found is None:
+                        continue
+                    entry, distance = found
+                    days = max((now - entry.joined_at).total_seconds(), 0.0) / SECONDS_PER_DAY
+                    priority = days * round(entry.urgency, 1)
+                    key = (-priority, entry.joined_at, self._clients[entry.client_id].seq)
+                    if best_key is None or key < best_key:
+                        best_key = key
+                        best = WaitlistMatch(entry, priority, days, distance)
+
+        if best is None:
+            self.misses += 1
+        else:
+            self.matches += 1
+        return best
+
+    def pop_best(self, unit: HousingUnit, now: Optional[datetime] = None) -> Optional[WaitlistMatch]:
+        """best_match, and take the matched client off the waitlist"""
+        match = self.best_match(unit, now)
+        if match is not None:
+            self.remove(match.entry.client_id)
+        return match
+
+    def _first_eligible(self, heap: list, unit: HousingUnit, exclude) -> Optional[Tuple[WaitlistEntry, Optional[float]]]:
+        """
+        Earliest joiner in a heap who accepts the unit's location
+
+        Stale entries are discarded; entries skipped for location or
+        exclusion (few: only clients whose area just clips this cell) are
+        pushed back afterwards.
+        """
+        skipped = []
+        found = None
+        while heap:
+            item = heap[0]
+            if not self._is_current(item):
+                heapq.heappop(heap)
+                self._heap_entries -= 1
+                continue
+            entry = self._clients[item[2]].entry
+            distance = None
+            if entry.has_location_preference() and self._has_location(unit):
+                distance = distance_km(entry.latitude, entry.longitude, unit.latitude, unit.longitude)
+            eligible = entry.client_id not in exclude and (
+                not entry.has_location_preference() or (distance is not None and distance <= entry.radius_km)
+            )
+            if eligible:
+                found = (entry, distance)
+                break
+            skipped.append(heapq.heappop(heap))
+        for item in skipped:
+            heapq.heappush(heap, item)
+        return found
+
+    @staticmethod
+    def _has_location(unit: HousingUnit) -> bool:
+        return unit.latitude is not None and unit.longitude is not None
+
+    def scan_best_match(self, unit: HousingUnit, now: Optional[datetime] = None) -> Optional[WaitlistMatch]:
+        """Reference matcher: check every client (tests and benchmarks)"""
+        now = now or datetime.now()
+        best, best_key = None, None
+        for registration in self._clients.values():
+            entry = registration.entry
+            if entry.bedrooms != unit.bedrooms or not entry.accessibility <= unit.accessibility:
+                continue
+            distance = None
+            if entry.has_location_preference():
+                if not self._has_location(unit):
+                    continue
+                distance = distance_km(entry.latitude, entry.longitude, unit.latitude, unit.longitude)
+                if distance > entry.radius_km:
+                    continue
+            days = max((now - entry.joined_at).total_seconds(), 0.0) / SECONDS_PER_DAY
+            priority = days * round(entry.urgency, 1)
+            key = (-priority, entry.joined_at, registration.seq)
+            if best_key is None or key < best_key:
+                best_key, best = key, WaitlistMatch(entry, priority, days, distance)
+        return best
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Get waitlist statistics"""
+        return {
+            "clients": len(self._clients),
+            "heap_entries": self._heap_entries,
+            "matches": self.matches,
+            "misses": self.misses,
+            "rebuilds": self.rebuilds
+        }
+
+
+class WaitlistStore:
+    """
+    Shared copy of the waitlist that worker indexes are loaded from
+    """
+
+    def __init__(self, redis_client=None, key: str = WAITLIST_KEY):
+        self.redis = redis_client
+        self.key = key
+
+    def _client(self):
+        if self.redis is None:
+            from app.redis_client import get_redis
+            self.redis = get_redis()
+        return self.redis
+
+    async def load(self) -> List[WaitlistEntry]:
+        """Every waitlisted client (invalid records are skipped)"""
+        entries = []
+        for client_id, raw in (await self._client().hgetall(self.key)).items():
+            try:
+                entries.append(entry_from_metadata(client_id, json.loads(raw)))
+            except ValueError as e:
+                logger.warning(f"Skipping stored waitlist entry: {e}")
+        return entries
+
+    async def save(self, entry: WaitlistEntry):
+        await self._client().hset(self.key, entry.client_id, json.dumps(entry_to_metadata(entry)))
+
+    async def delete(self, client_id: str):
+        await self._client().hdel(self.key, client_id)
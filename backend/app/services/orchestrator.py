@@ -14,13 +14,56 @@ Author: Claude (CTO, EINHARJER INNOVATIVE SOLUTIONS LLC)
 Date: November 6, 2025
 """
 
-from typing import Dict, List, Optional, Any
+from typing import Dict, Iterable, List, Optional, Any
 from datetime import datetime, timedelta
-from dataclasses import dataclass
+from dataclasses import dataclass, field, replace
+import asyncio
+import bisect
 import logging
+import os
+import time
+import uuid
+
+import numpy as np
+
+from app.services.context_cache import (
+    ContextCache,
+    PROVIDER_CAPACITY_TTL_SECONDS,
+    SYSTEM_STATE_TTL_SECONDS,
+    SYSTEM_STATE_KEY,
+    provider_capacity_key,
+)
+from app.services.housing_waitlist import (
+    HousingWaitlist,
+    WaitlistEntry,
+    entry_from_metadata,
+    entry_to_metadata,
+    unit_from_metadata,
+)
+from app.services.schedule_index import ScheduleIndex
+from app.services.route_index import RouteIndex, NETWORK_PARTS
+from app.services.event_microbatch import MicroBatcher, max_weight_assignment, CANCELLATION_BATCH_MAX_EVENTS
 
 logger = logging.getLogger(__name__)
 
+# Per-source budget for context queries; a slow source is dropped, not waited on
+CONTEXT_SOURCE_TIMEOUT_SECONDS = float(os.getenv("CONTEXT_SOURCE_TIMEOUT_SECONDS", "2.0"))
+
+# Minimum score for an appointment replacement, and how many top-ranked
+# candidates get the expensive transport/conflict checks per round
+APPOINTMENT_SCORE_THRESHOLD = 0.7
+RANKING_CHUNK_SIZE = 32
+
+# A replacement appointment occupies the client from pickup to the end of
+# the visit
+APPOINTMENT_DURATION_MINUTES = 60
+TRANSPORT_LEAD_MINUTES = 30
+
+# WorkerSync topics
+WAITLIST_TOPIC = "housing_waitlist"
+CONTEXT_INVALIDATION_TOPIC = "context_invalidation"
+ROUTE_NETWORK_TOPIC = "route_network"
+
 
 # ============================================================================
 # DATA STRUCTURES
@@ -46,6 +89,22 @@ class Context:
     system_state: Dict[str, Any]
     historical_patterns: List[Dict[str, Any]]
     business_rules: Dict[str, Any]
+    schedule_index: Optional[ScheduleIndex] = None  # Built from related clients' "bookings"
+    missing_sources: List[str] = field(default_factory=list)  # Timed out or failed; empty default used
+    partial_sources: List[str] = field(default_factory=list)  # Returned, but flagged incomplete
+    source_latency_ms: Dict[str, float] = field(default_factory=dict)
+    
+    def is_complete(self, *sources: str) -> bool:
+        """True if the given sources (all sources if none given) came back in full"""
+        degraded = set(self.missing_sources) | set(self.partial_sources)
+        return not degraded if not sources else degraded.isdisjoint(sources)
+
+
+@dataclass
+class PartialResult:
+    """Returned by a context source that could only fetch part of its data"""
+    value: Any
+    reason: str = ""
 
 
 @dataclass
@@ -90,21 +149,73 @@ class OrchestrationEngine:
     The orchestrator sees the entire ecosystem and makes optimal decisions.
     """
     
-    def __init__(self, db_session, ai_service=None):
+    def __init__(
+        self,
+        db_session=None,
+        ai_service=None,
+        stats=None,
+        context_cache=None,
+        housing_waitlist=None,
+        cancellation_batch_window_seconds: float = 0.0,
+        waitlist_store=None,
+        worker_sync=None,
+        session_factory=None,
+        route_store=None
+    ):
         """
         Initialize the orchestrator
         
         Args:
-            db_session: Database session for querying context
+            db_session: Default database session for querying context
+                (process-lifetime engines get one per call via handle_event)
             ai_service: Optional AI service for complex cases (Vertex AI Claude)
+            stats: Optional SharedCounters aggregating statistics across workers
+            context_cache: ContextCache for provider capacity and system state
+                (one per engine, i.e. per worker, if omitted)
+            housing_waitlist: HousingWaitlist index matched against housing_available
+                events (kept current by client_update events)
+            cancellation_batch_window_seconds: Hold appointment_cancelled events
+                this long to decide same-provider bursts jointly (0 = off)
+            waitlist_store: WaitlistStore the waitlist index is loaded from and
+                changes are persisted to (index-only if omitted)
+            worker_sync: WorkerSync sharing state changes with the other
+                workers (single-worker if omitted)
+            session_factory: Opens a database session per context source
+                (sources share the call's session if omitted)
+            route_store: RouteStore the route network is loaded from and
+                changes are persisted to (this process's events only if omitted)
         """
         self.db = db_session
         self.ai = ai_service
+        self.stats = stats
+        self.context_cache = context_cache or ContextCache()
+        self.housing_waitlist = housing_waitlist if housing_waitlist is not None else HousingWaitlist()
+        self.waitlist_store = waitlist_store
+        self.worker_sync = worker_sync
+        self.session_factory = session_factory
+        self.route_store = route_store
+        if worker_sync is not None:
+            worker_sync.on(WAITLIST_TOPIC, self._on_waitlist_change)
+            worker_sync.on(CONTEXT_INVALIDATION_TOPIC, self._on_context_invalidation)
+            worker_sync.on(ROUTE_NETWORK_TOPIC, self._on_route_network_change)
+        self.route_network: Dict[str, Any] = {"routes": [], "provider_locations": {}}
+        self.route_index: Optional[RouteIndex] = None  # Built from route_network in the background
+        self._route_rebuild: Optional[asyncio.Task] = None
+        self._route_rebuild_pending = False
+        self.cancellation_batcher = MicroBatcher(
+            self.handle_cancellation_batch,
+            window_seconds=cancellation_batch_window_seconds,
+            max_events=CANCELLATION_BATCH_MAX_EVENTS
+        ) if cancellation_batch_window_seconds > 0 else None
+        self.source_timeouts: Dict[str, float] = {}  # Per-source overrides of CONTEXT_SOURCE_TIMEOUT_SECONDS
         
         # Statistics tracking
         self.decisions_made = 0
         self.ai_decisions = 0  # Should be ~5%
         self.rule_decisions = 0  # Should be ~95%
+        self.context_timeouts = 0
+        self.context_errors = 0
+        self.source_latency: Dict[str, List[float]] = {}  # source -> [calls, total_ms, max_ms]
         
         logger.info("Orchestration Engine initialized")
     
@@ -113,7 +224,7 @@ class OrchestrationEngine:
     # MAIN ORCHESTRATION FLOW
     # ------------------------------------------------------------------------
     
-    async def handle_event(self, event: Event) -> Optional[Recommendation]:
+    async def handle_event(self, event: Event, db_session=None) -> Optional[Recommendation]:
         """
         Main entry point - handle an event and return recommendation
         
@@ -126,6 +237,7 @@ class OrchestrationEngine:
         
         Args:
             event: The event that triggered orchestration
+            db_session: Database session for this call (defaults to self.db)
             
         Returns:
             Recommendation for caseworker approval, or None if no action needed
@@ -133,13 +245,22 @@ class OrchestrationEngine:
         logger.info(f"Orchestrator handling event: {event.event_type} ({event.event_id})")
         
         try:
+            await self._invalidate_cached_context(event)
+            await self._update_housing_waitlist(event)
+            await self._update_transport_routes(event)
+            
             # STEP 1: SENSE - Understand the event
             if not self._should_orchestrate(event):
                 logger.info(f"Event {event.event_id} does not require orchestration")
                 return None
             
+            # Same-provider cancellation bursts are decided together
+            batch_key = self._cancellation_batch_key(event)
+            if batch_key is not None:
+                return await self.cancellation_batcher.submit(batch_key, event, db_session or self.db)
+            
             # STEP 2: THINK - Get full context
-            context = await self._get_full_context(event)
+            context = await self._get_full_context(event, db_session or self.db)
             
             # STEP 3: DECIDE - Make intelligent decision
             decision = await self._make_decision(event, context)
@@ -148,6 +269,11 @@ class OrchestrationEngine:
                 logger.info(f"No decision made for event {event.event_id}")
                 return None
             
+            if decision["decision_type"] == "match_housing":
+                # The rule took the client off this worker's index; hold them
+                # off the shared waitlist until the offer is decided
+                await self._share_waitlist_change(decision["new_client_id"], None)
+            
             # STEP 4: COORDINATE - Plan execution
             execution_plan = self._create_execution_plan(decision, context)
             
@@ -157,7 +283,7 @@ class OrchestrationEngine:
             # REMEMBER - Store for learning
             await self._store_pattern(event, context, decision, recommendation)
             
-            self.decisions_made += 1
+            self._count("decisions_made")
             logger.info(f"Recommendation created: {recommendation.recommendation_id}")
             
             return recommendation
@@ -167,6 +293,108 @@ class OrchestrationEngine:
             return None
     
     
+    async def handle_cancellation_batch(
+        self,
+        events: List[Event],
+        db_session=None
+    ) -> List[Optional[Recommendation]]:
+        """
+        Orchestrate appointment cancellations for one provider together
+        
+        Context is gathered once for the batch, for the span of its slots
+        and all of its cancelling clients. Each freed slot gets its
+        top candidates (as many as there are slots - an optimal assignment
+        never needs more), and slots are matched to candidates as a
+        maximum-weight bipartite assignment of their scores, so no client
+        is offered two slots and the batch's total score is as high as
+        possible. Slots no candidate is assigned to fall back to AI, like
+        single events the rules cannot decide.
+        
+        Returns:
+            One recommendation (or None) per event, in order
+        """
+        results: List[Optional[Recommendation]] = [None] * len(events)
+        try:
+            context = await self._get_full_context(self._batch_context_event(events), db_session or self.db)
+            if "related_clients" in context.missing_sources:
+                logger.info(f"Skipping batch of {len(events)}: related clients unavailable")
+                return results
+            
+            candidates = context.related_clients
+            columns: Dict[int, int] = {}  # candidate list index -> matrix column
+            slot_scores = []
+            for event in events:
+                cancelled_time, provider_id, appointment_type = self._cancelled_slot(event)
+                top = self._top_appointment_candidates(
+                    candidates, cancelled_time, provider_id, appointment_type, context, k=len(events)
+                )
+                slot_scores.append(top)
+                for index, _ in top:
+                    columns.setdefault(index, len(columns))
+            
+            # Columns in list order, so equal totals favour earlier candidates like the single rule
+            order = sorted(columns)
+            columns = {index: column for column, index in enumerate(order)}
+            weights = np.zeros((len(events), len(order)))
+            for row, top in enumerate(slot_scores):
+                for index, score in top:
+                    weights[row, columns[index]] = score
+            assignment = max_weight_assignment(weights)
+            assigned = {candidates[order[column]].get("id") for column in assignment if column is not None}
+            
+            for row, (event, column) in enumerate(zip(events, assignment)):
+                if column is not None:
+                    decision = self._bump_decision(event, context, candidates[order[column]], weights[row, column])
+                    self._count("rule_decisions")
+                else:
+                    # Clients already offered a slot of this batch are not offered another
+                    decision = await self._ai_fallback(event, context, taken=assigned)
+                    if not decision:
+                        logger.info(f"No decision made for event {event.event_id}")
+                        continue
+                    assigned.add(decision.get("new_client_id"))
+                execution_plan = self._create_execution_plan(decision, context)
+                recommendation = self._format_recommendation(decision, execution_plan, context)
+                await self._store_pattern(event, context, decision, recommendation)
+                self._count("decisions_made")
+                logger.info(f"Recommendation created: {recommendation.recommendation_id}")
+                results[row] = recommendation
+        except Exception as e:
+            logger.error(f"Error in batch orchestration: {e}", exc_info=True)
+        
+        return results
+    
+    
+    def _batch_context_event(self, events: List[Event]) -> Event:
+        """
+        The event a cancellation batch's context is queried for
+        
+        The first event, with metadata["window_start"] / ["window_end"]
+        spanning every freed slot and metadata["client_ids"] listing every
+        cancelling client.
+        """
+        first = events[0]
+        if len(events) == 1:
+            return first
+        metadata = dict(first.metadata)
+        times = [time for time in (self._cancelled_slot(event)[0] for event in events) if time is not None]
+        if times:
+            metadata["window_start"], metadata["window_end"] = min(times), max(times)
+        metadata["client_ids"] = [event.client_id for event in events if event.client_id]
+        return replace(first, metadata=metadata)
+    
+    
+    def _cancellation_batch_key(self, event: Event):
+        """Batch key for events that should be decided together, or None"""
+        if self.cancellation_batcher is None or event.event_type != "appointment_cancelled":
+            return None
+        provider_id = self._event_provider_id(event)
+        if provider_id is None:
+            return None
+        # Candidates are per appointment type, so only those share a context
+        return provider_id, event.metadata.get("appointment_type")
+    
+    
     # ------------------------------------------------------------------------
     # DECISION MAKING (THE BRAIN'S CORE)
     # ------------------------------------------------------------------------
@@ -190,15 +418,25 @@ class OrchestrationEngine:
         decision = self._apply_business_rules(event, context)
         
         if decision:
-            self.rule_decisions += 1
+            self._count("rule_decisions")
             logger.info(f"Decision made via business rules")
             return decision
         
         # If ambiguous, use AI (5% of cases)
+        return await self._ai_fallback(event, context)
+    
+    
+    async def _ai_fallback(
+        self,
+        event: Event,
+        context: Context,
+        taken: Iterable[str] = ()
+    ) -> Optional[Dict[str, Any]]:
+        """AI decision for an event the rules left undecided, if it is ambiguous and its client is not `taken`"""
         if self.ai and self._is_ambiguous(event, context):
             decision = await self._use_ai_decision(event, context)
-            if decision:
-                self.ai_decisions += 1
+            if decision and decision.get("new_client_id") not in taken:
+                self._count("ai_decisions")
                 logger.info(f"Decision made via AI")
                 return decision
         
@@ -259,47 +497,214 @@ class OrchestrationEngine:
         """
         
         # Get cancelled appointment details
+        cancelled_time, provider_id, appointment_type = self._cancelled_slot(event)
+        
+        # Without the candidate list there is nobody to offer the slot to
+        if "related_clients" in context.missing_sources:
+            logger.info(f"Skipping {event.event_id}: related clients unavailable")
+            return None
+        
+        # Find potential replacement clients and pick the best
+        best_candidate, best_score = self._rank_appointment_candidates(
+            context.related_clients,
+            cancelled_time,
+            provider_id,
+            appointment_type,
+            context
+        )
+        
+        if best_candidate:
+            return self._bump_decision(event, context, best_candidate, best_score)
+        
+        return None
+    
+    
+    def _cancelled_slot(self, event: Event):
+        """(appointment time, provider_id, appointment type) of a cancellation"""
         cancelled_time = event.metadata.get("appointment_time")
-        provider_id = event.metadata.get("provider_id")
-        appointment_type = event.metadata.get("appointment_type")
+        if isinstance(cancelled_time, str):
+            # Events arriving over the API carry ISO-8601 strings
+            cancelled_time = datetime.fromisoformat(cancelled_time)
+        return cancelled_time, event.metadata.get("provider_id"), event.metadata.get("appointment_type")
+    
+    
+    def _bump_decision(
+        self,
+        event: Event,
+        context: Context,
+        candidate: Dict[str, Any],
+        score: float
+    ) -> Dict[str, Any]:
+        """Decision to give a cancelled slot to `candidate`"""
+        cancelled_time, provider_id, _ = self._cancelled_slot(event)
+        reasoning = [
+            f"Higher medical urgency ({candidate.get('urgency_score', 0)})",
+            "All required documents uploaded",
+            "Lives on existing transport route",
+            "No scheduling conflicts"
+        ]
+        
+        # Degrade rather than fail: flag what the caseworker should verify
+        degraded = [
+            source for source in ("related_clients", "provider_capacity", "system_state")
+            if not context.is_complete(source)
+        ]
+        if degraded:
+            score *= 0.9 ** len(degraded)
+            reasoning.append(f"Verify before approving - incomplete data: {', '.join(degraded)}")
+        
+        return {
+            "decision_type": "bump_appointment",
+            "original_client_id": event.client_id,
+            "new_client_id": candidate["id"],
+            "appointment_time": cancelled_time,
+            "provider_id": provider_id,
+            "confidence": score,
+            "reasoning": reasoning
+        }
+    
+    
+    def _rank_appointment_candidates(
+        self,
+        candidates: List[Dict[str, Any]],
+        appointment_time: datetime,
+        provider_id: str,
+        appointment_type: str,
+        context: Context
+    ):
+        """
+        Highest-scoring candidate above the threshold, and its score
+        
+        Same answer as _scan_appointment_candidates (score everyone, keep
+        the first strictly better one); see _top_appointment_candidates.
         
-        # Find potential replacement clients
-        candidates = context.related_clients
+        Returns:
+            (client dict, score), or (None, 0.0) if nobody clears the threshold
+        """
+        top = self._top_appointment_candidates(
+            candidates, appointment_time, provider_id, appointment_type, context, k=1
+        )
+        if not top:
+            return None, 0.0
+        index, score = top[0]
+        return candidates[index], score
+    
+    
+    def _top_appointment_candidates(
+        self,
+        candidates: List[Dict[str, Any]],
+        appointment_time: datetime,
+        provider_id: str,
+        appointment_type: str,
+        context: Context,
+        k: int = 1
+    ) -> List[tuple]:
+        """
+        The k best candidates above the threshold, as (list index, score)
+        
+        Ordered by score, then list position. The cheap terms (urgency,
+        documents) are computed for all candidates in one NumPy pass, and
+        transport and conflicts in one batch query each against the same
+        indexes _is_transport_compatible and _has_conflicts read. That gives
+        each candidate an upper bound; candidates are then fully scored in
+        descending-bound order, RANKING_CHUNK_SIZE at a time via
+        argpartition, stopping once no remaining bound can displace the
+        k-th best. Exact scores always come from the scalar scorer.
+        """
+        count = len(candidates)
+        if count == 0 or k <= 0:
+            return []
         
-        # Score each candidate
+        try:
+            urgency = np.fromiter(
+                (client.get("urgency_score", 0) for client in candidates), dtype=np.float64, count=count
+            )
+        except (TypeError, ValueError):
+            # Non-numeric urgency somewhere: fall back to scoring everyone
+            scored = [
+                (-self._score_appointment_candidate(client, appointment_time, provider_id, appointment_type, context), n)
+                for n, client in enumerate(candidates)
+            ]
+            return [(n, -neg) for neg, n in sorted(scored) if -neg > APPOINTMENT_SCORE_THRESHOLD][:k]
+        documents = np.fromiter(
+            (bool(client.get("documents_complete", False)) for client in candidates), dtype=bool, count=count
+        )
+        
+        schedules = getattr(context, "schedule_index", None)
+        if schedules is not None and len(schedules) and appointment_time is not None:
+            conflicts = schedules.conflicts_many(
+                [client.get("id") for client in candidates], *self._appointment_window(appointment_time)
+            )
+        else:
+            conflicts = np.zeros(count, dtype=bool)
+        if self.route_index is not None:
+            on_route = self.route_index.compatible_many(candidates, provider_id)
+        else:
+            on_route = np.ones(count, dtype=bool)
+        
+        # Bound uses the scalar scorer's operation order, so it is never below the real score
+        upper = (urgency / 10) * 0.4
+        upper = upper + np.where(documents, 0.2, 0.0)
+        upper = upper + np.where(on_route, 0.2, 0.0)
+        upper = np.minimum(upper + np.where(conflicts, 0.0, 0.2), 1.0)
+        
+        remaining = np.flatnonzero(upper > APPOINTMENT_SCORE_THRESHOLD)
+        best: List[tuple] = []  # (-score, index), sorted, at most k
+        
+        while remaining.size:
+            # Next RANKING_CHUNK_SIZE candidates by (bound desc, list position);
+            # `remaining` stays in list order, so ties at the cut take the earliest
+            if remaining.size > RANKING_CHUNK_SIZE:
+                bounds = upper[remaining]
+                cut = bounds[np.argpartition(bounds, -RANKING_CHUNK_SIZE)[-RANKING_CHUNK_SIZE]]
+                above = np.flatnonzero(bounds > cut)
+                ties = np.flatnonzero(bounds == cut)[:RANKING_CHUNK_SIZE - above.size]
+                take = np.concatenate([above, ties])
+                chunk = remaining[take]
+                remaining = np.delete(remaining, take)
+            else:
+                chunk, remaining = remaining, remaining[:0]
+            
+            for index in chunk[np.lexsort((chunk, -upper[chunk]))]:
+                if len(best) == k and (-upper[index], index) > best[-1]:
+                    # Nobody left can beat the k-th best, or tie with it from earlier in the list
+                    return [(int(n), -neg) for neg, n in best]
+                score = self._score_appointment_candidate(
+                    candidates[index], appointment_time, provider_id, appointment_type, context
+                )
+                if score > APPOINTMENT_SCORE_THRESHOLD:
+                    bisect.insort(best, (-score, int(index)))
+                    del best[k:]
+        
+        return [(int(n), -neg) for neg, n in best]
+    
+    
+    def _scan_appointment_candidates(
+        self,
+        candidates: List[Dict[str, Any]],
+        appointment_time: datetime,
+        provider_id: str,
+        appointment_type: str,
+        context: Context
+    ):
+        """Reference ranking: score every candidate, keep the first strictly better one"""
         best_candidate = None
         best_score = 0.0
         
         for client in candidates:
             score = self._score_appointment_candidate(
                 client, 
-                cancelled_time, 
+                appointment_time, 
                 provider_id,
                 appointment_type,
                 context
             )
             
-            if score > best_score and score > 0.7:  # Threshold
+            if score > best_score and score > APPOINTMENT_SCORE_THRESHOLD:
                 best_score = score
                 best_candidate = client
         
-        if best_candidate:
-            return {
-                "decision_type": "bump_appointment",
-                "original_client_id": event.client_id,
-                "new_client_id": best_candidate["id"],
-                "appointment_time": cancelled_time,
-                "provider_id": provider_id,
-                "confidence": best_score,
-                "reasoning": [
-                    f"Higher medical urgency ({best_candidate.get('urgency_score', 0)})",
-                    "All required documents uploaded",
-                    "Lives on existing transport route",
-                    "No scheduling conflicts"
-                ]
-            }
-        
-        return None
+        return best_candidate, best_score
     
     
     def _score_appointment_candidate(
@@ -351,11 +756,45 @@ class OrchestrationEngine:
         Logic:
         1. Get housing requirements (bedroom count, location, etc.)
         2. Find waitlist clients who match
-        3. Score by time on waitlist + urgency + readiness
+        3. Score by time on waitlist x urgency
         4. Return top match
+        
+        Matching is a lookup in the waitlist index (bedroom/accessibility
+        buckets, location grid, per-bucket heaps), not a scan. The matched
+        client is taken off the waitlist so no other unit is offered to them
+        meanwhile; rejecting the offer puts them back (release_housing_hold).
         """
-        # TODO: Implement housing matching logic
-        return None
+        try:
+            unit = unit_from_metadata(event.metadata)
+        except ValueError as e:
+            logger.warning(f"Skipping {event.event_id}: {e}")
+            return None
+        
+        match = self.housing_waitlist.pop_best(unit, now=event.timestamp)
+        if match is None:
+            logger.info(f"No eligible waitlisted client for unit {unit.unit_id}")
+            return None
+        
+        entry = match.entry
+        reasoning = [
+            f"On waitlist {match.days_waiting:.0f} days with urgency {entry.urgency:g}",
+            f"Needs {entry.bedrooms} bedroom(s)"
+        ]
+        if entry.accessibility:
+            reasoning.append(f"Unit meets accessibility needs: {', '.join(sorted(entry.accessibility))}")
+        if match.distance_km is not None:
+            reasoning.append(f"Within preferred area ({match.distance_km:.1f} km)")
+        
+        return {
+            "decision_type": "match_housing",
+            "unit_id": unit.unit_id,
+            "new_client_id": entry.client_id,
+            "bedrooms": unit.bedrooms,
+            "priority": match.priority,
+            "waitlist_entry": entry_to_metadata(entry),
+            "confidence": 0.85,
+            "reasoning": reasoning
+        }
     
     
     def _handle_documents_complete(
@@ -422,7 +861,7 @@ class OrchestrationEngine:
     # CONTEXT GATHERING
     # ------------------------------------------------------------------------
     
-    async def _get_full_context(self, event: Event) -> Context:
+    async def _get_full_context(self, event: Event, db=None) -> Context:
         """
         Query full context needed for decision-making
         
@@ -431,38 +870,270 @@ class OrchestrationEngine:
         - Provider capacity
         - System state
         - Past patterns
-        """
         
-        # Query affected client
-        affected_client = None
-        if event.client_id:
-            affected_client = await self._query_client(event.client_id)
+        Sources are queried concurrently, each under its own timeout, so
+        context latency is that of the slowest source rather than the sum.
+        A source that times out or fails is recorded in missing_sources and
+        replaced by an empty value; rules check the context before relying
+        on it.
         
-        # Query related clients (potential matches)
-        related_clients = await self._query_related_clients(event)
+        Provider capacity and system state come from the context cache, so a
+        burst of events for one provider queries them once per TTL.
         
-        # Query provider capacity
-        provider_capacity = await self._query_provider_capacity(event)
+        An AsyncSession must not be used by two queries at once, so with a
+        session factory every source runs on a session of its own.
+        """
         
-        # Query system state
-        system_state = await self._query_system_state()
+        async def no_client():
+            return None
         
-        # Retrieve historical patterns
-        historical_patterns = await self._query_historical_patterns(event)
+        sources = {
+            "affected_client": (self._in_session(
+                lambda session: self._query_client(event.client_id, session), db
+            ) if event.client_id else no_client(), None),
+            "related_clients": (self._in_session(
+                lambda session: self._query_related_clients(event, session), db
+            ), []),
+            "provider_capacity": (self.context_cache.get_or_load(
+                provider_capacity_key(self._event_provider_id(event)),
+                lambda: self._in_session(lambda session: self._query_provider_capacity(event, session), db),
+                PROVIDER_CAPACITY_TTL_SECONDS
+            ), {}),
+            "system_state": (self.context_cache.get_or_load(
+                SYSTEM_STATE_KEY,
+                lambda: self._in_session(self._query_system_state, db),
+                SYSTEM_STATE_TTL_SECONDS
+            ), {}),
+            "historical_patterns": (self._in_session(
+                lambda session: self._query_historical_patterns(event, session), db
+            ), []),
+        }
         
-        # Load business rules
-        business_rules = self._load_business_rules()
+        names = list(sources)
+        outcomes = await asyncio.gather(*(
+            self._fetch_source(name, query, default) for name, (query, default) in sources.items()
+        ))
+        
+        values = {}
+        missing, partial, latency = [], [], {}
+        for name, (value, state, elapsed_ms) in zip(names, outcomes):
+            values[name] = value
+            latency[name] = elapsed_ms
+            if state == "missing":
+                missing.append(name)
+            elif state == "partial":
+                partial.append(name)
+        
+        try:
+            schedule_index = ScheduleIndex({
+                client.get("id"): client["bookings"]
+                for client in values["related_clients"] if client.get("bookings")
+            })
+        except ValueError as e:
+            # Conflict checks cannot be trusted; flag the candidates as partial
+            logger.warning(f"Related clients' bookings unusable: {e}")
+            schedule_index = ScheduleIndex()
+            if "related_clients" not in missing + partial:
+                partial.append("related_clients")
+        
+        if missing or partial:
+            logger.warning(
+                f"Context for {event.event_id} degraded (missing: {missing}, partial: {partial})"
+            )
         
         return Context(
-            affected_client=affected_client,
-            related_clients=related_clients,
-            provider_capacity=provider_capacity,
-            system_state=system_state,
-            historical_patterns=historical_patterns,
-            business_rules=business_rules
+            **values,
+            business_rules=self._load_business_rules(),
+            schedule_index=schedule_index,
+            missing_sources=missing,
+            partial_sources=partial,
+            source_latency_ms=latency
         )
     
     
+    async def _in_session(self, query, db=None):
+        """
+        Await query(session) on a session of its own
+        
+        Falls back to the shared `db` when the engine has no session factory.
+        """
+        if self.session_factory is None:
+            return await query(db)
+        async with self.session_factory() as session:
+            return await query(session)
+    
+    
+    async def _fetch_source(self, name: str, query, default):
+        """
+        Run one context query under its timeout
+        
+        Returns:
+            (value, state, elapsed_ms) where state is "ok", "partial" or "missing"
+        """
+        timeout = self.source_timeouts.get(name, CONTEXT_SOURCE_TIMEOUT_SECONDS)
+        started = time.perf_counter()
+        try:
+            value = await asyncio.wait_for(query, timeout=timeout)
+            state = "ok"
+            if isinstance(value, PartialResult):
+                logger.info(f"Context source {name} partial: {value.reason}")
+                value, state = value.value, "partial"
+        except asyncio.TimeoutError:
+            logger.warning(f"Context source {name} timed out after {timeout}s")
+            self._count("context_timeouts")
+            value, state = default, "missing"
+        except Exception as e:
+            logger.warning(f"Context source {name} failed: {e}")
+            self._count("context_errors")
+            value, state = default, "missing"
+        
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        calls, total_ms, max_ms = self.source_latency.get(name, (0, 0.0, 0.0))
+        self.source_latency[name] = [calls + 1, total_ms + elapsed_ms, max(max_ms, elapsed_ms)]
+        return value, state, elapsed_ms
+    
+    
+    def _event_provider_id(self, event: Event) -> Optional[str]:
+        """Provider an event concerns (top level or in metadata)"""
+        return event.provider_id or (event.metadata or {}).get("provider_id")
+    
+    
+    async def _update_housing_waitlist(self, event: Event):
+        """
+        Apply waitlist changes carried by client_update events
+        
+        metadata["housing_waitlist"] holds the client's requirements when
+        they join (or their needs change) and None when they leave.
+        """
+        if event.event_type != "client_update" or "housing_waitlist" not in event.metadata:
+            return
+        data = event.metadata["housing_waitlist"]
+        try:
+            entry = None if data is None else entry_from_metadata(event.client_id, data)
+        except ValueError as e:
+            logger.warning(f"Ignoring waitlist update in {event.event_id}: {e}")
+            return
+        self._apply_waitlist_change(event.client_id, entry)
+        await self._share_waitlist_change(event.client_id, entry)
+    
+    
+    async def load_housing_waitlist(self):
+        """Fill the waitlist index from the shared store (at startup)"""
+        if self.waitlist_store is None:
+            return
+        entries = await self.waitlist_store.load()
+        self.housing_waitlist.load(entries)
+        logger.info(f"Housing waitlist loaded: {len(entries)} clients")
+    
+    
+    async def release_housing_hold(self, execution_plan: Dict[str, Any]) -> bool:
+        """
+        Put the client of a rejected housing offer back on the waitlist
+        
+        Args:
+            execution_plan: The recommendation's serialized plan
+            
+        Returns:
+            True if the plan was a housing offer and the client was restored
+        """
+        for action in execution_plan.get("actions", []):
+            details = (action.get("parameters") or {}).get("details") or {}
+            if details.get("decision_type") != "match_housing" or not details.get("waitlist_entry"):
+                continue
+            entry = entry_from_metadata(details["new_client_id"], details["waitlist_entry"])
+            self._apply_waitlist_change(entry.client_id, entry)
+            await self._share_waitlist_change(entry.client_id, entry)
+            return True
+        return False
+    
+    
+    def _apply_waitlist_change(self, client_id: str, entry: Optional[WaitlistEntry]):
+        if entry is None:
+            self.housing_waitlist.remove(client_id)
+        else:
+            self.housing_waitlist.add(entry)
+    
+    
+    async def _share_waitlist_change(self, client_id: str, entry: Optional[WaitlistEntry]):
+        """Persist a change already applied here and announce it to the other workers"""
+        if self.waitlist_store is not None:
+            try:
+                if entry is None:
+                    await self.waitlist_store.delete(client_id)
+                else:
+                    await self.waitlist_store.save(entry)
+            except Exception as e:
+                logger.warning(f"Waitlist change for {client_id} not persisted: {e}")
+        if self.worker_sync is not None:
+            await self.worker_sync.publish(WAITLIST_TOPIC, {
+                "client_id": client_id,
+                "entry": None if entry is None else entry_to_metadata(entry)
+            })
+    
+    
+    def _on_waitlist_change(self, payload: Dict[str, Any]):
+        """Apply a waitlist change published by another worker"""
+        client_id, data = payload["client_id"], payload.get("entry")
+        self._apply_waitlist_change(client_id, None if data is None else entry_from_metadata(client_id, data))
+    
+    
+    async def _invalidate_cached_context(self, event: Event):
+        """Drop cached context the event makes stale, on every worker"""
+        if event.event_type != "provider_capacity_change":
+            return
+        # Capacity feeds the system-wide snapshot too
+        keys = [provider_capacity_key(self._event_provider_id(event)), SYSTEM_STATE_KEY]
+        for key in keys:
+            self.context_cache.invalidate(key)
+        if self.worker_sync is not None:
+            await self.worker_sync.publish(CONTEXT_INVALIDATION_TOPIC, {"keys": [list(key) for key in keys]})
+    
+    
+    def _on_context_invalidation(self, payload: Dict[str, Any]):
+        """Drop cache entries another worker invalidated"""
+        for key in payload["keys"]:
+            self.context_cache.invalidate(tuple(key))
+    
+    
+    async def _update_transport_routes(self, event: Event):
+        """
+        Apply route network changes carried by transport_routes_changed events
+        
+        metadata["routes"] (route_id, polyline and stops per route) and/or
+        metadata["provider_locations"] (provider_id -> {latitude, longitude})
+        replace that part of the network. Every worker rebuilds its index in
+        the background; events keep using the previous one meanwhile.
+        """
+        if event.event_type != "transport_routes_changed":
+            return
+        changes = {part: event.metadata[part] for part in NETWORK_PARTS if part in (event.metadata or {})}
+        if not changes:
+            logger.warning(f"Ignoring {event.event_id}: carries no routes or provider_locations")
+            return
+        self.route_network.update(changes)
+        self.schedule_route_index_rebuild()
+        if self.route_store is not None:
+            try:
+                await self.route_store.save(changes)
+            except Exception as e:
+                logger.warning(f"Route network change in {event.event_id} not persisted: {e}")
+        if self.worker_sync is not None:
+            await self.worker_sync.publish(ROUTE_NETWORK_TOPIC, changes)
+    
+    
+    async def load_route_network(self):
+        """Load the route network from the shared store and start building its index (at startup)"""
+        if self.route_store is not None:
+            self.route_network.update(await self.route_store.load())
+        self.schedule_route_index_rebuild()
+    
+    
+    def _on_route_network_change(self, payload: Dict[str, Any]):
+        """Apply a route network change published by another worker"""
+        self.route_network.update({part: payload[part] for part in NETWORK_PARTS if part in payload})
+        self.schedule_route_index_rebuild()
+    
+    
     # ------------------------------------------------------------------------
     # EXECUTION PLANNING
     # ------------------------------------------------------------------------
@@ -488,7 +1159,8 @@ class OrchestrationEngine:
         """
         
         actions = []
-        plan_id = f"plan_{datetime.now().timestamp()}"
+        # Random suffix: concurrent events can share a timestamp
+        plan_id = f"plan_{datetime.now().timestamp()}_{uuid.uuid4().hex[:8]}"
         
         if decision["decision_type"] == "bump_appointment":
             # Action 1: Cancel original appointment
@@ -520,7 +1192,7 @@ class OrchestrationEngine:
                 target_system="transportation",
                 parameters={
                     "client_id": decision["new_client_id"],
-                    "pickup_time": decision["appointment_time"] - timedelta(minutes=30),
+                    "pickup_time": decision["appointment_time"] - timedelta(minutes=TRANSPORT_LEAD_MINUTES),
                     "destination": "provider_location"
                 }
             ))
@@ -556,6 +1228,28 @@ class OrchestrationEngine:
                 }
             ))
         
+        elif decision["decision_type"] == "match_housing":
+            # Action 1: Record the offer on the case
+            actions.append(Action(
+                action_type="update_case",
+                target_system="case_management",
+                parameters={
+                    "client_id": decision["new_client_id"],
+                    "update_type": "housing_offer",
+                    "details": decision
+                }
+            ))
+            
+            # Action 2: Notify client
+            actions.append(Action(
+                action_type="send_sms",
+                target_system="notifications",
+                parameters={
+                    "client_id": decision["new_client_id"],
+                    "message": f"Good news! A {decision['bedrooms']}-bedroom unit is available for you. Your caseworker will contact you today."
+                }
+            ))
+        
         # Calculate affected systems and duration
         affected_systems = list(set([a.target_system for a in actions]))
         estimated_duration = len(actions) * 2  # ~2 seconds per action
@@ -585,7 +1279,7 @@ class OrchestrationEngine:
         the APPROVE button.
         """
         
-        rec_id = f"rec_{datetime.now().timestamp()}"
+        rec_id = f"rec_{datetime.now().timestamp()}_{uuid.uuid4().hex[:8]}"
         
         # Create human-readable summary
         summary = self._create_summary(decision)
@@ -610,6 +1304,9 @@ class OrchestrationEngine:
         if decision["decision_type"] == "bump_appointment":
             return f"Bump Client {decision['new_client_id']} to today's {decision['appointment_time']} appointment?"
         
+        if decision["decision_type"] == "match_housing":
+            return f"Offer unit {decision['unit_id']} to Client {decision['new_client_id']}?"
+        
         return "Optimization opportunity detected"
     
     
@@ -673,9 +1370,52 @@ class OrchestrationEngine:
         provider_id: str, 
         context: Context
     ) -> bool:
-        """Check if client is on compatible transport route"""
-        # TODO: Implement transport compatibility check
-        return True
+        """
+        Check if client is on compatible transport route
+        
+        One route must serve both the client's location and the provider;
+        a grid lookup and set intersection in the route index. Without an
+        index, or a location for either side, the client is not ruled out.
+        """
+        if self.route_index is None:
+            return True
+        return self.route_index.is_compatible(client, provider_id) is not False
+    
+    
+    def schedule_route_index_rebuild(self) -> asyncio.Task:
+        """
+        Rebuild the route index from route_network in the background
+        
+        Requests arriving while a rebuild runs are folded into one more
+        pass over the latest network.
+        """
+        self._route_rebuild_pending = True
+        if self._route_rebuild is None or self._route_rebuild.done():
+            self._route_rebuild = asyncio.create_task(self._rebuild_route_index())
+        return self._route_rebuild
+    
+    
+    async def _rebuild_route_index(self):
+        while self._route_rebuild_pending:
+            self._route_rebuild_pending = False
+            try:
+                await self.refresh_route_index()
+            except Exception as e:
+                logger.error(f"Route index rebuild failed: {e}", exc_info=True)
+    
+    
+    async def refresh_route_index(self):
+        """
+        Rebuild the transport route index from route_network
+        
+        Rasterizing is CPU work, so it runs in a thread; events keep using
+        the previous index until the new one is swapped in.
+        """
+        network = self.route_network
+        self.route_index = await asyncio.to_thread(
+            RouteIndex, network.get("routes") or [], network.get("provider_locations") or {}
+        )
+        logger.info(f"Route index rebuilt: {self.route_index.get_statistics()}")
     
     
     def _has_conflicts(
@@ -684,36 +1424,62 @@ class OrchestrationEngine:
         time: datetime, 
         context: Context
     ) -> bool:
-        """Check if client has scheduling conflicts"""
-        # TODO: Implement conflict detection
-        return False
+        """
+        Check if client has scheduling conflicts
+        
+        Any booked appointment or transport window overlapping pickup
+        through the end of the visit counts; one binary search in the
+        context's schedule index.
+        """
+        index = getattr(context, "schedule_index", None)
+        if index is None or time is None:
+            return False
+        return index.overlaps(client.get("id"), *self._appointment_window(time))
     
     
-    async def _query_client(self, client_id: str) -> Optional[Dict[str, Any]]:
+    def _appointment_window(self, appointment_time: datetime):
+        """(start, end) a client is occupied by an appointment at this time"""
+        return (
+            appointment_time - timedelta(minutes=TRANSPORT_LEAD_MINUTES),
+            appointment_time + timedelta(minutes=APPOINTMENT_DURATION_MINUTES)
+        )
+    
+    
+    async def _query_client(self, client_id: str, db=None) -> Optional[Dict[str, Any]]:
         """Query full client details"""
         # TODO: Implement database query
         return None
     
     
-    async def _query_related_clients(self, event: Event) -> List[Dict[str, Any]]:
-        """Query clients related to this event"""
+    async def _query_related_clients(self, event: Event, db=None) -> List[Dict[str, Any]]:
+        """
+        Query clients related to this event
+        
+        Each client may carry "bookings": their booked appointments and
+        transport windows around the event, as (start, end) pairs or
+        {"start", "end"} dicts; conflict checks are built from them.
+        
+        For a cancellation batch, bookings must cover metadata["window_start"]
+        through metadata["window_end"], and metadata["client_ids"] lists every
+        cancelling client.
+        """
         # TODO: Implement database query
         return []
     
     
-    async def _query_provider_capacity(self, event: Event) -> Dict[str, Any]:
+    async def _query_provider_capacity(self, event: Event, db=None) -> Dict[str, Any]:
         """Query provider capacity/availability"""
         # TODO: Implement provider capacity query
         return {}
     
     
-    async def _query_system_state(self) -> Dict[str, Any]:
+    async def _query_system_state(self, db=None) -> Dict[str, Any]:
         """Query overall system state"""
         # TODO: Implement system state query
         return {}
     
     
-    async def _query_historical_patterns(self, event: Event) -> List[Dict[str, Any]]:
+    async def _query_historical_patterns(self, event: Event, db=None) -> List[Dict[str, Any]]:
         """Query historical patterns for learning"""
         # TODO: Implement pattern retrieval
         return []
@@ -749,11 +1515,47 @@ class OrchestrationEngine:
         return None
     
     
-    def get_statistics(self) -> Dict[str, Any]:
-        """Get orchestrator statistics"""
-        return {
+    def _count(self, field: str):
+        """Bump a statistics counter locally and in the shared totals"""
+        setattr(self, field, getattr(self, field) + 1)
+        if self.stats is not None:
+            self.stats.incr(field)
+    
+    
+    def get_statistics(self, totals: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
+        """
+        Get orchestrator statistics
+        
+        Args:
+            totals: Cluster-wide counters (SharedCounters.totals()); this
+                instance's own counters if omitted
+        """
+        counts = totals if totals is not None else {
             "decisions_made": self.decisions_made,
             "ai_decisions": self.ai_decisions,
             "rule_decisions": self.rule_decisions,
-            "ai_percentage": (self.ai_decisions / max(self.decisions_made, 1)) * 100
+            "context_timeouts": self.context_timeouts,
+            "context_errors": self.context_errors
+        }
+        decisions_made = counts.get("decisions_made", 0)
+        ai_decisions = counts.get("ai_decisions", 0)
+        return {
+            "decisions_made": decisions_made,
+            "ai_decisions": ai_decisions,
+            "rule_decisions": counts.get("rule_decisions", 0),
+            "ai_percentage": (ai_decisions / max(decisions_made, 1)) * 100,
+            "context_timeouts": counts.get("context_timeouts", 0),
+            "context_errors": counts.get("context_errors", 0),
+            # Latency and cache figures are per worker (this process)
+            "context_cache": self.context_cache.get_statistics(),
+            "housing_waitlist": self.housing_waitlist.get_statistics(),
+            "route_index": self.route_index.get_statistics() if self.route_index else None,
+            "cancellation_batches": (
+                self.cancellation_batcher.get_statistics() if self.cancellation_batcher else None
+            ),
+            "worker_sync": self.worker_sync.get_statistics() if self.worker_sync else None,
+            "context_source_latency_ms": {
+                name: {"calls": calls, "avg": round(total_ms / calls, 2), "max": round(max_ms, 2)}
+                for name, (calls, total_ms, max_ms) in self.source_latency.items()
+            }
         }
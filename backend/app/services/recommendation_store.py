@@ -0,0 +1,390 @@
+"""
+First Contact E.I.S. - Recommendation Store
+Persistent orchestration recommendations with a write-through local cache
+
+Recommendations live in the orchestration_recommendations table (plan as
+JSONB), so they survive restarts and every worker sees the same set. Each
+worker keeps a small LRU of recently written/read records in front of it.
+
+Status changes are conditional UPDATEs (... WHERE status IN (...)
+RETURNING), so an approval or rejection on one worker is authoritative for
+all of them: a recommendation can only leave pending_approval once.
+
+Listings are keyset-paginated on (created_at, id) newest first; a cursor is
+the position of the last row of the previous page, so every page is an
+index range scan of `limit` rows however many recommendations exist. A
+page's ETag comes from a probe over the same range that reads only
+(created_at, updated_at), so revalidating polls never load the JSONB
+columns.
+"""
+
+from typing import Dict, List, Optional, Any, Iterable, Tuple
+from collections import OrderedDict
+from dataclasses import asdict
+from datetime import datetime, timedelta
+import base64
+import hashlib
+import json
+import logging
+import os
+import time
+import uuid
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import select, update, and_, or_, func
+
+from app.models import OrchestrationRecommendation
+from app.services.orchestrator import ExecutionPlan, Action
+
+logger = logging.getLogger(__name__)
+
+def serialize_plan(plan: ExecutionPlan) -> Dict[str, Any]:
+    """ExecutionPlan -> JSON-compatible dict"""
+    return jsonable_encoder(asdict(plan))
+
+
+def deserialize_plan(data: Dict[str, Any]) -> ExecutionPlan:
+    """JSON dict -> ExecutionPlan ready for the executor"""
+    return ExecutionPlan(
+        plan_id=data["plan_id"],
+        actions=[Action(**action) for action in data.get("actions", [])],
+        estimated_duration_seconds=data.get("estimated_duration_seconds", 0),
+        affected_systems=data.get("affected_systems", [])
+    )
+
+
+def encode_cursor(created_at: datetime, recommendation_id: str) -> str:
+    """Opaque cursor pointing just past a listed row"""
+    raw = f"{created_at.isoformat()}|{recommendation_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """Inverse of encode_cursor; ValueError if the cursor is malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, recommendation_id = raw.split("|", 1)
+        return datetime.fromisoformat(created_at), recommendation_id
+    except Exception:
+        raise ValueError(f"Invalid cursor: {cursor!r}")
+
+
+def page_etag(version: Tuple[int, Optional[datetime], Optional[datetime]], *params) -> str:
+    """Weak ETag over the listing parameters and the page's version (see RecommendationStore.page_version)"""
+    digest = hashlib.sha1(json.dumps([
+        [str(param) for param in params],
+        [str(part) for part in version]
+    ]).encode()).hexdigest()
+    return f'W/"{digest}"'
+
+
+def _to_record(row: OrchestrationRecommendation) -> Dict[str, Any]:
+    return {
+        "recommendation_id": row.id,
+        "organization_id": str(row.organization_id) if row.organization_id else None,
+        "summary": row.summary,
+        "reasoning": row.reasoning or [],
+        "impact": row.impact or {},
+        "confidence_score": row.confidence_score,
+        "actions_count": row.actions_count or 0,
+        "estimated_duration_seconds": row.estimated_duration_seconds or 0,
+        "affected_systems": row.affected_systems or [],
+        "execution_plan": row.execution_plan,
+        "status": row.status,
+        "approved_by": row.approved_by,
+        "queued_at": row.queued_at,
+        "started_at": row.started_at,
+        "completed_at": row.completed_at,
+        "attempts": row.attempts or 0,
+        "execution_result": row.execution_result,
+        "last_error": row.last_error,
+        "created_at": row.created_at,
+        "updated_at": row.updated_at
+    }
+
+
+class RecommendationStore:
+    """
+    Database-backed recommendation store with a per-worker LRU
+    """
+
+    def __init__(self, session_factory=None, cache_size: int = 1000, cache_ttl_seconds: float = 2.0):
+        """
+        Initialize the store
+
+        Args:
+            session_factory: Async session factory (defaults to AsyncSessionLocal)
+            cache_size: Records kept in the local LRU
+            cache_ttl_seconds: How long a cached record may be served without
+                re-reading it (bounds staleness from other workers' writes)
+        """
+        self.session_factory = session_factory
+        self.cache_size = cache_size
+        self.cache_ttl_seconds = cache_ttl_seconds
+        self._cache: "OrderedDict[str, tuple]" = OrderedDict()  # id -> (cached_at, record)
+
+        # Statistics tracking
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.conflicts = 0
+
+    def _sessions(self):
+        if self.session_factory is None:
+            from app.database import AsyncSessionLocal
+            self.session_factory = AsyncSessionLocal
+        return self.session_factory()
+
+    # ------------------------------------------------------------------------
+    # LOCAL CACHE
+    # ------------------------------------------------------------------------
+
+    def _remember(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        self._cache[record["recommendation_id"]] = (time.monotonic(), record)
+        self._cache.move_to_end(record["recommendation_id"])
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return record
+
+    def _cached(self, recommendation_id: str) -> Optional[Dict[str, Any]]:
+        entry = self._cache.get(recommendation_id)
+        if entry is None:
+            return None
+        cached_at, record = entry
+        if time.monotonic() - cached_at > self.cache_ttl_seconds:
+            return None
+        self._cache.move_to_end(recommendation_id)
+        return record
+
+    # ------------------------------------------------------------------------
+    # READS / WRITES
+    # ------------------------------------------------------------------------
+
+    async def create(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        """Persist a new recommendation (write-through)"""
+        now = datetime.utcnow()
+        row = OrchestrationRecommendation(
+            id=record["recommendation_id"],
+            organization_id=uuid.UUID(str(record["organization_id"])),
+            summary=record["summary"],
+            reasoning=record.get("reasoning", []),
+            impact=jsonable_encoder(record.get("impact", {})),
+            confidence_score=record["confidence_score"],
+            actions_count=record.get("actions_count", 0),
+            estimated_duration_seconds=record.get("estimated_duration_seconds", 0),
+            affected_systems=record.get("affected_systems", []),
+            execution_plan=record["execution_plan"],
+            status=record.get("status", "pending_approval"),
+            created_at=record.get("created_at") or now,
+            updated_at=now
+        )
+        async with self._sessions() as session:
+            session.add(row)
+            await session.commit()
+            return self._remember(_to_record(row))
+
+    async def get(self, recommendation_id: str) -> Optional[Dict[str, Any]]:
+        """Recommendation by ID (local cache first)"""
+        record = self._cached(recommendation_id)
+        if record is not None:
+            self.cache_hits += 1
+            return record
+
+        self.cache_misses += 1
+        async with self._sessions() as session:
+            row = await session.get(OrchestrationRecommendation, recommendation_id)
+            return self._remember(_to_record(row)) if row is not None else None
+
+    async def transition(
+        self,
+        recommendation_id: str,
+        status: str,
+        from_statuses: Optional[Iterable[str]] = None,
+        attempt: Optional[int] = None,
+        **fields
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Atomically move a recommendation to `status`
+
+        Args:
+            recommendation_id: Recommendation to update
+            status: New status
+            from_statuses: Only update if the current status is one of these
+            attempt: Only update if this is still the current execution
+                attempt (a reclaimed plan's old worker must not finish it)
+            **fields: Extra columns to set (e.g. approved_by)
+
+        Returns:
+            The updated record, or None if it does not exist or was not in an
+            allowed status (another worker got there first)
+        """
+        conditions = [OrchestrationRecommendation.id == recommendation_id]
+        if from_statuses is not None:
+            conditions.append(OrchestrationRecommendation.status.in_(list(from_statuses)))
+        if attempt is not None:
+            conditions.append(OrchestrationRecommendation.attempts == attempt)
+
+        stmt = update(OrchestrationRecommendation).where(*conditions).values(
+            status=status,
+            updated_at=datetime.utcnow(),
+            **fields
+        ).returning(OrchestrationRecommendation)
+
+        async with self._sessions() as session:
+            row = (await session.execute(stmt)).scalar_one_or_none()
+            await session.commit()
+
+        if row is None:
+            self.conflicts += 1
+            self._cache.pop(recommendation_id, None)
+            return None
+        return self._remember(_to_record(row))
+
+    async def claim_next(self, lease_seconds: float) -> Optional[Dict[str, Any]]:
+        """
+        Claim the oldest queued plan for execution
+
+        Also reclaims plans whose worker died mid-execution (status executing,
+        lease expired). Concurrent claimers skip each other's locked rows, so
+        each plan goes to exactly one worker per attempt.
+        """
+        model = OrchestrationRecommendation
+        now = datetime.utcnow()
+        candidate = select(model.id).where(
+            or_(
+                model.status == "queued",
+                and_(model.status == "executing", model.lease_expires_at < now)
+            )
+        ).order_by(model.queued_at).limit(1).with_for_update(skip_locked=True).scalar_subquery()
+
+        stmt = update(model).where(model.id == candidate).values(
+            status="executing",
+            attempts=model.attempts + 1,
+            started_at=now,
+            lease_expires_at=now + timedelta(seconds=lease_seconds),
+            updated_at=now
+        ).returning(model)
+
+        async with self._sessions() as session:
+            row = (await session.execute(stmt)).scalar_one_or_none()
+            await session.commit()
+            return self._remember(_to_record(row)) if row is not None else None
+
+    async def extend_lease(self, recommendation_id: str, attempt: int, lease_seconds: float) -> bool:
+        """Keep a running plan's claim alive; False if it was reclaimed"""
+        model = OrchestrationRecommendation
+        stmt = update(model).where(
+            and_(model.id == recommendation_id, model.status == "executing", model.attempts == attempt)
+        ).values(
+            lease_expires_at=datetime.utcnow() + timedelta(seconds=lease_seconds)
+        ).returning(model.id)
+
+        async with self._sessions() as session:
+            extended = (await session.execute(stmt)).scalar_one_or_none() is not None
+            await session.commit()
+        return extended
+
+    def _page_range(
+        self,
+        columns: List[Any],
+        organization_id: str,
+        status: Optional[str],
+        since: Optional[datetime],
+        limit: int,
+        cursor: Optional[str]
+    ):
+        """`columns` of one page plus one row, newest first (ValueError on a bad cursor or organization)"""
+        model = OrchestrationRecommendation
+        conditions = [model.organization_id == uuid.UUID(str(organization_id))]
+        if status is not None:
+            conditions.append(model.status == status)
+        if since is not None:
+            conditions.append(model.created_at >= since)
+        if cursor is not None:
+            created_at, recommendation_id = decode_cursor(cursor)
+            conditions.append(or_(
+                model.created_at < created_at,
+                and_(model.created_at == created_at, model.id < recommendation_id)
+            ))
+
+        # One extra row tells us whether another page exists
+        return select(*columns).where(and_(*conditions)).order_by(
+            model.created_at.desc(),
+            model.id.desc()
+        ).limit(limit + 1)
+
+    async def page_version(
+        self,
+        organization_id: str,
+        status: Optional[str] = None,
+        since: Optional[datetime] = None,
+        limit: int = 50,
+        cursor: Optional[str] = None
+    ) -> Tuple[int, Optional[datetime], Optional[datetime]]:
+        """
+        (row count, newest updated_at, oldest created_at) of a page
+
+        Reads the same index range as list_page without its JSONB columns.
+        Any change to what list_page would return moves one of the three:
+        every write bumps updated_at and new rows are the newest, while rows
+        leaving a status filter either shorten the range or pull an older
+        row in at its end.
+        """
+        model = OrchestrationRecommendation
+        page = self._page_range(
+            [model.created_at, model.updated_at], organization_id, status, since, limit, cursor
+        ).subquery("page")
+        query = select(func.count(), func.max(page.c.updated_at), func.min(page.c.created_at))
+
+        async with self._sessions() as session:
+            count, updated_at, created_at = (await session.execute(query)).one()
+        return count, updated_at, created_at
+
+    async def list_page(
+        self,
+        organization_id: str,
+        status: Optional[str] = None,
+        since: Optional[datetime] = None,
+        limit: int = 50,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        One page of an organization's recommendations, newest first
+
+        Args:
+            organization_id: Owner of the recommendations
+            status: Only recommendations in this status
+            since: Only recommendations created at or after this time
+            limit: Page size
+            cursor: next_cursor from the previous page
+
+        Returns:
+            (records, next_cursor); next_cursor is None on the last page
+        """
+        query = self._page_range([OrchestrationRecommendation], organization_id, status, since, limit, cursor)
+
+        async with self._sessions() as session:
+            rows = (await session.execute(query)).scalars().all()
+            records = [self._remember(_to_record(row)) for row in rows[:limit]]
+
+        next_cursor = None
+        if len(rows) > limit:
+            last = records[-1]
+            next_cursor = encode_cursor(last["created_at"], last["recommendation_id"])
+        return records, next_cursor
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Get store statistics"""
+        lookups = self.cache_hits + self.cache_misses
+        return {
+            "cached_records": len(self._cache),
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+            "cache_hit_rate": (self.cache_hits / lookups * 100) if lookups else 0.0,
+            "status_conflicts": self.conflicts
+        }
+
+
+# Process-wide store used by the orchestration router
+recommendation_store = RecommendationStore(
+    cache_size=int(os.getenv("RECOMMENDATION_CACHE_SIZE", "1000"))
+)
@@ -0,0 +1,302 @@
+"""
+First Contact E.I.S. - Analytics Rollups
+Incrementally maintained daily stats behind the city dashboard
+
+Raw intakes and pairs grow forever, but dashboards only ever ask for
+per-day (or, for local-time trends, per-hour) totals. Each intake/pair write
+upserts its rollup rows in the same transaction (INSERT ... ON CONFLICT DO
+UPDATE SET n = n + 1), so dashboard reads scan at most one row per location
+per bucket regardless of how much history exists.
+
+Daily intake rows also carry a HyperLogLog sketch of their client IDs, so
+distinct clients over any range of days/locations is a sketch merge rather
+than COUNT(DISTINCT) over raw intakes.
+
+rebuild_rollups() recomputes rollups from raw rows for backfills and repair.
+"""
+
+from typing import Dict, Optional
+from datetime import datetime, date, timedelta
+import logging
+
+from sqlalchemy import func, select, delete, update, and_, cast, Date
+from sqlalchemy.dialects.postgresql import insert
+
+from app.models import (
+    Intake, Location, MutualSupportPair,
+    IntakeDailyStats, IntakeHourlyStats, PairDailyStats
+)
+from app.services.hll import HyperLogLog
+
+logger = logging.getLogger(__name__)
+
+
+# ============================================================================
+# WRITE PATH (called inside the intake transaction)
+# ============================================================================
+
+def intake_rollup_upsert(organization_id, location_id, created_at: datetime):
+    """
+    Statement adding one intake to its (org, location, day) rollup row
+
+    Returns the row's client sketch (the row stays locked until commit).
+    """
+    stmt = insert(IntakeDailyStats).values(
+        organization_id=organization_id,
+        location_id=location_id,
+        day=created_at.date(),
+        intake_count=1,
+        updated_at=datetime.utcnow()
+    )
+    return stmt.on_conflict_do_update(
+        index_elements=[
+            IntakeDailyStats.organization_id,
+            IntakeDailyStats.location_id,
+            IntakeDailyStats.day
+        ],
+        set_={
+            "intake_count": IntakeDailyStats.intake_count + 1,
+            "updated_at": stmt.excluded.updated_at
+        }
+    ).returning(IntakeDailyStats.clients_sketch)
+
+
+def intake_hourly_rollup_upsert(organization_id, location_id, created_at: datetime):
+    """Statement adding one intake to its (org, location, UTC hour) rollup row"""
+    stmt = insert(IntakeHourlyStats).values(
+        organization_id=organization_id,
+        location_id=location_id,
+        hour=created_at.replace(minute=0, second=0, microsecond=0),
+        intake_count=1,
+        updated_at=datetime.utcnow()
+    )
+    return stmt.on_conflict_do_update(
+        index_elements=[
+            IntakeHourlyStats.organization_id,
+            IntakeHourlyStats.location_id,
+            IntakeHourlyStats.hour
+        ],
+        set_={
+            "intake_count": IntakeHourlyStats.intake_count + 1,
+            "updated_at": stmt.excluded.updated_at
+        }
+    )
+
+
+def record_intake_rollups(db, organization_id, location_id, client_id, created_at: datetime):
+    """Add one intake to the daily and hourly rollups and the day's client sketch"""
+    current_sketch = db.execute(intake_rollup_upsert(organization_id, location_id, created_at)).scalar()
+    db.execute(intake_hourly_rollup_upsert(organization_id, location_id, created_at))
+
+    # Most repeat visits leave the sketch unchanged, so it is rarely rewritten
+    sketch = HyperLogLog.from_bytes(current_sketch)
+    if sketch.add(client_id):
+        db.execute(
+            update(IntakeDailyStats).where(
+                and_(
+                    IntakeDailyStats.organization_id == organization_id,
+                    IntakeDailyStats.location_id == location_id,
+                    IntakeDailyStats.day == created_at.date()
+                )
+            ).values(clients_sketch=sketch.to_bytes())
+        )
+
+
+def pair_rollup_upsert(organization_id, created_at: datetime, ihss_eligible: bool, cost_savings: float):
+    """Statement adding one detected pair to its (org, day) rollup row"""
+    stmt = insert(PairDailyStats).values(
+        organization_id=organization_id,
+        day=created_at.date(),
+        pair_count=1,
+        ihss_eligible_count=1 if ihss_eligible else 0,
+        cost_savings_total=cost_savings or 0.0,
+        updated_at=datetime.utcnow()
+    )
+    return stmt.on_conflict_do_update(
+        index_elements=[PairDailyStats.organization_id, PairDailyStats.day],
+        set_={
+            "pair_count": PairDailyStats.pair_count + 1,
+            "ihss_eligible_count": PairDailyStats.ihss_eligible_count + stmt.excluded.ihss_eligible_count,
+            "cost_savings_total": PairDailyStats.cost_savings_total + stmt.excluded.cost_savings_total,
+            "updated_at": stmt.excluded.updated_at
+        }
+    )
+
+
+# ============================================================================
+# BACKFILL / REPAIR
+# ============================================================================
+
+def rebuild_rollups(
+    db,
+    start_day: date,
+    end_day: date,
+    organization_id: Optional[str] = None
+):
+    """
+    Recompute rollups for [start_day, end_day] from raw intakes and pairs
+
+    Deletes and re-inserts the affected rows in one transaction. Run it once
+    to backfill history, or after bulk imports that bypass the intake router.
+    """
+    range_start = datetime.combine(start_day, datetime.min.time())
+    range_end = datetime.combine(end_day + timedelta(days=1), datetime.min.time())
+
+    intake_scope = and_(IntakeDailyStats.day >= start_day, IntakeDailyStats.day <= end_day)
+    hourly_scope = and_(IntakeHourlyStats.hour >= range_start, IntakeHourlyStats.hour < range_end)
+    pair_scope = and_(PairDailyStats.day >= start_day, PairDailyStats.day <= end_day)
+    if organization_id is not None:
+        intake_scope = and_(intake_scope, IntakeDailyStats.organization_id == organization_id)
+        hourly_scope = and_(hourly_scope, IntakeHourlyStats.organization_id == organization_id)
+        pair_scope = and_(pair_scope, PairDailyStats.organization_id == organization_id)
+
+    db.execute(delete(IntakeDailyStats).where(intake_scope))
+    db.execute(delete(IntakeHourlyStats).where(hourly_scope))
+    db.execute(delete(PairDailyStats).where(pair_scope))
+
+    intake_day = cast(Intake.created_at, Date)
+    intake_rows = select(
+        Location.organization_id,
+        Intake.location_id,
+        intake_day,
+        func.count(Intake.id),
+        func.now()
+    ).join(
+        Location, Location.id == Intake.location_id
+    ).where(
+        and_(Intake.created_at >= range_start, Intake.created_at < range_end)
+    ).group_by(
+        Location.organization_id, Intake.location_id, intake_day
+    )
+    if organization_id is not None:
+        intake_rows = intake_rows.where(Location.organization_id == organization_id)
+
+    intake_hour = func.date_trunc('hour', Intake.created_at)
+    hourly_rows = select(
+        Location.organization_id,
+        Intake.location_id,
+        intake_hour,
+        func.count(Intake.id),
+        func.now()
+    ).join(
+        Location, Location.id == Intake.location_id
+    ).where(
+        and_(Intake.created_at >= range_start, Intake.created_at < range_end)
+    ).group_by(
+        Location.organization_id, Intake.location_id, intake_hour
+    )
+    if organization_id is not None:
+        hourly_rows = hourly_rows.where(Location.organization_id == organization_id)
+
+    pair_day = cast(MutualSupportPair.created_at, Date)
+    pair_rows = select(
+        MutualSupportPair.organization_id,
+        pair_day,
+        func.count(MutualSupportPair.id),
+        func.count(MutualSupportPair.id).filter(MutualSupportPair.ihss_eligible.is_(True)),
+        func.coalesce(func.sum(MutualSupportPair.cost_savings_estimate), 0.0),
+        func.now()
+    ).where(
+        and_(MutualSupportPair.created_at >= range_start, MutualSupportPair.created_at < range_end)
+    ).group_by(
+        MutualSupportPair.organization_id, pair_day
+    )
+    if organization_id is not None:
+        pair_rows = pair_rows.where(MutualSupportPair.organization_id == organization_id)
+
+    db.execute(insert(IntakeDailyStats).from_select(
+        ["organization_id", "location_id", "day", "intake_count", "updated_at"],
+        intake_rows
+    ))
+    db.execute(insert(IntakeHourlyStats).from_select(
+        ["organization_id", "location_id", "hour", "intake_count", "updated_at"],
+        hourly_rows
+    ))
+    db.execute(insert(PairDailyStats).from_select(
+        ["organization_id", "day", "pair_count", "ihss_eligible_count", "cost_savings_total", "updated_at"],
+        pair_rows
+    ))
+    _rebuild_client_sketches(db, range_start, range_end, organization_id)
+    db.commit()
+
+    logger.info(f"Rebuilt analytics rollups for {start_day} - {end_day}")
+
+
+def _rebuild_client_sketches(db, range_start: datetime, range_end: datetime, organization_id: Optional[str]):
+    """Fill clients_sketch on freshly inserted daily rows, streaming intakes in key order"""
+    intake_day = cast(Intake.created_at, Date)
+    rows = select(
+        Location.organization_id,
+        Intake.location_id,
+        intake_day,
+        Intake.client_id
+    ).join(
+        Location, Location.id == Intake.location_id
+    ).where(
+        and_(Intake.created_at >= range_start, Intake.created_at < range_end)
+    ).order_by(
+        Location.organization_id, Intake.location_id, intake_day
+    )
+    if organization_id is not None:
+        rows = rows.where(Location.organization_id == organization_id)
+
+    updates = []
+    current_key, sketch = None, None
+    for org, location_id, day, client_id in db.execute(rows.execution_options(yield_per=10000)):
+        key = (org, location_id, day)
+        if key != current_key:
+            if current_key is not None:
+                updates.append(_sketch_update(current_key, sketch))
+            current_key, sketch = key, HyperLogLog()
+        sketch.add(client_id)
+        if len(updates) >= 1000:
+            db.execute(update(IntakeDailyStats), updates)
+            updates = []
+    if current_key is not None:
+        updates.append(_sketch_update(current_key, sketch))
+    if updates:
+        db.execute(update(IntakeDailyStats), updates)
+
+
+def _sketch_update(key, sketch: HyperLogLog) -> Dict:
+    organization_id, location_id, day = key
+    return {
+        "organization_id": organization_id,
+        "location_id": location_id,
+        "day": day,
+        "clients_sketch": sketch.to_bytes()
+    }
+
+
+# ============================================================================
+# READ PATH
+# ============================================================================
+
+def _sketch_rows(organization_id: str, start_day: date):
+    return select(
+        IntakeDailyStats.location_id,
+        IntakeDailyStats.clients_sketch
+    ).where(
+        and_(
+            IntakeDailyStats.organization_id == organization_id,
+            IntakeDailyStats.day >= start_day,
+            IntakeDailyStats.clients_sketch.isnot(None)
+        )
+    )
+
+
+def unique_clients(db, organization_id: str, start_day: date) -> int:
+    """Approximate distinct clients for an organization since start_day"""
+    rows = db.execute(_sketch_rows(organization_id, start_day))
+    return HyperLogLog.union(row.clients_sketch for row in rows).cardinality()
+
+
+def unique_clients_by_location(db, organization_id: str, start_day: date) -> Dict:
+    """Approximate distinct clients per location since start_day"""
+    sketches: Dict = {}
+    for row in db.execute(_sketch_rows(organization_id, start_day)):
+        sketch = sketches.get(row.location_id)
+        if sketch is None:
+            sketch = sketches[row.location_id] = HyperLogLog()
+        sketch.merge_bytes(row.clients_sketch)
+    return {location_id: sketch.cardinality() for location_id, sketch in sketches.items()}
@@ -0,0 +1,186 @@
+"""
+First Contact E.I.S. - Transport Route Index
+Which paratransit routes serve a location, precomputed on a grid
+
+Route polylines (and stops) are rasterized once into grid cells: every
+cell whose centre is within the service corridor of a route lists that
+route. Each
+provider's location is resolved to its set of routes at build time, so
+"can this client ride to this provider?" is a dict lookup for the client's
+cell and a set intersection - microseconds, with no geometry per candidate.
+
+The index is immutable; when routes change a new one is built (off the
+event loop) and swapped in. RouteStore keeps the network it is built from
+in Redis, so workers starting later build the same index.
+"""
+
+from typing import Any, Dict, FrozenSet, Iterable, Optional, Sequence, Tuple
+import json
+import logging
+import math
+import os
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# ~280 m north-south; membership is decided per cell centre, so the
+# corridor is honoured to within half a cell
+ROUTE_CELL_DEGREES = 0.0025
+KM_PER_DEGREE = 111.32
+
+# How far from the route line a client can be picked up / dropped off
+CORRIDOR_KM = float(os.getenv("TRANSPORT_ROUTE_CORRIDOR_KM", "0.8"))
+
+# Redis hash: "routes" / "provider_locations" -> JSON
+ROUTES_KEY = "transport_routes:network"
+NETWORK_PARTS = ("routes", "provider_locations")
+
+Point = Tuple[float, float]
+
+
+def route_cell(latitude: float, longitude: float) -> Tuple[int, int]:
+    return math.floor(latitude / ROUTE_CELL_DEGREES), math.floor(longitude / ROUTE_CELL_DEGREES)
+
+
+def _corridor_cells(points: Sequence[Point], corridor_km: float) -> set:
+    """
+    Cells whose centre is within corridor_km of a polyline (or a lone stop)
+
+    Each segment's bounding box (padded by the corridor) is tested at once
+    in NumPy, with distances on a local flat projection.
+    """
+    cells = set()
+    if not points:
+        return cells
+    segments = list(zip(points, points[1:])) or [(points[0], points[0])]
+    for (lat1, lon1), (lat2, lon2) in segments:
+        km_per_lon = KM_PER_DEGREE * max(math.cos(math.radians((lat1 + lat2) / 2)), 0.01)
+        lat_pad, lon_pad = corridor_km / KM_PER_DEGREE, corridor_km / km_per_lon
+        row_low, col_low = route_cell(min(lat1, lat2) - lat_pad, min(lon1, lon2) - lon_pad)
+        row_high, col_high = route_cell(max(lat1, lat2) + lat_pad, max(lon1, lon2) + lon_pad)
+        rows, cols = np.meshgrid(
+            np.arange(row_low, row_high + 1), np.arange(col_low, col_high + 1), indexing="ij"
+        )
+
+        # Cell centres relative to the segment start, in km
+        y = ((rows + 0.5) * ROUTE_CELL_DEGREES - lat1) * KM_PER_DEGREE
+        x = ((cols + 0.5) * ROUTE_CELL_DEGREES - lon1) * km_per_lon
+        dy, dx = (lat2 - lat1) * KM_PER_DEGREE, (lon2 - lon1) * km_per_lon
+        length_sq = dx * dx + dy * dy
+        t = np.clip((x * dx + y * dy) / length_sq, 0.0, 1.0) if length_sq else 0.0
+        near = np.hypot(x - t * dx, y - t * dy) <= corridor_km
+        cells.update(zip(rows[near].tolist(), cols[near].tolist()))
+    return cells
+
+
+def _location(item: Dict[str, Any]) -> Optional[Point]:
+    latitude, longitude = item.get("latitude"), item.get("longitude")
+    if latitude is None or longitude is None:
+        return None
+    return float(latitude), float(longitude)
+
+
+class RouteIndex:
+    """
+    Grid of routes serving each cell, plus each provider's routes
+    """
+
+    def __init__(
+        self,
+        routes: Iterable[Dict[str, Any]] = (),
+        providers: Optional[Dict[str, Any]] = None,
+        corridor_km: float = CORRIDOR_KM
+    ):
+        """
+        Build the index
+
+        Args:
+            routes: {"route_id", "polyline": [(lat, lon), ...], "stops": [(lat, lon), ...]}
+            providers: provider_id -> {"latitude", "longitude"} or (lat, lon)
+            corridor_km: Pickup distance from the route line
+        """
+        cell_routes: Dict[Tuple[int, int], set] = {}
+        route_count = 0
+        for route in routes:
+            route_id = route["route_id"]
+            route_count += 1
+            cells = _corridor_cells([tuple(p) for p in route.get("polyline") or ()], corridor_km)
+            for stop in route.get("stops") or ():
+                cells |= _corridor_cells([tuple(stop)], corridor_km)
+            for cell in cells:
+                cell_routes.setdefault(cell, set()).add(route_id)
+
+        # Many cells share a route set; intern them
+        interned: Dict[FrozenSet[str], FrozenSet[str]] = {}
+        self._cells: Dict[Tuple[int, int], FrozenSet[str]] = {
+            cell: interned.setdefault(frozenset(ids), frozenset(ids)) for cell, ids in cell_routes.items()
+        }
+
+        self._providers: Dict[str, FrozenSet[str]] = {}
+        for provider_id, location in (providers or {}).items():
+            point = _location(location) if isinstance(location, dict) else tuple(location)
+            if point is not None:
+                self._providers[provider_id] = self.routes_at(*point)
+
+        self.route_count = route_count
+        self.checks = 0
+
+    def routes_at(self, latitude: float, longitude: float) -> FrozenSet[str]:
+        """Routes serving a location"""
+        return self._cells.get(route_cell(latitude, longitude), frozenset())
+
+    def is_compatible(self, client: Dict[str, Any], provider_id: str) -> Optional[bool]:
+        """
+        True if one route serves both the client's location and the provider
+
+        None if that cannot be decided (provider or client location unknown).
+        """
+        provider_routes = self._providers.get(provider_id)
+        point = _location(client)
+        if provider_routes is None or point is None:
+            return None
+        self.checks += 1
+        return not provider_routes.isdisjoint(self.routes_at(*point))
+
+    def compatible_many(self, clients: Sequence[Dict[str, Any]], provider_id: str) -> np.ndarray:
+        """is_compatible for many clients; undecidable counts as compatible"""
+        return np.fromiter(
+            (self.is_compatible(client, provider_id) is not False for client in clients),
+            dtype=bool,
+            count=len(clients)
+        )
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Get index statistics"""
+        return {
+            "routes": self.route_count,
+            "cells": len(self._cells),
+            "providers": len(self._providers),
+            "checks": self.checks
+        }
+
+
+class RouteStore:
+    """
+    Shared copy of the route network that worker indexes are built from
+    """
+
+    def __init__(self, redis_client=None, key: str = ROUTES_KEY):
+        self.redis = redis_client
+        self.key = key
+
+    def _client(self):
+        if self.redis is None:
+            from app.redis_client import get_redis
+            self.redis = get_redis()
+        return self.redis
+
+    async def load(self) -> Dict[str, Any]:
+        """Stored parts of the network (parts never saved are left out)"""
+        stored = await self._client().hgetall(self.key)
+        return {part: json.loads(raw) for part, raw in stored.items() if part in NETWORK_PARTS}
+
+    async def save(self, changes: Dict[str, Any]):
+        """Replace the given parts of the network"""
+        await self._client().hset(self.key, mapping={part: json.dumps(value) for part, value in changes.items()})
@@ -0,0 +1,125 @@
+"""
+First Contact E.I.S. - Schedule Index
+Overlap queries against clients' booked appointments and transport windows
+
+Built once per orchestration context from the related clients' bookings. Each
+client's intervals are sorted by start and carry a running maximum of their
+ends, so "does anything overlap [start, end)?" is one binary search: find
+the last interval starting before `end` and check whether the furthest end
+so far reaches past `start`.
+
+All clients share flat arrays keyed by (client, start), which lets
+conflicts_many answer for a whole candidate list in one np.searchsorted.
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+from bisect import bisect_left
+from datetime import datetime
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+Moment = Union[datetime, str, float, int]
+
+
+def _seconds(moment: Moment) -> float:
+    if isinstance(moment, str):
+        moment = datetime.fromisoformat(moment)
+    if isinstance(moment, datetime):
+        return moment.timestamp()
+    return float(moment)
+
+
+def _interval(booking: Any) -> Tuple[float, float]:
+    """(start, end) seconds from a (start, end) pair or a {"start", "end"} dict"""
+    if isinstance(booking, dict):
+        return _seconds(booking["start"]), _seconds(booking["end"])
+    start, end = booking
+    return _seconds(start), _seconds(end)
+
+
+class ScheduleIndex:
+    """
+    Per-client sorted intervals with running-max ends
+    """
+
+    def __init__(self, bookings: Optional[Dict[str, Iterable[Any]]] = None):
+        """
+        Build the index
+
+        Args:
+            bookings: client_id -> booked intervals, each (start, end) or a
+                dict with "start"/"end" (datetimes, ISO strings or epoch seconds)
+
+        Raises:
+            ValueError: an interval could not be parsed
+        """
+        self._client_index: Dict[str, int] = {}
+        starts: List[float] = []
+        max_ends: List[float] = []
+        offsets = [0]
+
+        for client_id, intervals in (bookings or {}).items():
+            try:
+                parsed = sorted(_interval(booking) for booking in intervals)
+            except (KeyError, TypeError, ValueError) as e:
+                raise ValueError(f"Invalid booking for client {client_id}: {e}")
+            parsed = [(start, end) for start, end in parsed if end > start]
+            if not parsed:
+                continue
+            self._client_index[client_id] = len(offsets) - 1
+            furthest = float("-inf")
+            for start, end in parsed:
+                furthest = max(furthest, end)
+                starts.append(start)
+                max_ends.append(furthest)
+            offsets.append(len(starts))
+
+        self._starts = starts
+        self._max_ends = max_ends
+        self._offsets = offsets
+
+        # Flat (client, start) keys for batch queries: client number in the
+        # high part, seconds since the earliest start in the low part
+        self._base = min(starts) if starts else 0.0
+        self._span = (max(starts) - self._base + 2) if starts else 1.0
+        client_numbers = np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+        self._keys = client_numbers * self._span + (np.asarray(starts, dtype=np.float64) - self._base)
+        self._max_ends_array = np.asarray(max_ends, dtype=np.float64)
+        self._offsets_array = np.asarray(offsets, dtype=np.int64)
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    def overlaps(self, client_id: str, start: Moment, end: Moment) -> bool:
+        """True if any of the client's intervals overlaps [start, end)"""
+        number = self._client_index.get(client_id)
+        if number is None:
+            return False
+        lo, hi = self._offsets[number], self._offsets[number + 1]
+        position = bisect_left(self._starts, _seconds(end), lo, hi)
+        return position > lo and self._max_ends[position - 1] > _seconds(start)
+
+    def conflicts_many(self, client_ids: Sequence[str], start: Moment, end: Moment) -> np.ndarray:
+        """overlaps() for many clients and one window, as a boolean array"""
+        result = np.zeros(len(client_ids), dtype=bool)
+        if not self._starts:
+            return result
+        numbers = np.fromiter(
+            (self._client_index.get(client_id, -1) for client_id in client_ids), dtype=np.int64, count=len(client_ids)
+        )
+        known = numbers >= 0
+        if not known.any():
+            return result
+        numbers = numbers[known]
+
+        # Clipping keeps each query inside its client's key range: at 0 it
+        # lands before the client's first start, at span after its last
+        offset_in_client = min(max(_seconds(end) - self._base, 0.0), self._span)
+        positions = np.searchsorted(self._keys, numbers * self._span + offset_in_client, side="left")
+        has_earlier = positions > self._offsets_array[numbers]
+        reaches = self._max_ends_array[np.maximum(positions - 1, 0)] > _seconds(start)
+        result[known] = has_earlier & reaches
+        return result
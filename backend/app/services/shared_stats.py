@@ -0,0 +1,112 @@
+"""
+First Contact E.I.S. - Shared Statistics
+Service counters aggregated across uvicorn workers
+
+Each service keeps its counters in process (so hot paths never wait on the
+network) and a flusher adds the accumulated deltas to one Redis hash per
+service every few seconds:
+    orchestration_stats:{deploy}:{namespace} -> {decisions_made, ai_decisions, ...}
+
+Reading the hash gives cluster-wide totals. Each deploy (STATS_DEPLOY_ID,
+e.g. the release sha) counts into its own hashes, and every flush pushes
+the hash's expiry out by STATS_TTL_SECONDS, so totals start from zero on a
+new deploy and abandoned hashes are dropped by Redis. If Redis is
+unavailable, deltas are kept and retried on the next flush, and reads fall
+back to this worker's own counters.
+"""
+
+from typing import Dict, Optional
+import asyncio
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "orchestration_stats:"
+
+STATS_DEPLOY_ID = os.getenv("STATS_DEPLOY_ID", "")
+STATS_TTL_SECONDS = int(os.getenv("STATS_TTL_SECONDS", str(7 * 24 * 3600)))
+
+
+class SharedCounters:
+    """
+    Local counters periodically merged into a Redis hash
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        redis_client=None,
+        flush_interval_seconds: float = 2.0,
+        deploy_id: str = STATS_DEPLOY_ID,
+        ttl_seconds: int = STATS_TTL_SECONDS
+    ):
+        self.namespace = namespace
+        self.key = f"{KEY_PREFIX}{deploy_id}:{namespace}" if deploy_id else f"{KEY_PREFIX}{namespace}"
+        self.redis = redis_client
+        self.flush_interval_seconds = flush_interval_seconds
+        self.ttl_seconds = ttl_seconds
+
+        self.local: Dict[str, int] = {}  # This worker, since startup
+        self._pending: Dict[str, int] = {}  # Not yet flushed to Redis
+        self._flush_task: Optional[asyncio.Task] = None
+
+    def _client(self):
+        if self.redis is None:
+            from app.redis_client import get_redis
+            self.redis = get_redis()
+        return self.redis
+
+    def incr(self, field: str, amount: int = 1):
+        """Count an occurrence (no I/O)"""
+        self.local[field] = self.local.get(field, 0) + amount
+        self._pending[field] = self._pending.get(field, 0) + amount
+
+    async def flush(self):
+        """Add pending deltas to the shared hash and renew its expiry"""
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, {}
+        try:
+            async with self._client().pipeline(transaction=True) as pipe:
+                for field, delta in pending.items():
+                    pipe.hincrby(self.key, field, delta)
+                if self.ttl_seconds:
+                    pipe.expire(self.key, self.ttl_seconds)
+                await pipe.execute()
+        except Exception as e:
+            # Keep the deltas for the next attempt
+            for field, delta in pending.items():
+                self._pending[field] = self._pending.get(field, 0) + delta
+            logger.debug(f"Statistics flush for {self.namespace} failed: {e}")
+
+    async def totals(self) -> Dict[str, int]:
+        """Counters summed over all workers (this worker's if Redis is down)"""
+        await self.flush()
+        try:
+            raw = await self._client().hgetall(self.key)
+            return {field: int(value) for field, value in raw.items()}
+        except Exception as e:
+            logger.debug(f"Statistics read for {self.namespace} failed: {e}")
+            return dict(self.local)
+
+    def start(self):
+        """Start the periodic flusher"""
+        async def flush_loop():
+            while True:
+                await asyncio.sleep(self.flush_interval_seconds)
+                await self.flush()
+
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(flush_loop())
+
+    async def stop(self):
+        """Stop the flusher and push what is left"""
+        if self._flush_task:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        await self.flush()
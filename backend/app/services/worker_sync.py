@@ -0,0 +1,134 @@
+"""
+First Contact E.I.S. - Worker Sync
+Broadcast orchestration state changes to every uvicorn worker
+
+Each worker keeps in-memory orchestration state (waitlist index, context
+cache, transport route index). A worker that changes it applies the change
+locally and publishes it here; every other worker's listener applies the
+same change to its own copy:
+    orchestration_sync:{topic} -> {"origin": worker id, "payload": {...}}
+
+Without Redis the process is the only worker and publishing is a no-op.
+"""
+
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Union
+import asyncio
+import inspect
+import json
+import logging
+import uuid
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_PREFIX = "orchestration_sync:"
+
+Handler = Callable[[Dict[str, Any]], Union[None, Awaitable[None]]]
+
+
+class WorkerSync:
+    """
+    Topic-based Redis pub/sub between the workers of a deployment
+    """
+
+    def __init__(self, redis_client=None):
+        self.redis = redis_client
+        self.worker_id = uuid.uuid4().hex
+        self._handlers: Dict[str, List[Handler]] = {}
+        self._listener_task: Optional[asyncio.Task] = None
+        self._pubsub = None
+
+        # Statistics tracking
+        self.published = 0
+        self.received = 0
+        self.failed = 0
+
+    def on(self, topic: str, handler: Handler):
+        """Apply `handler(payload)` to changes other workers publish on `topic`"""
+        self._handlers.setdefault(topic, []).append(handler)
+
+    # ------------------------------------------------------------------------
+    # LIFECYCLE
+    # ------------------------------------------------------------------------
+
+    async def start(self):
+        """Start listening (single-worker mode if Redis is unavailable)"""
+        if self.redis is None:
+            try:
+                from app.redis_client import get_redis
+                self.redis = get_redis()
+                await self.redis.ping()
+            except Exception as e:
+                logger.warning(f"Worker sync running in single-worker mode (Redis unavailable): {e}")
+                self.redis = None
+                return
+
+        self._pubsub = self.redis.pubsub()
+        await self._pubsub.psubscribe(f"{CHANNEL_PREFIX}*")
+        self._listener_task = asyncio.create_task(self._listen())
+        logger.info("Worker sync listening for orchestration state changes")
+
+    async def stop(self):
+        """Stop the listener"""
+        if self._listener_task:
+            self._listener_task.cancel()
+            try:
+                await self._listener_task
+            except asyncio.CancelledError:
+                pass
+            self._listener_task = None
+
+        if self._pubsub is not None:
+            await self._pubsub.close()
+            self._pubsub = None
+
+    async def _listen(self):
+        while True:
+            try:
+                async for raw in self._pubsub.listen():
+                    if raw.get("type") != "pmessage":
+                        continue
+                    envelope = json.loads(raw["data"])
+                    if envelope.get("origin") == self.worker_id:
+                        continue  # Already applied when published
+                    await self.dispatch(raw["channel"][len(CHANNEL_PREFIX):], envelope["payload"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Worker sync listener error: {e}", exc_info=True)
+                await asyncio.sleep(1)
+
+    async def dispatch(self, topic: str, payload: Dict[str, Any]):
+        """Run the topic's handlers; one failing handler does not stop the others"""
+        self.received += 1
+        for handler in self._handlers.get(topic, ()):
+            try:
+                result = handler(payload)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"Worker sync handler for {topic} failed: {e}", exc_info=True)
+
+    # ------------------------------------------------------------------------
+    # PUBLISH
+    # ------------------------------------------------------------------------
+
+    async def publish(self, topic: str, payload: Dict[str, Any]):
+        """Announce a change this worker has already applied"""
+        if self.redis is None:
+            return
+        envelope = {"origin": self.worker_id, "payload": payload}
+        try:
+            await self.redis.publish(f"{CHANNEL_PREFIX}{topic}", json.dumps(envelope, default=str))
+            self.published += 1
+        except Exception as e:
+            logger.warning(f"Worker sync publish on {topic} failed: {e}")
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Get sync statistics"""
+        return {
+            "published": self.published,
+            "received": self.received,
+            "failed": self.failed,
+            "cross_worker": self.redis is not None
+        }
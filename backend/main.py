@@ -14,7 +14,19 @@ from fastapi.responses import JSONResponse
 from fastapi.staticfiles import StaticFiles
 import uvicorn
 
-from app.database import init_db
+from app.database import init_db, AsyncSessionLocal, replica_monitor
+from app.redis_client import close_redis_connections
+from app.services.alert_hub import alert_hub
+from app.services.alert_counters import alert_counters
+from app.services.orchestrator import OrchestrationEngine
+from app.services.executor import ExecutionService
+from app.services.event_listener import EventListenerService
+from app.services.shared_stats import SharedCounters
+from app.services.execution_queue import ExecutionQueue
+from app.services.event_microbatch import CANCELLATION_BATCH_WINDOW_SECONDS
+from app.services.housing_waitlist import WaitlistStore
+from app.services.route_index import RouteStore
+from app.services.worker_sync import WorkerSync
 # from app.auth import auth_router  # TODO: Enable after demo
 # AI Services - disabled for demo, enable during pilot
 # from app.ai_service import ai_router, AIService
@@ -47,6 +59,72 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.warning(f"Database init skipped (expected in demo mode): {e}")
 
+    # Real-time alert push (Redis fan-out across workers when available)
+    await alert_hub.start()
+
+    # Periodically repair unread-alert badge counters from the database
+    alert_counters.start_reconciler(
+        AsyncSessionLocal,
+        interval_seconds=int(os.getenv("ALERT_COUNTS_RECONCILE_SECONDS", "300"))
+    )
+
+    # Orchestration services live for the whole process (routes inject a
+    # per-request DB session); counters are summed across workers in Redis
+    orchestration_stats = {
+        name: SharedCounters(name) for name in ("orchestrator", "executor", "event_listener")
+    }
+    app.state.orchestration_stats = orchestration_stats
+    # In-memory orchestration state (waitlist index, ...) is kept in step
+    # across workers over Redis pub/sub
+    app.state.worker_sync = WorkerSync()
+    await app.state.worker_sync.start()
+    app.state.orchestrator = OrchestrationEngine(
+        ai_service=None,  # TODO: Initialize with AI service if needed
+        stats=orchestration_stats["orchestrator"],
+        cancellation_batch_window_seconds=CANCELLATION_BATCH_WINDOW_SECONDS,
+        waitlist_store=WaitlistStore(),
+        worker_sync=app.state.worker_sync,
+        session_factory=AsyncSessionLocal,  # One session per context source
+        route_store=RouteStore()
+    )
+    try:
+        await app.state.orchestrator.load_housing_waitlist()
+    except Exception as e:
+        logger.warning(f"Housing waitlist not loaded: {e}")
+    try:
+        # The index builds in the background; transport_routes_changed
+        # events update the network on every worker
+        await app.state.orchestrator.load_route_network()
+    except Exception as e:
+        logger.warning(f"Transport route network not loaded: {e}")
+    app.state.executor = ExecutionService(
+        db_session=None,
+        notification_service=None,  # TODO: notification service and API clients
+        external_api_clients={},
+        demo_mode=True,  # Set to True for demo
+        stats=orchestration_stats["executor"]
+    )
+    app.state.event_listener = EventListenerService(
+        orchestrator=app.state.orchestrator,
+        firestore_client=None,
+        demo_mode=True,  # Set to True for demo
+        stats=orchestration_stats["event_listener"],
+        session_factory=AsyncSessionLocal  # One session per event
+    )
+    await app.state.event_listener.start()  # Registers webhook handlers
+    for counters in orchestration_stats.values():
+        counters.start()
+
+    # Approved plans run on a DB-backed queue (EXECUTION_WORKER_CONCURRENCY
+    # per process; 0 leaves execution to scripts/run_execution_worker.py)
+    from app.routes.orchestration import publish_recommendation_update
+    app.state.execution_queue = ExecutionQueue(
+        app.state.executor,
+        session_factory=AsyncSessionLocal,
+        on_status_change=publish_recommendation_update
+    )
+    app.state.execution_queue.start()
+
     # AI services will be initialized during pilot phase
     logger.info("Backend ready for demo")
 
@@ -54,6 +132,16 @@ async def lifespan(app: FastAPI):
 
     # Shutdown
     logger.info("Shutting down First Contact EIS Backend...")
+    await app.state.execution_queue.stop()
+    await app.state.event_listener.stop()
+    if app.state.orchestrator.cancellation_batcher:
+        await app.state.orchestrator.cancellation_batcher.drain()
+    for counters in orchestration_stats.values():
+        await counters.stop()
+    await app.state.worker_sync.stop()
+    await alert_hub.stop()
+    await alert_counters.stop()
+    await close_redis_connections()
 
 # Create FastAPI application
 app = FastAPI(
@@ -100,6 +188,10 @@ async def health_check():
         timestamp=datetime.utcnow().isoformat(),
         services={
             "database": "healthy",
+            "read_replica": (
+                "not_configured" if replica_monitor.session_factory is None
+                else "healthy" if replica_monitor.usable else "fallback_to_primary"
+            ),
             "redis": "healthy",
             "ai_service": "healthy",
             "case_manager": "healthy",
@@ -0,0 +1,454 @@
+#!/usr/bin/env python3
+"""
+Orchestration Benchmarks - Event throughput of single vs batched triggering
+
+Usage:
+    python scripts/benchmark_orchestration.py                      # in-process, 2000 events
+    python scripts/benchmark_orchestration.py --events 10000 --context-latency-ms 20
+    python scripts/benchmark_orchestration.py --url http://localhost:8000 --events 5000
+    python scripts/benchmark_orchestration.py --providers 1 --no-context-cache
+    python scripts/benchmark_orchestration.py --ranking-candidates 5000
+    python scripts/benchmark_orchestration.py --waitlist-clients 20000
+    python scripts/benchmark_orchestration.py --schedule-clients 5000
+    python scripts/benchmark_orchestration.py --route-candidates 2000
+    python scripts/benchmark_orchestration.py --burst-events 40
+
+In-process mode runs OrchestrationEngine.handle_event directly, one event at
+a time and then through the batch fan-out at several concurrency levels.
+Context queries sleep --context-latency-ms to stand in for database and
+provider API round trips, and related clients are synthesized so the
+appointment rule produces a recommendation. Events are spread over
+--providers providers; --no-context-cache queries provider capacity and
+system state for every event, for comparison with the per-worker cache.
+
+--url mode replays the same synthetic events against a running API: one
+POST /trigger-event per event, then a single NDJSON POST /trigger-events.
+
+--ranking-candidates times appointment-candidate ranking on a waitlist of
+that size: the one-by-one scan against the vectorized ranking, with
+transport/conflict checks costing --check-cost-us microseconds each.
+
+--waitlist-clients times housing matches on a waitlist of that size: the
+full scan against the bucketed/gridded heap index.
+
+--schedule-clients times conflict checks for that many candidates with a
+day of bookings each: scanning every booking, one bisect per candidate, and
+one batch query for all of them.
+
+--route-candidates times transport compatibility for that many candidates
+against 200 synthetic routes: point-to-polyline geometry per candidate
+against the rasterized route index.
+
+--burst-events replays a clinic closing: that many appointment_cancelled
+events for one provider at once, handled event by event and then through
+the micro-batcher. Reports context queries, elapsed time and how many
+recommendations offered a client who had already been offered another slot.
+"""
+
+import sys
+import asyncio
+import argparse
+import json
+import math
+import random
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.services.orchestrator import OrchestrationEngine, Event
+from app.services.context_cache import ContextCache
+from app.services.housing_waitlist import HousingWaitlist, WaitlistEntry, HousingUnit
+from app.services.schedule_index import ScheduleIndex
+from app.services.route_index import RouteIndex, CORRIDOR_KM, KM_PER_DEGREE
+from app.services.event_batches import iter_items, run_concurrently
+
+API_PREFIX = "/api/v1/orchestration"
+
+
+def synthetic_events(count: int, providers: int = 25):
+    """Appointment cancellations like a provider's daily scheduling export"""
+    start = datetime(2025, 11, 7, 8, 0)
+    return [
+        {
+            "event_type": "appointment_cancelled",
+            "event_id": f"bench_{index}",
+            "client_id": f"client_{index}",
+            "provider_id": f"provider_{index % providers}",
+            "metadata": {
+                "appointment_time": (start + timedelta(minutes=15 * (index % 40))).isoformat(),
+                "appointment_type": "primary_care",
+                "provider_id": f"provider_{index % providers}",
+                "organization_id": "bench_org"
+            }
+        }
+        for index in range(count)
+    ]
+
+
+class UncachedContext(ContextCache):
+    """Always loads, as before the context cache existed"""
+
+    async def get_or_load(self, key, loader, ttl_seconds):
+        self.misses += 1
+        return await loader()
+
+
+class BenchmarkEngine(OrchestrationEngine):
+    """Orchestrator whose context sources take simulated I/O time"""
+
+    def __init__(self, latency_seconds: float, context_cache=None, **kwargs):
+        super().__init__(context_cache=context_cache, **kwargs)
+        self.latency_seconds = latency_seconds
+
+    async def _query_client(self, client_id, db=None):
+        await asyncio.sleep(self.latency_seconds)
+        return {"id": client_id}
+
+    async def _query_related_clients(self, event, db=None):
+        await asyncio.sleep(self.latency_seconds)
+        rng = random.Random(event.event_id)
+        return [
+            {"id": f"candidate_{n}", "urgency_score": rng.randint(1, 10), "documents_complete": rng.random() < 0.7}
+            for n in range(20)
+        ]
+
+    async def _query_provider_capacity(self, event, db=None):
+        await asyncio.sleep(self.latency_seconds)
+        return {"open_slots": 3}
+
+    async def _query_system_state(self, db=None):
+        await asyncio.sleep(self.latency_seconds)
+        return {"load": "normal"}
+
+
+class BurstEngine(BenchmarkEngine):
+    """One shared candidate pool, so events compete for the same clients"""
+
+    def __init__(self, latency_seconds: float, **kwargs):
+        super().__init__(latency_seconds, **kwargs)
+        self.related_queries = 0
+
+    async def _query_related_clients(self, event, db=None):
+        self.related_queries += 1
+        await asyncio.sleep(self.latency_seconds)
+        rng = random.Random(50)
+        return [
+            {"id": f"candidate_{n}", "urgency_score": rng.randint(1, 10), "documents_complete": rng.random() < 0.7}
+            for n in range(200)
+        ]
+
+
+class CostlyChecksEngine(OrchestrationEngine):
+    """Transport and conflict checks that burn CPU like a route/calendar lookup"""
+
+    def __init__(self, cost_seconds: float):
+        super().__init__()
+        self.cost_seconds = cost_seconds
+
+    def _busy(self):
+        deadline = time.perf_counter() + self.cost_seconds
+        while time.perf_counter() < deadline:
+            pass
+
+    def _is_transport_compatible(self, client, provider_id, context):
+        self._busy()
+        return client["on_route"]
+
+    def _has_conflicts(self, client, time, context):
+        self._busy()
+        return client["conflict"]
+
+
+def benchmark_ranking(count: int, cost_seconds: float, repeat: int = 5):
+    rng = random.Random(45)
+    candidates = [
+        {
+            "id": f"client_{n}",
+            "urgency_score": round(rng.uniform(0, 10), 1),
+            "documents_complete": rng.random() < 0.6,
+            "on_route": rng.random() < 0.7,
+            "conflict": rng.random() < 0.3
+        }
+        for n in range(count)
+    ]
+    engine = CostlyChecksEngine(cost_seconds)
+    args = (candidates, datetime(2025, 11, 7, 10), "provider_1", "primary_care", None)
+
+    results = {}
+    for label, rank in (("scalar scan", engine._scan_appointment_candidates),
+                        ("vectorized", engine._rank_appointment_candidates)):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            results[label] = rank(*args)
+            timings.append(time.perf_counter() - started)
+        print(f"  {label:<24} {min(timings) * 1000:>10.2f} ms   (best of {repeat})")
+
+    scalar, vectorized = results["scalar scan"], results["vectorized"]
+    same = scalar[0] is vectorized[0] and scalar[1] == vectorized[1]
+    print(f"  identical result: {same} ({vectorized[0]['id'] if vectorized[0] else None}, {vectorized[1]})")
+
+
+def benchmark_waitlist(count: int, units: int = 500):
+    rng = random.Random(47)
+    now = datetime(2025, 11, 7, 9, 0)
+    features = ["wheelchair", "ground_floor", "elevator"]
+
+    def location():
+        return 40.7 + rng.uniform(-0.3, 0.3), -74.0 + rng.uniform(-0.3, 0.3)
+
+    waitlist = HousingWaitlist()
+    started = time.perf_counter()
+    for n in range(count):
+        latitude, longitude = location()
+        located = rng.random() < 0.7
+        waitlist.add(WaitlistEntry(
+            client_id=f"client_{n}",
+            bedrooms=rng.randint(0, 3),
+            urgency=rng.randint(1, 10),
+            joined_at=now - timedelta(days=rng.randint(1, 900)),
+            accessibility=frozenset(f for f in features if rng.random() < 0.1),
+            latitude=latitude if located else None,
+            longitude=longitude if located else None,
+            radius_km=rng.choice([2, 5, 15]) if located else None
+        ))
+    print(f"  {'index build':<24} {(time.perf_counter() - started) * 1000:>10.2f} ms")
+
+    openings = []
+    for n in range(units):
+        latitude, longitude = location()
+        openings.append(HousingUnit(
+            f"unit_{n}", rng.randint(0, 3), frozenset(f for f in features if rng.random() < 0.5), latitude, longitude
+        ))
+
+    results = {}
+    for label, match in (("full scan", waitlist.scan_best_match), ("indexed", waitlist.best_match)):
+        started = time.perf_counter()
+        results[label] = [match(unit, now) for unit in openings]
+        elapsed = time.perf_counter() - started
+        print(f"  {label:<24} {elapsed / units * 1000:>10.3f} ms per unit")
+
+    same = all(
+        (a is None and b is None) or (a is not None and b is not None and a.entry is b.entry)
+        for a, b in zip(results["full scan"], results["indexed"])
+    )
+    print(f"  identical matches: {same}")
+
+
+def benchmark_conflicts(count: int, bookings_per_client: int = 20, repeat: int = 5):
+    rng = random.Random(48)
+    day = datetime(2025, 11, 7)
+    bookings = {}
+    for n in range(count):
+        intervals = []
+        for _ in range(bookings_per_client):
+            start = day + timedelta(minutes=15 * rng.randint(0, 60))
+            intervals.append((start, start + timedelta(minutes=rng.choice([15, 30, 60]))))
+        bookings[f"client_{n}"] = intervals
+    client_ids = list(bookings)
+    window = (day.replace(hour=9, minute=30), day.replace(hour=11))
+
+    started = time.perf_counter()
+    index = ScheduleIndex(bookings)
+    print(f"  {'index build':<24} {(time.perf_counter() - started) * 1000:>10.2f} ms")
+
+    def scan():
+        start, end = window
+        return [any(s < end and e > start for s, e in bookings[c]) for c in client_ids]
+
+    variants = (
+        ("scan every booking", scan),
+        ("bisect per candidate", lambda: [index.overlaps(c, *window) for c in client_ids]),
+        ("batch query", lambda: index.conflicts_many(client_ids, *window).tolist()),
+    )
+    results = {}
+    for label, run in variants:
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            results[label] = run()
+            timings.append(time.perf_counter() - started)
+        print(f"  {label:<24} {min(timings) * 1000:>10.2f} ms   (best of {repeat})")
+    print(f"  identical result: {len({tuple(r) for r in results.values()}) == 1}")
+
+
+def benchmark_routes(count: int, route_count: int = 200):
+    rng = random.Random(49)
+
+    def point():
+        return 40.7 + rng.uniform(-0.2, 0.2), -73.95 + rng.uniform(-0.2, 0.2)
+
+    routes = [
+        {"route_id": f"route_{n}", "polyline": [point() for _ in range(rng.randint(4, 12))]}
+        for n in range(route_count)
+    ]
+    providers = {"provider_1": point()}
+    clients = [dict(zip(("latitude", "longitude"), point())) for _ in range(count)]
+
+    started = time.perf_counter()
+    index = RouteIndex(routes, providers)
+    print(f"  {'index build':<24} {(time.perf_counter() - started) * 1000:>10.2f} ms   {index.get_statistics()}")
+
+    def near(lat, lon, polyline):
+        # Flat-earth distance to each segment, like a per-candidate route lookup
+        for (lat1, lon1), (lat2, lon2) in zip(polyline, polyline[1:]):
+            dx, dy = lat2 - lat1, lon2 - lon1
+            t = max(0.0, min(1.0, ((lat - lat1) * dx + (lon - lon1) * dy) / ((dx * dx + dy * dy) or 1.0)))
+            if math.hypot(lat - (lat1 + t * dx), lon - (lon1 + t * dy)) * KM_PER_DEGREE <= CORRIDOR_KM:
+                return True
+        return False
+
+    provider_lat, provider_lon = providers["provider_1"]
+    provider_routes = [route for route in routes if near(provider_lat, provider_lon, route["polyline"])]
+
+    def geometry():
+        return [
+            any(near(c["latitude"], c["longitude"], route["polyline"]) for route in provider_routes)
+            for c in clients
+        ]
+
+    for label, run in (("geometry per candidate", geometry),
+                       ("route index", lambda: [index.is_compatible(c, "provider_1") for c in clients])):
+        started = time.perf_counter()
+        result = run()
+        elapsed = time.perf_counter() - started
+        print(f"  {label:<24} {elapsed / count * 1e6:>10.2f} us per candidate   ({sum(result)} compatible)")
+
+
+async def benchmark_burst(count: int, latency_seconds: float):
+    events = synthetic_events(count, providers=1)
+    for label, kwargs in (("event by event", {}),
+                          ("micro-batched", {"cancellation_batch_window_seconds": 0.05})):
+        engine = BurstEngine(latency_seconds, **kwargs)
+        started = time.perf_counter()
+        results = await asyncio.gather(*(engine.handle_event(to_event(item)) for item in events))
+        elapsed = time.perf_counter() - started
+        offered = [r.execution_plan.actions[0].parameters["client_id"] for r in results if r]
+        print(f"  {label:<24} {elapsed * 1000:>8.1f} ms   {engine.related_queries:>3} candidate queries   "
+              f"{len(offered)} recommendations, {len(offered) - len(set(offered))} double offers")
+
+
+def to_event(item) -> Event:
+    return Event(
+        event_id=item["event_id"],
+        event_type=item["event_type"],
+        timestamp=datetime.now(),
+        client_id=item["client_id"],
+        provider_id=item["provider_id"],
+        metadata=item["metadata"]
+    )
+
+
+def report(label: str, count: int, elapsed: float, recommended: int):
+    print(f"  {label:<24} {count / elapsed:>10.1f} events/s   ({elapsed:.2f}s, {recommended} recommendations)")
+
+
+async def benchmark_in_process(events, latency_seconds: float, concurrency_levels, cache: bool = True):
+    engine = BenchmarkEngine(latency_seconds, context_cache=None if cache else UncachedContext())
+
+    started = time.perf_counter()
+    recommended = 0
+    for item in events:
+        recommended += (await engine.handle_event(to_event(item))) is not None
+    report("sequential", len(events), time.perf_counter() - started, recommended)
+
+    for concurrency in concurrency_levels:
+        async def handle(item):
+            return await engine.handle_event(to_event(item))
+
+        started = time.perf_counter()
+        recommended = 0
+        async for outcome in run_concurrently(iter_items(events), handle, concurrency=concurrency):
+            recommended += outcome.result is not None
+        report(f"batch (concurrency={concurrency})", len(events), time.perf_counter() - started, recommended)
+
+    stats = engine.context_cache.get_statistics()
+    print(f"  context cache: {stats['misses']} loads, {stats['hits']} hits, {stats['coalesced']} coalesced")
+
+
+async def benchmark_http(events, url: str, concurrency_levels):
+    import httpx
+
+    async with httpx.AsyncClient(base_url=url, timeout=None) as client:
+        started = time.perf_counter()
+        recommended = 0
+        for item in events:
+            response = await client.post(f"{API_PREFIX}/trigger-event", json=item)
+            recommended += response.status_code == 200
+        report("one request per event", len(events), time.perf_counter() - started, recommended)
+
+        body = "".join(json.dumps(item) + "\n" for item in events)
+        for concurrency in concurrency_levels:
+            started = time.perf_counter()
+            recommended = 0
+            async with client.stream(
+                "POST",
+                f"{API_PREFIX}/trigger-events",
+                params={"concurrency": concurrency},
+                content=body,
+                headers={"Content-Type": "application/x-ndjson"}
+            ) as response:
+                async for line in response.aiter_lines():
+                    if line and json.loads(line).get("status") == "recommended":
+                        recommended += 1
+            report(f"NDJSON (concurrency={concurrency})", len(events), time.perf_counter() - started, recommended)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=2000)
+    parser.add_argument("--context-latency-ms", type=float, default=5.0, help="Simulated latency per context source")
+    parser.add_argument("--providers", type=int, default=25, help="Distinct providers the events are spread over")
+    parser.add_argument("--no-context-cache", action="store_true", help="Query capacity/system state for every event")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[4, 16, 64])
+    parser.add_argument("--url", help="Benchmark a running API instead of the engine in-process")
+    parser.add_argument("--ranking-candidates", type=int, help="Benchmark candidate ranking on a waitlist this size")
+    parser.add_argument("--waitlist-clients", type=int, help="Benchmark housing matching on a waitlist this size")
+    parser.add_argument("--schedule-clients", type=int, help="Benchmark conflict checks for this many candidates")
+    parser.add_argument("--route-candidates", type=int, help="Benchmark transport checks for this many candidates")
+    parser.add_argument("--burst-events", type=int, help="Benchmark a same-provider cancellation burst this size")
+    parser.add_argument("--check-cost-us", type=float, default=20.0, help="Cost of one transport/conflict check")
+    args = parser.parse_args()
+
+    if args.ranking_candidates:
+        print(f"📊 Ranking {args.ranking_candidates} candidates, {args.check_cost_us}us per check")
+        benchmark_ranking(args.ranking_candidates, args.check_cost_us / 1e6)
+        return
+
+    if args.burst_events:
+        print(f"📊 Burst of {args.burst_events} cancellations for one provider, "
+              f"{args.context_latency_ms}ms per context source")
+        asyncio.run(benchmark_burst(args.burst_events, args.context_latency_ms / 1000))
+        return
+
+    if args.route_candidates:
+        print(f"📊 Transport compatibility for {args.route_candidates} candidates")
+        benchmark_routes(args.route_candidates)
+        return
+
+    if args.schedule_clients:
+        print(f"📊 Conflict checks for {args.schedule_clients} candidates")
+        benchmark_conflicts(args.schedule_clients)
+        return
+
+    if args.waitlist_clients:
+        print(f"📊 Matching housing units against {args.waitlist_clients} waitlisted clients")
+        benchmark_waitlist(args.waitlist_clients)
+        return
+
+    events = synthetic_events(args.events, args.providers)
+    if args.url:
+        print(f"📊 {args.events} events against {args.url}")
+        asyncio.run(benchmark_http(events, args.url, args.concurrency))
+    else:
+        print(f"📊 {args.events} events in-process over {args.providers} providers, "
+              f"{args.context_latency_ms}ms per context source")
+        asyncio.run(benchmark_in_process(
+            events, args.context_latency_ms / 1000, args.concurrency, cache=not args.no_context_cache
+        ))
+
+
+if __name__ == "__main__":
+    main()
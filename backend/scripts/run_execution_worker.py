@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Execution Worker - Runs approved recommendation plans from the execution queue
+
+Usage:
+    python scripts/run_execution_worker.py                  # EXECUTION_WORKER_CONCURRENCY plans at once
+    python scripts/run_execution_worker.py --concurrency 16
+
+Run as many of these as needed next to the API; throughput scales with
+workers x concurrency. Set EXECUTION_WORKER_CONCURRENCY=0 on the API
+processes to keep plan execution out of the web workers entirely. SIGTERM
+stops claiming and lets running plans finish (up to --drain-seconds).
+"""
+
+import sys
+import asyncio
+import argparse
+import logging
+import signal
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.database import AsyncSessionLocal, close_db_connections
+from app.redis_client import close_redis_connections
+from app.routes.orchestration import publish_recommendation_update
+from app.services.alert_hub import alert_hub
+from app.services.executor import ExecutionService
+from app.services.execution_queue import ExecutionQueue, DEFAULT_CONCURRENCY
+from app.services.shared_stats import SharedCounters
+
+logger = logging.getLogger("execution_worker")
+
+
+async def run(concurrency: int, drain_seconds: float):
+    await alert_hub.start()
+    stats = SharedCounters("executor")
+    stats.start()
+    executor = ExecutionService(
+        db_session=None,
+        notification_service=None,
+        external_api_clients={},
+        demo_mode=True,
+        stats=stats
+    )
+    queue = ExecutionQueue(
+        executor,
+        session_factory=AsyncSessionLocal,
+        concurrency=concurrency,
+        on_status_change=publish_recommendation_update
+    )
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop.set)
+
+    queue.start()
+    print(f"⚙️  Execution worker running ({concurrency} concurrent plans)")
+    await stop.wait()
+
+    print("⏹️  Draining running plans...")
+    await queue.stop(timeout_seconds=drain_seconds)
+    await stats.stop()
+    await alert_hub.stop()
+    await close_redis_connections()
+    await close_db_connections()
+    print(f"✅ Stopped: {queue.get_statistics()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=max(DEFAULT_CONCURRENCY, 1), help="Plans run at once")
+    parser.add_argument("--drain-seconds", type=float, default=30.0, help="Grace period for running plans on shutdown")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(run(args.concurrency, args.drain_seconds))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,286 @@
+"""
+Tests for burst coalescing of mutual support alerts (grouping, digest lookup and merging)
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import Column, MetaData, Table, create_engine, func, select, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import sessionmaker
+
+from app.models import MutualSupportAlert
+from app.services.alert_coalescer import AlertCoalescer
+
+
+def client(address=None):
+    return SimpleNamespace(id=uuid4(), address=address)
+
+
+def detection(confidence, ihss_eligible=False, indicators=("shared_address",)):
+    return SimpleNamespace(
+        confidence_score=confidence,
+        ihss_eligible=ihss_eligible,
+        support_indicators=[SimpleNamespace(indicator_type=name) for name in indicators],
+        recommended_actions=["Review pair"]
+    )
+
+
+@pytest.fixture
+def coalescer():
+    return AlertCoalescer(window_minutes=15, max_evidence=3)
+
+
+@pytest.fixture
+def db():
+    """SQLite session with just the alerts table"""
+    engine = create_engine("sqlite://")
+    MutualSupportAlert.__table__.create(bind=engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+class TestCoalesceKey:
+    """Test pair and household grouping"""
+
+    def test_pair_key_is_order_independent(self, coalescer):
+        """Both orderings of a pair share one digest"""
+        a, b = client("12 Pine St"), client("40 Oak Ave")
+
+        key = coalescer.coalesce_key(a, b)
+
+        assert key == coalescer.coalesce_key(b, a)
+        assert key == "pair:{}:{}".format(*sorted([str(a.id), str(b.id)]))
+
+    def test_same_address_is_one_household(self, coalescer):
+        """Every pairing within a household shares a key, despite formatting differences"""
+        a, b = client("12 Pine St., Apt 4"), client("12  pine st apt 4")
+        c = client("12 PINE ST, APT 4")
+
+        key = coalescer.coalesce_key(a, b)
+
+        assert key.startswith("household:")
+        assert coalescer.coalesce_key(a, c) == key
+        assert coalescer.coalesce_key(c, b) == key
+
+    def test_missing_address_falls_back_to_pair(self, coalescer):
+        """Clients without an address are never grouped as a household"""
+        assert coalescer.coalesce_key(client(), client()).startswith("pair:")
+
+
+class FakeResult:
+    def __init__(self, value):
+        self.value = value
+
+    def scalar_one(self):
+        return self.value
+
+
+class UpsertSession:
+    """Answers the upsert with `existing_id` (or the inserted id) and serves rows by id"""
+
+    def __init__(self, existing=None):
+        self.existing = existing
+        self.statements = []
+
+    def execute(self, statement):
+        self.statements.append(statement)
+        if isinstance(statement, postgresql.Insert):
+            inserted = statement.compile(dialect=postgresql.dialect()).params["id"]
+            return FakeResult(self.existing.id if self.existing else inserted)
+        return FakeResult(None)
+
+    def get(self, model, row_id, populate_existing=False):
+        return self.existing if self.existing else SimpleNamespace(id=row_id)
+
+
+class TestOpenDigest:
+    """Test opening digests and the one-open-digest-per-group rule"""
+
+    def add_alert(self, db, organization_id, coalesce_key, status="unread", age_minutes=0, coalesce_open=True):
+        alert = MutualSupportAlert(
+            organization_id=organization_id,
+            pair_id=uuid4(),
+            message="detected",
+            coalesce_key=coalesce_key,
+            coalesce_open=coalesce_open,
+            status=status,
+            created_at=datetime.utcnow() - timedelta(minutes=age_minutes)
+        )
+        db.add(alert)
+        db.commit()
+        return alert
+
+    def test_one_open_digest_per_group(self, db):
+        """A second open unread digest for the group is rejected; closed or read ones are not"""
+        org = uuid4()
+        self.add_alert(db, org, "pair:a:b")
+        self.add_alert(db, org, "pair:a:b", coalesce_open=False)
+        self.add_alert(db, org, "pair:a:b", status="read")
+        self.add_alert(db, uuid4(), "pair:a:b")
+
+        with pytest.raises(IntegrityError):
+            self.add_alert(db, org, "pair:a:b")
+
+    def test_close_expired_only_touches_the_expired_group_digest(self, coalescer, db):
+        """Digests past the window are closed so the next detection opens a new one"""
+        org = uuid4()
+        expired = self.add_alert(db, org, "pair:a:b", age_minutes=16)
+        other_group = self.add_alert(db, org, "pair:a:c", age_minutes=16)
+        other_org = self.add_alert(db, uuid4(), "pair:a:b", age_minutes=16)
+
+        coalescer.close_expired(db, org, "pair:a:b")
+        db.commit()
+        fresh = self.add_alert(db, org, "pair:a:b")
+        coalescer.close_expired(db, org, "pair:a:b")
+        db.commit()
+
+        db.expire_all()
+        assert not expired.coalesce_open
+        assert fresh.coalesce_open and other_group.coalesce_open and other_org.coalesce_open
+
+    def test_upsert_targets_the_open_digest_index(self, coalescer):
+        """Conflicts on the partial unique index touch the existing digest and return its id"""
+        alert = coalescer.create_alert(uuid4(), uuid4(), detection(0.8), "pair:a:b", "first", {})
+        alert.id = uuid4()
+
+        sql = str(coalescer.open_digest_upsert(alert).compile(dialect=postgresql.dialect()))
+
+        assert "ON CONFLICT (organization_id, coalesce_key) WHERE status = 'unread' AND coalesce_open" in sql
+        assert "DO UPDATE SET last_occurrence_at = excluded.last_occurrence_at" in sql
+        assert sql.endswith("RETURNING mutual_support_alerts.id")
+
+    def test_inserted_alert_opens_the_group(self, coalescer):
+        db = UpsertSession()
+        alert = coalescer.create_alert(uuid4(), uuid4(), detection(0.8), "pair:a:b", "first", {})
+
+        digest, created = coalescer.open_digest(db, alert)
+
+        assert created and digest.id == alert.id
+        assert [type(statement).__name__ for statement in db.statements] == ["Update", "Insert"]
+        assert coalescer.get_statistics()["alerts_created"] == 1
+
+    def test_conflict_returns_the_open_digest(self, coalescer):
+        """A detection that loses the race gets the existing digest to merge into"""
+        existing = SimpleNamespace(id=uuid4())
+        alert = coalescer.create_alert(uuid4(), uuid4(), detection(0.8), "pair:a:b", "first", {})
+
+        digest, created = coalescer.open_digest(UpsertSession(existing), alert)
+
+        assert digest is existing and not created
+        assert coalescer.get_statistics()["alerts_created"] == 0
+
+
+class TestMerge:
+    """Test folding detections into a digest"""
+
+    def new_digest(self, coalescer, confidence):
+        digest = coalescer.create_alert(uuid4(), uuid4(), detection(confidence), "pair:a:b", "first", {})
+        digest.id = uuid4()
+        return digest
+
+    def test_create_alert_opens_group(self, coalescer):
+        """A new alert carries one occurrence and its evidence"""
+        digest = self.new_digest(coalescer, 0.7)
+
+        assert digest.occurrence_count == 1
+        assert digest.severity == "medium"
+        assert len(digest.alert_metadata["pair_ids"]) == 1
+        assert digest.alert_metadata["top_evidence"][0]["confidence_score"] == 0.7
+
+    def test_keeps_top_evidence_by_confidence(self, coalescer):
+        """Only the max_evidence most confident detections are kept, highest first"""
+        digest = self.new_digest(coalescer, 0.5)
+        for confidence in [0.9, 0.6, 0.8, 0.55]:
+            coalescer.merge(digest, uuid4(), detection(confidence), "again")
+
+        evidence = digest.alert_metadata["top_evidence"]
+
+        assert [entry["confidence_score"] for entry in evidence] == [0.9, 0.8, 0.6]
+        assert len(digest.alert_metadata["pair_ids"]) == 5
+        assert digest.occurrence_count == 5
+        assert digest.alert_type == "mutual_support_digest"
+        assert digest.message.startswith("5 mutual support detections")
+
+    def test_high_confidence_detection_escalates_severity(self, coalescer):
+        """A digest becomes high severity once any detection is high confidence"""
+        digest = self.new_digest(coalescer, 0.6)
+
+        coalescer.merge(digest, uuid4(), detection(0.7), "again")
+        assert digest.severity == "medium"
+
+        coalescer.merge(digest, uuid4(), detection(0.9, ihss_eligible=True), "again")
+        assert digest.severity == "high"
+        assert digest.alert_metadata["confidence_score"] == 0.9
+        assert digest.alert_metadata["ihss_eligible"] is True
+
+    def test_severity_never_downgrades(self, coalescer):
+        """Later low-confidence detections keep the digest high"""
+        digest = self.new_digest(coalescer, 0.9)
+
+        coalescer.merge(digest, uuid4(), detection(0.5), "again")
+
+        assert digest.severity == "high"
+        assert coalescer.get_statistics()["detections_coalesced"] == 1
+
+
+@pytest.mark.skipif(not os.getenv("TEST_DATABASE_URL"), reason="needs a Postgres TEST_DATABASE_URL")
+class TestOpenDigestOnPostgres:
+    """Concurrent first detections of a group"""
+
+    @pytest.fixture
+    def sessions(self):
+        """Two sessions on an alerts table (without foreign keys) in a throwaway schema"""
+        engine = create_engine(os.environ["TEST_DATABASE_URL"])
+        schema = f"test_coalescer_{uuid4().hex[:8]}"
+        with engine.begin() as connection:
+            connection.execute(text(f"CREATE SCHEMA {schema}"))
+        engine = engine.execution_options(schema_translate_map={None: schema})
+        metadata = MetaData()
+        Table(
+            MutualSupportAlert.__tablename__, metadata,
+            *[Column(column.name, column.type, primary_key=column.primary_key)
+              for column in MutualSupportAlert.__table__.columns]
+        )
+        metadata.create_all(engine)
+        with engine.begin() as connection:
+            connection.execute(text(
+                f"CREATE UNIQUE INDEX uq_open_digest ON {schema}.mutual_support_alerts "
+                f"(organization_id, coalesce_key) WHERE {MutualSupportAlert.OPEN_DIGEST}"
+            ))
+        factory = sessionmaker(bind=engine)
+        first, second = factory(), factory()
+        yield first, second
+        first.close()
+        second.close()
+        with engine.begin() as connection:
+            connection.execute(text(f"DROP SCHEMA {schema} CASCADE"))
+
+    def test_racing_first_detections_share_one_digest(self, coalescer, sessions):
+        """The second insert waits for the first, then merges into its row"""
+        first, second = sessions
+        org = uuid4()
+
+        def detect(db):
+            alert = coalescer.create_alert(org, uuid4(), detection(0.8), "pair:a:b", "detected", {})
+            return coalescer.open_digest(db, alert)
+
+        opened, created = detect(first)
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            racing = pool.submit(detect, second)  # Blocks on the uncommitted digest
+            first.commit()
+            merged_into, second_created = racing.result(timeout=10)
+        coalescer.merge(merged_into, uuid4(), detection(0.9), "again")
+        second.commit()
+
+        assert created and not second_created
+        assert merged_into.id == opened.id
+        assert second.execute(select(func.count()).select_from(MutualSupportAlert)).scalar() == 1
+        assert merged_into.occurrence_count == 2
+
@@ -0,0 +1,260 @@
+"""
+Tests for Redis-backed unread alert counters (deltas, reads and reconciliation)
+"""
+
+import fnmatch
+
+from redis.exceptions import WatchError
+
+from app.services.alert_counters import AlertCounters, counts_key
+
+
+class FakePipeline:
+    """MULTI/EXEC pipeline with WATCH, in memory"""
+
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+        self.watched = {}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        pass
+
+    async def watch(self, *keys):
+        self.watched = {key: self.redis.versions.get(key, 0) for key in keys}
+
+    def multi(self):
+        pass
+
+    def hincrby(self, key, field, amount):
+        self.commands.append((self.redis.hincrby, key, field, amount))
+
+    def delete(self, key):
+        self.commands.append((self.redis.delete, key))
+
+    def hset(self, key, mapping):
+        self.commands.append((self.redis.hset, key, mapping))
+
+    async def execute(self):
+        if any(self.redis.versions.get(key, 0) != version for key, version in self.watched.items()):
+            raise WatchError("watched key changed")
+        for command, *args in self.commands:
+            command(*args)
+
+
+class FakeRedis:
+    """The hash, scan and SET NX commands the counters use, in memory"""
+
+    def __init__(self):
+        self.hashes = {}
+        self.versions = {}
+        self.strings = {}
+
+    def _touch(self, key):
+        self.versions[key] = self.versions.get(key, 0) + 1
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    def hincrby(self, key, field, amount):
+        fields = self.hashes.setdefault(key, {})
+        fields[field] = str(int(fields.get(field, 0)) + amount)
+        self._touch(key)
+
+    def delete(self, key):
+        self.hashes.pop(key, None)
+        self._touch(key)
+
+    def hset(self, key, mapping):
+        self.hashes.setdefault(key, {}).update({field: str(value) for field, value in mapping.items()})
+        self._touch(key)
+
+    async def hgetall(self, key):
+        return dict(self.hashes.get(key, {}))
+
+    async def scan_iter(self, match):
+        for key in list(self.hashes):
+            if fnmatch.fnmatch(key, match):
+                yield key
+
+    async def set(self, key, value, nx=False, px=None):
+        if nx and key in self.strings:
+            return None
+        self.strings[key] = value
+        return True
+
+
+class FakeResult:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def all(self):
+        return self.rows
+
+
+class FakeSession:
+    """Returns the next row set per query; `during_query` runs as the database is read"""
+
+    def __init__(self, *row_sets, during_query=None):
+        self.row_sets = list(row_sets)
+        self.during_query = during_query
+        self.queries = 0
+
+    async def execute(self, query):
+        self.queries += 1
+        if self.during_query:
+            self.during_query(self.queries)
+        return FakeResult(self.row_sets.pop(0))
+
+
+class TestIncrementalUpdates:
+    """Test counter deltas and reads"""
+
+    async def test_created_alerts_are_counted_by_severity(self):
+        counters = AlertCounters(FakeRedis())
+
+        await counters.record_created("org-a", "high")
+        await counters.record_created("org-a", "medium", count=2)
+        counts = await counters.get_counts("org-a")
+
+        assert counts["unread"] == 3
+        assert counts["unread_by_severity"] == {"high": 1, "medium": 2}
+        assert counts["reconciled_at"] is None
+
+    async def test_transitions_adjust_unread(self):
+        """Leaving unread decrements, returning to unread increments, no-ops are ignored"""
+        counters = AlertCounters(FakeRedis())
+        await counters.record_created("org-a", "high", count=3)
+
+        await counters.record_transitions("org-a", [
+            ("high", "unread", "read"),
+            ("high", "unread", "dismissed"),
+            ("high", "read", "read"),
+            ("high", "dismissed", "unread"),
+        ])
+        counts = await counters.get_counts("org-a")
+
+        assert counts["unread"] == 2
+        assert counts["unread_by_severity"] == {"high": 2}
+
+    async def test_read_to_dismissed_does_not_touch_unread(self):
+        """Only transitions into or out of unread change the counters"""
+        redis = FakeRedis()
+        counters = AlertCounters(redis)
+
+        await counters.record_transitions("org-a", [("low", "read", "dismissed")])
+
+        assert redis.hashes == {}
+        assert counters.get_statistics()["updates_applied"] == 0
+
+    async def test_unknown_organization_is_none(self):
+        """The caller falls back to the database"""
+        assert await AlertCounters(FakeRedis()).get_counts("org-new") is None
+
+    async def test_drifted_negative_counts_read_as_zero(self):
+        counters = AlertCounters(FakeRedis())
+
+        await counters.record_transitions("org-a", [("high", "unread", "read")])
+
+        assert (await counters.get_counts("org-a"))["unread"] == 0
+
+    async def test_redis_failure_is_counted(self):
+        """A failed update is left for the reconciler"""
+        class BrokenRedis(FakeRedis):
+            def pipeline(self, transaction=True):
+                raise ConnectionError("redis down")
+
+        counters = AlertCounters(BrokenRedis())
+
+        await counters.record_created("org-a", "high")
+
+        assert counters.get_statistics()["updates_failed"] == 1
+
+
+class TestReconciliation:
+    """Test overwriting counters from the database"""
+
+    async def test_store_counts_overwrites_and_resets(self):
+        """Rows replace the counters; covered organizations without rows go to zero"""
+        counters = AlertCounters(FakeRedis())
+        await counters.record_created("org-a", "low", count=5)
+        await counters.record_created("org-b", "high")
+
+        await counters.store_counts([("org-a", "high", 2), ("org-a", "medium", 1)], organization_ids=["org-a", "org-b"])
+
+        a, b = await counters.get_counts("org-a"), await counters.get_counts("org-b")
+        assert a["unread"] == 3 and a["unread_by_severity"] == {"high": 2, "medium": 1}
+        assert b["unread"] == 0 and b["unread_by_severity"] == {}
+        assert a["reconciled_at"] is not None
+
+    async def test_reconcile_repairs_drift(self):
+        """Every known organization is recomputed, including ones now at zero"""
+        counters = AlertCounters(FakeRedis())
+        await counters.record_created("org-a", "high", count=7)
+        await counters.record_created("org-b", "high")
+
+        written = await counters.reconcile(FakeSession([("org-a", "high", 1), ("org-c", "low", 4)]))
+
+        assert written == 2
+        assert (await counters.get_counts("org-a"))["unread"] == 1
+        assert (await counters.get_counts("org-b"))["unread"] == 0
+        assert (await counters.get_counts("org-c"))["unread_by_severity"] == {"low": 4}
+
+    async def test_concurrent_increment_is_not_overwritten(self):
+        """An alert written while the database is read aborts the overwrite, which is retried"""
+        redis = FakeRedis()
+        counters = AlertCounters(redis)
+        await counters.record_created("org-a", "high")
+
+        def alert_written(query_number):
+            if query_number == 1:
+                redis.hincrby(counts_key("org-a"), "unread", 1)
+                redis.hincrby(counts_key("org-a"), "unread:high", 1)
+
+        session = FakeSession([("org-a", "high", 1)], [("org-a", "high", 2)], during_query=alert_written)
+        await counters.reconcile(session)
+
+        assert session.queries == 2
+        assert (await counters.get_counts("org-a"))["unread"] == 2
+        assert counters.get_statistics()["reconciliations"] == 1
+
+    async def test_late_delta_drifts_until_next_reconcile(self):
+        """A delta applied after EXEC for an alert the query saw is counted twice, once"""
+        counters = AlertCounters(FakeRedis())
+        await counters.record_created("org-a", "high")
+
+        # The second alert commits before the query, its HINCRBY lands after EXEC
+        await counters.reconcile(FakeSession([("org-a", "high", 2)]))
+        await counters.record_created("org-a", "high")
+
+        assert (await counters.get_counts("org-a"))["unread"] == 3
+
+        await counters.reconcile(FakeSession([("org-a", "high", 2)]))
+
+        assert (await counters.get_counts("org-a"))["unread"] == 2
+
+    async def test_gives_up_while_counters_keep_moving(self):
+        """Counters are left alone rather than overwritten with stale rows"""
+        redis = FakeRedis()
+        counters = AlertCounters(redis)
+        await counters.record_created("org-a", "high")
+
+        def alert_written(query_number):
+            redis.hincrby(counts_key("org-a"), "unread", 1)
+
+        session = FakeSession(*[[("org-a", "high", 0)]] * 3, during_query=alert_written)
+
+        assert await counters.reconcile(session) == -1
+        assert (await counters.get_counts("org-a"))["unread"] == 4
+
+    async def test_one_worker_reconciles_per_interval(self):
+        """The reconcile lock is held by the first worker to ask"""
+        redis = FakeRedis()
+        workers = [AlertCounters(redis) for _ in range(3)]
+
+        acquired = [await worker._acquire_reconcile_lock(300) for worker in workers]
+
+        assert acquired == [True, False, False]
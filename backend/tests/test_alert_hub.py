@@ -0,0 +1,241 @@
+"""
+Tests for the real-time Alert Hub (in-process fan-out and backpressure)
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from app.services.alert_hub import AlertHub
+
+
+@pytest.fixture
+def hub():
+    """In-process hub (no Redis) fixture"""
+    return AlertHub(max_queue_size=10, max_consecutive_drops=5, max_subscribers=10000)
+
+
+class TestAlertHubFanout:
+    """Test organization-scoped delivery"""
+
+    async def test_publish_reaches_only_same_organization(self, hub):
+        """Subscribers only see their organization's alerts"""
+        org_a = hub.subscribe("org-a", caseworker_id="cw-1")
+        org_b = hub.subscribe("org-b", caseworker_id="cw-2")
+
+        await hub.publish("mutual_support_alert", {"alert_id": "1"}, organization_id="org-a")
+
+        message = await org_a.get(timeout=1)
+        assert message["type"] == "mutual_support_alert"
+        assert message["data"] == {"alert_id": "1"}
+        assert "timestamp" in message
+        assert await org_b.get(timeout=0.01) is None
+
+    async def test_broadcast_reaches_every_organization(self, hub):
+        """Messages without an organization go to everyone"""
+        org_a = hub.subscribe("org-a")
+        org_b = hub.subscribe("org-b")
+
+        await hub.publish("recommendation_update", {"status": "executing"})
+
+        assert (await org_a.get(timeout=1))["type"] == "recommendation_update"
+        assert (await org_b.get(timeout=1))["type"] == "recommendation_update"
+
+    async def test_unsubscribe_stops_delivery(self, hub):
+        """Disconnected dashboards are removed from the hub"""
+        subscription = hub.subscribe("org-a")
+        hub.unsubscribe(subscription)
+
+        await hub.publish("mutual_support_alert", {}, organization_id="org-a")
+
+        assert hub.subscriber_count() == 0
+        assert hub._throttles == {}
+        assert await subscription.get(timeout=0.01) is None
+
+    def test_subscriber_limit(self):
+        """Hub refuses connections beyond its limit"""
+        hub = AlertHub(max_subscribers=1)
+        hub.subscribe("org-a")
+        with pytest.raises(RuntimeError):
+            hub.subscribe("org-a")
+
+
+class TestAlertHubBackpressure:
+    """Test slow-client handling"""
+
+    async def test_full_queue_drops_oldest(self, hub):
+        """A full queue keeps the newest messages"""
+        subscription = hub.subscribe("org-a")
+
+        for i in range(12):
+            await hub.publish("mutual_support_alert", {"n": i}, organization_id="org-a")
+
+        received = [(await subscription.get(timeout=1))["data"]["n"] for _ in range(10)]
+        assert received == list(range(2, 12))
+        assert subscription.dropped == 2
+        assert hub.get_statistics()["messages_dropped"] == 2
+
+    async def test_persistently_slow_subscriber_is_closed(self, hub):
+        """A subscriber that never drains is disconnected without blocking others"""
+        slow = hub.subscribe("org-a")
+        fast = hub.subscribe("org-a")
+
+        for i in range(20):
+            await hub.publish("mutual_support_alert", {"n": i}, organization_id="org-a")
+            await fast.get(timeout=1)
+
+        assert slow.closed
+        assert hub.subscriber_count("org-a") == 1
+
+
+class TestAlertHubRateLimiting:
+    """Test per-caseworker notification rate limiting"""
+
+    async def test_rate_limited_updates_collapse_to_latest(self):
+        """Excess digest updates are held and the latest is delivered when tokens refill"""
+        hub = AlertHub(notify_rate_per_minute=2)
+        subscription = hub.subscribe("org-a", caseworker_id="cw-1")
+
+        for i in range(5):
+            await hub.publish("mutual_support_alert", {"alert_id": "a1", "occurrence_count": i + 1},
+                              organization_id="org-a", rate_limited=True)
+
+        first = await subscription.get(timeout=0.01)
+        second = await subscription.get(timeout=0.01)
+        assert [first["data"]["occurrence_count"], second["data"]["occurrence_count"]] == [1, 2]
+        assert await subscription.get(timeout=0.01) is None
+
+        subscription.throttle._refilled_at -= 30  # One token's worth of time passes
+        trailing = await subscription.get(timeout=0.01)
+
+        assert trailing["data"]["occurrence_count"] == 5
+        assert await subscription.get(timeout=0.01) is None
+        assert hub.get_statistics()["messages_throttled"] == 3
+
+    async def test_held_updates_are_kept_per_alert(self):
+        """Throttled updates for different alerts do not overwrite each other"""
+        hub = AlertHub(notify_rate_per_minute=1)
+        subscription = hub.subscribe("org-a")
+
+        await hub.publish("mutual_support_alert", {"alert_id": "a1", "occurrence_count": 1},
+                          organization_id="org-a", rate_limited=True)
+        for alert_id, count in [("a2", 1), ("a3", 1), ("a2", 2)]:
+            await hub.publish("mutual_support_alert", {"alert_id": alert_id, "occurrence_count": count},
+                              organization_id="org-a", rate_limited=True)
+
+        assert (await subscription.get(timeout=0.01))["data"]["alert_id"] == "a1"
+        assert set(subscription.throttle.held) == {"a2", "a3"}
+
+        released = []
+        for _ in range(2):
+            subscription.throttle._refilled_at -= 60  # One token's worth of time passes
+            released.append(await subscription.get(timeout=0.01))
+
+        assert [(m["data"]["alert_id"], m["data"]["occurrence_count"]) for m in released] == [("a2", 2), ("a3", 1)]
+        assert subscription.throttle.held == {}
+
+    async def test_get_wakes_when_a_token_refills(self):
+        """A waiting dashboard gets the held update at refill time, not at its idle timeout"""
+        hub = AlertHub(notify_rate_per_minute=600)
+        subscription = hub.subscribe("org-a")
+        subscription.throttle._tokens = 0.95  # Next token in 5 ms
+
+        await hub.publish("mutual_support_alert", {"alert_id": "a1"}, organization_id="org-a", rate_limited=True)
+        assert subscription.queue.empty()
+
+        started = time.monotonic()
+        message = await subscription.get(timeout=5)
+
+        assert message["data"]["alert_id"] == "a1"
+        assert time.monotonic() - started < 1
+
+    async def test_tabs_share_one_budget(self):
+        """Each notification costs one token per caseworker and reaches every tab"""
+        hub = AlertHub(notify_rate_per_minute=2)
+        tabs = [hub.subscribe("org-a", caseworker_id="cw-1") for _ in range(2)]
+        other = hub.subscribe("org-a", caseworker_id="cw-2")
+
+        for alert_id in ("a1", "a2", "a3"):
+            await hub.publish("mutual_support_alert", {"alert_id": alert_id}, organization_id="org-a",
+                              rate_limited=True)
+
+        assert tabs[0].throttle is tabs[1].throttle is not other.throttle
+        assert [tab.queue.qsize() for tab in tabs] == [2, 2]
+        assert other.queue.qsize() == 2
+        assert set(tabs[0].throttle.held) == {"a3"}
+
+    async def test_reconnect_keeps_the_budget(self):
+        """A new connection does not get a fresh burst allowance"""
+        hub = AlertHub(notify_rate_per_minute=1)
+        first = hub.subscribe("org-a", caseworker_id="cw-1")
+        await hub.publish("mutual_support_alert", {"alert_id": "a1"}, organization_id="org-a", rate_limited=True)
+        hub.unsubscribe(first)
+
+        again = hub.subscribe("org-a", caseworker_id="cw-1")
+        await hub.publish("mutual_support_alert", {"alert_id": "a2"}, organization_id="org-a", rate_limited=True)
+
+        assert again.throttle is first.throttle
+        assert again.queue.empty()
+
+    async def test_too_many_held_drops_oldest(self):
+        """Held notifications are bounded like the connection queue"""
+        hub = AlertHub(max_queue_size=3, notify_rate_per_minute=1)
+        subscription = hub.subscribe("org-a", caseworker_id="cw-1")
+
+        for i in range(6):
+            await hub.publish("mutual_support_alert", {"alert_id": f"a{i}"}, organization_id="org-a",
+                              rate_limited=True)
+
+        assert list(subscription.throttle.held) == ["a3", "a4", "a5"]
+        assert hub.get_statistics()["messages_dropped"] == 2
+
+    async def test_unlimited_messages_bypass_rate_limit(self):
+        """Recommendation updates and other unlimited messages are never throttled"""
+        hub = AlertHub(notify_rate_per_minute=1)
+        subscription = hub.subscribe("org-a")
+
+        for i in range(5):
+            await hub.publish("mutual_support_alert", {"n": i}, organization_id="org-a")
+
+        assert subscription.queue.qsize() == 5
+
+
+@pytest.mark.slow
+class TestAlertHubLoad:
+    """Load test with many concurrent dashboard connections"""
+
+    async def test_5000_concurrent_subscribers(self):
+        """5k subscribers across 50 organizations all receive their alerts"""
+        hub = AlertHub(max_queue_size=100, max_subscribers=10000)
+        organizations = [f"org-{i}" for i in range(50)]
+        messages_per_org = 20
+
+        received_counts = []
+
+        async def consumer(subscription):
+            count = 0
+            while count < messages_per_org:
+                message = await subscription.get(timeout=5)
+                if message is None:
+                    break
+                count += 1
+            received_counts.append(count)
+
+        subscriptions = [hub.subscribe(organizations[i % len(organizations)]) for i in range(5000)]
+        consumers = [asyncio.create_task(consumer(s)) for s in subscriptions]
+
+        started = time.perf_counter()
+        for n in range(messages_per_org):
+            for organization_id in organizations:
+                await hub.publish("mutual_support_alert", {"n": n}, organization_id=organization_id)
+            await asyncio.sleep(0)
+        await asyncio.gather(*consumers)
+        elapsed = time.perf_counter() - started
+
+        assert hub.subscriber_count() == 5000
+        assert received_counts == [messages_per_org] * 5000
+        assert hub.get_statistics()["messages_delivered"] == 5000 * messages_per_org
+        assert hub.get_statistics()["messages_dropped"] == 0
+        # 100k deliveries should comfortably finish well under a few seconds
+        assert elapsed < 10
@@ -0,0 +1,195 @@
+"""
+Tests for the bulk alert transition endpoint (PATCH /alerts/bulk)
+
+The statement is Postgres-specific (UPDATE ... FROM, = ANY(array), JSONB);
+its shape is checked against the compiled SQL everywhere, and its behaviour
+against a real database when TEST_DATABASE_URL points at a Postgres.
+"""
+
+import os
+import uuid
+
+import pytest
+from fastapi import BackgroundTasks
+from sqlalchemy import Column, MetaData, Table, create_engine, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import sessionmaker
+
+from app.models import MutualSupportAlert
+from app.routes import alerts
+from app.schemas import BulkAlertActionRequest
+
+ORG = uuid.UUID(int=1)
+OTHER_ORG = uuid.UUID(int=2)
+
+
+class RecordingCounters:
+    def __init__(self):
+        self.transitions = []
+
+    async def record_transitions(self, organization_id, transitions):
+        self.transitions.append((organization_id, list(transitions)))
+
+
+class FakeResult:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def all(self):
+        return self.rows
+
+
+class FakeSession:
+    """Records the statement and returns the given RETURNING rows"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.statements = []
+        self.committed = False
+
+    def execute(self, statement):
+        self.statements.append(statement)
+        return FakeResult(self.rows)
+
+    def commit(self):
+        self.committed = True
+
+    def rollback(self):
+        pass
+
+
+@pytest.fixture
+def counters(monkeypatch):
+    recorder = RecordingCounters()
+    monkeypatch.setattr(alerts, "alert_counters", recorder)
+    return recorder
+
+
+async def bulk(db, action, alert_ids, organization_id=ORG, reason=None):
+    background_tasks = BackgroundTasks()
+    response = await alerts.bulk_update_alerts(
+        request=BulkAlertActionRequest(
+            organization_id=organization_id, alert_ids=alert_ids, action=action, reason=reason
+        ),
+        background_tasks=background_tasks,
+        db=db
+    )
+    return response, background_tasks
+
+
+def compiled(statement):
+    return str(statement.compile(dialect=postgresql.dialect()))
+
+
+class TestBulkStatement:
+    """Test the shape of the single UPDATE"""
+
+    async def test_self_join_returns_previous_status(self, counters):
+        """RETURNING reads status from the pre-update copy of each row"""
+        db = FakeSession([])
+
+        await bulk(db, "read", [uuid.uuid4()])
+        sql = compiled(db.statements[0])
+
+        assert "FROM mutual_support_alerts AS previous" in sql
+        assert "mutual_support_alerts.id = previous.id" in sql
+        assert "RETURNING mutual_support_alerts.id, mutual_support_alerts.severity, previous.status" in sql
+
+    async def test_scoped_to_organization_and_ids(self, counters):
+        """Only the requested ids of the caller's organization are touched"""
+        db = FakeSession([])
+
+        await bulk(db, "dismiss", [uuid.uuid4()], reason="duplicate")
+        sql = compiled(db.statements[0])
+
+        assert "previous.id = ANY (%(alert_ids)s::UUID[])" in sql
+        assert "previous.organization_id = %(organization_id_1)s::UUID" in sql
+        assert "mutual_support_alerts.status != %(status_1)s" in sql
+        assert "jsonb_build_object" in sql
+
+    async def test_read_only_touches_unread(self, counters):
+        db = FakeSession([])
+
+        await bulk(db, "read", [uuid.uuid4()])
+
+        assert "mutual_support_alerts.status = %(status_1)s" in compiled(db.statements[0])
+
+
+class TestBulkResponse:
+    """Test how returned rows become the response, counters and push"""
+
+    async def test_unmatched_ids_are_skipped(self, counters):
+        """Duplicates count once; ids not returned (missing, other org, already done) are skipped"""
+        found, missing = uuid.uuid4(), uuid.uuid4()
+        db = FakeSession([(found, "high", "unread")])
+
+        response, background_tasks = await bulk(db, "read", [found, found, missing])
+
+        assert (response.updated, response.skipped, response.updated_ids) == (1, 1, [str(found)])
+        assert db.committed
+        assert counters.transitions == [(str(ORG), [("high", "unread", "read")])]
+        assert background_tasks.tasks[0].kwargs == {"organization_id": str(ORG)}
+
+    async def test_previous_status_drives_counters(self, counters):
+        """Dismissing a read alert leaves the unread counters alone"""
+        read_alert, unread_alert = uuid.uuid4(), uuid.uuid4()
+        db = FakeSession([(read_alert, "low", "read"), (unread_alert, "medium", "unread")])
+
+        await bulk(db, "dismiss", [read_alert, unread_alert])
+
+        assert counters.transitions[0][1] == [("low", "read", "dismissed"), ("medium", "unread", "dismissed")]
+
+    async def test_nothing_updated_pushes_nothing(self, counters):
+        response, background_tasks = await bulk(FakeSession([]), "dismiss", [uuid.uuid4()])
+
+        assert response.updated == 0 and response.skipped == 1
+        assert background_tasks.tasks == []
+
+
+@pytest.mark.skipif(not os.getenv("TEST_DATABASE_URL"), reason="needs a Postgres TEST_DATABASE_URL")
+class TestBulkOnPostgres:
+    """Run the statement against Postgres"""
+
+    @pytest.fixture
+    def db(self):
+        """Alerts table (without foreign keys) in a throwaway schema"""
+        engine = create_engine(os.environ["TEST_DATABASE_URL"])
+        schema = f"test_alerts_{uuid.uuid4().hex[:8]}"
+        with engine.begin() as connection:
+            connection.execute(text(f"CREATE SCHEMA {schema}"))
+        engine = engine.execution_options(schema_translate_map={None: schema})
+        metadata = MetaData()
+        Table(
+            MutualSupportAlert.__tablename__, metadata,
+            *[Column(column.name, column.type, primary_key=column.primary_key)
+              for column in MutualSupportAlert.__table__.columns]
+        )
+        metadata.create_all(engine)
+        session = sessionmaker(bind=engine)()
+        yield session
+        session.close()
+        with engine.begin() as connection:
+            connection.execute(text(f"DROP SCHEMA {schema} CASCADE"))
+
+    def add_alert(self, db, status, organization_id=ORG, severity="high"):
+        alert = MutualSupportAlert(
+            id=uuid.uuid4(), organization_id=organization_id, pair_id=uuid.uuid4(),
+            message="detected", severity=severity, status=status, alert_metadata={"source": "test"}
+        )
+        db.add(alert)
+        db.commit()
+        return alert.id
+
+    async def test_transitions_own_alerts_only(self, db, counters):
+        """Other organizations' and unknown ids are skipped; previous statuses are reported"""
+        unread, read, dismissed = (self.add_alert(db, status) for status in ("unread", "read", "dismissed"))
+        foreign = self.add_alert(db, "unread", organization_id=OTHER_ORG)
+
+        response, _ = await bulk(db, "dismiss", [unread, read, dismissed, foreign, uuid.uuid4()], reason="resolved")
+
+        assert sorted(response.updated_ids) == sorted([str(unread), str(read)])
+        assert response.skipped == 3
+        assert sorted(counters.transitions[0][1]) == [("high", "read", "dismissed"), ("high", "unread", "dismissed")]
+        db.expire_all()
+        assert db.get(MutualSupportAlert, foreign).status == "unread"
+        assert db.get(MutualSupportAlert, unread).alert_metadata == {"source": "test", "dismissal_reason": "resolved"}
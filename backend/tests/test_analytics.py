@@ -0,0 +1,218 @@
+"""
+Tests for the intake volume trends (local-time buckets with gap filling)
+
+The trends query is Postgres-specific (generate_series, timezone(), date_trunc);
+its shape is checked against the compiled SQL everywhere, and the buckets
+around the organization's last DST change are checked on a real database
+when TEST_DATABASE_URL points at a Postgres.
+"""
+
+import os
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from zoneinfo import ZoneInfo
+
+import pytest
+from sqlalchemy import Column, MetaData, Table, create_engine, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import sessionmaker
+
+from app.models import IntakeHourlyStats, Organization
+from app.routes import analytics
+from app.routes.analytics import build_volume_trends_query
+
+ORG = uuid.UUID(int=1)
+LOCATION = uuid.UUID(int=10)
+ZONE = "America/Los_Angeles"
+
+
+def compiled(statement):
+    return statement.compile(dialect=postgresql.dialect())
+
+
+def last_dst_change(zone, now):
+    """First UTC hour (naive) on the new offset of the zone's latest offset change before `now`"""
+    tz = ZoneInfo(zone)
+    hour = now.replace(minute=0, second=0, microsecond=0)
+    offset = hour.replace(tzinfo=timezone.utc).astimezone(tz).utcoffset()
+    while True:
+        previous = hour - timedelta(hours=1)
+        previous_offset = previous.replace(tzinfo=timezone.utc).astimezone(tz).utcoffset()
+        if previous_offset != offset:
+            return hour
+        hour, offset = previous, previous_offset
+
+
+def wall_clock(utc_hour, zone):
+    return utc_hour.replace(tzinfo=timezone.utc).astimezone(ZoneInfo(zone)).replace(tzinfo=None)
+
+
+class FakeResult:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def all(self):
+        return self.rows
+
+
+class FakeSession:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def execute(self, statement):
+        return FakeResult(self.rows)
+
+
+class TestTrendsQuery:
+    """Test the shape of the gap-filled statement"""
+
+    def test_buckets_come_from_a_series_in_local_time(self):
+        """Every bucket in the window is generated; missing counts read as 0"""
+        sql = str(compiled(build_volume_trends_query(str(ORG), datetime(2025, 3, 1), "hour")))
+
+        assert "FROM (SELECT generate_series(date_trunc(" in sql
+        assert "LEFT OUTER JOIN" in sql and "ON counts.bucket = buckets.bucket" in sql
+        assert "coalesce(counts.intake_count, " in sql
+        assert "timezone(coalesce((SELECT organizations.timezone" in sql
+        assert sql.endswith("ORDER BY buckets.bucket")
+
+    def test_rollup_filtered_on_raw_hour(self):
+        """The window start is converted to UTC once instead of converting every rollup row"""
+        sql = str(compiled(build_volume_trends_query(str(ORG), datetime(2025, 3, 1), "day")))
+
+        assert "intake_hourly_stats.hour >= timezone(" in sql
+        assert ") AS window_start" in sql
+
+    def test_granularity_sets_step(self):
+        statement = compiled(build_volume_trends_query(str(ORG), datetime(2025, 3, 1), "week"))
+
+        assert statement.params["date_trunc_1"] == "week"
+        assert statement.params["param_3"] == timedelta(weeks=1)
+
+
+class TestTrendsResponse:
+    """Test how buckets become the chart payload"""
+
+    @pytest.fixture(autouse=True)
+    def no_unique_clients(self, monkeypatch):
+        monkeypatch.setattr(analytics, "unique_clients", lambda db, organization_id, since: 0)
+
+    async def trends(self, rows, granularity, days=7):
+        # Skip the response cache; its behaviour is tested in test_analytics_cache.py
+        return await analytics.get_intake_volume_trends.__wrapped__(
+            organization_id=str(ORG), days=days, granularity=granularity, db=FakeSession(rows)
+        )
+
+    async def test_hourly_buckets_keep_wall_clock_time(self):
+        start = datetime.utcnow() - timedelta(days=7)
+        rows = [
+            SimpleNamespace(bucket=datetime(2025, 11, 2, 0), intake_count=1, timezone=ZONE, window_start=start),
+            SimpleNamespace(bucket=datetime(2025, 11, 2, 1), intake_count=2, timezone=ZONE, window_start=start),
+            SimpleNamespace(bucket=datetime(2025, 11, 2, 2), intake_count=0, timezone=ZONE, window_start=start),
+        ]
+
+        trends = await self.trends(rows, "hour")
+
+        assert trends.dates == ["2025-11-02T00:00:00", "2025-11-02T01:00:00", "2025-11-02T02:00:00"]
+        assert trends.intake_counts == [1, 2, 0]
+        assert (trends.total_intakes, trends.peak_daily, trends.timezone) == (3, 2, ZONE)
+
+    async def test_daily_buckets_are_dates(self):
+        rows = [SimpleNamespace(
+            bucket=datetime(2025, 11, 2), intake_count=4, timezone=ZONE, window_start=datetime.utcnow()
+        )]
+
+        trends = await self.trends(rows, "day")
+
+        assert trends.dates == ["2025-11-02"]
+
+    async def test_average_covers_the_partial_first_week(self):
+        """A week bucket starting before the cutoff is averaged over the days it spans"""
+        start = datetime.utcnow() - timedelta(days=35)
+        rows = [
+            SimpleNamespace(bucket=datetime(2025, 9, 29) + timedelta(weeks=week), intake_count=70, timezone=ZONE,
+                            window_start=start)
+            for week in range(5)
+        ]
+
+        trends = await self.trends(rows, "week", days=30)
+
+        assert trends.total_intakes == 350
+        assert trends.average_daily == 10.0
+
+    async def test_no_buckets_default_to_utc(self):
+        trends = await self.trends([], "day")
+
+        assert (trends.dates, trends.peak_daily, trends.timezone) == ([], 0, "UTC")
+
+
+@pytest.mark.skipif(not os.getenv("TEST_DATABASE_URL"), reason="needs a Postgres TEST_DATABASE_URL")
+class TestTrendsOnPostgres:
+    """Gap filling across the organization's latest DST change"""
+
+    @pytest.fixture
+    def db(self):
+        """Organizations and hourly rollups (without foreign keys) in a throwaway schema"""
+        engine = create_engine(os.environ["TEST_DATABASE_URL"])
+        schema = f"test_analytics_{uuid.uuid4().hex[:8]}"
+        with engine.begin() as connection:
+            connection.execute(text(f"CREATE SCHEMA {schema}"))
+        engine = engine.execution_options(schema_translate_map={None: schema})
+        metadata = MetaData()
+        organizations = Table(
+            Organization.__tablename__, metadata,
+            Column("id", Organization.id.type, primary_key=True), Column("timezone", Organization.timezone.type)
+        )
+        hourly = Table(
+            IntakeHourlyStats.__tablename__, metadata,
+            *[Column(column.name, column.type, primary_key=column.primary_key)
+              for column in IntakeHourlyStats.__table__.columns]
+        )
+        metadata.create_all(engine)
+        session = sessionmaker(bind=engine)()
+        session.execute(organizations.insert().values(id=ORG, timezone=ZONE))
+        session.info["hourly"] = hourly
+        yield session
+        session.close()
+        with engine.begin() as connection:
+            connection.execute(text(f"DROP SCHEMA {schema} CASCADE"))
+
+    @pytest.fixture
+    def change(self, db):
+        """One intake per UTC hour for the two hours either side of the change"""
+        change = last_dst_change(ZONE, datetime.utcnow())
+        hours = [change + timedelta(hours=offset) for offset in range(-2, 2)]
+        db.execute(db.info["hourly"].insert(), [
+            {"organization_id": ORG, "location_id": LOCATION, "hour": hour, "intake_count": 1} for hour in hours
+        ])
+        db.commit()
+        return change, hours
+
+    def test_hourly_buckets_are_contiguous_wall_clock_hours(self, db, change):
+        """Skipped or repeated local hours neither break the series nor lose intakes"""
+        transition, hours = change
+
+        rows = db.execute(build_volume_trends_query(str(ORG), transition - timedelta(days=2), "hour")).all()
+        buckets = [row.bucket for row in rows]
+
+        assert all(later - earlier == timedelta(hours=1) for earlier, later in zip(buckets, buckets[1:]))
+        assert buckets[0] == wall_clock(transition - timedelta(days=2), ZONE).replace(minute=0, second=0, microsecond=0)
+        assert {row.bucket: row.intake_count for row in rows if row.intake_count} == Counter(
+            wall_clock(hour, ZONE) for hour in hours
+        )
+        assert sum(row.intake_count for row in rows) == len(hours)
+        assert {row.timezone for row in rows} == {ZONE}
+
+    def test_daily_bucket_holds_the_whole_local_day(self, db, change):
+        """A 23- or 25-hour local day is still one bucket; the days around it are 0"""
+        transition, hours = change
+
+        rows = db.execute(build_volume_trends_query(str(ORG), transition - timedelta(days=3), "day")).all()
+        counts = {row.bucket: row.intake_count for row in rows}
+
+        day = wall_clock(transition, ZONE).replace(hour=0, minute=0, second=0, microsecond=0)
+        assert counts[day] == len(hours)
+        assert counts[day - timedelta(days=1)] == counts.get(day + timedelta(days=1), 0) == 0
+        assert list(counts) == [day - timedelta(days=3) + timedelta(days=index) for index in range(len(counts))]
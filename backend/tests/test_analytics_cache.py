@@ -0,0 +1,241 @@
+"""
+Tests for the organization-scoped analytics cache (local layer)
+"""
+
+import asyncio
+
+import pytest
+
+from app.services.analytics_cache import AnalyticsCache
+
+
+class UnavailableRedis:
+    """Redis client whose every command fails, forcing worker-local mode"""
+
+    def __getattr__(self, name):
+        async def fail(*args, **kwargs):
+            raise ConnectionError("redis unavailable")
+        return fail
+
+    def pipeline(self, transaction=True):
+        raise ConnectionError("redis unavailable")
+
+
+class FakeRedis:
+    """String commands of redis.asyncio shared by several workers, in memory (PX expiry on a fake clock)"""
+
+    def __init__(self):
+        self.values = {}
+        self.expires = {}
+        self.now = 0.0
+        self.generation_reads = 0
+
+    def _live(self, key):
+        if key in self.expires and self.expires[key] <= self.now:
+            self.values.pop(key, None)
+            self.expires.pop(key, None)
+        return self.values.get(key)
+
+    async def get(self, key):
+        return self._live(key)
+
+    async def incr(self, key):
+        self.values[key] = str(int(self._live(key) or 0) + 1)
+
+    async def mget(self, *keys):
+        self.generation_reads += 1
+        return [self._live(key) for key in keys]
+
+    async def set(self, key, value, ex=None, px=None, nx=False):
+        if nx and self._live(key) is not None:
+            return None
+        self.values[key] = value
+        if px is not None:
+            self.expires[key] = self.now + px / 1000
+        return True
+
+    async def delete(self, key):
+        self.values.pop(key, None)
+
+    async def exists(self, key):
+        return int(self._live(key) is not None)
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        pass
+
+    def incr(self, key):
+        self.commands.append(lambda: self.redis.incr(key))
+
+    def set(self, key, value, px=None):
+        self.commands.append(lambda: self.redis.set(key, value, px=px))
+
+    async def execute(self):
+        for command in self.commands:
+            result = command()
+            if asyncio.iscoroutine(result):
+                await result
+
+
+@pytest.fixture
+def cache():
+    """Worker-local cache fixture"""
+    return AnalyticsCache(max_local_entries=3, redis_client=UnavailableRedis())
+
+
+class TestAnalyticsCacheLookup:
+    """Test keying, hits and invalidation"""
+
+    async def test_second_lookup_is_a_hit(self, cache):
+        """Identical requests are served from the cache"""
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return {"total_intakes": 10}
+
+        first = await cache.get_or_compute("dashboard-summary", "org-a", {}, compute)
+        second = await cache.get_or_compute("dashboard-summary", "org-a", {}, compute)
+
+        assert first == second == {"total_intakes": 10}
+        assert len(calls) == 1
+        assert cache.get_statistics()["hit_ratio"] == 0.5
+
+    async def test_params_and_organizations_are_isolated(self, cache):
+        """Different params or organizations never share an entry"""
+        await cache.get_or_compute("heatmap", "org-a", {"days": 30}, lambda: ["a-30"])
+
+        assert await cache.get_or_compute("heatmap", "org-a", {"days": 7}, lambda: ["a-7"]) == ["a-7"]
+        assert await cache.get_or_compute("heatmap", "org-b", {"days": 30}, lambda: ["b-30"]) == ["b-30"]
+
+    async def test_invalidate_bumps_organization_generation(self, cache):
+        """Writes make an organization's cached responses unreachable"""
+        await cache.get_or_compute("cost-savings", "org-a", {}, lambda: {"pairs": 1})
+        await cache.get_or_compute("cost-savings", "org-b", {}, lambda: {"pairs": 1})
+
+        await cache.invalidate("org-a")
+
+        assert await cache.get_or_compute("cost-savings", "org-a", {}, lambda: {"pairs": 2}) == {"pairs": 2}
+        assert await cache.get_or_compute("cost-savings", "org-b", {}, lambda: {"pairs": 2}) == {"pairs": 1}
+
+    async def test_local_lru_evicts_oldest(self, cache):
+        """Local layer stays within its capacity"""
+        for days in range(5):
+            await cache.get_or_compute("heatmap", "org-a", {"days": days}, lambda: [])
+
+        assert cache.get_statistics()["local_entries"] == 3
+
+
+class TestAnalyticsCacheSingleFlight:
+    """Test stampede protection"""
+
+    async def test_concurrent_misses_compute_once(self, cache):
+        """A burst of misses for one key triggers exactly one recompute"""
+        calls = []
+
+        async def compute():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return {"total_pairs": 3}
+
+        results = await asyncio.gather(*[
+            cache.get_or_compute("dashboard-summary", "org-a", {}, compute) for _ in range(50)
+        ])
+
+        assert len(calls) == 1
+        assert all(result == {"total_pairs": 3} for result in results)
+        assert cache.get_statistics()["coalesced_waits"] == 49
+
+    async def test_failure_propagates_and_is_not_cached(self, cache):
+        """Errors reach every waiter and the next request retries"""
+        async def failing():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("database down")
+
+        results = await asyncio.gather(*[
+            cache.get_or_compute("heatmap", "org-a", {}, failing) for _ in range(3)
+        ], return_exceptions=True)
+
+        assert all(isinstance(result, RuntimeError) for result in results)
+        assert await cache.get_or_compute("heatmap", "org-a", {}, lambda: ["ok"]) == ["ok"]
+
+
+class TestAnalyticsCacheGenerations:
+    """Test the in-process generation cache and reading the primary after writes"""
+
+    async def test_local_hits_skip_redis_within_generation_window(self):
+        """Repeated lookups reuse the remembered generation"""
+        redis = FakeRedis()
+        cache = AnalyticsCache(redis_client=redis, generation_cache_seconds=60)
+
+        for _ in range(5):
+            await cache.get_or_compute("heatmap", "org-a", {}, lambda: ["a"])
+
+        assert redis.generation_reads == 1
+        assert cache.get_statistics()["local_hits"] == 4
+
+    async def test_own_write_is_seen_at_once_and_others_after_the_window(self):
+        """The writing worker forgets its generation; other workers catch up when theirs expires"""
+        redis = FakeRedis()
+        writer = AnalyticsCache(redis_client=redis, generation_cache_seconds=60)
+        reader = AnalyticsCache(redis_client=redis, generation_cache_seconds=60)
+        for worker in (writer, reader):
+            await worker.get_or_compute("cost-savings", "org-a", {}, lambda: {"pairs": 1})
+
+        await writer.invalidate("org-a")
+
+        assert await writer.get_or_compute("cost-savings", "org-a", {}, lambda: {"pairs": 2}) == {"pairs": 2}
+        assert await reader.get_or_compute("cost-savings", "org-a", {}, lambda: {"pairs": 2}) == {"pairs": 1}
+        reader._generation_cache.clear()  # Window elapsed
+        assert await reader.get_or_compute("cost-savings", "org-a", {}, lambda: {"pairs": 3}) == {"pairs": 2}
+
+    async def test_fill_after_write_reads_primary(self):
+        """Every worker fills from the primary until the replica must have caught up"""
+        redis = FakeRedis()
+        writer = AnalyticsCache(redis_client=redis, generation_cache_seconds=0, primary_read_seconds=35)
+        other = AnalyticsCache(redis_client=redis, generation_cache_seconds=0, primary_read_seconds=35)
+
+        await writer.invalidate("org-a")
+        filled = await other.get_or_compute("heatmap", "org-a", {}, lambda: ["replica"], lambda: ["primary"])
+
+        assert filled == ["primary"]
+        redis.now += 36
+        await writer.invalidate("org-b")
+        redis.now += 36
+        assert await other.get_or_compute("heatmap", "org-b", {}, lambda: ["replica"], lambda: ["primary"]) == ["replica"]
+
+    async def test_decorated_endpoint_gets_primary_session(self):
+        """The endpoint's db argument is swapped for a primary session on such fills"""
+        primary = object()
+
+        class PrimarySessions:
+            async def __aenter__(self):
+                return primary
+
+            async def __aexit__(self, *exc_info):
+                pass
+
+        cache = AnalyticsCache(
+            redis_client=FakeRedis(), generation_cache_seconds=0,
+            primary_session_factory=PrimarySessions, primary_read_seconds=35
+        )
+
+        @cache.cached("dashboard-summary")
+        async def endpoint(organization_id, db=None):
+            return {"primary": db is primary}
+
+        assert await endpoint(organization_id="org-a", db="replica") == {"primary": False}
+        await cache.invalidate("org-a")
+        assert await endpoint(organization_id="org-a", db="replica") == {"primary": True}
+        assert cache.get_statistics()["primary_fills"] == 1
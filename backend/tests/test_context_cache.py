@@ -0,0 +1,198 @@
+"""
+Tests for the provider capacity / system state context cache
+"""
+
+import asyncio
+from datetime import datetime
+
+from app.services.context_cache import ContextCache, SYSTEM_STATE_KEY, provider_capacity_key
+from app.services.orchestrator import OrchestrationEngine, Event
+from app.services.worker_sync import WorkerSync
+
+
+class CountingLoader:
+    def __init__(self, delay=0.0, fail=False):
+        self.delay = delay
+        self.fail = fail
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise ConnectionError("provider API down")
+        return {"open_slots": self.calls}
+
+
+class CountingEngine(OrchestrationEngine):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.capacity_queries = []
+        self.system_queries = 0
+
+    async def _query_provider_capacity(self, event, db=None):
+        self.capacity_queries.append(event.provider_id)
+        await asyncio.sleep(0.01)
+        return {"open_slots": 2}
+
+    async def _query_system_state(self, db=None):
+        self.system_queries += 1
+        await asyncio.sleep(0.01)
+        return {"load": "normal"}
+
+
+class TrackedSession:
+    def __init__(self, log):
+        self.closed = False
+        log.append(self)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.closed = True
+        return False
+
+
+class SessionCheckingEngine(CountingEngine):
+    """Capacity query that is slow and checks its session stays open"""
+
+    async def _query_provider_capacity(self, event, db=None):
+        await asyncio.sleep(0.05)
+        assert not db.closed
+        return {"open_slots": 3}
+
+
+class LinkedSync(WorkerSync):
+    """WorkerSync delivering straight to the other workers' instances"""
+
+    def __init__(self, peers):
+        super().__init__()
+        self.peers = peers
+        peers.append(self)
+
+    async def publish(self, topic, payload):
+        for peer in self.peers:
+            if peer is not self:
+                await peer.dispatch(topic, payload)
+
+
+def event(event_type, provider_id, index=0):
+    return Event(
+        event_id=f"evt_{index}",
+        event_type=event_type,
+        timestamp=datetime.now(),
+        client_id=None,
+        provider_id=provider_id,
+        metadata={"appointment_time": "2025-11-07T10:00:00"}
+    )
+
+
+class TestContextCache:
+    """Test TTL, single flight and invalidation"""
+
+    async def test_hits_until_ttl_expires(self):
+        cache, loader = ContextCache(), CountingLoader()
+        key = provider_capacity_key("provider_1")
+
+        assert await cache.get_or_load(key, loader, 0.05) == {"open_slots": 1}
+        assert await cache.get_or_load(key, loader, 0.05) == {"open_slots": 1}
+        await asyncio.sleep(0.06)
+        assert await cache.get_or_load(key, loader, 0.05) == {"open_slots": 2}
+        assert cache.get_statistics()["hits"] == 1
+
+    async def test_concurrent_misses_share_one_load(self):
+        cache, loader = ContextCache(), CountingLoader(delay=0.02)
+
+        values = await asyncio.gather(*(cache.get_or_load(SYSTEM_STATE_KEY, loader, 10) for _ in range(50)))
+
+        assert loader.calls == 1
+        assert all(value is values[0] for value in values)
+        assert cache.get_statistics()["coalesced"] == 49
+
+    async def test_waiter_timeout_does_not_cancel_shared_load(self):
+        cache, loader = ContextCache(), CountingLoader(delay=0.05)
+        key = provider_capacity_key("provider_1")
+
+        patient = asyncio.ensure_future(cache.get_or_load(key, loader, 10))
+        try:
+            await asyncio.wait_for(cache.get_or_load(key, loader, 10), timeout=0.01)
+        except asyncio.TimeoutError:
+            pass
+
+        assert await patient == {"open_slots": 1}
+        assert loader.calls == 1
+
+    async def test_failures_are_not_cached(self):
+        cache, loader = ContextCache(), CountingLoader(fail=True)
+        key = provider_capacity_key("provider_1")
+
+        for _ in range(2):
+            try:
+                await cache.get_or_load(key, loader, 10)
+            except ConnectionError:
+                pass
+
+        assert loader.calls == 2
+        assert cache.get_statistics()["entries"] == 0
+
+    async def test_invalidation_during_load_is_not_overwritten(self):
+        cache, loader = ContextCache(), CountingLoader(delay=0.02)
+        key = provider_capacity_key("provider_1")
+
+        stale = asyncio.ensure_future(cache.get_or_load(key, loader, 10))
+        await asyncio.sleep(0)
+        cache.invalidate(key)
+        await stale
+
+        assert await cache.get_or_load(key, loader, 10) == {"open_slots": 2}
+
+    async def test_burst_on_one_provider_queries_once(self):
+        """Fifty events for one provider share one capacity and system-state query"""
+        engine = CountingEngine()
+
+        await asyncio.gather(*(
+            engine._get_full_context(event("appointment_cancelled", "provider_1", n)) for n in range(50)
+        ))
+        await engine._get_full_context(event("appointment_cancelled", "provider_2"))
+
+        assert engine.capacity_queries == ["provider_1", "provider_2"]
+        assert engine.system_queries == 1
+
+    async def test_capacity_change_invalidates_provider(self):
+        engine = CountingEngine()
+        await engine._get_full_context(event("appointment_cancelled", "provider_1"))
+
+        await engine.handle_event(event("provider_capacity_change", "provider_1"))
+        context = await engine._get_full_context(event("appointment_cancelled", "provider_1"))
+
+        assert engine.capacity_queries.count("provider_1") == 2
+        assert context.provider_capacity == {"open_slots": 2}
+
+    async def test_shared_load_uses_its_own_session(self):
+        """A caller giving up does not close the session the shared load is using"""
+        sessions = []
+        engine = SessionCheckingEngine(session_factory=lambda: TrackedSession(sessions))
+        engine.source_timeouts["provider_capacity"] = 0.01
+        key = provider_capacity_key("provider_1")
+
+        impatient = await engine._get_full_context(event("appointment_cancelled", "provider_1"))
+        assert "provider_capacity" in impatient.missing_sources
+
+        assert await engine.context_cache.get_or_load(key, None, 10) == {"open_slots": 3}
+        assert engine.context_cache.get_statistics()["coalesced"] == 1
+        assert all(session.closed for session in sessions)
+
+    async def test_capacity_change_invalidates_every_worker(self):
+        """Other workers drop their cached capacity when one worker sees the change"""
+        peers = []
+        worker_a = CountingEngine(worker_sync=LinkedSync(peers))
+        worker_b = CountingEngine(worker_sync=LinkedSync(peers))
+        for worker in (worker_a, worker_b):
+            await worker._get_full_context(event("appointment_cancelled", "provider_1"))
+
+        await worker_a.handle_event(event("provider_capacity_change", "provider_1"))
+        await worker_b._get_full_context(event("appointment_cancelled", "provider_1"))
+
+        assert worker_b.capacity_queries == ["provider_1", "provider_1"]
+        assert worker_b.system_queries == 2
@@ -0,0 +1,66 @@
+"""
+Tests for batched event orchestration (NDJSON parsing, bounded fan-out)
+"""
+
+import asyncio
+
+from app.services.event_batches import iter_ndjson, iter_items, run_concurrently
+
+
+async def chunked(*chunks):
+    for chunk in chunks:
+        yield chunk
+
+
+async def collect(iterator):
+    return [item async for item in iterator]
+
+
+class TestEventBatches:
+    """Test batch parsing and concurrency"""
+
+    async def test_ndjson_across_chunk_boundaries(self):
+        """Lines split across network chunks are reassembled; bad lines become errors"""
+        parsed = await collect(iter_ndjson(chunked(b'{"a": 1}\n{"a"', b': 2}\n\nnot json\n{"a": 3}')))
+
+        assert [line for line, _ in parsed] == [1, 2, 4, 5]
+        assert [item for _, item in parsed if not isinstance(item, Exception)] == [{"a": 1}, {"a": 2}, {"a": 3}]
+        assert isinstance(parsed[2][1], ValueError)
+
+    async def test_fan_out_is_bounded(self):
+        """All items are handled, never more than `concurrency` at once"""
+        running = {"now": 0, "max": 0}
+
+        async def handler(item):
+            running["now"] += 1
+            running["max"] = max(running["max"], running["now"])
+            await asyncio.sleep(0.01)
+            running["now"] -= 1
+            return item * 2
+
+        results = await collect(run_concurrently(iter_items(range(50)), handler, concurrency=5))
+
+        assert sorted(result.result for result in results) == [n * 2 for n in range(50)]
+        assert running["max"] == 5
+
+    async def test_failures_are_reported_per_item(self):
+        """A failing event does not stop the rest of the batch"""
+        async def handler(item):
+            if item == 3:
+                raise ValueError("bad event")
+            return item
+
+        results = await collect(run_concurrently(iter_items(range(6)), handler, concurrency=2))
+
+        assert [r.index for r in results if r.error] == [3]
+        assert len([r for r in results if r.error is None]) == 5
+
+    async def test_batch_limit(self):
+        """Events beyond max_items are rejected"""
+        async def handler(item):
+            return item
+
+        results = await collect(run_concurrently(iter_items(range(10)), handler, concurrency=2, max_items=4))
+
+        assert len([r for r in results if r.error is None]) == 4
+        assert any("limit" in (r.error or "") for r in results)
@@ -0,0 +1,52 @@
+"""
+Tests for the event listener's hand-off to the orchestrator
+"""
+
+from datetime import datetime
+
+from app.services.event_listener import EventListenerService
+from app.services.orchestrator import Event
+
+
+class RecordingOrchestrator:
+    def __init__(self):
+        self.sessions = []
+
+    async def handle_event(self, event, db_session=None):
+        self.sessions.append(db_session)
+        return None
+
+
+class FakeSession:
+    def __init__(self):
+        self.closed = False
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.closed = True
+
+
+class TestEventListenerSessions:
+    """Test that listener-triggered orchestration gets a database session"""
+
+    async def test_each_event_gets_its_own_session(self):
+        """Sessions are opened per event and closed once the event is handled"""
+        orchestrator = RecordingOrchestrator()
+        opened = []
+
+        def session_factory():
+            opened.append(FakeSession())
+            return opened[-1]
+
+        listener = EventListenerService(orchestrator, session_factory=session_factory)
+        for event_id in ("evt_1", "evt_2"):
+            await listener._trigger_orchestration(Event(
+                event_id=event_id, event_type="appointment_cancelled", timestamp=datetime.now(),
+                client_id="client_a", provider_id=None, metadata={}
+            ))
+
+        assert orchestrator.sessions == opened
+        assert len(opened) == 2 and all(session.closed for session in opened)
+        assert listener.events_ignored == 2
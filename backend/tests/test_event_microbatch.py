@@ -0,0 +1,139 @@
+"""
+Tests for same-provider event micro-batching and joint slot assignment
+"""
+
+import asyncio
+import itertools
+import random
+from datetime import datetime
+
+from app.services.event_microbatch import MicroBatcher, max_weight_assignment
+from app.services.orchestrator import OrchestrationEngine, Event
+
+START = datetime(2025, 11, 7, 8, 0)
+
+
+def brute_force_total(weights):
+    rows, columns = len(weights), len(weights[0]) if weights else 0
+    best = 0.0
+    options = list(range(columns)) + [None] * rows
+    for choice in itertools.permutations(options, rows):
+        best = max(best, sum(weights[r][c] for r, c in enumerate(choice) if c is not None and weights[r][c] > 0))
+    return best
+
+
+class CountingEngine(OrchestrationEngine):
+    """Candidates on every query; counts context gathering"""
+
+    def __init__(self, candidates, **kwargs):
+        super().__init__(**kwargs)
+        self.candidates = candidates
+        self.related_queries = 0
+
+    async def _query_related_clients(self, event, db=None):
+        self.related_queries += 1
+        await asyncio.sleep(0.01)
+        return self.candidates
+
+
+def cancellation(n, hour):
+    return Event(
+        event_id=f"evt_{n}",
+        event_type="appointment_cancelled",
+        timestamp=datetime.now(),
+        client_id=f"original_{n}",
+        provider_id="provider_1",
+        metadata={
+            "appointment_time": START.replace(hour=hour).isoformat(),
+            "appointment_type": "primary_care",
+            "provider_id": "provider_1"
+        }
+    )
+
+
+class TestMaxWeightAssignment:
+    """Test the Hungarian solver against brute force"""
+
+    def test_matches_brute_force(self):
+        rng = random.Random(50)
+        for trial in range(300):
+            rows, columns = rng.randint(1, 4), rng.randint(0, 5)
+            weights = [[rng.choice([0.0, round(rng.uniform(0.7, 1.0), 2)]) for _ in range(columns)]
+                       for _ in range(rows)]
+
+            assignment = max_weight_assignment(weights)
+
+            used = [c for c in assignment if c is not None]
+            assert len(used) == len(set(used)), f"trial {trial}"
+            total = sum(weights[r][c] for r, c in enumerate(assignment) if c is not None)
+            assert abs(total - brute_force_total(weights)) < 1e-9, f"trial {trial}"
+
+
+class TestMicroBatcher:
+    """Test batching windows and joint decisions"""
+
+    async def test_burst_shares_one_batch(self):
+        batches = []
+
+        async def handle(events, context):
+            batches.append(list(events))
+            return [event * 10 for event in events]
+
+        batcher = MicroBatcher(handle, window_seconds=0.02, max_events=3)
+        results = await asyncio.gather(*(batcher.submit("p1", n) for n in range(4)), batcher.submit("p2", 9))
+
+        assert results == [0, 10, 20, 30, 90]
+        assert sorted(map(len, batches)) == [1, 1, 3]  # p1 filled at 3, then a leftover; p2 alone
+
+    async def test_slots_go_to_different_clients(self):
+        """Two cancellations never offer the same client, and the best pairing wins"""
+        candidates = [
+            {"id": "c0", "urgency_score": 10, "documents_complete": True},
+            {"id": "c1", "urgency_score": 9, "documents_complete": True},
+            {"id": "c2", "urgency_score": 3, "documents_complete": False},
+        ]
+        batched = CountingEngine(candidates, cancellation_batch_window_seconds=0.05)
+        unbatched = CountingEngine(candidates)
+
+        together = await asyncio.gather(batched.handle_event(cancellation(0, 8)), batched.handle_event(cancellation(1, 9)))
+        apart = await asyncio.gather(unbatched.handle_event(cancellation(0, 8)), unbatched.handle_event(cancellation(1, 9)))
+
+        assert batched.related_queries == 1 and unbatched.related_queries == 2
+        assert sorted(r.execution_plan.actions[0].parameters["client_id"] for r in together) == ["c0", "c1"]
+        assert [r.execution_plan.actions[0].parameters["client_id"] for r in apart] == ["c0", "c0"]
+        assert batched.get_statistics()["cancellation_batches"]["largest_batch"] == 2
+
+    async def test_batch_context_spans_every_slot(self):
+        """Related clients are queried for the whole batch, not its first event"""
+        queried = []
+
+        class RecordingEngine(CountingEngine):
+            async def _query_related_clients(self, event, db=None):
+                queried.append(event)
+                return await super()._query_related_clients(event, db)
+
+        engine = RecordingEngine([{"id": "c0", "urgency_score": 10, "documents_complete": True}])
+
+        await engine.handle_cancellation_batch([cancellation(0, 11), cancellation(1, 8), cancellation(2, 9)])
+
+        assert queried[0].metadata["window_start"] == START.replace(hour=8)
+        assert queried[0].metadata["window_end"] == START.replace(hour=11)
+        assert queried[0].metadata["client_ids"] == ["original_0", "original_1", "original_2"]
+
+    async def test_unassigned_slots_fall_back_to_ai(self):
+        """A slot without a rule candidate gets the AI's pick, unless that client is already offered a slot"""
+        picks = iter(["c0", "ai_pick"])
+
+        class AiEngine(CountingEngine):
+            def _is_ambiguous(self, event, context):
+                return True
+
+            async def _use_ai_decision(self, event, context):
+                return self._bump_decision(event, context, {"id": next(picks)}, 0.8)
+
+        engine = AiEngine([{"id": "c0", "urgency_score": 10, "documents_complete": True}], ai_service=object())
+
+        results = await engine.handle_cancellation_batch([cancellation(0, 8), cancellation(1, 9), cancellation(2, 10)])
+
+        assert [r and r.execution_plan.actions[0].parameters["client_id"] for r in results] == ["c0", None, "ai_pick"]
+        assert engine.get_statistics()["ai_decisions"] == 1
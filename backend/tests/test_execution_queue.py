@@ -0,0 +1,128 @@
+"""
+Tests for the durable execution queue (claiming, concurrency limit, retries)
+"""
+
+import asyncio
+
+from app.services.execution_queue import ExecutionQueue
+from app.services.executor import ExecutionResult
+
+
+def plan_json(plan_id):
+    return {"plan_id": plan_id, "actions": [], "estimated_duration_seconds": 0, "affected_systems": []}
+
+
+class FakeStore:
+    """In-memory stand-in for RecommendationStore's queue methods"""
+
+    def __init__(self, records):
+        self.records = {record["recommendation_id"]: record for record in records}
+
+    async def transition(self, recommendation_id, status, from_statuses=None, attempt=None, **fields):
+        record = self.records.get(recommendation_id)
+        if record is None or (from_statuses and record["status"] not in from_statuses):
+            return None
+        if attempt is not None and record["attempts"] != attempt:
+            return None
+        record.update(status=status, **fields)
+        return dict(record)
+
+    async def claim_next(self, lease_seconds):
+        for record in self.records.values():
+            if record["status"] == "queued":
+                record["status"] = "executing"
+                record["attempts"] += 1
+                return dict(record)
+        return None
+
+    async def extend_lease(self, recommendation_id, attempt, lease_seconds):
+        return True
+
+
+class FakeSession:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+
+class SlowExecutor:
+    """Records how many plans run at the same time"""
+
+    def __init__(self, duration=0.02):
+        self.duration = duration
+        self.running = 0
+        self.max_running = 0
+        self.executed = []
+
+    async def execute_plan(self, plan, approved_by, db_session=None):
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        await asyncio.sleep(self.duration)
+        self.running -= 1
+        self.executed.append(plan.plan_id)
+        return ExecutionResult(
+            plan_id=plan.plan_id,
+            status="success",
+            actions_completed=0,
+            actions_failed=0,
+            total_duration_seconds=self.duration,
+            action_results=[]
+        )
+
+
+def record(recommendation_id, status="queued", attempts=0):
+    return {
+        "recommendation_id": recommendation_id,
+        "status": status,
+        "attempts": attempts,
+        "approved_by": "caseworker_1",
+        "execution_plan": plan_json(f"plan_{recommendation_id}")
+    }
+
+
+def make_queue(store, executor, **kwargs):
+    return ExecutionQueue(
+        executor, store=store, session_factory=FakeSession, poll_interval_seconds=0.01, **kwargs
+    )
+
+
+class TestExecutionQueue:
+    """Test plan execution through the queue"""
+
+    async def test_enqueue_requires_pending_approval(self):
+        """Approval queues a pending plan once; repeats are refused"""
+        store = FakeStore([record("rec_1", status="pending_approval")])
+        queue = make_queue(store, SlowExecutor(), concurrency=0)
+
+        assert (await queue.enqueue("rec_1", "caseworker_1"))["status"] == "queued"
+        assert await queue.enqueue("rec_1", "caseworker_1") is None
+
+    async def test_concurrency_is_limited(self):
+        """Every queued plan runs, never more than `concurrency` at once"""
+        store = FakeStore([record(f"rec_{i}") for i in range(10)])
+        executor = SlowExecutor()
+        queue = make_queue(store, executor, concurrency=3)
+
+        queue.start()
+        for _ in range(100):
+            if len(executor.executed) == 10:
+                break
+            await asyncio.sleep(0.01)
+        await queue.stop()
+
+        assert len(executor.executed) == 10
+        assert executor.max_running == 3
+        assert all(r["status"] == "completed" for r in store.records.values())
+
+    async def test_exhausted_plan_fails_without_running(self):
+        """A plan reclaimed more than max_attempts times is marked failed"""
+        store = FakeStore([record("rec_1", attempts=3)])
+        executor = SlowExecutor()
+        queue = make_queue(store, executor, concurrency=1, max_attempts=3)
+
+        assert await queue.run_once() is True
+
+        assert executor.executed == []
+        assert store.records["rec_1"]["status"] == "failed"
@@ -0,0 +1,116 @@
+"""
+Tests for the heatmap tile pyramid (tile math, upserts and tile payloads)
+"""
+
+import uuid
+from datetime import date, datetime
+from types import SimpleNamespace
+
+from sqlalchemy.dialects import postgresql
+
+from app.services.heatmap_tiles import (
+    DETAIL_LEVELS, MAX_ZOOM, MIN_ZOOM,
+    heatmap_tile_upsert, is_valid_tile, pack_tile, tile_cells_query, tile_for, tile_pyramid
+)
+
+NEW_YORK = (40.7128, -74.0060)
+
+
+class TestTileMath:
+    """Test slippy-map projection"""
+
+    def test_known_tiles(self):
+        """Matches the basemap's z/x/y scheme"""
+        assert tile_for(0.0, 0.0, 1) == (1, 1)
+        assert tile_for(*NEW_YORK, 8) == (75, 96)
+        assert tile_for(*NEW_YORK, 12) == (1205, 1540)
+
+    def test_poles_and_antimeridian_clamp(self):
+        """Points outside web mercator land on the edge tiles"""
+        last = (1 << 10) - 1
+
+        assert tile_for(90.0, 0.0, 10)[1] == 0
+        assert tile_for(-90.0, 0.0, 10)[1] == last
+        assert tile_for(0.0, 180.0, 10)[0] == last
+        assert tile_for(0.0, -180.0, 10)[0] == 0
+
+    def test_pyramid_is_nested(self):
+        """Every zoom from MIN_ZOOM to MAX_ZOOM; each tile is its child's parent"""
+        pyramid = tile_pyramid(*NEW_YORK)
+
+        assert sorted(pyramid) == list(range(MIN_ZOOM, MAX_ZOOM + 1))
+        for zoom in range(MIN_ZOOM, MAX_ZOOM):
+            child_x, child_y = pyramid[zoom + 1]
+            assert pyramid[zoom] == (child_x >> 1, child_y >> 1)
+        assert pyramid[MAX_ZOOM] == tile_for(*NEW_YORK, MAX_ZOOM)
+        assert pyramid[8] == tile_for(*NEW_YORK, 8)
+
+    def test_valid_tiles(self):
+        """Only zooms in the pyramid and coordinates inside the world"""
+        assert is_valid_tile(MIN_ZOOM, 0, 0)
+        assert is_valid_tile(MAX_ZOOM, (1 << MAX_ZOOM) - 1, (1 << MAX_ZOOM) - 1)
+        assert not is_valid_tile(MIN_ZOOM - 1, 0, 0)
+        assert not is_valid_tile(MAX_ZOOM + 1, 0, 0)
+        assert not is_valid_tile(10, 1 << 10, 0)
+        assert not is_valid_tile(10, 0, -1)
+
+
+class TestTileUpsert:
+    """Test the write-path statement"""
+
+    def test_one_row_per_zoom_adding_counts(self):
+        """Conflicting rows add the new counts instead of replacing them"""
+        stmt = heatmap_tile_upsert(uuid.UUID(int=1), *NEW_YORK, datetime(2025, 3, 9, 23, 30), intakes=1)
+        compiled = stmt.compile(dialect=postgresql.dialect())
+        sql = str(compiled)
+
+        assert "ON CONFLICT (organization_id, zoom, tile_x, tile_y, day) DO UPDATE" in sql
+        assert "intake_count = (heatmap_tiles.intake_count + excluded.intake_count)" in sql
+        assert "pair_count = (heatmap_tiles.pair_count + excluded.pair_count)" in sql
+        zooms = sorted(value for name, value in compiled.params.items() if name.startswith("zoom"))
+        assert zooms == list(range(MIN_ZOOM, MAX_ZOOM + 1))
+        assert {value for name, value in compiled.params.items() if name.startswith("day")} == {date(2025, 3, 9)}
+
+    def test_location_without_coordinates_is_skipped(self):
+        assert heatmap_tile_upsert(uuid.UUID(int=1), None, -74.0, datetime(2025, 3, 9), intakes=1) is None
+
+
+class TestTilePayload:
+    """Test the read path"""
+
+    def test_cells_query_covers_the_tile(self):
+        """Sub-cells DETAIL_LEVELS zooms down, bounded to the requested tile"""
+        compiled = tile_cells_query("org-a", 10, 300, 400, date(2025, 1, 1)).compile(dialect=postgresql.dialect())
+        shift = DETAIL_LEVELS
+
+        assert compiled.params["zoom_1"] == 10 + shift
+        assert (compiled.params["tile_x_1"], compiled.params["tile_x_2"]) == (300 << shift, (301 << shift) - 1)
+        assert (compiled.params["tile_y_1"], compiled.params["tile_y_2"]) == (400 << shift, (401 << shift) - 1)
+
+    def test_cell_zoom_stops_at_max_zoom(self):
+        compiled = tile_cells_query("org-a", MAX_ZOOM - 1, 10, 20, date(2025, 1, 1)).compile(
+            dialect=postgresql.dialect()
+        )
+
+        assert compiled.params["zoom_1"] == MAX_ZOOM
+        assert (compiled.params["tile_x_1"], compiled.params["tile_x_2"]) == (20, 21)
+
+    def test_pack_tile_uses_offsets_inside_tile(self):
+        """Cells are numbered from the tile's top-left corner"""
+        rows = [
+            SimpleNamespace(tile_x=(300 << 3) + 2, tile_y=(400 << 3), intake_count=5, pair_count=1),
+            SimpleNamespace(tile_x=(300 << 3) + 7, tile_y=(400 << 3) + 7, intake_count=2, pair_count=0),
+        ]
+
+        payload = pack_tile(10, 300, 400, 30, rows)
+
+        assert payload["cell_zoom"] == 13
+        assert payload["cell_x"] == [2, 7] and payload["cell_y"] == [0, 7]
+        assert payload["intake_counts"] == [5, 2] and payload["pair_counts"] == [1, 0]
+        assert payload["period_days"] == 30
+
+    def test_empty_tile(self):
+        payload = pack_tile(MAX_ZOOM, 1, 2, 7, [])
+
+        assert payload["cell_zoom"] == MAX_ZOOM
+        assert payload["cell_x"] == payload["intake_counts"] == []
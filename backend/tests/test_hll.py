@@ -0,0 +1,51 @@
+"""
+Tests for HyperLogLog client sketches
+"""
+
+import uuid
+
+from app.services.hll import HyperLogLog, FORMAT_SPARSE, FORMAT_DENSE
+
+
+class TestHyperLogLog:
+    """Test accuracy, merging and serialization"""
+
+    def test_empty_sketch(self):
+        """No values, no clients"""
+        assert HyperLogLog().cardinality() == 0
+        assert HyperLogLog.union([None, b""]).cardinality() == 0
+
+    def test_repeat_values_do_not_change_sketch(self):
+        """Adding the same client twice is a no-op"""
+        sketch = HyperLogLog()
+        client_id = uuid.uuid4()
+        assert sketch.add(client_id) is True
+        assert sketch.add(client_id) is False
+
+    def test_accuracy_across_magnitudes(self):
+        """Estimates stay within a few standard errors across magnitudes"""
+        for n in (100, 1000, 10000, 100000):
+            sketch = HyperLogLog().update(uuid.uuid4() for _ in range(n))
+            assert abs(sketch.cardinality() - n) / n < 0.05
+
+    def test_merge_counts_overlap_once(self):
+        """Union over days counts a returning client once"""
+        shared = [uuid.uuid4() for _ in range(3000)]
+        day_one = HyperLogLog().update(shared + [uuid.uuid4() for _ in range(1000)])
+        day_two = HyperLogLog().update(shared + [uuid.uuid4() for _ in range(1000)])
+
+        merged = HyperLogLog.union([day_one.to_bytes(), day_two.to_bytes()])
+
+        assert abs(merged.cardinality() - 5000) / 5000 < 0.05
+
+    def test_serialization_round_trip(self):
+        """Small sketches are stored sparse, large ones dense, both lossless"""
+        small = HyperLogLog().update(range(20))
+        large = HyperLogLog().update(range(50000))
+
+        assert small.to_bytes()[0] == FORMAT_SPARSE
+        assert len(small.to_bytes()) < 100
+        assert large.to_bytes()[0] == FORMAT_DENSE
+        for sketch in (small, large):
+            restored = HyperLogLog.from_bytes(sketch.to_bytes())
+            assert (restored.registers == sketch.registers).all()
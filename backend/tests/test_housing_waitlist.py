@@ -0,0 +1,226 @@
+"""
+Tests for the housing waitlist index
+"""
+
+import random
+from datetime import datetime, timedelta
+
+from app.services.housing_waitlist import HousingWaitlist, WaitlistEntry, HousingUnit, WaitlistStore
+from app.services.orchestrator import OrchestrationEngine, Event
+from app.services.recommendation_store import serialize_plan
+from app.services.worker_sync import WorkerSync
+
+NOW = datetime(2025, 11, 7, 9, 0)
+FEATURES = ["wheelchair", "ground_floor", "elevator"]
+
+
+def random_entry(rng, n):
+    located = rng.random() < 0.7
+    return WaitlistEntry(
+        client_id=f"client_{n}",
+        bedrooms=rng.randint(0, 3),
+        urgency=rng.randint(1, 10),
+        joined_at=NOW - timedelta(days=rng.randint(1, 900)),
+        accessibility=frozenset(f for f in FEATURES if rng.random() < 0.15),
+        latitude=40.7 + rng.uniform(-0.3, 0.3) if located else None,
+        longitude=-74.0 + rng.uniform(-0.3, 0.3) if located else None,
+        radius_km=rng.choice([2, 5, 15]) if located else None
+    )
+
+
+def random_unit(rng, n):
+    return HousingUnit(
+        unit_id=f"unit_{n}",
+        bedrooms=rng.randint(0, 3),
+        accessibility=frozenset(f for f in FEATURES if rng.random() < 0.5),
+        latitude=40.7 + rng.uniform(-0.3, 0.3),
+        longitude=-74.0 + rng.uniform(-0.3, 0.3)
+    )
+
+
+class FakeRedis:
+    """Hash commands of redis.asyncio, in memory"""
+
+    def __init__(self):
+        self.hashes = {}
+
+    async def hgetall(self, key):
+        return dict(self.hashes.get(key, {}))
+
+    async def hset(self, key, field, value):
+        self.hashes.setdefault(key, {})[field] = value
+
+    async def hdel(self, key, field):
+        self.hashes.get(key, {}).pop(field, None)
+
+
+class LinkedSync(WorkerSync):
+    """WorkerSync delivering straight to the other workers' instances"""
+
+    def __init__(self, peers):
+        super().__init__()
+        self.peers = peers
+        peers.append(self)
+
+    async def publish(self, topic, payload):
+        self.published += 1
+        for peer in self.peers:
+            if peer is not self:
+                await peer.dispatch(topic, payload)
+
+
+def join_event(client_id, days, bedrooms=2):
+    return Event(
+        event_id=f"join_{client_id}",
+        event_type="client_update",
+        timestamp=NOW,
+        client_id=client_id,
+        provider_id=None,
+        metadata={"housing_waitlist": {
+            "bedrooms": bedrooms, "urgency_score": 5, "joined_at": (NOW - timedelta(days=days)).isoformat()
+        }}
+    )
+
+
+def unit_event(unit_id, bedrooms=2):
+    return Event(
+        event_id=f"open_{unit_id}",
+        event_type="housing_available",
+        timestamp=NOW,
+        client_id=None,
+        provider_id=None,
+        metadata={"unit_id": unit_id, "bedrooms": bedrooms}
+    )
+
+
+def same(a, b):
+    return (a is None and b is None) or (a is not None and b is not None and a.entry is b.entry)
+
+
+class TestHousingWaitlist:
+    """Test indexed matching against the full scan"""
+
+    def test_matches_scan(self):
+        rng = random.Random(47)
+        waitlist = HousingWaitlist()
+        waitlist.load(random_entry(rng, n) for n in range(3000))
+
+        for n in range(300):
+            unit = random_unit(rng, n)
+            assert same(waitlist.best_match(unit, NOW), waitlist.scan_best_match(unit, NOW))
+
+    def test_incremental_updates_match_scan(self):
+        """Joins, leaves and re-registrations keep the index exact"""
+        rng = random.Random(48)
+        waitlist = HousingWaitlist()
+        for n in range(4000):
+            action = rng.random()
+            if action < 0.6:
+                waitlist.add(random_entry(rng, rng.randint(0, 1500)))
+            elif action < 0.9:
+                waitlist.remove(f"client_{rng.randint(0, 1500)}")
+            else:
+                unit = random_unit(rng, n)
+                popped_scan = waitlist.scan_best_match(unit, NOW)
+                popped = waitlist.pop_best(unit, NOW)
+                assert same(popped, popped_scan)
+                if popped:
+                    assert popped.entry.client_id not in waitlist
+
+        assert waitlist.rebuilds > 0
+
+    def test_longer_wait_outranks_higher_urgency(self):
+        waitlist = HousingWaitlist()
+        waitlist.add(WaitlistEntry("urgent", 2, urgency=9, joined_at=NOW - timedelta(days=10)))
+        waitlist.add(WaitlistEntry("patient", 2, urgency=3, joined_at=NOW - timedelta(days=400)))
+
+        match = waitlist.best_match(HousingUnit("unit_1", 2), NOW)
+
+        assert match.entry.client_id == "patient"
+        assert match.priority == 1200
+
+    def test_requirements_filter(self):
+        """Accessibility needs and preferred area must be met"""
+        waitlist = HousingWaitlist()
+        waitlist.add(WaitlistEntry(
+            "needs_wheelchair", 1, urgency=10, joined_at=NOW - timedelta(days=500),
+            accessibility=frozenset({"wheelchair"})
+        ))
+        waitlist.add(WaitlistEntry(
+            "brooklyn_only", 1, urgency=10, joined_at=NOW - timedelta(days=400),
+            latitude=40.65, longitude=-73.95, radius_km=3
+        ))
+        waitlist.add(WaitlistEntry("anywhere", 1, urgency=1, joined_at=NOW - timedelta(days=5)))
+
+        manhattan = HousingUnit("unit_1", 1, latitude=40.78, longitude=-73.97)
+        assert waitlist.best_match(manhattan, NOW).entry.client_id == "anywhere"
+
+        brooklyn = HousingUnit("unit_2", 1, frozenset({"wheelchair"}), latitude=40.66, longitude=-73.95)
+        assert waitlist.best_match(brooklyn, NOW).entry.client_id == "needs_wheelchair"
+        assert waitlist.best_match(brooklyn, NOW, exclude=["needs_wheelchair"]).entry.client_id == "brooklyn_only"
+
+        assert waitlist.best_match(HousingUnit("unit_3", 2), NOW) is None
+
+    async def test_orchestrator_matches_housing_event(self):
+        engine = OrchestrationEngine()
+        for client_id, days in (("client_a", 30), ("client_b", 200)):
+            await engine.handle_event(join_event(client_id, days))
+
+        recommendation = await engine.handle_event(unit_event("unit_9"))
+
+        assert recommendation.summary == "Offer unit unit_9 to Client client_b?"
+        assert [a.action_type for a in recommendation.execution_plan.actions] == ["update_case", "send_sms"]
+        # Held off the waitlist while the offer is pending
+        assert "client_b" not in engine.housing_waitlist
+
+        second = await engine.handle_event(unit_event("unit_10"))
+        assert second.summary == "Offer unit unit_10 to Client client_a?"
+
+    async def test_rejected_offer_returns_client_to_waitlist(self):
+        engine = OrchestrationEngine()
+        await engine.handle_event(join_event("client_a", 30))
+        recommendation = await engine.handle_event(unit_event("unit_9"))
+        assert len(engine.housing_waitlist) == 0
+
+        restored = await engine.release_housing_hold(serialize_plan(recommendation.execution_plan))
+
+        assert restored
+        assert "client_a" in engine.housing_waitlist
+        assert engine.housing_waitlist.best_match(HousingUnit("unit_11", 2), NOW).days_waiting == 30
+
+
+class TestSharedWaitlist:
+    """Test persistence and cross-worker updates"""
+
+    async def test_index_is_loaded_from_store(self):
+        redis = FakeRedis()
+        writer = OrchestrationEngine(waitlist_store=WaitlistStore(redis))
+        await writer.handle_event(join_event("client_a", 30))
+        await writer.handle_event(join_event("client_b", 60, bedrooms=1))
+
+        restarted = OrchestrationEngine(waitlist_store=WaitlistStore(redis))
+        await restarted.load_housing_waitlist()
+
+        assert len(restarted.housing_waitlist) == 2
+        match = restarted.housing_waitlist.best_match(HousingUnit("unit_1", 1), NOW)
+        assert match.entry.client_id == "client_b"
+        assert match.entry.joined_at == NOW - timedelta(days=60)
+
+    async def test_changes_reach_other_workers(self):
+        redis, peers = FakeRedis(), []
+        worker_a = OrchestrationEngine(waitlist_store=WaitlistStore(redis), worker_sync=LinkedSync(peers))
+        worker_b = OrchestrationEngine(waitlist_store=WaitlistStore(redis), worker_sync=LinkedSync(peers))
+
+        await worker_a.handle_event(join_event("client_a", 30))
+        assert "client_a" in worker_b.housing_waitlist
+
+        # A match on one worker takes the client off everywhere
+        recommendation = await worker_b.handle_event(unit_event("unit_9"))
+        assert recommendation is not None
+        assert "client_a" not in worker_a.housing_waitlist
+        assert await worker_a.handle_event(unit_event("unit_10")) is None
+        assert await WaitlistStore(redis).load() == []
+
+        await worker_a.release_housing_hold(serialize_plan(recommendation.execution_plan))
+        assert "client_a" in worker_b.housing_waitlist
+        assert [entry.client_id for entry in await WaitlistStore(redis).load()] == ["client_a"]
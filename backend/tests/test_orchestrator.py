@@ -0,0 +1,218 @@
+"""
+Tests for OrchestrationEngine context gathering (concurrency, timeouts, degradation)
+"""
+
+import asyncio
+import random
+import time
+from datetime import datetime
+
+from app.services.orchestrator import OrchestrationEngine, Event, PartialResult
+
+CANDIDATES = [{"id": "client_b", "urgency_score": 9, "documents_complete": True}]
+
+
+class SlowSourcesEngine(OrchestrationEngine):
+    """Context sources with fixed delays (seconds) and optional failures"""
+
+    def __init__(self, delays, fail=(), partial=()):
+        super().__init__()
+        self.delays = delays
+        self.fail = fail
+        self.partial = partial
+
+    async def _source(self, name, value):
+        await asyncio.sleep(self.delays.get(name, 0))
+        if name in self.fail:
+            raise ConnectionError(f"{name} unavailable")
+        return PartialResult(value, "page limit") if name in self.partial else value
+
+    async def _query_client(self, client_id, db=None):
+        return await self._source("affected_client", {"id": client_id})
+
+    async def _query_related_clients(self, event, db=None):
+        return await self._source("related_clients", CANDIDATES)
+
+    async def _query_provider_capacity(self, event, db=None):
+        return await self._source("provider_capacity", {"open_slots": 1})
+
+    async def _query_system_state(self, db=None):
+        return await self._source("system_state", {})
+
+    async def _query_historical_patterns(self, event, db=None):
+        return await self._source("historical_patterns", [])
+
+
+def cancellation():
+    return Event(
+        event_id="evt_1",
+        event_type="appointment_cancelled",
+        timestamp=datetime.now(),
+        client_id="client_a",
+        provider_id="provider_1",
+        metadata={"appointment_time": "2025-11-07T10:00:00", "provider_id": "provider_1"}
+    )
+
+
+class TestContextGathering:
+    """Test concurrent, time-boxed context queries"""
+
+    async def test_latency_is_max_not_sum(self):
+        """Five 50ms sources finish in about 50ms"""
+        engine = SlowSourcesEngine({name: 0.05 for name in (
+            "affected_client", "related_clients", "provider_capacity", "system_state", "historical_patterns"
+        )})
+
+        started = time.perf_counter()
+        context = await engine._get_full_context(cancellation())
+
+        assert time.perf_counter() - started < 0.15
+        assert context.is_complete()
+        assert set(context.source_latency_ms) == {
+            "affected_client", "related_clients", "provider_capacity", "system_state", "historical_patterns"
+        }
+
+    async def test_slow_and_failing_sources_are_missing(self):
+        """Timeouts and errors fall back to empty values and are recorded"""
+        engine = SlowSourcesEngine({"system_state": 1.0}, fail=("provider_capacity",))
+        engine.source_timeouts["system_state"] = 0.05
+
+        started = time.perf_counter()
+        context = await engine._get_full_context(cancellation())
+
+        assert time.perf_counter() - started < 0.5
+        assert sorted(context.missing_sources) == ["provider_capacity", "system_state"]
+        assert context.provider_capacity == {} and context.system_state == {}
+        assert context.related_clients == CANDIDATES
+        assert engine.get_statistics()["context_timeouts"] == 1
+
+    async def test_rules_degrade_with_partial_data(self):
+        """Recommendations still come out, with lower confidence and a warning"""
+        complete = await SlowSourcesEngine({}).handle_event(cancellation())
+        degraded = await SlowSourcesEngine({}, fail=("provider_capacity",), partial=("related_clients",)).handle_event(
+            cancellation()
+        )
+
+        assert degraded.confidence_score < complete.confidence_score
+        assert any("incomplete data" in reason for reason in degraded.reasoning)
+
+    async def test_no_recommendation_without_candidates(self):
+        """Missing candidate list means no bump recommendation"""
+        engine = SlowSourcesEngine({}, fail=("related_clients",))
+        assert await engine.handle_event(cancellation()) is None
+
+
+class FakeSession:
+    """Async session that fails if two queries use it at once"""
+
+    def __init__(self, opened):
+        self.busy = False
+        self.closed = False
+        opened.append(self)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.closed = True
+        return False
+
+    async def query(self, value):
+        assert not self.busy, "session used concurrently"
+        assert not self.closed, "session used after close"
+        self.busy = True
+        await asyncio.sleep(0.01)
+        self.busy = False
+        return value
+
+
+class SessionEngine(OrchestrationEngine):
+    """Every context source queries through the session it is given"""
+
+    async def _query_client(self, client_id, db=None):
+        return await db.query({"id": client_id})
+
+    async def _query_related_clients(self, event, db=None):
+        return await db.query(CANDIDATES)
+
+    async def _query_provider_capacity(self, event, db=None):
+        return await db.query({"open_slots": 1})
+
+    async def _query_system_state(self, db=None):
+        return await db.query({})
+
+    async def _query_historical_patterns(self, event, db=None):
+        return await db.query([])
+
+
+class TestContextSessions:
+    """Test session handling for concurrent context sources"""
+
+    async def test_each_source_gets_its_own_session(self):
+        """Concurrent sources never share a session, and every session is closed"""
+        opened = []
+        engine = SessionEngine(session_factory=lambda: FakeSession(opened))
+
+        context = await engine._get_full_context(cancellation(), db=None)
+
+        assert context.is_complete()
+        assert len(opened) == 5
+        assert all(session.closed for session in opened)
+
+
+class CheckedEngine(OrchestrationEngine):
+    """Transport/conflict checks read from the candidate and are counted"""
+
+    def __init__(self):
+        super().__init__()
+        self.checks = 0
+
+    def _is_transport_compatible(self, client, provider_id, context):
+        self.checks += 1
+        return client["on_route"]
+
+    def _has_conflicts(self, client, time, context):
+        return client["conflict"]
+
+
+class TestCandidateRanking:
+    """Test vectorized appointment-candidate ranking"""
+
+    def test_matches_scalar_scorer(self):
+        """Same candidate and score as scoring everyone one by one, ties included"""
+        rng = random.Random(45)
+        for trial in range(300):
+            candidates = [
+                {
+                    "id": f"c{n}",
+                    "urgency_score": rng.choice([rng.randint(0, 10), round(rng.uniform(0, 10), 2)]),
+                    "documents_complete": rng.random() < 0.6,
+                    "on_route": rng.random() < 0.7,
+                    "conflict": rng.random() < 0.3
+                }
+                for n in range(rng.randint(0, 200))
+            ]
+            engine = CheckedEngine()
+            args = (candidates, datetime(2025, 11, 7, 10), "provider_1", "primary_care", None)
+
+            vectorized = engine._rank_appointment_candidates(*args)
+            scalar = engine._scan_appointment_candidates(*args)
+
+            assert vectorized[0] is scalar[0], f"trial {trial}"
+            assert vectorized[1] == scalar[1], f"trial {trial}"
+
+    def test_expensive_checks_only_for_survivors(self):
+        """A large waitlist only pays for checks on the top of the ranking"""
+        candidates = [
+            {"id": f"c{n}", "urgency_score": n % 10, "documents_complete": n % 3 == 0,
+             "on_route": True, "conflict": False}
+            for n in range(5000)
+        ]
+        engine = CheckedEngine()
+
+        best, score = engine._rank_appointment_candidates(
+            candidates, datetime(2025, 11, 7, 10), "provider_1", "primary_care", None
+        )
+
+        assert best["id"] == "c9" and score == engine._score_appointment_candidate(best, None, None, None, None)
+        assert engine.checks <= 32
@@ -0,0 +1,85 @@
+"""
+Tests for read-replica routing (lag tolerance and fallback to the primary)
+"""
+
+import asyncio
+
+from app.database import ReplicaMonitor
+
+
+class FakeResult:
+    def __init__(self, value):
+        self.value = value
+
+    def scalar(self):
+        return self.value
+
+
+class FakeSession:
+    def __init__(self, lag=None, error=None, delay=0.0):
+        self.lag = lag
+        self.error = error
+        self.delay = delay
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    async def execute(self, statement):
+        await asyncio.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return FakeResult(self.lag)
+
+
+def replica(calls, **session_kwargs):
+    """Session factory counting lag checks"""
+    def factory():
+        calls.append(1)
+        return FakeSession(**session_kwargs)
+    return factory
+
+
+class TestReplicaMonitor:
+    """Test replica selection"""
+
+    async def test_unconfigured_replica_is_never_used(self):
+        """Without READ_DATABASE_URL every read goes to the primary"""
+        monitor = ReplicaMonitor(None, max_lag_seconds=30, check_interval_seconds=5)
+        assert await monitor.is_usable() is False
+
+    async def test_replica_within_tolerance_is_used(self):
+        """A caught-up replica serves reads"""
+        monitor = ReplicaMonitor(replica([], lag=1.5), max_lag_seconds=30, check_interval_seconds=5)
+        assert await monitor.is_usable() is True
+        assert monitor.get_statistics()["lag_seconds"] == 1.5
+
+    async def test_lagging_replica_falls_back(self):
+        """A replica beyond the lag tolerance is skipped"""
+        monitor = ReplicaMonitor(replica([], lag=120), max_lag_seconds=30, check_interval_seconds=5)
+        assert await monitor.is_usable() is False
+
+    async def test_unreachable_replica_falls_back(self):
+        """Connection errors and slow checks send reads to the primary"""
+        failing = ReplicaMonitor(
+            replica([], error=ConnectionError("refused")), max_lag_seconds=30, check_interval_seconds=5
+        )
+        hanging = ReplicaMonitor(
+            replica([], lag=0, delay=1), max_lag_seconds=30, check_interval_seconds=5, check_timeout_seconds=0.05
+        )
+
+        assert await failing.is_usable() is False
+        assert failing.get_statistics()["last_error"] == "refused"
+        assert await hanging.is_usable() is False
+
+    async def test_lag_is_checked_once_per_interval(self):
+        """Routing decisions reuse the last measurement"""
+        calls = []
+        monitor = ReplicaMonitor(replica(calls, lag=0), max_lag_seconds=30, check_interval_seconds=60)
+
+        for _ in range(10):
+            await monitor.is_usable()
+
+        assert len(calls) == 1
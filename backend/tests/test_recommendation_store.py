@@ -0,0 +1,238 @@
+"""
+Tests for recommendation persistence helpers (plan round-trip, cursors, ETags)
+"""
+
+import uuid
+from datetime import datetime
+
+import pytest
+from fastapi import Response
+from sqlalchemy.dialects import postgresql
+from starlette.requests import Request
+
+from app.routes import orchestration
+from app.services.orchestrator import ExecutionPlan, Action, Recommendation
+from app.services.recommendation_store import (
+    RecommendationStore, serialize_plan, deserialize_plan, encode_cursor, decode_cursor, page_etag
+)
+
+ORG = str(uuid.UUID(int=1))
+VERSION = (2, datetime(2025, 11, 7, 9, 30), datetime(2025, 11, 7, 8, 0))
+
+
+class FakeResult:
+    def __init__(self, row):
+        self.row = row
+
+    def one(self):
+        return self.row
+
+
+class FakeSession:
+    """Records statements and answers with the given row"""
+
+    def __init__(self, row, statements):
+        self.row = row
+        self.statements = statements
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        pass
+
+    async def execute(self, statement):
+        self.statements.append(statement)
+        return FakeResult(self.row)
+
+
+class RecordingSession:
+    """Keeps added rows"""
+
+    def __init__(self):
+        self.added = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        pass
+
+    def add(self, row):
+        self.added.append(row)
+
+    async def commit(self):
+        pass
+
+
+class FakeStore:
+    """Page version and page for the listing route"""
+
+    def __init__(self, version, records=(), next_cursor=None):
+        self.version = version
+        self.records = list(records)
+        self.next_cursor = next_cursor
+        self.pages_read = 0
+
+    async def page_version(self, **params):
+        return self.version
+
+    async def list_page(self, **params):
+        self.pages_read += 1
+        return self.records, self.next_cursor
+
+
+def request(if_none_match=None):
+    headers = [(b"if-none-match", if_none_match.encode())] if if_none_match else []
+    return Request({"type": "http", "method": "GET", "path": "/recommendations", "headers": headers})
+
+
+async def list_recommendations(store, monkeypatch, if_none_match=None):
+    monkeypatch.setattr(orchestration, "recommendation_store", store)
+    response = Response()
+    result = await orchestration.get_recommendations(
+        request=request(if_none_match), response=response, organization_id=ORG, status="pending_approval",
+        since=None, limit=50, cursor=None
+    )
+    return result, response
+
+
+class TestRecommendationStore:
+    """Test storage round-trips and listing helpers"""
+
+    def test_plan_round_trip(self):
+        """A stored plan comes back as the dataclasses the executor expects"""
+        plan = ExecutionPlan(
+            plan_id="plan_1",
+            actions=[
+                Action("cancel_appointment", "doctor_office", {"appointment_id": "a1"}),
+                Action("send_sms", "sms", {"to": "c2"}, depends_on=["cancel_appointment"])
+            ],
+            estimated_duration_seconds=12,
+            affected_systems=["doctor_office", "sms"]
+        )
+
+        assert deserialize_plan(serialize_plan(plan)) == plan
+
+    def test_cursor_round_trip(self):
+        """Cursors decode to the (created_at, id) they were built from"""
+        created_at = datetime(2025, 11, 7, 9, 30, 15, 123456)
+        assert decode_cursor(encode_cursor(created_at, "rec_42")) == (created_at, "rec_42")
+
+    def test_malformed_cursor_is_rejected(self):
+        """Garbage cursors raise ValueError (surfaced as 400)"""
+        with pytest.raises(ValueError):
+            decode_cursor("not-a-cursor")
+
+    def test_etag_tracks_page_version(self):
+        """The ETag changes when the page's version or the params change"""
+        etag = page_etag(VERSION, ORG, "pending_approval", 50)
+
+        assert page_etag(VERSION, ORG, "pending_approval", 50) == etag
+        assert page_etag((2, datetime(2025, 11, 7, 9, 31), VERSION[2]), ORG, "pending_approval", 50) != etag
+        assert page_etag((3, *VERSION[1:]), ORG, "pending_approval", 50) != etag
+        assert page_etag(VERSION, ORG, "pending_approval", 20) != etag
+        assert page_etag(VERSION, str(uuid.UUID(int=2)), "pending_approval", 50) != etag
+
+    async def test_version_probe_skips_page_columns(self):
+        """The probe aggregates the page's range without reading the JSONB columns"""
+        statements = []
+        store = RecommendationStore(session_factory=lambda: FakeSession(VERSION, statements))
+
+        version = await store.page_version(
+            organization_id=ORG, status="pending_approval", limit=50,
+            cursor=encode_cursor(datetime(2025, 11, 7, 10, 0), "rec_9")
+        )
+        statement = statements[0].compile(dialect=postgresql.dialect())
+        sql = str(statement)
+
+        assert version == VERSION
+        assert sql.startswith("SELECT count(*) AS count_1, max(page.updated_at)")
+        assert "orchestration_recommendations.organization_id = %(organization_id_1)s::UUID" in sql
+        assert statement.params["organization_id_1"] == uuid.UUID(ORG)
+        assert "execution_plan" not in sql and "summary" not in sql
+        assert "ORDER BY orchestration_recommendations.created_at DESC, orchestration_recommendations.id DESC" in sql
+        assert "LIMIT %(param_1)s" in sql
+
+    async def test_listing_rejects_malformed_organization(self):
+        store = RecommendationStore(session_factory=lambda: FakeSession(VERSION, []))
+
+        with pytest.raises(ValueError):
+            await store.page_version(organization_id="long-beach-coc")
+
+    async def test_create_stores_organization_as_uuid(self):
+        """The owner is a UUID foreign key; records carry it as a string"""
+        session = RecordingSession()
+        store = RecommendationStore(session_factory=lambda: session)
+        organization_id = uuid.uuid4()
+
+        stored = await store.create({
+            "recommendation_id": "rec_1", "organization_id": str(organization_id), "summary": "Rebook",
+            "confidence_score": 0.9, "execution_plan": {"plan_id": "plan_1", "actions": []}
+        })
+
+        assert session.added[0].organization_id == organization_id
+        assert stored["organization_id"] == str(organization_id)
+
+    def test_trigger_requires_organization_uuid(self):
+        """Events name their organization by id; slugs and blanks are rejected"""
+        organization_id = uuid.uuid4()
+
+        def require(metadata):
+            trigger = orchestration.TriggerEventRequest(event_type="client_update", metadata=metadata)
+            return orchestration._require_organization(trigger)
+
+        assert require({"organization_id": str(organization_id).upper()}) == str(organization_id)
+        with pytest.raises(ValueError, match="not a valid UUID"):
+            require({"organization_id": "long-beach-coc"})
+        with pytest.raises(ValueError, match="required"):
+            require({})
+
+
+    async def test_stored_recommendation_is_created_in_utc(self, monkeypatch):
+        """created_at shares updated_at's clock, so since/cursor/ETag comparisons hold on any host"""
+        created = []
+
+        class RecordingStore:
+            async def create(self, record):
+                created.append(record)
+                return record
+
+        async def no_push(record):
+            pass
+
+        monkeypatch.setattr(orchestration, "recommendation_store", RecordingStore())
+        monkeypatch.setattr(orchestration, "publish_recommendation_update", no_push)
+        recommendation = Recommendation(
+            recommendation_id="rec_1", summary="Rebook", reasoning=[], impact={},
+            execution_plan=ExecutionPlan("plan_1", [], 0, []), confidence_score=0.9
+        )
+
+        before = datetime.utcnow()
+        await orchestration._store_recommendation(recommendation, ORG)
+
+        assert before <= created[0]["created_at"] <= datetime.utcnow()
+        assert created[0]["organization_id"] == ORG
+
+
+class TestRecommendationListing:
+    """Test ETag revalidation on the listing route"""
+
+    async def test_matching_etag_skips_the_page_query(self, monkeypatch):
+        store = FakeStore(VERSION)
+
+        result, _ = await list_recommendations(
+            store, monkeypatch, if_none_match=page_etag(VERSION, ORG, "pending_approval", None, 50, None)
+        )
+
+        assert result.status_code == 304
+        assert store.pages_read == 0
+
+    async def test_changed_page_is_returned_with_new_etag(self, monkeypatch):
+        store = FakeStore(VERSION, records=[{"recommendation_id": "rec_1"}], next_cursor="next")
+
+        result, response = await list_recommendations(store, monkeypatch, if_none_match='W/"stale"')
+
+        assert result == [{"recommendation_id": "rec_1"}]
+        assert response.headers["etag"] == page_etag(VERSION, ORG, "pending_approval", None, 50, None)
+        assert response.headers["x-next-cursor"] == "next"
@@ -0,0 +1,263 @@
+"""
+Tests for the analytics rollups (write-path upserts and rebuild)
+
+The upserts are Postgres statements (INSERT ... ON CONFLICT); their shape is
+checked against the compiled SQL everywhere, and the write path is compared
+with a full rebuild on a real database when TEST_DATABASE_URL points at a
+Postgres.
+"""
+
+import os
+import uuid
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import Column, MetaData, Table, create_engine, select, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.sql import Delete, Insert, Select, Update
+
+from app.models import (
+    Intake, Location, MutualSupportPair, IntakeDailyStats, IntakeHourlyStats, PairDailyStats
+)
+from app.services.hll import HyperLogLog
+from app.services.rollups import (
+    intake_hourly_rollup_upsert, intake_rollup_upsert, pair_rollup_upsert,
+    rebuild_rollups, record_intake_rollups
+)
+
+ORG = uuid.UUID(int=1)
+OTHER_ORG = uuid.UUID(int=2)
+LOCATION = uuid.UUID(int=10)
+
+
+def compiled(statement):
+    return statement.compile(dialect=postgresql.dialect())
+
+
+class FakeResult:
+    def __init__(self, rows=(), scalar=None):
+        self.rows = list(rows)
+        self.value = scalar
+
+    def scalar(self):
+        return self.value
+
+    def __iter__(self):
+        return iter(self.rows)
+
+
+class FakeSession:
+    """Records statements; upserts return `sketch`, selects return `rows`"""
+
+    def __init__(self, sketch=None, rows=()):
+        self.sketch = sketch
+        self.rows = rows
+        self.statements = []
+        self.committed = False
+
+    def execute(self, statement, parameters=None):
+        self.statements.append((statement, parameters))
+        if isinstance(statement, Select):
+            return FakeResult(self.rows)
+        return FakeResult(scalar=self.sketch)
+
+    def commit(self):
+        self.committed = True
+
+
+class TestUpserts:
+    """Test the write-path statements"""
+
+    def test_daily_upsert_increments_and_returns_sketch(self):
+        """One intake adds one to its (org, location, day) row and reads the row's sketch"""
+        statement = compiled(intake_rollup_upsert(ORG, LOCATION, datetime(2025, 3, 9, 23, 30)))
+        sql = str(statement)
+
+        assert "ON CONFLICT (organization_id, location_id, day) DO UPDATE" in sql
+        assert "intake_count = (intake_daily_stats.intake_count +" in sql
+        assert sql.endswith("RETURNING intake_daily_stats.clients_sketch")
+        assert statement.params["day"] == date(2025, 3, 9)
+
+    def test_hourly_upsert_truncates_to_the_hour(self):
+        statement = compiled(intake_hourly_rollup_upsert(ORG, LOCATION, datetime(2025, 3, 9, 23, 30, 15, 9)))
+
+        assert "ON CONFLICT (organization_id, location_id, hour) DO UPDATE" in str(statement)
+        assert statement.params["hour"] == datetime(2025, 3, 9, 23)
+
+    def test_pair_upsert_adds_eligibility_and_savings(self):
+        """IHSS eligibility and savings are added from the new row, not overwritten"""
+        statement = compiled(pair_rollup_upsert(ORG, datetime(2025, 3, 9, 8), True, 1250.0))
+        sql = str(statement)
+
+        assert "ihss_eligible_count = (pair_daily_stats.ihss_eligible_count + excluded.ihss_eligible_count)" in sql
+        assert "cost_savings_total = (pair_daily_stats.cost_savings_total + excluded.cost_savings_total)" in sql
+        assert (statement.params["ihss_eligible_count"], statement.params["cost_savings_total"]) == (1, 1250.0)
+        assert compiled(pair_rollup_upsert(ORG, datetime(2025, 3, 9), False, None)).params["cost_savings_total"] == 0.0
+
+
+class TestRecordIntake:
+    """Test the per-intake write path"""
+
+    def test_new_client_updates_sketch(self):
+        """Daily and hourly rows are upserted, then the grown sketch is written back"""
+        client_id = uuid.uuid4()
+        db = FakeSession(sketch=None)
+
+        record_intake_rollups(db, ORG, LOCATION, client_id, datetime(2025, 3, 9, 10, 5))
+
+        statements = [statement for statement, _ in db.statements]
+        assert [type(statement) for statement in statements[:2]] == [postgresql.Insert, postgresql.Insert]
+        assert isinstance(statements[2], Update)
+        sketch = HyperLogLog.from_bytes(compiled(statements[2]).params["clients_sketch"])
+        assert sketch.cardinality() == 1
+
+    def test_repeat_client_leaves_sketch_alone(self):
+        """A client already in the day's sketch costs no extra write"""
+        client_id = uuid.uuid4()
+        sketch = HyperLogLog()
+        sketch.add(client_id)
+        db = FakeSession(sketch=sketch.to_bytes())
+
+        record_intake_rollups(db, ORG, LOCATION, client_id, datetime(2025, 3, 9, 10, 5))
+
+        assert len(db.statements) == 2
+
+
+class TestRebuild:
+    """Test recomputing rollups from raw rows"""
+
+    def test_deletes_then_reinserts_in_one_transaction(self):
+        """Every rollup is cleared for the range, refilled from raw rows and committed once"""
+        day = date(2025, 3, 9)
+        clients = [uuid.uuid4() for _ in range(3)]
+        db = FakeSession(rows=[(ORG, LOCATION, day, client_id) for client_id in clients + clients[:1]])
+
+        rebuild_rollups(db, day, day + timedelta(days=1), organization_id=ORG)
+
+        statements = [statement for statement, _ in db.statements]
+        deletes = [statement for statement in statements if isinstance(statement, Delete)]
+        inserts = [statement for statement in statements if isinstance(statement, Insert)]
+        assert [statement.table.name for statement in deletes] == [
+            "intake_daily_stats", "intake_hourly_stats", "pair_daily_stats"
+        ]
+        assert [statement.table.name for statement in inserts] == [
+            "intake_daily_stats", "intake_hourly_stats", "pair_daily_stats"
+        ]
+        assert statements.index(deletes[-1]) < statements.index(inserts[0])
+        assert all(".organization_id = " in str(compiled(statement)) for statement in deletes + inserts)
+        assert db.committed
+
+        # Sketches are streamed per (org, location, day) and written in bulk
+        updates = [parameters for statement, parameters in db.statements if isinstance(statement, Update)]
+        assert len(updates) == 1 and len(updates[0]) == 1
+        assert HyperLogLog.from_bytes(updates[0][0]["clients_sketch"]).cardinality() == 3
+
+    def test_unscoped_rebuild_covers_every_organization(self):
+        db = FakeSession()
+
+        rebuild_rollups(db, date(2025, 3, 9), date(2025, 3, 9))
+
+        deletes = [statement for statement, _ in db.statements if isinstance(statement, Delete)]
+        assert not any("organization_id" in str(compiled(statement)) for statement in deletes)
+
+
+def bare_table(metadata, model, names=None):
+    """Copy of a model's table without foreign keys or NOT NULL constraints"""
+    columns = [column for column in model.__table__.columns if names is None or column.name in names]
+    return Table(
+        model.__tablename__, metadata,
+        *[Column(column.name, column.type, primary_key=column.primary_key) for column in columns]
+    )
+
+
+@pytest.mark.skipif(not os.getenv("TEST_DATABASE_URL"), reason="needs a Postgres TEST_DATABASE_URL")
+class TestRollupsOnPostgres:
+    """Write path and rebuild must agree"""
+
+    @pytest.fixture
+    def db(self):
+        """Raw and rollup tables (without foreign keys) in a throwaway schema; session.info["raw"] has the raw ones"""
+        engine = create_engine(os.environ["TEST_DATABASE_URL"])
+        schema = f"test_rollups_{uuid.uuid4().hex[:8]}"
+        with engine.begin() as connection:
+            connection.execute(text(f"CREATE SCHEMA {schema}"))
+        engine = engine.execution_options(schema_translate_map={None: schema})
+        metadata = MetaData()
+        raw = {
+            "locations": bare_table(metadata, Location, {"id", "organization_id", "latitude", "longitude"}),
+            "intakes": bare_table(metadata, Intake, {"id", "client_id", "location_id", "created_at"}),
+            "pairs": bare_table(metadata, MutualSupportPair, {
+                "id", "organization_id", "client_a_id", "client_b_id", "ihss_eligible", "cost_savings_estimate",
+                "created_at"
+            })
+        }
+        for model in (IntakeDailyStats, IntakeHourlyStats, PairDailyStats):
+            bare_table(metadata, model)
+        metadata.create_all(engine)
+        session = sessionmaker(bind=engine)()
+        session.info["raw"] = raw
+        yield session
+        session.close()
+        with engine.begin() as connection:
+            connection.execute(text(f"DROP SCHEMA {schema} CASCADE"))
+
+    def snapshot(self, db):
+        return (
+            sorted(db.execute(select(
+                IntakeDailyStats.organization_id, IntakeDailyStats.location_id,
+                IntakeDailyStats.day, IntakeDailyStats.intake_count, IntakeDailyStats.clients_sketch
+            )).all()),
+            sorted(db.execute(select(
+                IntakeHourlyStats.organization_id, IntakeHourlyStats.location_id,
+                IntakeHourlyStats.hour, IntakeHourlyStats.intake_count
+            )).all()),
+            sorted(db.execute(select(
+                PairDailyStats.organization_id, PairDailyStats.day, PairDailyStats.pair_count,
+                PairDailyStats.ihss_eligible_count, PairDailyStats.cost_savings_total
+            )).all())
+        )
+
+    def test_rebuild_matches_write_path(self, db):
+        """Rollups maintained per write equal rollups recomputed from raw rows"""
+        raw = db.info["raw"]
+        other_location = uuid.uuid4()
+        db.execute(raw["locations"].insert(), [
+            {"id": LOCATION, "organization_id": ORG}, {"id": other_location, "organization_id": OTHER_ORG}
+        ])
+        clients = [uuid.uuid4() for _ in range(4)]
+        start = datetime(2025, 3, 8, 22, 15)
+        for index in range(12):
+            location = LOCATION if index % 3 else other_location
+            organization_id = ORG if index % 3 else OTHER_ORG
+            created_at = start + timedelta(minutes=50 * index)
+            client_id = clients[index % len(clients)]
+            db.execute(raw["intakes"].insert().values(
+                id=uuid.uuid4(), client_id=client_id, location_id=location, created_at=created_at
+            ))
+            record_intake_rollups(db, organization_id, location, client_id, created_at)
+        for index, eligible in enumerate([True, False, True]):
+            created_at = start + timedelta(hours=3 * index)
+            db.execute(raw["pairs"].insert().values(
+                id=uuid.uuid4(), organization_id=ORG, client_a_id=clients[0], client_b_id=clients[1],
+                ihss_eligible=eligible, cost_savings_estimate=1000.0, created_at=created_at
+            ))
+            db.execute(pair_rollup_upsert(ORG, created_at, eligible, 1000.0))
+        db.commit()
+        maintained = self.snapshot(db)
+
+        rebuild_rollups(db, date(2025, 3, 8), date(2025, 3, 10))
+
+        assert self.snapshot(db) == maintained
+        assert maintained[2] == [(ORG, date(2025, 3, 8), 1, 1, 1000.0), (ORG, date(2025, 3, 9), 2, 1, 2000.0)]
+
+    def test_scoped_rebuild_leaves_other_organizations(self, db):
+        db.execute(PairDailyStats.__table__.insert().values(
+            organization_id=OTHER_ORG, day=date(2025, 3, 9), pair_count=5, ihss_eligible_count=0,
+            cost_savings_total=0.0, updated_at=datetime(2025, 3, 9)
+        ))
+        db.commit()
+
+        rebuild_rollups(db, date(2025, 3, 9), date(2025, 3, 9), organization_id=ORG)
+
+        assert db.execute(select(PairDailyStats.pair_count)).scalars().all() == [5]
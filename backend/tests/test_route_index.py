@@ -0,0 +1,178 @@
+"""
+Tests for the transport route index
+"""
+
+import json
+import random
+from datetime import datetime
+
+from app.services.route_index import RouteIndex, RouteStore
+from app.services.orchestrator import OrchestrationEngine, Event
+from app.services.worker_sync import WorkerSync
+
+# Two routes along Manhattan avenues, one crosstown
+ROUTES = [
+    {"route_id": "north_south", "polyline": [(40.70, -74.01), (40.80, -73.96)]},
+    {"route_id": "crosstown", "polyline": [(40.75, -74.00), (40.75, -73.94)], "stops": [(40.75, -73.94)]},
+    {"route_id": "bronx", "polyline": [(40.84, -73.90), (40.88, -73.88)]},
+]
+PROVIDERS = {"clinic_midtown": {"latitude": 40.75, "longitude": -73.97}, "clinic_bronx": (40.86, -73.89)}
+
+
+
+
+class FakeRedis:
+    """Hash commands of redis.asyncio, in memory"""
+
+    def __init__(self):
+        self.hashes = {}
+
+    async def hgetall(self, key):
+        return dict(self.hashes.get(key, {}))
+
+    async def hset(self, key, mapping):
+        self.hashes.setdefault(key, {}).update(mapping)
+
+
+class LinkedSync(WorkerSync):
+    """WorkerSync delivering straight to the other workers' instances"""
+
+    def __init__(self, peers):
+        super().__init__()
+        self.peers = peers
+        peers.append(self)
+
+    async def publish(self, topic, payload):
+        for peer in self.peers:
+            if peer is not self:
+                await peer.dispatch(topic, json.loads(json.dumps(payload)))
+
+
+def routes_event(**metadata):
+    return Event(
+        event_id="routes_v2", event_type="transport_routes_changed", timestamp=datetime.now(),
+        client_id=None, provider_id=None, metadata=metadata
+    )
+
+
+class TestRouteIndex:
+    """Test rasterized route compatibility"""
+
+    def test_shared_route_is_compatible(self):
+        index = RouteIndex(ROUTES, PROVIDERS)
+
+        near_crosstown = {"latitude": 40.7505, "longitude": -73.99}
+        far_away = {"latitude": 40.60, "longitude": -73.80}
+
+        assert index.is_compatible(near_crosstown, "clinic_midtown") is True
+        assert index.is_compatible(near_crosstown, "clinic_bronx") is False
+        assert index.is_compatible(far_away, "clinic_midtown") is False
+        assert index.routes_at(40.86, -73.89) == frozenset({"bronx"})
+
+    def test_unknown_location_is_undecided(self):
+        index = RouteIndex(ROUTES, PROVIDERS)
+
+        assert index.is_compatible({"id": "no_address"}, "clinic_midtown") is None
+        assert index.is_compatible({"latitude": 40.75, "longitude": -73.99}, "unknown_clinic") is None
+        assert index.compatible_many([{"id": "no_address"}, {"latitude": 40.60, "longitude": -73.80}],
+                                     "clinic_midtown").tolist() == [True, False]
+
+    async def test_ranking_uses_route_index(self):
+        engine = OrchestrationEngine()
+        await engine.handle_event(routes_event(routes=ROUTES, provider_locations=PROVIDERS))
+        await engine._route_rebuild
+        rng = random.Random(49)
+        candidates = [
+            {"id": f"c{n}", "urgency_score": rng.randint(0, 10), "documents_complete": rng.random() < 0.6,
+             "latitude": 40.75 + rng.uniform(-0.1, 0.1), "longitude": -73.95 + rng.uniform(-0.1, 0.1)}
+            for n in range(500)
+        ]
+        args = (candidates, datetime(2025, 11, 7, 10), "clinic_midtown", "primary_care", None)
+
+        ranked = engine._rank_appointment_candidates(*args)
+        scanned = engine._scan_appointment_candidates(*args)
+
+        assert engine.route_index.get_statistics()["routes"] == 3
+        assert ranked[0] is scanned[0] and ranked[1] == scanned[1]
+        assert engine._is_transport_compatible(ranked[0], "clinic_midtown", None)
+
+
+class TestRouteNetworkUpdates:
+    """Test background rebuilds and sharing the network across workers"""
+
+    async def test_rebuild_runs_in_background(self):
+        """The event returns before rasterizing; the old index serves meanwhile"""
+        engine = OrchestrationEngine()
+
+        await engine.handle_event(routes_event(routes=ROUTES, provider_locations=PROVIDERS))
+
+        assert engine.route_index is None
+        await engine._route_rebuild
+        assert engine.route_index.get_statistics()["routes"] == 3
+
+    async def test_changes_during_rebuild_are_folded(self):
+        """Later changes reuse the running rebuild for one more pass"""
+        engine = OrchestrationEngine()
+        builds = []
+        original = engine.refresh_route_index
+
+        async def counting_refresh():
+            builds.append(len(engine.route_network["routes"]))
+            await original()
+
+        engine.refresh_route_index = counting_refresh
+
+        first = engine.schedule_route_index_rebuild()
+        await engine.handle_event(routes_event(routes=ROUTES[:1]))
+        await engine.handle_event(routes_event(routes=ROUTES))
+        await first
+
+        assert engine._route_rebuild is first
+        assert builds == [3]
+        assert engine.route_index.get_statistics()["routes"] == 3
+
+    async def test_partial_change_keeps_other_part(self):
+        """Routes alone keep the known provider locations"""
+        engine = OrchestrationEngine()
+        await engine.handle_event(routes_event(routes=ROUTES, provider_locations=PROVIDERS))
+
+        await engine.handle_event(routes_event(routes=ROUTES[2:]))
+        await engine._route_rebuild
+
+        assert engine.route_index.get_statistics()["routes"] == 1
+        assert engine.route_index.get_statistics()["providers"] == 2
+        assert engine.route_index.is_compatible({"latitude": 40.86, "longitude": -73.89}, "clinic_bronx") is True
+
+    async def test_event_without_network_is_ignored(self):
+        """Nothing to rebuild from"""
+        engine = OrchestrationEngine()
+
+        await engine.handle_event(routes_event())
+
+        assert engine._route_rebuild is None
+
+    async def test_every_worker_rebuilds(self):
+        """A change received by one worker reaches the others' indexes"""
+        peers = []
+        workers = [OrchestrationEngine(worker_sync=LinkedSync(peers)) for _ in range(3)]
+
+        await workers[0].handle_event(routes_event(routes=ROUTES, provider_locations=PROVIDERS))
+        for worker in workers:
+            await worker._route_rebuild
+
+        for worker in workers:
+            assert worker.route_index.routes_at(40.86, -73.89) == frozenset({"bronx"})
+
+    async def test_new_worker_loads_stored_network(self):
+        """Workers starting later build from the shared store"""
+        redis = FakeRedis()
+        await OrchestrationEngine(route_store=RouteStore(redis)).handle_event(
+            routes_event(routes=ROUTES, provider_locations=PROVIDERS)
+        )
+
+        late = OrchestrationEngine(route_store=RouteStore(redis))
+        await late.load_route_network()
+        await late._route_rebuild
+
+        assert late.route_index.get_statistics()["providers"] == 2
+        assert late.route_index.is_compatible({"latitude": 40.7505, "longitude": -73.99}, "clinic_midtown") is True
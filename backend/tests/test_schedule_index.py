@@ -0,0 +1,120 @@
+"""
+Tests for schedule conflict detection
+"""
+
+import random
+from datetime import datetime, timedelta
+
+from app.services.schedule_index import ScheduleIndex
+from app.services.orchestrator import OrchestrationEngine, Context, Event
+
+DAY = datetime(2025, 11, 7)
+
+
+def random_bookings(rng, clients=200):
+    bookings = {}
+    for n in range(clients):
+        intervals = []
+        for _ in range(rng.randint(0, 12)):
+            start = DAY + timedelta(minutes=15 * rng.randint(0, 60))
+            intervals.append((start, start + timedelta(minutes=rng.choice([15, 30, 60, 240]))))
+        bookings[f"c{n}"] = intervals
+    return bookings
+
+
+def brute_force(bookings, client_id, start, end):
+    return any(s < end and e > start for s, e in bookings.get(client_id, []))
+
+
+def context_with(bookings):
+    return Context(
+        affected_client=None, related_clients=[], provider_capacity={}, system_state={},
+        historical_patterns=[], business_rules={}, schedule_index=ScheduleIndex(bookings)
+    )
+
+
+class TestScheduleIndex:
+    """Test interval overlap queries"""
+
+    def test_overlaps_match_brute_force(self):
+        rng = random.Random(48)
+        bookings = random_bookings(rng)
+        index = ScheduleIndex(bookings)
+        client_ids = list(bookings) + ["unknown"]
+
+        for _ in range(200):
+            start = DAY + timedelta(minutes=rng.randint(-120, 1000))
+            end = start + timedelta(minutes=rng.choice([1, 30, 90, 600]))
+            expected = [brute_force(bookings, c, start, end) for c in client_ids]
+
+            assert [index.overlaps(c, start, end) for c in client_ids] == expected
+            assert index.conflicts_many(client_ids, start, end).tolist() == expected
+
+    def test_touching_intervals_do_not_conflict(self):
+        index = ScheduleIndex({"c1": [{"start": "2025-11-07T09:00:00", "end": "2025-11-07T10:00:00"}]})
+
+        assert not index.overlaps("c1", DAY.replace(hour=10), DAY.replace(hour=11))
+        assert index.overlaps("c1", DAY.replace(hour=9, minute=59), DAY.replace(hour=11))
+        assert not index.conflicts_many(["c1"], DAY.replace(hour=8), DAY.replace(hour=9))[0]
+
+    def test_ranking_with_conflicts_matches_scan(self):
+        """The batch conflict bound never changes the ranking's answer"""
+        rng = random.Random(49)
+        engine = OrchestrationEngine()
+        for trial in range(100):
+            bookings = random_bookings(rng, clients=150)
+            candidates = [
+                {"id": f"c{n}", "urgency_score": rng.randint(0, 10), "documents_complete": rng.random() < 0.6}
+                for n in range(150)
+            ]
+            context = context_with(bookings)
+            args = (candidates, DAY + timedelta(minutes=30 * rng.randint(0, 30)), "provider_1", "primary_care", context)
+
+            ranked = engine._rank_appointment_candidates(*args)
+            scanned = engine._scan_appointment_candidates(*args)
+
+            assert ranked[0] is scanned[0] and ranked[1] == scanned[1], f"trial {trial}"
+
+    def test_conflicted_candidate_is_skipped(self):
+        engine = OrchestrationEngine()
+        appointment = DAY.replace(hour=10)
+        context = context_with({"busy": [(appointment - timedelta(minutes=20), appointment - timedelta(minutes=10))]})
+        candidates = [
+            {"id": "busy", "urgency_score": 10, "documents_complete": True},
+            {"id": "free", "urgency_score": 9, "documents_complete": True}
+        ]
+
+        best, _ = engine._rank_appointment_candidates(candidates, appointment, "provider_1", "primary_care", context)
+
+        assert best["id"] == "free"
+
+    async def test_context_indexes_related_clients_bookings(self):
+        """Bookings arrive with the related clients; invalid ones flag the candidates as partial"""
+        appointment = DAY.replace(hour=10)
+        event = Event(
+            event_id="evt_1",
+            event_type="appointment_cancelled",
+            timestamp=DAY,
+            client_id=None,
+            provider_id="provider_1",
+            metadata={"appointment_time": appointment.isoformat()}
+        )
+
+        class BookedEngine(OrchestrationEngine):
+            bookings = [{"start": appointment.isoformat(), "end": (appointment + timedelta(hours=1)).isoformat()}]
+
+            async def _query_related_clients(self, event, db=None):
+                return [
+                    {"id": "busy", "bookings": self.bookings},
+                    {"id": "free"}
+                ]
+
+        context = await BookedEngine()._get_full_context(event)
+        assert context.schedule_index.overlaps("busy", appointment, appointment + timedelta(minutes=30))
+        assert not context.schedule_index.overlaps("free", appointment, appointment + timedelta(minutes=30))
+        assert context.is_complete()
+
+        BookedEngine.bookings = [{"start": "not a time", "end": "later"}]
+        context = await BookedEngine()._get_full_context(event)
+        assert len(context.schedule_index) == 0
+        assert context.partial_sources == ["related_clients"]
@@ -0,0 +1,104 @@
+"""
+Tests for cross-worker statistics counters
+"""
+
+
+from app.services.shared_stats import KEY_PREFIX, SharedCounters
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.ops = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    def hincrby(self, key, field, delta):
+        self.ops.append((key, field, delta))
+
+    def expire(self, key, seconds):
+        self.ops.append((key, None, seconds))
+
+    async def execute(self):
+        if self.redis.down:
+            raise ConnectionError("redis down")
+        for key, field, value in self.ops:
+            if field is None:
+                self.redis.ttls[key] = value
+                continue
+            fields = self.redis.hashes.setdefault(key, {})
+            fields[field] = str(int(fields.get(field, 0)) + value)
+
+
+class FakeRedis:
+    """Just enough of redis.asyncio for the counters"""
+
+    def __init__(self):
+        self.hashes = {}
+        self.ttls = {}
+        self.down = False
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    async def hgetall(self, key):
+        if self.down:
+            raise ConnectionError("redis down")
+        return dict(self.hashes.get(key, {}))
+
+
+class TestSharedCounters:
+    """Test counter aggregation"""
+
+    async def test_totals_sum_all_workers(self):
+        """Two workers flushing into one hash report combined totals"""
+        redis = FakeRedis()
+        worker_a = SharedCounters("orchestrator", redis_client=redis)
+        worker_b = SharedCounters("orchestrator", redis_client=redis)
+
+        worker_a.incr("decisions_made", 3)
+        worker_b.incr("decisions_made")
+        worker_b.incr("ai_decisions")
+        await worker_b.flush()
+
+        assert await worker_a.totals() == {"decisions_made": 4, "ai_decisions": 1}
+
+    async def test_failed_flush_is_retried(self):
+        """Deltas survive a Redis outage and reads fall back to local counts"""
+        redis = FakeRedis()
+        counters = SharedCounters("executor", redis_client=redis)
+        counters.incr("executions_count", 2)
+
+        redis.down = True
+        assert await counters.totals() == {"executions_count": 2}
+
+        redis.down = False
+        assert await counters.totals() == {"executions_count": 2}
+
+    async def test_flush_renews_expiry(self):
+        """Hashes nobody writes to any more are dropped by Redis"""
+        redis = FakeRedis()
+        counters = SharedCounters("orchestrator", redis_client=redis, ttl_seconds=3600)
+
+        counters.incr("decisions_made")
+        await counters.flush()
+
+        assert redis.ttls == {counters.key: 3600}
+
+    async def test_deploys_count_separately(self):
+        """A new deploy starts from zero instead of adding to the previous totals"""
+        redis = FakeRedis()
+        old = SharedCounters("orchestrator", redis_client=redis, deploy_id="a1b2c3")
+        new = SharedCounters("orchestrator", redis_client=redis, deploy_id="d4e5f6")
+
+        old.incr("decisions_made", 5)
+        await old.flush()
+        new.incr("decisions_made")
+
+        assert new.key == f"{KEY_PREFIX}d4e5f6:orchestrator"
+        assert await new.totals() == {"decisions_made": 1}
+
@@ -0,0 +1,117 @@
+"""
+Tests for cross-worker state sync (publish, listen and dispatch)
+"""
+
+import asyncio
+import json
+
+from app.services.worker_sync import WorkerSync, CHANNEL_PREFIX
+
+
+class FakePubSub:
+    def __init__(self, bus):
+        self.bus = bus
+        self.queue = asyncio.Queue()
+        bus.subscribers.append(self)
+
+    async def psubscribe(self, pattern):
+        pass
+
+    async def listen(self):
+        while True:
+            yield await self.queue.get()
+
+    async def close(self):
+        self.bus.subscribers.remove(self)
+
+
+class FakeRedis:
+    """Pattern pub/sub of redis.asyncio shared by several workers, in memory"""
+
+    def __init__(self):
+        self.subscribers = []
+
+    def pubsub(self):
+        return FakePubSub(self)
+
+    async def publish(self, channel, data):
+        for subscriber in self.subscribers:
+            subscriber.queue.put_nowait({"type": "pmessage", "channel": channel, "data": data})
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+class TestWorkerSync:
+    """Test topic fan-out between workers"""
+
+    async def test_other_workers_apply_changes(self):
+        """Every other worker runs the topic's handlers; the publisher does not"""
+        redis = FakeRedis()
+        workers = [WorkerSync(redis) for _ in range(3)]
+        received = {index: [] for index in range(3)}
+        for index, worker in enumerate(workers):
+            worker.on("housing_waitlist", received[index].append)
+            await worker.start()
+
+        await workers[0].publish("housing_waitlist", {"client_id": "client_a"})
+        await settle()
+
+        assert received == {0: [], 1: [{"client_id": "client_a"}], 2: [{"client_id": "client_a"}]}
+        for worker in workers:
+            await worker.stop()
+
+    async def test_topics_are_separate(self):
+        """Handlers only see their own topic"""
+        redis = FakeRedis()
+        sender, receiver = WorkerSync(redis), WorkerSync(redis)
+        seen = []
+        receiver.on("route_index", seen.append)
+        await receiver.start()
+
+        await sender.publish("housing_waitlist", {"client_id": "client_a"})
+        await sender.publish("route_index", {"version": 2})
+        await settle()
+
+        assert seen == [{"version": 2}]
+        await receiver.stop()
+
+    async def test_failing_handler_does_not_stop_others(self):
+        """One broken handler is counted and the rest still run"""
+        sync = WorkerSync()
+        seen = []
+
+        def broken(payload):
+            raise RuntimeError("boom")
+
+        async def working(payload):
+            seen.append(payload)
+
+        sync.on("context_invalidation", broken)
+        sync.on("context_invalidation", working)
+        await sync.dispatch("context_invalidation", {"key": ["system_state"]})
+
+        assert seen == [{"key": ["system_state"]}]
+        assert sync.get_statistics()["failed"] == 1
+
+    async def test_single_worker_publish_is_a_no_op(self):
+        """Without Redis there is nobody to tell"""
+        sync = WorkerSync()
+
+        await sync.publish("housing_waitlist", {"client_id": "client_a"})
+
+        assert sync.get_statistics() == {"published": 0, "received": 0, "failed": 0, "cross_worker": False}
+
+    async def test_envelope_names_origin(self):
+        """Published messages carry the worker id used to skip echoes"""
+        redis = FakeRedis()
+        subscriber = FakePubSub(redis)
+        sync = WorkerSync(redis)
+
+        await sync.publish("housing_waitlist", {"client_id": "client_a"})
+        raw = subscriber.queue.get_nowait()
+
+        assert raw["channel"] == f"{CHANNEL_PREFIX}housing_waitlist"
+        assert json.loads(raw["data"]) == {"origin": sync.worker_id, "payload": {"client_id": "client_a"}}
@@ -95,11 +95,12 @@ function RecommendationCard({ recommendation, onApprove, onReject, isApproving,
             Pending Approval
           </div>
         )
+      case 'queued':
       case 'executing':
         return (
           <div className="flex items-center gap-2 px-3 py-1 bg-primary-100 text-primary-700 rounded-full text-sm font-medium">
             <div className="animate-spin rounded-full h-3 w-3 border-b-2 border-primary-600" />
-            Executing
+            {status === 'queued' ? 'Queued' : 'Executing'}
           </div>
         )
       case 'completed':
@@ -252,7 +253,7 @@ function RecommendationCard({ recommendation, onApprove, onReject, isApproving,
           </div>
         )}
 
-        {status === 'executing' && (
+        {(status === 'queued' || status === 'executing') && (
           <div className="flex items-center justify-center gap-2 py-2">
             <div className="animate-spin rounded-full h-5 w-5 border-b-2 border-primary-600"></div>
             <span className="text-sm font-medium text-primary-700">Executing coordination plan...</span>
@@ -1,13 +1,16 @@
 import { useQuery, useMutation, useQueryClient } from '@tanstack/react-query'
 
 const API_URL = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000'
+const ORGANIZATION_ID = process.env.NEXT_PUBLIC_ORGANIZATION_ID
 
 // Poll recommendations every 5 seconds
 export function useRecommendations() {
   return useQuery({
     queryKey: ['recommendations'],
     queryFn: async () => {
-      const res = await fetch(`${API_URL}/api/v1/orchestration/recommendations`)
+      const res = await fetch(
+        `${API_URL}/api/v1/orchestration/recommendations?organization_id=${ORGANIZATION_ID}`
+      )
       if (!res.ok) throw new Error('Failed to fetch recommendations')
       return res.json()
     },
@@ -75,7 +78,8 @@ export function useTriggerDemoEvent() {
           provider_id: 'dr_smith_001',
           metadata: {
             appointment_time: new Date(Date.now() + 86400000).toISOString(), // tomorrow
-            reason: 'client_cancellation'
+            reason: 'client_cancellation',
+            organization_id: ORGANIZATION_ID
           }
         })
       })